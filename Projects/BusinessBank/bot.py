@@ -35,6 +35,7 @@ from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandl
 
 sys.path.insert(0, str(Path(__file__).parent))
 
+from src.history_store import HistoryStore
 from src.reports_sheet import rebuild_reports_sheet
 from src.sheets_client import WbSheetsClient
 from src.wb_detail_report import SchemaError as DetailSchemaError
@@ -49,6 +50,8 @@ load_dotenv(Path(__file__).parent / ".env")
 BOT_TOKEN     = os.getenv("BOT_TOKEN", "")
 WB_SHEETS_ID  = os.getenv("WB_SHEETS_ID", "")
 SA_PATH       = Path(os.getenv("SA_PATH", "../FinanceBot/service_account.json"))
+# Локальная история детальных отчётов (Parquet) — источник для сводок и дашборда
+HISTORY_DIR   = Path(os.getenv("WB_HISTORY_DIR", str(Path(__file__).parent / "data" / "wb_history")))
 _allowed_raw  = os.getenv("BOT_ALLOWED_IDS", "")
 ALLOWED_IDS: set[int] = {
     int(x.strip()) for x in _allowed_raw.split(",") if x.strip().isdigit()
@@ -284,7 +287,11 @@ async def _process_detail(file_path: Path, update: Update) -> str:
                 f"{date_from.strftime('%d.%m.%Y')} — {date_to.strftime('%d.%m.%Y')}"
             )
 
-        sheets_client = WbSheetsClient(sa_path=SA_PATH, spreadsheet_id=WB_SHEETS_ID)
+        sheets_client = WbSheetsClient(
+            sa_path=SA_PATH,
+            spreadsheet_id=WB_SHEETS_ID,
+            history_store=HistoryStore(HISTORY_DIR),
+        )
 
         if data_type == "по_выкупам":
             sheets_client.update_buyouts(df)
@@ -609,8 +609,7 @@ def main():
             try:
                 raw_bank = parse_statement(bank_path)
                 clf = TransactionClassifier()
-                classified = [clf.classify(row, owner_name=OWNER) for _, row in raw_bank.iterrows()]
-                bank_df = pd.DataFrame(classified)
+                bank_df = clf.classify_frame(raw_bank, owner_name=OWNER).reset_index(drop=True)
                 # Добавляем подписанную сумму: доход + расход -
                 if "amount" in bank_df.columns and "tx_type" in bank_df.columns:
                     bank_df["amount_rub"] = bank_df.apply(
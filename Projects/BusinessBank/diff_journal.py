@@ -124,24 +124,19 @@ def read_bank_modulbank(bank_path: Path, owner_name: str = "") -> pd.DataFrame:
     raw = parse_statement(bank_path)
     classifier = TransactionClassifier()
 
-    records = []
-    for _, row in raw.iterrows():
-        cls = classifier.classify(row, owner_name=owner_name)
-        signed = row["amount_in"] if row["is_income"] else -row["amount_out"]
-
-        records.append(
-            {
-                "date":        row["date"].date(),
-                "amount":      signed,
-                "counterparty": row["counterparty"],
-                "purpose":     row["purpose"],
-                "type":        cls["type"],
-                "category":    cls["category"],
-                "subcategory": cls["subcategory"],
-            }
-        )
+    cls = classifier.classify_frame(raw, owner_name=owner_name)
 
-    result = pd.DataFrame(records)
+    result = pd.DataFrame(
+        {
+            "date":        raw["date"].dt.date,
+            "amount":      raw["amount_in"].where(raw["is_income"], -raw["amount_out"]),
+            "counterparty": raw["counterparty"],
+            "purpose":     raw["purpose"],
+            "type":        cls["type"],
+            "category":    cls["category"],
+            "subcategory": cls["subcategory"],
+        }
+    ).reset_index(drop=True)
     logger.info(f"Банк: {len(result)} транзакций (период: {result['date'].min()} → {result['date'].max()})")
     return result
 
@@ -53,14 +53,14 @@ def build_journal(df: pd.DataFrame, entity: str, owner_name: str = "") -> pd.Dat
                     на личные счета без пометки "перевод между счетами".
     """
     classifier = TransactionClassifier()
-    results = [classifier.classify(row, owner_name=owner_name) for _, row in df.iterrows()]
+    results = classifier.classify_frame(df, owner_name=owner_name)
 
     journal = df.copy()
     journal["entity"]     = entity
-    journal["type"]       = [r["type"]       for r in results]
-    journal["category"]   = [r["category"]   for r in results]
-    journal["subcategory"] = [r["subcategory"] for r in results]
-    journal["confidence"] = [r["confidence"] for r in results]
+    journal["type"]       = results["type"]
+    journal["category"]   = results["category"]
+    journal["subcategory"] = results["subcategory"]
+    journal["confidence"] = results["confidence"]
     journal["currency"]   = "RUB"
     journal["source"]     = "bank_statement"
 
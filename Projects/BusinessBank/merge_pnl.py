@@ -100,13 +100,13 @@ def _empty_unified() -> pd.DataFrame:
 
 def _classify_bank(df: pd.DataFrame, entity: str, owner: str) -> pd.DataFrame:
     clf = TransactionClassifier()
-    results = [clf.classify(row, owner_name=owner) for _, row in df.iterrows()]
+    results = clf.classify_frame(df, owner_name=owner)
 
     out = df.copy()
     out["entity"]      = entity
-    out["tx_type"]     = [r["type"]       for r in results]
-    out["category"]    = [r["category"]   for r in results]
-    out["subcategory"] = [r["subcategory"] for r in results]
+    out["tx_type"]     = results["type"]
+    out["category"]    = results["category"]
+    out["subcategory"] = results["subcategory"]
     out["source"]      = "bank"
     out["currency"]    = "RUB"
     return out
@@ -9,6 +9,10 @@ articles_aggregator.py — P&L сводка по артикулам из ист
     build_article_pnl_by_period(df, "Q")  — по кварталам
     build_article_pnl_by_period(df, "Y")  — по годам
     build_dashboard_rows(df)              — дашборд: последний период vs предыдущий
+    build_article_reports(df)             — сводка + M/Q/Y за один проход
+
+Все метрики считаются одной groupby-агрегацией «артикул × месяц» (_aggregate_base);
+кварталы, годы и all-time сводка — перегруппировка этой базы, а не новый проход по строкам.
 
 Источник данных: «История {year}» — год-партиционированные листы детальных отчётов.
 """
@@ -17,6 +21,7 @@ import logging
 from datetime import date as _date
 from typing import Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
@@ -64,6 +69,11 @@ _MONTH_RU = {
 # Мета-поля: берём первое непустое значение внутри группы артикула
 _META_COLS = ["Название", "Предмет", "Бренд"]
 
+# Ключ месяца в базовой агрегации: год * 12 + (месяц - 1); строки без даты продажи
+_NO_MONTH = -1
+# Делитель ключа месяца → ключ периода (квартал: год * 4 + (квартал - 1), год: год)
+_PERIOD_DIVISOR = {"M": 1, "Q": 3, "Y": 12}
+
 
 # ─── Публичные функции ────────────────────────────────────────────────────────
 
@@ -94,69 +104,7 @@ def build_article_summary(history_df: pd.DataFrame) -> pd.DataFrame:
     if history_df.empty or _ARTICLE_COL not in history_df.columns:
         return pd.DataFrame()
 
-    df = _prep_df(history_df)
-
-    rows = []
-    for article, grp in df.groupby(_ARTICLE_COL, sort=True):
-        metrics = _article_metrics(grp)
-
-        # Период по артикулу (первая и последняя дата продажи)
-        if "_sale_date" in grp.columns:
-            valid_dates = grp["_sale_date"].dropna()
-            date_first = valid_dates.min().strftime("%d.%m.%Y") if not valid_dates.empty else ""
-            date_last  = valid_dates.max().strftime("%d.%m.%Y") if not valid_dates.empty else ""
-        else:
-            date_first = date_last = ""
-
-        row: Dict = {
-            _ARTICLE_COL:              str(article),
-            "Название":                _first_nonempty(grp, "Название"),
-            "Предмет":                 _first_nonempty(grp, "Предмет"),
-            "Бренд":                   _first_nonempty(grp, "Бренд"),
-            "Первая продажа":          date_first,
-            "Последняя продажа":       date_last,
-            **metrics,
-        }
-        rows.append(row)
-
-    if not rows:
-        return pd.DataFrame()
-
-    result = pd.DataFrame(rows)
-
-    # Сортировка по нетто-прибыли (лучшие артикулы наверху)
-    result = result.sort_values("Нетто-прибыль", ascending=False).reset_index(drop=True)
-
-    # Строка ИТОГО
-    totals: Dict = {
-        _ARTICLE_COL:              "ИТОГО",
-        "Название":                "",
-        "Предмет":                 "",
-        "Бренд":                   "",
-        "Первая продажа":          result["Первая продажа"].min() if not result.empty else "",
-        "Последняя продажа":       result["Последняя продажа"].max() if not result.empty else "",
-        "Продажи (шт.)":           int(result["Продажи (шт.)"].sum()),
-        "Возвраты (шт.)":          int(result["Возвраты (шт.)"].sum()),
-        "% возвратов":             _total_return_rate(result),
-        "К перечислению (Продажи)":  round(float(result["К перечислению (Продажи)"].sum()), 2),
-        "К перечислению (Возвраты)": round(float(result["К перечислению (Возвраты)"].sum()), 2),
-        "К перечислению ИТОГО":      round(float(result["К перечислению ИТОГО"].sum()), 2),
-        "Нетто-прибыль":             round(float(result["Нетто-прибыль"].sum()), 2),
-        "Логистика на ед.":          "",
-    }
-    for fin_key, col_name in _FIN_COLS.items():
-        col_label = _fin_col_label(fin_key)
-        if col_label in result.columns:
-            totals[col_label] = round(float(result[col_label].sum()), 2)
-
-    logger.info(
-        "build_article_summary: %d артикулов, продажи=%d, возвраты=%d",
-        len(result),
-        totals["Продажи (шт.)"],
-        totals["Возвраты (шт.)"],
-    )
-
-    return pd.concat([result, pd.DataFrame([totals])], ignore_index=True)
+    return _summary_from_base(_aggregate_base(_prep_df(history_df)))
 
 
 def build_article_pnl_by_period(
@@ -192,52 +140,27 @@ def build_article_pnl_by_period(
     if history_df.empty or _ARTICLE_COL not in history_df.columns:
         return pd.DataFrame()
 
-    df = _prep_df(history_df)
+    return _period_from_base(_aggregate_base(_prep_df(history_df)), freq)
 
-    # Только строки с валидной датой продажи
-    df = df.dropna(subset=["_sale_date"]).copy()
-    if df.empty:
-        return pd.DataFrame()
-
-    df["_period"] = df["_sale_date"].dt.to_period(freq)
-
-    rows = []
-    for (period, article), grp in df.groupby(["_period", _ARTICLE_COL], sort=True):
-        metrics = _article_metrics(grp)
-        ts = period.start_time
-
-        row: Dict = {
-            "Год":      int(ts.year),
-            "Период":   _period_label(ts, freq),
-            "_ord":     period.ordinal,
-            _ARTICLE_COL:  str(article),
-            "Название":    _first_nonempty(grp, "Название"),
-            "Бренд":       _first_nonempty(grp, "Бренд"),
-            "Предмет":     _first_nonempty(grp, "Предмет"),
-            **metrics,
-        }
-        rows.append(row)
 
-    if not rows:
-        return pd.DataFrame()
+def build_article_reports(history_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    All-time сводка и P&L по месяцам / кварталам / годам из одной базовой агрегации.
 
-    result = pd.DataFrame(rows)
+    Результат тот же, что у build_article_summary + build_article_pnl_by_period × 3,
+    но строки истории группируются один раз.
 
-    # Сортировка: новые периоды сверху, внутри периода — по нетто-прибыли desc
-    result = (
-        result
-        .sort_values(["_ord", "Нетто-прибыль"], ascending=[False, False])
-        .drop(columns=["_ord"])
-        .reset_index(drop=True)
-    )
+    Returns:
+        {"summary": ..., "M": ..., "Q": ..., "Y": ...}; пустые DataFrame если нет данных.
+    """
+    if history_df.empty or _ARTICLE_COL not in history_df.columns:
+        return {key: pd.DataFrame() for key in ("summary", "M", "Q", "Y")}
 
-    logger.info(
-        "build_article_pnl_by_period(freq=%s): %d строк (%d уникальных артикулов)",
-        freq,
-        len(result),
-        result[_ARTICLE_COL].nunique(),
-    )
-    return result
+    base = _aggregate_base(_prep_df(history_df))
+    reports = {"summary": _summary_from_base(base)}
+    for freq in ("M", "Q", "Y"):
+        reports[freq] = _period_from_base(base, freq)
+    return reports
 
 
 def build_dashboard_rows(history_df: pd.DataFrame) -> List[List]:
@@ -400,6 +323,217 @@ def build_dashboard_rows(history_df: pd.DataFrame) -> List[List]:
     return rows
 
 
+# ─── Агрегация ────────────────────────────────────────────────────────────────
+
+def _aggregate_base(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Одна groupby-агрегация по (артикул, месяц) после _prep_df.
+
+    Продажи/возвраты разнесены в индикаторные колонки заранее, поэтому все суммы
+    и счётчики считаются одним .agg() без фильтрации внутри групп. Все поля
+    аддитивны (или min/max), так что любой более крупный период — перегруппировка
+    базы (_regroup). Строки без даты продажи попадают в месяц _NO_MONTH.
+    """
+    df = df[df[_ARTICLE_COL].notna()]
+    if _DOC_TYPE_COL in df.columns:
+        is_sale   = (df[_DOC_TYPE_COL] == _SALE_TYPE).to_numpy()
+        is_return = (df[_DOC_TYPE_COL] == _RETURN_TYPE).to_numpy()
+    else:
+        is_sale   = np.ones(len(df), dtype=bool)
+        is_return = np.zeros(len(df), dtype=bool)
+
+    payout = df[_PAYOUT_COL].to_numpy(dtype=float) if _PAYOUT_COL in df.columns else np.zeros(len(df))
+    sale_date = df["_sale_date"]
+    month = (sale_date.dt.year * 12 + sale_date.dt.month - 1).fillna(_NO_MONTH).astype(int)
+
+    work = pd.DataFrame({
+        _ARTICLE_COL:      df[_ARTICLE_COL].to_numpy(),
+        "_month":          month.to_numpy(),
+        "_sales":          is_sale.astype(int),
+        "_returns":        is_return.astype(int),
+        "_payout":         payout,
+        "_payout_sales":   np.where(is_sale, payout, 0.0),
+        "_payout_returns": np.where(is_return, payout, 0.0),
+        "_date_first":     sale_date.to_numpy(),
+        "_date_last":      sale_date.to_numpy(),
+    })
+    for key, col in _FIN_COLS.items():
+        work[f"_fin_{key}"] = df[col].to_numpy(dtype=float) if col in df.columns else 0.0
+
+    # Мета-поля: непустое значение + номер строки (первое в группе = минимальный номер)
+    positions = np.arange(len(df), dtype=float)
+    for col in _META_COLS:
+        if col in df.columns:
+            values = df[col]
+            text = values.astype(str)
+            nonempty = (values.notna() & (text.str.strip() != "")).to_numpy()
+            work[col] = np.where(nonempty, text.to_numpy(dtype=object), None)
+            work[f"_pos_{col}"] = np.where(nonempty, positions, np.nan)
+
+    return _regroup(work, [_ARTICLE_COL, "_month"])
+
+
+def _regroup(frame: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """Сгруппировать строки / базу по keys: суммы аддитивных полей, min/max дат и позиций."""
+    meta = [col for col in _META_COLS if col in frame.columns]
+    spec = {}
+    for col in frame.columns:
+        if col in keys or col in meta or col == "_month":
+            continue
+        if col == "_date_last":
+            spec[col] = "max"
+        elif col == "_date_first" or col.startswith("_pos_"):
+            spec[col] = "min"
+        else:
+            spec[col] = "sum"
+    result = frame.groupby(keys, sort=True).agg(spec)
+    # Мета-значение с минимальным номером строки: stable-сортировка по номеру + first (пропускает None)
+    for col in meta:
+        ordered = frame.sort_values(f"_pos_{col}", kind="stable", na_position="last")
+        result[col] = ordered.groupby(keys, sort=True)[col].first()
+    return result.reset_index()
+
+
+def _round_values(values: pd.Series, digits: int) -> pd.Series:
+    """round() по значениям — совпадает с округлением в _article_metrics."""
+    return values.map(lambda v: round(float(v), digits))
+
+
+def _metrics_frame(groups: pd.DataFrame) -> pd.DataFrame:
+    """Колонки P&L метрик (как в _article_metrics) для каждой строки сгруппированной базы."""
+    n_sales   = groups["_sales"].astype(int)
+    n_returns = groups["_returns"].astype(int)
+    total     = n_sales + n_returns
+    return_rate = _round_values(n_returns / total.where(total > 0, 1) * 100, 1).where(total > 0, 0.0)
+
+    payout_total = _round_values(groups["_payout"], 2)
+    fin_sums = {key: _round_values(groups[f"_fin_{key}"], 2) for key in _FIN_COLS}
+    net_profit = _round_values(payout_total + sum(fin_sums[k] for k in _NET_PROFIT_FIN_KEYS), 2)
+    logistics_per_unit = _round_values(
+        fin_sums["logistics"] / n_sales.where(n_sales > 0, 1), 2
+    ).where(n_sales > 0, 0.0)
+
+    metrics = pd.DataFrame({
+        "Продажи (шт.)":              n_sales,
+        "Возвраты (шт.)":             n_returns,
+        "% возвратов":                return_rate,
+        "К перечислению (Продажи)":   _round_values(groups["_payout_sales"], 2),
+        "К перечислению (Возвраты)":  _round_values(groups["_payout_returns"], 2),
+        "К перечислению ИТОГО":       payout_total,
+    })
+    for key in _FIN_COLS:
+        metrics[_fin_col_label(key)] = fin_sums[key]
+    metrics["Нетто-прибыль"] = net_profit
+    metrics["Логистика на ед."] = logistics_per_unit
+    return metrics
+
+
+def _meta_values(groups: pd.DataFrame, col: str) -> pd.Series:
+    """Первое непустое значение мета-поля в каждой группе (как _first_nonempty)."""
+    if col not in groups.columns:
+        return pd.Series("", index=groups.index, dtype=str)
+    return groups[col].map(lambda value: value if isinstance(value, str) else "").astype(str)
+
+
+def _summary_from_base(base: pd.DataFrame) -> pd.DataFrame:
+    """All-time сводка по артикулам + строка ИТОГО из базовой агрегации."""
+    if base.empty:
+        return pd.DataFrame()
+
+    groups = _regroup(base, [_ARTICLE_COL])
+    result = pd.concat([
+        pd.DataFrame({
+            _ARTICLE_COL:        groups[_ARTICLE_COL].map(str),
+            "Название":          _meta_values(groups, "Название"),
+            "Предмет":           _meta_values(groups, "Предмет"),
+            "Бренд":             _meta_values(groups, "Бренд"),
+            "Первая продажа":    groups["_date_first"].map(lambda d: d.strftime("%d.%m.%Y") if pd.notna(d) else ""),
+            "Последняя продажа": groups["_date_last"].map(lambda d: d.strftime("%d.%m.%Y") if pd.notna(d) else ""),
+        }),
+        _metrics_frame(groups),
+    ], axis=1)
+
+    # Сортировка по нетто-прибыли (лучшие артикулы наверху)
+    result = result.sort_values("Нетто-прибыль", ascending=False).reset_index(drop=True)
+
+    # Строка ИТОГО
+    totals: Dict = {
+        _ARTICLE_COL:              "ИТОГО",
+        "Название":                "",
+        "Предмет":                 "",
+        "Бренд":                   "",
+        "Первая продажа":          result["Первая продажа"].min() if not result.empty else "",
+        "Последняя продажа":       result["Последняя продажа"].max() if not result.empty else "",
+        "Продажи (шт.)":           int(result["Продажи (шт.)"].sum()),
+        "Возвраты (шт.)":          int(result["Возвраты (шт.)"].sum()),
+        "% возвратов":             _total_return_rate(result),
+        "К перечислению (Продажи)":  round(float(result["К перечислению (Продажи)"].sum()), 2),
+        "К перечислению (Возвраты)": round(float(result["К перечислению (Возвраты)"].sum()), 2),
+        "К перечислению ИТОГО":      round(float(result["К перечислению ИТОГО"].sum()), 2),
+        "Нетто-прибыль":             round(float(result["Нетто-прибыль"].sum()), 2),
+        "Логистика на ед.":          "",
+    }
+    for fin_key, col_name in _FIN_COLS.items():
+        col_label = _fin_col_label(fin_key)
+        if col_label in result.columns:
+            totals[col_label] = round(float(result[col_label].sum()), 2)
+
+    logger.info(
+        "build_article_summary: %d артикулов, продажи=%d, возвраты=%d",
+        len(result),
+        totals["Продажи (шт.)"],
+        totals["Возвраты (шт.)"],
+    )
+
+    return pd.concat([result, pd.DataFrame([totals])], ignore_index=True)
+
+
+def _period_from_base(base: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """P&L артикул × период (M/Q/Y) из базовой агрегации; строки без даты исключаются."""
+    dated = base[base["_month"] != _NO_MONTH].copy()
+    if dated.empty:
+        return pd.DataFrame()
+
+    dated["_ord"] = dated["_month"] // _PERIOD_DIVISOR[freq]
+    groups = _regroup(dated, ["_ord", _ARTICLE_COL])
+    starts = [_period_start(ordinal, freq) for ordinal in groups["_ord"]]
+
+    result = pd.concat([
+        pd.DataFrame({
+            "Год":         [int(ts.year) for ts in starts],
+            "Период":      [_period_label(ts, freq) for ts in starts],
+            "_ord":        groups["_ord"],
+            _ARTICLE_COL:  groups[_ARTICLE_COL].map(str),
+            "Название":    _meta_values(groups, "Название"),
+            "Бренд":       _meta_values(groups, "Бренд"),
+            "Предмет":     _meta_values(groups, "Предмет"),
+        }),
+        _metrics_frame(groups),
+    ], axis=1)
+
+    # Сортировка: новые периоды сверху, внутри периода — по нетто-прибыли desc
+    result = (
+        result
+        .sort_values(["_ord", "Нетто-прибыль"], ascending=[False, False])
+        .drop(columns=["_ord"])
+        .reset_index(drop=True)
+    )
+
+    logger.info(
+        "build_article_pnl_by_period(freq=%s): %d строк (%d уникальных артикулов)",
+        freq,
+        len(result),
+        result[_ARTICLE_COL].nunique(),
+    )
+    return result
+
+
+def _period_start(ordinal: int, freq: str) -> pd.Timestamp:
+    """Начало периода по ключу _ord (месяц / квартал / год от нулевого года)."""
+    months = int(ordinal) * _PERIOD_DIVISOR[freq]
+    return pd.Timestamp(year=months // 12, month=months % 12 + 1, day=1)
+
+
 # ─── Вспомогательные ──────────────────────────────────────────────────────────
 
 def _prep_df(history_df: pd.DataFrame) -> pd.DataFrame:
@@ -11,6 +11,7 @@ import re
 import logging
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from .categories import (
@@ -34,6 +35,8 @@ class TransactionClassifier:
 
     # ── Паттерны поиска ────────────────────────────────────────────────────────
 
+    _OWN_FUNDS_RE = re.compile(r'внесение собственн|пополнение счёт|пополнение счет', re.IGNORECASE)
+    _REFUND_RE = re.compile(r'возврат (средств|п/п|платеж|платёж)|счет получателя закрыт', re.IGNORECASE)
     _TRANSFER_RE = re.compile(r'перевод между счет|перевод собственн', re.IGNORECASE)
     # Назначения, характерные для выплат зарплаты ИП владельцу (не расход в PnL)
     _OWNER_WITHDRAWAL_PURPOSE_RE = re.compile(
@@ -141,15 +144,15 @@ class TransactionClassifier:
         bic         = str(row.get("bic", "")).strip()
         inn_raw     = str(row.get("inn", "")).strip()
         inn         = inn_raw.split("/")[0].strip()  # убираем КПП
-        is_income   = bool(row.get("is_income", False))
+        is_income   = self._flag(row.get("is_income", False))
 
         # ── 1a. Пополнение р/с с личного счёта (входящее, но НЕ доход) ──────
         # "Внесение собственных средств" = Наташа вернула деньги на р/с с карты
-        if is_income and re.search(r'внесение собственн|пополнение счёт|пополнение счет', purpose, re.IGNORECASE):
+        if is_income and self._OWN_FUNDS_RE.search(purpose):
             return self._result(TYPE_TRANSFER_INTERNAL, "—", "пополнение р/с с личного счёта")
 
         # ── 1b. Возврат платежа (счёт получателя закрыт и т.п.) ─────────────
-        if is_income and re.search(r'возврат (средств|п/п|платеж|платёж)|счет получателя закрыт', purpose, re.IGNORECASE):
+        if is_income and self._REFUND_RE.search(purpose):
             return self._result(TYPE_TRANSFER_INTERNAL, "—", "возврат платежа")
 
         # ── 1. Внутренний перевод / вывод на карту ───────────────────────────
@@ -237,8 +240,127 @@ class TransactionClassifier:
         # ── 12. Прочее (требует ручной проверки) ─────────────────────────────
         return self._result(TYPE_EXPENSE, CAT_OTHER, counterparty, confidence="manual")
 
+    def classify_frame(self, df: pd.DataFrame, owner_name: str = "") -> pd.DataFrame:
+        """
+        Классифицирует всю выписку сразу — результат идентичен classify() по строкам.
+
+        Каждое правило считается одной векторной проверкой по колонке
+        (str.contains / сравнение ИНН), приоритет правил — порядок в np.select,
+        тот же, что и в classify().
+
+        Returns:
+            DataFrame(type, category, subcategory, confidence) с индексом df
+        """
+        purpose      = self._text_column(df, "purpose")
+        counterparty = self._text_column(df, "counterparty")
+        bank         = self._text_column(df, "bank")
+        bic          = self._text_column(df, "bic")
+        inn          = pd.Series([v.split("/")[0].strip() for v in self._text_column(df, "inn")], index=df.index, dtype=object)
+        if "is_income" in df.columns:
+            is_income = pd.Series([self._flag(v) for v in df["is_income"].to_numpy(dtype=object)], index=df.index, dtype=bool)
+        else:
+            is_income = pd.Series(False, index=df.index)
+
+        # Назначения и контрагенты в выписке сильно повторяются: каждая проверка
+        # выполняется один раз на уникальное значение и раскладывается по строкам
+        factorized = {id(column): pd.factorize(column) for column in (purpose, counterparty, bank)}
+
+        def on_unique(column: pd.Series, test) -> pd.Series:
+            codes, uniques = factorized[id(column)]
+            found = np.array([test(value) for value in uniques], dtype=bool)
+            return pd.Series(found[codes], index=df.index)
+
+        def has(column: pd.Series, pattern: re.Pattern) -> pd.Series:
+            return on_unique(column, lambda value: pattern.search(value) is not None)
+
+        def first_match(patterns: list, default: str) -> np.ndarray:
+            return np.select(
+                [has(purpose, pattern) for _, pattern in patterns],
+                [name for name, _ in patterns],
+                default=default,
+            ).astype(object)
+
+        # ── 1b. Вывод на личный счёт: совпадение 2 из 3 слов ФИО ─────────────
+        owner_parts = [part for part in owner_name.lower().split() if len(part) > 2]
+        to_owner = ~is_income & on_unique(
+            counterparty, lambda value: sum(1 for part in owner_parts if part in value.lower()) >= 2
+        )
+
+        # ── 3. Налоги ─────────────────────────────────────────────────────────
+        is_sfr = on_unique(counterparty, lambda value: "осфр" in value.lower() or "социальн" in value.lower())
+        is_tax_receiver = (inn == self.INN_FNS) | is_sfr | on_unique(
+            counterparty, lambda value: "казначейство" in value.lower() or "пенсионн" in value.lower()
+        )
+        tax_subtype = first_match(self._TAX_PATTERNS, "ЕНП / ЕНС")
+        tax_subtype = np.where((tax_subtype == "ЕНП / ЕНС") & is_sfr, "Страховые взносы (СФР)", tax_subtype)
+
+        is_modulbank = has(counterparty, self._MODULBANK_COUNTERPARTY_RE)
+        to_bank = np.where(bank != "", "→ " + bank, "→ другой банк")
+        to_owner_bank = np.where(bank != "", "→ " + bank, "→ личный счёт")
+
+        # Правила в порядке приоритета: (условие, type, category, subcategory, confidence)
+        rules = [
+            (is_income & has(purpose, self._OWN_FUNDS_RE),
+             TYPE_TRANSFER_INTERNAL, "—", "пополнение р/с с личного счёта", "auto"),
+            (is_income & has(purpose, self._REFUND_RE),
+             TYPE_TRANSFER_INTERNAL, "—", "возврат платежа", "auto"),
+            (has(purpose, self._TRANSFER_RE) & ((bic == self.MODULBANK_BIC) | has(bank, self._MODULBANK_COUNTERPARTY_RE)),
+             TYPE_TRANSFER_INTERNAL, "—", "р/с ↔ Маркет-карта", "auto"),
+            (has(purpose, self._TRANSFER_RE),
+             TYPE_TRANSFER_WITHDRAWAL, "—", to_bank, "auto"),
+            (to_owner,
+             TYPE_TRANSFER_WITHDRAWAL, "—", to_owner_bank, "auto"),
+            (is_income & ((inn == self.INN_WB_RVB) | has(counterparty, self._WB_INCOME_RE)),
+             TYPE_INCOME, CAT_INCOME_WB, counterparty, "auto"),
+            (is_income & has(counterparty, self._OZON_INCOME_RE),
+             TYPE_INCOME, CAT_INCOME_OZON, counterparty, "auto"),
+            (is_income,
+             TYPE_INCOME, CAT_INCOME_OTHER, counterparty, "manual"),
+            # Дальше только расходы
+            (is_tax_receiver,
+             TYPE_EXPENSE, CAT_TAXES, tax_subtype, "auto"),
+            (is_modulbank & has(purpose, self._MBH_RE),
+             TYPE_EXPENSE, CAT_IT, "МодульБух (бухгалтерия)", "auto"),
+            (is_modulbank,
+             TYPE_EXPENSE, CAT_BANK, first_match(self._BANK_FEE_SUBTYPES, "Прочие банковские расходы"), "auto"),
+            (inn.isin(self.FULFILLMENT_INNS) | has(purpose, self._FULFILLMENT_RE)
+             | has(counterparty, self._FULFILLMENT_COUNTERPARTY_RE),
+             TYPE_EXPENSE, CAT_FULFILLMENT, counterparty, "auto"),
+            ((inn == self.INN_MTT) | has(counterparty, self._IT_RE) | has(purpose, self._IT_RE),
+             TYPE_EXPENSE, CAT_IT, counterparty, "auto"),
+            (has(purpose, self._SALARY_RE), TYPE_EXPENSE, CAT_SALARY, counterparty, "auto"),
+            (has(purpose, self._RENT_RE), TYPE_EXPENSE, CAT_RENT, counterparty, "auto"),
+            (has(purpose, self._CERT_RE), TYPE_EXPENSE, CAT_CERT, counterparty, "auto"),
+            (has(purpose, self._GOODS_RE), TYPE_EXPENSE, CAT_GOODS, counterparty, "auto"),
+            (has(purpose, self._MARKETING_RE), TYPE_EXPENSE, CAT_MARKETING, counterparty, "auto"),
+        ]
+        # ── 12. Прочее (требует ручной проверки) ─────────────────────────────
+        default = (TYPE_EXPENSE, CAT_OTHER, counterparty, "manual")
+
+        conditions = [np.asarray(rule[0], dtype=bool) for rule in rules]
+        columns = {}
+        for i, name in enumerate(["type", "category", "subcategory", "confidence"], start=1):
+            columns[name] = np.select(
+                conditions,
+                [np.asarray(rule[i], dtype=object) for rule in rules],
+                default=np.asarray(default[i - 1], dtype=object),
+            )
+        return pd.DataFrame(columns, index=df.index)
+
     # ── Вспомогательные методы ────────────────────────────────────────────────
 
+    @staticmethod
+    def _text_column(df: pd.DataFrame, name: str) -> pd.Series:
+        """Колонка как str(value).strip() — так же, как её видит classify()"""
+        if name not in df.columns:
+            return pd.Series("", index=df.index, dtype=object)
+        return pd.Series([str(v).strip() for v in df[name].to_numpy(dtype=object)], index=df.index, dtype=object)
+
+    @staticmethod
+    def _flag(value) -> bool:
+        """Флаг is_income; пустая ячейка (None/NaN) — False, как и отсутствующая колонка"""
+        return bool(value) if pd.notna(value) else False
+
     def _detect_tax_subtype(self, purpose: str) -> str:
         for subtype, pattern in self._TAX_PATTERNS:
             if pattern.search(purpose):
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+history_store.py — локальная история детальных отчётов WB (Parquet, по годам).
+
+Источник истины для аналитики по артикулам: строки хранятся типизированными
+(числа — float, даты — datetime64), поэтому сводки и дашборд строятся локальным
+чтением, без get_all_values() по листам «История {year}». Google Sheets остаются
+только местом публикации.
+
+Структура каталога:
+    {root}/year=2025/history.parquet
+    {root}/year=2026/history.parquet
+
+Использование:
+    store = HistoryStore(Path("data/wb_history"))
+    fresh = store.new_rows(df)        # новые строки (дедупликация по Srid)
+    store.upsert(fresh)               # сохранить после публикации в Sheets
+    history_df = store.read()         # вся история для articles_aggregator
+"""
+
+import datetime
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+_SRID_COL = "Srid"
+_DATE_COL = "Дата продажи"
+_FILE_NAME = "history.parquet"
+
+# Колонки с датами (в Sheets — строки «YYYY-MM-DD»)
+DATE_COLUMNS = ["Дата заказа покупателем", "Дата продажи"]
+
+# Числовые колонки детального отчёта; остальные хранятся строками
+NUMERIC_COLUMNS = [
+    "Кол-во",
+    "Цена розничная",
+    "Цена розничная с учетом согласованной скидки",
+    "Вайлдберриз реализовал Товар (Пр)",
+    "Размер кВВ, %",
+    "К перечислению Продавцу за реализованный Товар",
+    "Вознаграждение с продаж до вычета услуг поверенного, без НДС",
+    "Услуги по доставке товара покупателю",
+    "Возмещение за выдачу и возврат товаров на ПВЗ",
+    "Хранение",
+    "Удержания",
+    "Операции на приемке",
+    "Возмещение издержек по перевозке/по складским операциям с товаром",
+    "Общая сумма штрафов",
+    "Эквайринг/Комиссии за организацию платежей",
+    "Компенсация скидки по программе лояльности",
+]
+
+
+class HistoryStore:
+    """
+    Год-партиционированная история строк детального отчёта.
+
+    Args:
+        root: каталог хранилища (создаётся при первой записи)
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    # ── Чтение ───────────────────────────────────────────────────────────────
+
+    def years(self) -> List[int]:
+        """Годы, для которых есть партиции (по возрастанию)."""
+        if not self.root.exists():
+            return []
+        return sorted(
+            int(path.parent.name.split("=", 1)[1])
+            for path in self.root.glob(f"year=*/{_FILE_NAME}")
+        )
+
+    def is_empty(self) -> bool:
+        return not self.years()
+
+    def read(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Вся история (партиции по возрастанию года, строки в порядке добавления).
+
+        Returns:
+            Типизированный DataFrame или пустой DataFrame если истории нет.
+        """
+        frames = [self._read_year(year, columns) for year in self.years()]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def _read_year(self, year: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        path = self._path(year)
+        if not path.exists():
+            return pd.DataFrame()
+        if columns is not None:
+            # Колонки, которых нет в партиции, просто пропускаем
+            schema = pq.read_schema(path).names
+            columns = [c for c in columns if c in schema]
+        return pd.read_parquet(path, columns=columns)
+
+    # ── Запись ───────────────────────────────────────────────────────────────
+
+    def upsert(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Добавить строки, которых ещё нет в истории (ключ — Srid).
+
+        Args:
+            df: строки детального отчёта (из парсера или из листов Sheets —
+                числа и даты могут быть строками, приводятся к типам здесь).
+
+        Returns:
+            Добавленные строки (исходный вид df) — их и нужно опубликовать в Sheets.
+
+        Side effects:
+            - Перезаписывает (атомарно) партиции затронутых годов.
+
+        Invariants:
+            - Существующие строки не удаляются и не изменяются.
+            - Строки без Srid добавляются всегда (как и в листах истории).
+            - Строки без даты продажи попадают в партицию текущего года.
+        """
+        new_rows = self.new_rows(df)
+        if new_rows.empty:
+            logger.info("HistoryStore: нет новых строк")
+            return new_rows
+
+        typed = _typed(new_rows)
+        for year, year_df in _split_by_year(typed).items():
+            existing = self._read_year(year)
+            combined = pd.concat([existing, year_df], ignore_index=True) if not existing.empty else year_df
+            self._write_year(year, _typed(combined))
+            logger.info("HistoryStore: %d → +%d строк (итого %d)", year, len(year_df), len(combined))
+
+        return new_rows
+
+    def new_rows(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Строки df, которых ещё нет в истории (ключ — Srid), без записи.
+
+        Нужен, чтобы сначала опубликовать строки в Sheets и только после
+        успешной публикации сохранить их через upsert().
+
+        Returns:
+            Подмножество df (исходный вид): новые Srid (повторы внутри df —
+            только первое вхождение) и все строки без Srid.
+        """
+        if df.empty or _SRID_COL not in df.columns:
+            return df
+        srids = df[_SRID_COL].fillna("").astype(str).str.strip()
+        keyless = (srids == "").to_numpy()
+        is_new = ~srids.isin(self._known_srids()).to_numpy() & ~srids.duplicated().to_numpy()
+        return df[keyless | is_new]
+
+    def _known_srids(self) -> set:
+        srids: set = set()
+        for year in self.years():
+            if _SRID_COL in pq.read_schema(self._path(year)).names:
+                values = pd.read_parquet(self._path(year), columns=[_SRID_COL])[_SRID_COL]
+                srids.update(v for v in values.fillna("").astype(str).str.strip() if v)
+        return srids
+
+    def _write_year(self, year: int, df: pd.DataFrame) -> None:
+        path = self._path(year)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    def _path(self, year: int) -> Path:
+        return self.root / f"year={year}" / _FILE_NAME
+
+
+# ─── Вспомогательные функции ──────────────────────────────────────────────────
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Числа → float, даты → datetime64, остальное → строки ('' вместо пустых)."""
+    out = df.copy()
+    for col in out.columns:
+        if col in NUMERIC_COLUMNS:
+            out[col] = pd.to_numeric(out[col], errors="coerce")
+        elif col in DATE_COLUMNS:
+            out[col] = pd.to_datetime(out[col], errors="coerce")
+        else:
+            out[col] = out[col].where(out[col].notna(), "").astype(str)
+    return out
+
+
+def _split_by_year(df: pd.DataFrame) -> Dict[int, pd.DataFrame]:
+    """Разбить по году «Дата продажи»; без даты — текущий год."""
+    if _DATE_COL in df.columns:
+        years = df[_DATE_COL].dt.year.fillna(0).astype(int)
+    else:
+        years = pd.Series(0, index=df.index)
+    years = years.where(years != 0, datetime.date.today().year)
+    return {int(year): df[years == year] for year in sorted(years.unique())}
@@ -20,6 +20,13 @@ sheets_client.py — Google Sheets клиент для WB финансовых 
     client = WbSheetsClient(sa_path=..., spreadsheet_id=sheets_id)
     client.update_reports_history(df)   # из WbGeneralParser
     client.update_articles_current(df)  # из WbDetailParser
+
+История детальных отчётов:
+    С history_store (HistoryStore) источником истины служит локальный Parquet:
+    append_articles_history публикует в «История {year}» только новые строки и
+    сохраняет их в Parquet после успешной публикации, а сводки и дашборд
+    строятся из него без чтения листов.
+    Без history_store — прежний режим (листы истории читаются целиком).
 """
 
 import datetime
@@ -30,10 +37,10 @@ from pathlib import Path
 from typing import List, Optional
 
 from .articles_aggregator import (
-    build_article_pnl_by_period,
-    build_article_summary,
+    build_article_reports,
     build_dashboard_rows,
 )
+from .history_store import HistoryStore
 
 import gspread
 import pandas as pd
@@ -138,15 +145,18 @@ class WbSheetsClient:
     Args:
         sa_path:        Путь к service_account.json
         spreadsheet_id: ID существующей таблицы (None → нужно создать)
+        history_store:  Локальная история артикулов (None → история только в листах)
     """
 
     def __init__(
         self,
         sa_path: Path,
         spreadsheet_id: Optional[str] = None,
+        history_store: Optional[HistoryStore] = None,
     ) -> None:
         self.sa_path = sa_path
         self.spreadsheet_id = spreadsheet_id
+        self.history_store = history_store
         self._client: Optional[gspread.Client] = None
         self._spreadsheet: Optional[gspread.Spreadsheet] = None
 
@@ -482,7 +492,7 @@ class WbSheetsClient:
 
     def rebuild_articles_summary(self) -> int:
         """
-        Прочитать все История {year} → пересчитать → записать листы аналитики.
+        Прочитать историю (history_store или все История {year}) → пересчитать → записать листы аналитики.
 
         Обновляет 4 листа:
             - Артикулы — Сводка        (all-time, 1 строка на артикул)
@@ -511,14 +521,13 @@ class WbSheetsClient:
             self.update_articles_pnl_yearly(pd.DataFrame())
             return 0
 
-        # All-time сводка
-        summary = build_article_summary(history_df)
+        # All-time сводка и P&L по периодам — одна агрегация истории
+        reports   = build_article_reports(history_df)
+        summary   = reports["summary"]
+        monthly   = reports["M"]
+        quarterly = reports["Q"]
+        yearly    = reports["Y"]
         self.update_articles_summary(summary)
-
-        # P&L по периодам
-        monthly   = build_article_pnl_by_period(history_df, "M")
-        quarterly = build_article_pnl_by_period(history_df, "Q")
-        yearly    = build_article_pnl_by_period(history_df, "Y")
         self.update_articles_pnl_monthly(monthly)
         self.update_articles_pnl_quarterly(quarterly)
         self.update_articles_pnl_yearly(yearly)
@@ -534,6 +543,45 @@ class WbSheetsClient:
         return n_articles
 
     def _get_all_history_df(self) -> pd.DataFrame:
+        """
+        Вся история артикулов: из history_store, а без него — из листов.
+
+        Returns:
+            Объединённый DataFrame или пустой DataFrame если данных нет.
+
+        Side effects:
+            - С history_store: при пустом хранилище — однократное наполнение из листов.
+
+        Invariants:
+            - Листы не изменяются.
+        """
+        if self.history_store is not None:
+            self._ensure_history_store()
+            history_df = self.history_store.read()
+            logger.info("_get_all_history_df: %d строк из локальной истории", len(history_df))
+            return history_df
+        return self._read_history_sheets()
+
+    def _ensure_history_store(self) -> None:
+        """
+        Наполнить пустой history_store из листов «История {year}» (однократная миграция).
+
+        Side effects:
+            - Пишет партиции history_store.
+
+        Invariants:
+            - Листы не изменяются.
+            - Непустое хранилище не трогается (листы не читаются).
+        """
+        if not self.history_store.is_empty():
+            return
+        sheets_df = self._read_history_sheets()
+        if sheets_df.empty:
+            return
+        added = self.history_store.upsert(sheets_df)
+        logger.info("history_store: перенесено %d строк из листов истории", len(added))
+
+    def _read_history_sheets(self) -> pd.DataFrame:
         """
         Прочитать все листы «История {year}» и объединить в один DataFrame.
 
@@ -558,7 +606,7 @@ class WbSheetsClient:
                 legacy_ws = sh.worksheet(SHEET_HISTORY)
                 vals = legacy_ws.get_all_values()
                 if len(vals) >= 2:
-                    logger.info("_get_all_history_df: читаем legacy лист %s (%d строк)", SHEET_HISTORY, len(vals) - 1)
+                    logger.info("_read_history_sheets: читаем legacy лист %s (%d строк)", SHEET_HISTORY, len(vals) - 1)
                     return pd.DataFrame(vals[1:], columns=vals[0])
             except gspread.WorksheetNotFound:
                 pass
@@ -570,13 +618,13 @@ class WbSheetsClient:
             if len(vals) < 2:
                 continue
             frames.append(pd.DataFrame(vals[1:], columns=vals[0]))
-            logger.debug("_get_all_history_df: %s — %d строк", ws.title, len(vals) - 1)
+            logger.debug("_read_history_sheets: %s — %d строк", ws.title, len(vals) - 1)
 
         if not frames:
             return pd.DataFrame()
 
         combined = pd.concat(frames, ignore_index=True)
-        logger.info("_get_all_history_df: итого %d строк из %d листов", len(combined), len(frames))
+        logger.info("_read_history_sheets: итого %d строк из %d листов", len(combined), len(frames))
         return combined
 
     def _append_to_history_year_sheet(self, sheet_name: str, src: pd.DataFrame) -> int:
@@ -638,6 +686,43 @@ class WbSheetsClient:
         logger.info("%s: добавлено %d строк", sheet_name, len(new_rows))
         return len(new_rows)
 
+    def _publish_to_history_year_sheet(self, sheet_name: str, src: pd.DataFrame) -> int:
+        """
+        Дописать в лист истории строки, уже отобранные history_store как новые.
+
+        В отличие от _append_to_history_year_sheet лист не читается целиком:
+        дедупликацию по Srid уже выполнило локальное хранилище.
+
+        Returns:
+            Количество дописанных строк.
+
+        Side effects:
+            - Лист sheet_name создаётся при необходимости (с заголовком).
+
+        Invariants:
+            - Существующие строки не удаляются и не изменяются.
+        """
+        if src.empty:
+            return 0
+
+        ws = self._get_or_create_sheet(sheet_name, rows=50000, cols=35)
+        header = ws.row_values(1)
+        if "Артикул поставщика" not in header:
+            if header:
+                ws.insert_rows([src.columns.tolist()], row=1)
+                logger.warning("%s: заголовок отсутствовал — восстановлен", sheet_name)
+            else:
+                _batch_write(ws, [src.columns.tolist()] + src.values.tolist())
+                logger.info("%s: первая запись %d строк", sheet_name, len(src))
+                return len(src)
+            header = src.columns.tolist()
+
+        # Порядок колонок — как в листе; отсутствующие в src — пустые
+        rows = src.reindex(columns=header).values.tolist()
+        ws.append_rows(_sanitize(rows), value_input_option="USER_ENTERED")
+        logger.info("%s: опубликовано %d строк", sheet_name, len(src))
+        return len(src)
+
     def migrate_history_to_year_sheets(self) -> int:
         """
         Однократная миграция: «Артикулы (история)» → «История {year}» листы.
@@ -740,6 +825,11 @@ class WbSheetsClient:
         Разбивает входной DataFrame по году «Дата продажи» и пишет каждую
         часть в соответствующий лист. Дедупликация по Srid внутри каждого листа.
 
+        С history_store новые строки отбираются по локальной истории
+        (дедупликация по Srid там) и публикуются без чтения листов истории;
+        в локальную историю год записывается только после успешной публикации,
+        поэтому упавший append_rows повторяется при следующем вызове.
+
         Args:
             df: DataFrame из WbDetailParser.parse()
 
@@ -749,6 +839,7 @@ class WbSheetsClient:
         Side effects:
             - Создаёт листы «История {year}» при необходимости.
             - Дописывает строки в конец соответствующего листа.
+            - С history_store: дописывает опубликованные строки в локальную историю.
 
         Invariants:
             - Существующие строки не удаляются.
@@ -758,6 +849,15 @@ class WbSheetsClient:
         if src.empty:
             return 0
 
+        publish = self._append_to_history_year_sheet
+        if self.history_store is not None:
+            self._ensure_history_store()
+            src = self.history_store.new_rows(src)
+            if src.empty:
+                logger.info("history_store: нет новых строк")
+                return 0
+            publish = self._publish_to_history_year_sheet
+
         # Определяем год для каждой строки
         sale_dates = pd.to_datetime(src.get("Дата продажи", pd.Series(dtype=str)), errors="coerce")
         years = sale_dates.dt.year.fillna(0).astype(int)
@@ -768,7 +868,9 @@ class WbSheetsClient:
             year_mask = years == year
             year_df = src[year_mask].copy()
             sheet_name = _history_sheet_name(actual_year)
-            total += self._append_to_history_year_sheet(sheet_name, year_df)
+            total += publish(sheet_name, year_df)
+            if self.history_store is not None:
+                self.history_store.upsert(year_df)
 
         return total
 
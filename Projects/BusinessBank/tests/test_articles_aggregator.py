@@ -0,0 +1,202 @@
+"""
+Тесты агрегации P&L по артикулам (articles_aggregator)
+=====================================================
+Контракт:
+- build_article_summary / build_article_pnl_by_period (одна groupby-агрегация
+  _aggregate_base) дают тот же результат, что прежний цикл по группам
+  с _article_metrics на каждую группу.
+- build_article_reports == summary + M/Q/Y по отдельности.
+- Порядок строк истории, пропущенные даты, пустые мета-поля и отсутствие
+  колонки «Тип документа» не меняют результат.
+
+Запуск: python -m pytest tests/test_articles_aggregator.py -v
+"""
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from src import articles_aggregator as agg
+from src.articles_aggregator import (
+    build_article_pnl_by_period,
+    build_article_reports,
+    build_article_summary,
+)
+
+ARTICLE = agg._ARTICLE_COL
+
+
+# ── Эталон: цикл по группам, как до _aggregate_base ───────────────────────────
+
+def reference_summary(history_df: pd.DataFrame) -> pd.DataFrame:
+    if history_df.empty or ARTICLE not in history_df.columns:
+        return pd.DataFrame()
+    df = agg._prep_df(history_df)
+
+    rows = []
+    for article, grp in df.groupby(ARTICLE, sort=True):
+        dates = grp["_sale_date"].dropna()
+        rows.append({
+            ARTICLE:             str(article),
+            "Название":          agg._first_nonempty(grp, "Название"),
+            "Предмет":           agg._first_nonempty(grp, "Предмет"),
+            "Бренд":             agg._first_nonempty(grp, "Бренд"),
+            "Первая продажа":    dates.min().strftime("%d.%m.%Y") if not dates.empty else "",
+            "Последняя продажа": dates.max().strftime("%d.%m.%Y") if not dates.empty else "",
+            **agg._article_metrics(grp),
+        })
+    if not rows:
+        return pd.DataFrame()
+
+    result = pd.DataFrame(rows).sort_values("Нетто-прибыль", ascending=False)
+    result = result.reset_index(drop=True)
+    totals: Dict = {
+        ARTICLE: "ИТОГО", "Название": "", "Предмет": "", "Бренд": "",
+        "Первая продажа":            result["Первая продажа"].min(),
+        "Последняя продажа":         result["Последняя продажа"].max(),
+        "Продажи (шт.)":             int(result["Продажи (шт.)"].sum()),
+        "Возвраты (шт.)":            int(result["Возвраты (шт.)"].sum()),
+        "% возвратов":               agg._total_return_rate(result),
+        "К перечислению (Продажи)":  round(float(result["К перечислению (Продажи)"].sum()), 2),
+        "К перечислению (Возвраты)": round(float(result["К перечислению (Возвраты)"].sum()), 2),
+        "К перечислению ИТОГО":      round(float(result["К перечислению ИТОГО"].sum()), 2),
+        "Нетто-прибыль":             round(float(result["Нетто-прибыль"].sum()), 2),
+        "Логистика на ед.":          "",
+    }
+    for key in agg._FIN_COLS:
+        label = agg._fin_col_label(key)
+        totals[label] = round(float(result[label].sum()), 2)
+    return pd.concat([result, pd.DataFrame([totals])], ignore_index=True)
+
+
+def reference_period(history_df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    if history_df.empty or ARTICLE not in history_df.columns:
+        return pd.DataFrame()
+    df = agg._prep_df(history_df).dropna(subset=["_sale_date"]).copy()
+    if df.empty:
+        return pd.DataFrame()
+    df["_period"] = df["_sale_date"].dt.to_period(freq)
+
+    rows = []
+    for (period, article), grp in df.groupby(["_period", ARTICLE], sort=True):
+        ts = period.start_time
+        rows.append({
+            "Год":      int(ts.year),
+            "Период":   agg._period_label(ts, freq),
+            "_ord":     period.ordinal,
+            ARTICLE:    str(article),
+            "Название": agg._first_nonempty(grp, "Название"),
+            "Бренд":    agg._first_nonempty(grp, "Бренд"),
+            "Предмет":  agg._first_nonempty(grp, "Предмет"),
+            **agg._article_metrics(grp),
+        })
+    return (
+        pd.DataFrame(rows)
+        .sort_values(["_ord", "Нетто-прибыль"], ascending=[False, False])
+        .drop(columns=["_ord"])
+        .reset_index(drop=True)
+    )
+
+
+# ── Данные ────────────────────────────────────────────────────────────────────
+
+def history(n: int = 300, seed: int = 7) -> pd.DataFrame:
+    """
+    Синтетическая история в виде строк из Sheets (числа и даты — строки).
+
+    Строки перемешаны, ~10% без даты продажи, мета-поля местами пустые/None.
+    """
+    rng = np.random.default_rng(seed)
+    articles = [f"ART-{i}" for i in range(12)]
+    dates = pd.date_range("2024-11-01", "2026-02-28", freq="D").strftime("%Y-%m-%d")
+
+    data = {
+        ARTICLE:          rng.choice(articles, n),
+        agg._DOC_TYPE_COL: rng.choice(
+            [agg._SALE_TYPE, agg._SALE_TYPE, agg._RETURN_TYPE, "Прочее"], n
+        ),
+        agg._DATE_COL:    rng.choice(dates, n),
+        agg._PAYOUT_COL:  rng.normal(900, 400, n).round(2).astype(str),
+        "Название":       rng.choice(["Отпугиватель", "", "  ", None, "Фонарь"], n),
+        "Предмет":        rng.choice(["Сад", "", None], n),
+        "Бренд":          rng.choice(["DBZ", "Brand", ""], n),
+    }
+    for col in agg._FIN_COLS.values():
+        data[col] = rng.normal(-40, 25, n).round(2)
+    df = pd.DataFrame(data)
+
+    no_date = rng.random(n) < 0.1
+    df.loc[no_date, agg._DATE_COL] = rng.choice(["", "не дата"], no_date.sum())
+    df.loc[rng.random(n) < 0.05, agg._PAYOUT_COL] = ""
+    return df
+
+
+# ── Паритет ───────────────────────────────────────────────────────────────────
+
+class TestArticleAggregationParity:
+
+    def test_summary(self):
+        df = history()
+        assert_frame_equal(build_article_summary(df), reference_summary(df))
+
+    @pytest.mark.parametrize("freq", ["M", "Q", "Y"])
+    def test_period(self, freq):
+        df = history()
+        assert_frame_equal(build_article_pnl_by_period(df, freq), reference_period(df, freq))
+
+    def test_row_order_does_not_matter(self):
+        df = history()
+        shuffled = df.sample(frac=1, random_state=3)
+
+        assert_frame_equal(build_article_summary(shuffled), reference_summary(shuffled))
+        assert_frame_equal(
+            build_article_pnl_by_period(shuffled, "M"), reference_period(shuffled, "M")
+        )
+
+    def test_without_doc_type_column(self):
+        df = history().drop(columns=[agg._DOC_TYPE_COL])
+
+        assert_frame_equal(build_article_summary(df), reference_summary(df))
+        assert_frame_equal(build_article_pnl_by_period(df, "Q"), reference_period(df, "Q"))
+
+    def test_without_meta_and_fin_columns(self):
+        df = history().drop(columns=["Название", "Бренд", agg._FIN_COLS["storage"]])
+
+        assert_frame_equal(build_article_summary(df), reference_summary(df))
+        assert_frame_equal(build_article_pnl_by_period(df, "M"), reference_period(df, "M"))
+
+    def test_all_dates_missing(self):
+        df = history()
+        df[agg._DATE_COL] = ""
+
+        assert_frame_equal(build_article_summary(df), reference_summary(df))
+        assert build_article_pnl_by_period(df, "M").empty
+
+    @pytest.mark.parametrize("df", [
+        pd.DataFrame(),
+        pd.DataFrame(columns=[ARTICLE, agg._DATE_COL]),
+        pd.DataFrame({"Название": ["x"]}),
+    ])
+    def test_empty_input(self, df):
+        assert build_article_summary(df).empty
+        assert build_article_pnl_by_period(df, "M").empty
+        assert all(report.empty for report in build_article_reports(df).values())
+
+    def test_reports_match_separate_builds(self):
+        df = history()
+        reports = build_article_reports(df)
+
+        assert set(reports) == {"summary", "M", "Q", "Y"}
+        assert_frame_equal(reports["summary"], build_article_summary(df))
+        for freq in ("M", "Q", "Y"):
+            assert_frame_equal(reports[freq], build_article_pnl_by_period(df, freq))
+
+    def test_history_is_not_mutated(self):
+        df = history()
+        before = df.copy()
+
+        build_article_reports(df)
+
+        assert_frame_equal(df, before)
@@ -0,0 +1,124 @@
+"""
+Тесты векторного классификатора (TransactionClassifier.classify_frame)
+=====================================================================
+Контракт:
+- classify_frame(df) даёт тот же результат, что classify() по каждой строке
+  (type, category, subcategory, confidence), при любом owner_name.
+- NaN/None в ячейках и отсутствующие колонки обрабатываются так же, как в classify().
+- Индекс результата совпадает с индексом df.
+
+Запуск: python -m pytest tests/test_classifier.py -v
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.classifier import TransactionClassifier
+
+
+OWNER = "Пирожкова Наталья Сергеевна"
+MODULBANK_BIC = TransactionClassifier.MODULBANK_BIC
+
+# (purpose, counterparty, inn, bank, bic, is_income) — по строке на каждое правило
+ROWS = [
+    ("Внесение собственных средств", "Пирожкова Наталья", "", "", "", True),
+    ("Возврат средств: счет получателя закрыт", "ООО Ромашка", "", "", "", True),
+    ("Перевод между счетами", "Пирожкова Н.С.", "", "Модульбанк", MODULBANK_BIC, False),
+    ("Перевод между счетами", "Пирожкова Н.С.", "", "Тинькофф", "044525974", False),
+    ("Перевод собственных средств", "Пирожкова Н.С.", "", "", "", False),
+    ("Перевод по договору", "Пирожкова Наталья Сергеевна", "", "Сбербанк", "", False),
+    ("Перевод по договору", "Пирожкова Наталья Сергеевна", "", "", "", False),
+    ("Оплата по реестру", 'ООО "РВБ"', "9714053621/771401001", "", "", True),
+    ("Оплата по реестру", "ООО Вайлдберриз", "", "", "", True),
+    ("Оплата по реестру", "ООО Интернет Решения (Ozon)", "", "", "", True),
+    ("Оплата по договору", "ИП Иванов", "123456789012", "", "", True),
+    ("Уплата УСН за 2025 год", "Казначейство России (ФНС России)", "7727406020", "", "", False),
+    ("Единый налоговый платёж", "УФК по г. Москве (ОСФР)", "", "", "", False),
+    ("Страховые взносы ИП", "Социальный фонд России", "", "", "", False),
+    ("Оплата МодульБух", "АО КБ Модульбанк", "", "", "", False),
+    ("Комиссия за перевод", "АО КБ Модульбанк", "", "", "", False),
+    ("Без НДС", "АО КБ Модульбанк", "", "", "", False),
+    ("Оплата по счёту", "ИП Брасова", "503802069670", "", "", False),
+    ("Оказание услуг склада", "ИП Петров", "", "", "", False),
+    ("Оплата по счёту", "ООО Склад-Сервис", "", "", "", False),
+    ("Услуги связи", "ПАО МТТ", "7733119038", "", "", False),
+    ("Подписка на сервис", "ООО Облако", "", "", "", False),
+    ("Заработная плата за январь", "Сидоров П.П.", "", "", "", False),
+    ("Аренда офиса за март", "ООО Бизнес-центр", "", "", "", False),
+    ("Декларация соответствия", "ООО Сертэксперт", "", "", "", False),
+    ("Оплата за товар по счёту 15", "ООО Поставщик", "", "", "", False),
+    ("Фотосъемка товара", "ИП Фотограф", "", "", "", False),
+    ("Оплата по счёту 7", "ООО Неизвестно", "", "", "", False),
+]
+COLUMNS = ["purpose", "counterparty", "inn", "bank", "bic", "is_income"]
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def statement(rows: list = ROWS) -> pd.DataFrame:
+    """Выписка с нестандартным индексом — проверяем, что он сохраняется."""
+    return pd.DataFrame(rows, columns=COLUMNS, index=range(100, 100 + len(rows)))
+
+
+def row_wise(clf: TransactionClassifier, df: pd.DataFrame, owner_name: str) -> pd.DataFrame:
+    """Эталон: classify() по каждой строке."""
+    results = [clf.classify(row, owner_name=owner_name) for _, row in df.iterrows()]
+    return pd.DataFrame(results, index=df.index, columns=["type", "category", "subcategory", "confidence"])
+
+
+def assert_parity(df: pd.DataFrame, owner_name: str) -> pd.DataFrame:
+    clf = TransactionClassifier()
+    frame = clf.classify_frame(df, owner_name=owner_name)
+    expected = row_wise(clf, df, owner_name)
+
+    assert list(frame.index) == list(df.index)
+    assert frame.astype(object).to_dict("records") == expected.astype(object).to_dict("records")
+    return frame
+
+
+# ── Паритет classify_frame ↔ classify ─────────────────────────────────────────
+
+class TestClassifyFrameParity:
+
+    @pytest.mark.parametrize("owner_name", ["", OWNER])
+    def test_every_rule_matches_row_wise(self, owner_name):
+        assert_parity(statement(), owner_name)
+
+    def test_owner_name_changes_result(self):
+        """Строка «вывод владельцу» без owner_name — прочий расход, с ним — вывод."""
+        without_owner = assert_parity(statement(), "")
+        with_owner = assert_parity(statement(), OWNER)
+
+        assert (without_owner["type"] != with_owner["type"]).any()
+
+    @pytest.mark.parametrize("owner_name", ["", OWNER])
+    def test_nan_and_none_cells(self, owner_name):
+        df = statement()
+        df.loc[101, "purpose"] = np.nan
+        df.loc[105, "bank"] = None
+        df.loc[107, "inn"] = np.nan
+        df.loc[112, "counterparty"] = np.nan
+        df["is_income"] = df["is_income"].astype(object)
+        df.loc[110, "is_income"] = np.nan
+        df.loc[111, "is_income"] = None
+
+        assert_parity(df, owner_name)
+
+    @pytest.mark.parametrize("missing", ["inn", "bank", "bic", "is_income", "counterparty"])
+    def test_missing_column(self, missing):
+        assert_parity(statement().drop(columns=[missing]), OWNER)
+
+    def test_only_purpose_column(self):
+        assert_parity(statement()[["purpose"]], OWNER)
+
+    @pytest.mark.parametrize("owner_name", ["", OWNER])
+    def test_empty_frame(self, owner_name):
+        frame = assert_parity(pd.DataFrame(columns=COLUMNS), owner_name)
+
+        assert frame.empty
+        assert list(frame.columns) == ["type", "category", "subcategory", "confidence"]
+
+    def test_repeated_values_are_classified_per_row(self):
+        """Факторизация по уникальным значениям не путает строки с одинаковым назначением."""
+        rows = ROWS * 5
+        assert_parity(statement(rows).sample(frac=1, random_state=0), OWNER)
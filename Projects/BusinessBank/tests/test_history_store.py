@@ -0,0 +1,113 @@
+"""
+Тесты локальной истории детальных отчётов (HistoryStore)
+=======================================================
+Контракт:
+- Дедупликация по Srid через все годовые партиции; повторы внутри одного
+  df — только первое вхождение.
+- Строки без Srid добавляются всегда.
+- Строки без даты продажи попадают в партицию текущего года.
+- new_rows() только отбирает строки, ничего не записывая.
+- Строки хранятся типизированными (числа — float, даты — datetime64).
+
+Запуск: python -m pytest tests/test_history_store.py -v
+"""
+import datetime
+
+import pandas as pd
+
+from src.history_store import HistoryStore
+
+
+def rows(*items) -> pd.DataFrame:
+    """Строки отчёта в виде из Sheets: (Srid, Дата продажи, Кол-во)."""
+    return pd.DataFrame(
+        [{"Srid": srid, "Дата продажи": date, "Кол-во": qty} for srid, date, qty in items]
+    )
+
+
+# ── Дедупликация ──────────────────────────────────────────────────────────────
+
+class TestHistoryStoreUpsert:
+
+    def test_rows_are_split_by_sale_year(self, tmp_path):
+        store = HistoryStore(tmp_path)
+
+        added = store.upsert(rows(("a", "2025-03-01", "1"), ("b", "2026-01-10", "2")))
+
+        assert len(added) == 2
+        assert store.years() == [2025, 2026]
+        assert (tmp_path / "year=2025" / "history.parquet").exists()
+
+    def test_known_srid_of_any_year_is_skipped(self, tmp_path):
+        store = HistoryStore(tmp_path)
+        store.upsert(rows(("a", "2025-03-01", "1"), ("b", "2026-01-10", "2")))
+
+        # «a» приходит с датой другого года — всё равно уже известна
+        added = store.upsert(rows(("a", "2026-02-01", "1"), ("b", "2026-01-10", "2"),
+                                  ("c", "2026-02-02", "3")))
+
+        assert added["Srid"].tolist() == ["c"]
+        assert sorted(store.read()["Srid"]) == ["a", "b", "c"]
+
+    def test_duplicates_within_one_frame_keep_first(self, tmp_path):
+        store = HistoryStore(tmp_path)
+
+        added = store.upsert(rows(("a", "2025-03-01", "1"), (" a ", "2025-03-02", "5"),
+                                  ("b", "2025-03-03", "2")))
+
+        assert added["Кол-во"].tolist() == ["1", "2"]
+        assert len(store.read()) == 2
+
+    def test_keyless_rows_are_always_appended(self, tmp_path):
+        store = HistoryStore(tmp_path)
+        batch = rows(("", "2025-03-01", "1"), (None, "2025-03-01", "1"))
+
+        store.upsert(batch)
+        added = store.upsert(batch)
+
+        assert len(added) == 2
+        assert len(store.read()) == 4
+
+    def test_rows_without_sale_date_go_to_current_year(self, tmp_path):
+        store = HistoryStore(tmp_path)
+
+        store.upsert(rows(("a", "", "1"), ("b", "не дата", "2")))
+
+        assert store.years() == [datetime.date.today().year]
+        assert store.read()["Srid"].tolist() == ["a", "b"]
+
+    def test_rows_are_stored_typed(self, tmp_path):
+        store = HistoryStore(tmp_path)
+
+        store.upsert(rows(("a", "2025-03-01", "1,5"), ("b", "2025-03-02", "2")))
+        history = store.read()
+
+        assert history["Кол-во"].dtype == float
+        assert pd.isna(history["Кол-во"].iloc[0])
+        assert history["Дата продажи"].iloc[1] == pd.Timestamp("2025-03-02")
+
+    def test_empty_frame_is_noop(self, tmp_path):
+        store = HistoryStore(tmp_path)
+
+        assert store.upsert(pd.DataFrame()).empty
+        assert store.is_empty()
+        assert store.read().empty
+
+
+class TestHistoryStoreNewRows:
+
+    def test_new_rows_does_not_write(self, tmp_path):
+        store = HistoryStore(tmp_path)
+        store.upsert(rows(("a", "2025-03-01", "1")))
+
+        fresh = store.new_rows(rows(("a", "2025-03-01", "1"), ("b", "2025-03-02", "2"),
+                                    ("", "2025-03-03", "3")))
+
+        assert fresh["Srid"].tolist() == ["b", ""]
+        assert store.read()["Srid"].tolist() == ["a"]
+
+    def test_frame_without_srid_column_is_new(self, tmp_path):
+        store = HistoryStore(tmp_path)
+        df = pd.DataFrame({"Дата продажи": ["2025-03-01"], "Кол-во": ["1"]})
+
+        assert len(store.new_rows(df)) == 1
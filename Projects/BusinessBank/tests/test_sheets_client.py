@@ -0,0 +1,150 @@
+"""
+Тесты публикации истории артикулов (WbSheetsClient.append_articles_history)
+==========================================================================
+Контракт (с history_store):
+- В листы «История {year}» публикуются только строки, которых нет в
+  локальной истории; листы истории при этом не читаются.
+- Год записывается в локальную историю только после успешного append_rows:
+  упавшая публикация повторяется при следующем вызове, уже опубликованные
+  годы второй раз не отправляются.
+
+Запуск: python -m pytest tests/test_sheets_client.py -v
+"""
+from typing import Dict, List
+
+import gspread
+import pandas as pd
+import pytest
+
+from src.history_store import HistoryStore
+from src.sheets_client import WbSheetsClient
+
+HEADER = ["Артикул поставщика", "Дата продажи", "Тип документа", "Srid"]
+
+
+class FakeWorksheet:
+    """Лист с заголовком; append_rows падает, пока лист в fail_titles таблицы."""
+
+    def __init__(self, book: "FakeSpreadsheet", title: str, values: List[List]):
+        self.book = book
+        self.title = title
+        self.values = values
+
+    def row_values(self, row: int) -> List:
+        return list(self.values[row - 1]) if len(self.values) >= row else []
+
+    def get_all_values(self) -> List[List]:
+        self.book.full_reads += 1
+        return [list(row) for row in self.values]
+
+    def append_rows(self, rows: List[List], value_input_option: str = "RAW") -> None:
+        if self.title in self.book.fail_titles:
+            raise gspread.exceptions.GSpreadException("append_rows: 503")
+        self.values.extend(rows)
+
+    def update(self, label: str, rows: List[List]) -> None:
+        self.values[:len(rows)] = rows
+
+    def insert_rows(self, rows: List[List], row: int = 1) -> None:
+        self.values[row - 1:row - 1] = rows
+
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.sheets: Dict[str, FakeWorksheet] = {}
+        self.fail_titles: set = set()
+        self.full_reads = 0
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        return list(self.sheets.values())
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        if title not in self.sheets:
+            raise gspread.WorksheetNotFound(title)
+        return self.sheets[title]
+
+    def add_worksheet(self, title: str, rows: int, cols: int) -> FakeWorksheet:
+        self.sheets[title] = FakeWorksheet(self, title, [])
+        return self.sheets[title]
+
+    def srids(self, title: str) -> List[str]:
+        values = self.sheets[title].values
+        return [row[values[0].index("Srid")] for row in values[1:]]
+
+
+@pytest.fixture
+def book() -> FakeSpreadsheet:
+    book = FakeSpreadsheet()
+    for year in (2025, 2026):
+        title = f"История {year}"
+        book.sheets[title] = FakeWorksheet(book, title, [list(HEADER)])
+    return book
+
+
+@pytest.fixture
+def client(tmp_path, book) -> WbSheetsClient:
+    client = WbSheetsClient(sa_path=tmp_path / "sa.json", spreadsheet_id="test",
+                            history_store=HistoryStore(tmp_path / "history"))
+    client._spreadsheet = book
+    return client
+
+
+def report(*items) -> pd.DataFrame:
+    """Строки детального отчёта: (Srid, Дата продажи)."""
+    return pd.DataFrame([
+        {"Артикул поставщика": "ART", "Дата продажи": date,
+         "Тип документа": "Продажа", "Srid": srid}
+        for srid, date in items
+    ])
+
+
+# ── append_articles_history ───────────────────────────────────────────────────
+
+class TestAppendArticlesHistory:
+
+    def test_publishes_only_new_rows_without_reading_sheets(self, client, book):
+        client.history_store.upsert(report(("a", "2025-03-01")))
+        book.full_reads = 0
+
+        added = client.append_articles_history(report(("a", "2025-03-01"), ("b", "2025-04-01"),
+                                                      ("c", "2026-01-05")))
+
+        assert added == 2
+        assert book.srids("История 2025") == ["b"]
+        assert book.srids("История 2026") == ["c"]
+        assert book.full_reads == 0
+        assert sorted(client.history_store.read()["Srid"]) == ["a", "b", "c"]
+
+    def test_failed_publish_is_not_stored_and_is_retried(self, client, book):
+        rows = report(("a", "2025-03-01"), ("b", "2026-01-05"))
+        book.fail_titles.add("История 2026")
+
+        with pytest.raises(gspread.exceptions.GSpreadException):
+            client.append_articles_history(rows)
+
+        # 2025 опубликован и сохранён, 2026 — нигде
+        assert book.srids("История 2025") == ["a"]
+        assert book.srids("История 2026") == []
+        assert client.history_store.read()["Srid"].tolist() == ["a"]
+
+        book.fail_titles.clear()
+        assert client.append_articles_history(rows) == 1
+
+        assert book.srids("История 2025") == ["a"]
+        assert book.srids("История 2026") == ["b"]
+        assert sorted(client.history_store.read()["Srid"]) == ["a", "b"]
+
+    def test_repeated_call_publishes_nothing(self, client, book):
+        rows = report(("a", "2025-03-01"))
+        assert client.append_articles_history(rows) == 1
+
+        assert client.append_articles_history(rows) == 0
+        assert book.srids("История 2025") == ["a"]
+
+    def test_empty_store_is_seeded_from_sheets_first(self, client, book):
+        book.sheets["История 2025"].values.append(["ART", "2025-03-01", "Продажа", "a"])
+
+        added = client.append_articles_history(report(("a", "2025-03-01"), ("b", "2025-03-02")))
+
+        assert added == 1
+        assert book.srids("История 2025") == ["a", "b"]
@@ -0,0 +1,134 @@
+"""
+Async-фасад над SheetsManager
+Finance Bot - gspread-вызовы из хендлеров не блокируют event loop
+"""
+import asyncio
+import copy
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from telegram.ext import ContextTypes
+
+from src import config
+
+logger = logging.getLogger(__name__)
+
+
+# Методы SheetsManager только на чтение: одинаковые параллельные вызовы
+# склеиваются в один поход в Sheets
+READ_METHODS = frozenset({
+    'get_user',
+    'get_user_role',
+    'is_user_active',
+    'check_user_permission',
+    'get_all_users',
+    'get_users_by_role',
+    'get_requests_by_status',
+    'get_all_requests',
+    'get_requests_page',
+    'get_request_stats',
+    'get_request_by_request_id',
+    'get_request_by_id',
+    'get_assigned_requests',
+    'get_payments_by_executor',
+})
+
+
+def _freeze(value):
+    """Сделать аргумент хешируемым для ключа склейки (list -> tuple)."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+class AsyncSheetsManager:
+    """
+    Async-обёртка над SheetsManager: каждый вызов выполняется в ограниченном
+    пуле потоков, event loop бота не ждёт Google Sheets.
+
+    Использование в хендлере:
+        sheets = get_async_sheets(context)
+        requests = await sheets.get_requests_by_status(config.STATUS_CREATED)
+
+    Side effects:
+        - Одинаковые параллельные чтения (READ_METHODS с теми же аргументами)
+          выполняются один раз — остальные ждут тот же результат.
+        - Каждая запись начинает новое «поколение»: чтения, начатые после
+          записи, не склеиваются с чтениями, начатыми до неё (read-your-writes).
+
+    Invariants:
+        - Одновременно выполняется не больше max_workers вызовов Sheets.
+        - Присоединившиеся к чужому чтению получают копию списка (сортировка
+          или фильтрация на месте не влияет на других).
+    """
+
+    def __init__(self, sheets, max_workers: int = config.SHEETS_MAX_WORKERS):
+        self.sheets = sheets
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='sheets'
+        )
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._generation = 0
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.sheets, name)
+        if not callable(attr):
+            return attr
+
+        async def method(*args, **kwargs):
+            return await self.call(name, *args, **kwargs)
+
+        method.__name__ = name
+        return method
+
+    async def call(self, name: str, *args, **kwargs) -> Any:
+        """Вызвать метод SheetsManager в пуле потоков."""
+        func = functools.partial(getattr(self.sheets, name), *args, **kwargs)
+        loop = asyncio.get_running_loop()
+
+        if name not in READ_METHODS:
+            try:
+                return await loop.run_in_executor(self._executor, func)
+            finally:
+                self._generation += 1
+
+        key = (self._generation, name, _freeze(args), _freeze(kwargs))
+        future = self._inflight.get(key)
+        if future is not None:
+            logger.debug(f"AsyncSheetsManager: coalesced {name}{args}")
+            result = await asyncio.shield(future)
+            return copy.copy(result) if isinstance(result, list) else result
+
+        future = loop.run_in_executor(self._executor, func)
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    def close(self) -> None:
+        """Остановить пул потоков (дождаться текущих вызовов)."""
+        self._executor.shutdown(wait=True)
+
+
+def get_async_sheets(context: ContextTypes.DEFAULT_TYPE) -> Optional[AsyncSheetsManager]:
+    """
+    AsyncSheetsManager для хендлера.
+
+    Берётся из bot_data['sheets_async'] (создаётся в post_init); если его нет
+    или он обёрнут вокруг другого объекта — создаётся поверх bot_data['sheets'].
+
+    Returns:
+        None если SheetsManager не подключён.
+    """
+    sheets = context.bot_data.get('sheets')
+    if not sheets:
+        return None
+
+    async_sheets = context.bot_data.get('sheets_async')
+    if async_sheets is None or async_sheets.sheets is not sheets:
+        async_sheets = AsyncSheetsManager(sheets)
+        context.bot_data['sheets_async'] = async_sheets
+    return async_sheets
@@ -2,6 +2,7 @@
 Finance Bot - Главный файл
 Telegram бот для управления финансовыми заявками через Google Sheets
 """
+import functools
 import logging
 import warnings
 
@@ -22,6 +23,9 @@ from telegram.ext import (
 )
 from src import config
 from src.sheets import SheetsManager
+from src.async_sheets import AsyncSheetsManager
+from src.utils.tronscan_client import TronscanClient
+from src.upload_queue import DriveUploadQueue
 from src.handlers.start import start, help_command
 from src.handlers.menu import handle_menu_button, menu_command
 from src.handlers.request import (
@@ -33,7 +37,8 @@ from src.handlers.request import (
     cancel_request_callback,
     my_requests_navigation_callback,
     edit_qr_cny_callback,
-    handle_qr_update
+    handle_qr_update,
+    on_qr_uploaded,
 )
 from src.handlers.edit_handlers import (
     get_edit_conversation_handler,
@@ -44,7 +49,8 @@ from src.handlers.payment import (
     pending_payments,
     my_payments,
     my_payments_navigation,
-    get_payment_conversation_handler
+    get_payment_conversation_handler,
+    on_receipt_uploaded,
 )
 from src.handlers.fact_expense import fact_expense_handler
 from src.handlers.owner import (
@@ -85,6 +91,7 @@ async def post_init(application: Application) -> None:
         # Подключаемся к Google Sheets
         sheets = SheetsManager()
         application.bot_data['sheets'] = sheets
+        application.bot_data['sheets_async'] = AsyncSheetsManager(sheets)
         logger.info("✅ Подключение к Google Sheets успешно")
     except Exception as e:
         logger.error(f"❌ Ошибка подключения к Google Sheets: {e}")
@@ -97,10 +104,23 @@ async def post_init(application: Application) -> None:
         drive_manager = DriveManager()
         application.bot_data['drive_manager'] = drive_manager
         logger.info("✅ DriveManager инициализирован")
+
+        # Очередь загрузок: хендлеры отвечают сразу, файл уходит в Drive в фоне
+        uploads = DriveUploadQueue(
+            drive_manager.upload_file, config.DRIVE_UPLOAD_SPOOL,
+            workers=config.DRIVE_UPLOAD_WORKERS, retries=config.DRIVE_UPLOAD_RETRIES,
+        )
+        uploads.on_done('receipt', functools.partial(on_receipt_uploaded, application))
+        uploads.on_done('qr', functools.partial(on_qr_uploaded, application))
+        uploads.start()
+        application.bot_data['drive_uploads'] = uploads
     except Exception as e:
         logger.error(f"❌ Ошибка инициализации DriveManager: {e}")
         logger.warning("Загрузка QR-кодов в Google Drive будет недоступна")
 
+    # Tronscan: общий пул соединений и кэш транзакций для проверки USDT-оплат
+    application.bot_data['tronscan'] = TronscanClient.from_config()
+
     # Меню команд (кнопка / в чате) — на мобильном кнопки меню могут быть скрыты клавиатурой
     try:
         await application.bot.set_my_commands([
@@ -117,6 +137,28 @@ async def post_init(application: Application) -> None:
         logger.warning(f"Не удалось установить меню команд: {e}")
 
 
+async def post_shutdown(application: Application) -> None:
+    """
+    Закрытие клиента Tronscan и очереди загрузок, отправка очереди записей
+    и остановка пула потоков Google Sheets
+    """
+    tronscan = application.bot_data.get('tronscan')
+    if tronscan:
+        await tronscan.aclose()
+
+    uploads = application.bot_data.get('drive_uploads')
+    if uploads:
+        await uploads.close()
+
+    async_sheets = application.bot_data.get('sheets_async')
+    if async_sheets:
+        try:
+            await async_sheets.close_write_queue()
+        except Exception as e:
+            logger.error(f"❌ Не удалось отправить очередь записей: {e}")
+        async_sheets.close()
+
+
 def main():
     """Запуск бота"""
     logger.info("Запуск Finance Bot...")
@@ -137,6 +179,7 @@ def main():
         Application.builder()
         .token(config.TELEGRAM_BOT_TOKEN)
         .post_init(post_init)
+        .post_shutdown(post_shutdown)
         .build()
     )
 
@@ -88,3 +88,43 @@ CNY_PAYMENT_METHODS = {
 MAX_RECIPIENT_LEN = 500
 MAX_PURPOSE_LEN = 1000
 MAX_DETAILS_LEN = 2000
+
+# Кэш листов заявок в памяти (секунды). Собственные записи бота
+# сбрасывают кэш сразу, TTL нужен для правок, сделанных вручную в таблице.
+SHEETS_SNAPSHOT_TTL = float(os.getenv('SHEETS_SNAPSHOT_TTL', '20'))
+
+# Пул потоков для вызовов Google Sheets из async-хендлеров
+# (ограничивает число одновременных запросов к API)
+SHEETS_MAX_WORKERS = int(os.getenv('SHEETS_MAX_WORKERS', '4'))
+
+# Очередь записей в Sheets (write-behind): изменения копятся и раз в
+# SHEETS_FLUSH_INTERVAL секунд уходят одним batch-запросом.
+# Журнал на диске хранит неотправленные изменения на случай падения.
+SHEETS_WRITE_BEHIND = os.getenv('SHEETS_WRITE_BEHIND', '1') == '1'
+SHEETS_FLUSH_INTERVAL = float(os.getenv('SHEETS_FLUSH_INTERVAL', '2'))
+SHEETS_WRITE_JOURNAL = os.getenv('SHEETS_WRITE_JOURNAL', 'data/sheets_write_journal.jsonl')
+
+# Лист Пользователи в памяти: фоновое обновление раз в USERS_REFRESH_INTERVAL
+# секунд; если фон не успел — данные старше USERS_CACHE_TTL перечитываются
+USERS_REFRESH_INTERVAL = float(os.getenv('USERS_REFRESH_INTERVAL', '60'))
+USERS_CACHE_TTL = float(os.getenv('USERS_CACHE_TTL', '300'))
+
+# Зеркало листов заявок для панели владельца (список, статистика):
+# синхронизируется в фоне раз в REQUESTS_MIRROR_INTERVAL секунд, пока
+# панель открыта или бот что-то записал; собственные записи бота видны сразу
+REQUESTS_MIRROR_INTERVAL = float(os.getenv('REQUESTS_MIRROR_INTERVAL', '30'))
+
+# Tronscan API: проверка USDT-транзакций. Подтверждённые транзакции
+# кэшируются на диске (LRU на TRONSCAN_CACHE_SIZE записей); пустой путь — без кэша
+TRONSCAN_API_URL = os.getenv(
+    'TRONSCAN_API_URL', 'https://apilist.tronscan.org/api/transaction-info'
+)
+TRONSCAN_MAX_CONCURRENCY = int(os.getenv('TRONSCAN_MAX_CONCURRENCY', '4'))
+TRONSCAN_CACHE_PATH = os.getenv('TRONSCAN_CACHE_PATH', 'data/tronscan_cache.sqlite3')
+TRONSCAN_CACHE_SIZE = int(os.getenv('TRONSCAN_CACHE_SIZE', '5000'))
+
+# Очередь загрузок в Google Drive (чеки, QR-коды): файл сначала ложится
+# в DRIVE_UPLOAD_SPOOL, загрузка идёт в фоне DRIVE_UPLOAD_WORKERS потоками
+DRIVE_UPLOAD_SPOOL = os.getenv('DRIVE_UPLOAD_SPOOL', 'data/drive_uploads')
+DRIVE_UPLOAD_WORKERS = int(os.getenv('DRIVE_UPLOAD_WORKERS', '2'))
+DRIVE_UPLOAD_RETRIES = int(os.getenv('DRIVE_UPLOAD_RETRIES', '4'))
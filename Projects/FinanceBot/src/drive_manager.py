@@ -3,6 +3,7 @@
 Загрузка QR-кодов через OAuth (от имени пользователя)
 """
 import logging
+import threading
 from typing import Optional
 import io
 
@@ -10,6 +11,12 @@ from src import config
 
 logger = logging.getLogger(__name__)
 
+# Размер части resumable-загрузки (кратен 256 КБ — требование Drive API)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Повторы одной части при 429/5xx/обрыве (загрузка продолжается с той же части)
+CHUNK_RETRIES = 3
+
 
 def _build_drive_service_and_creds():
     """
@@ -21,6 +28,16 @@ def _build_drive_service_and_creds():
     """
     from googleapiclient.discovery import build
 
+    creds, using_oauth = _build_drive_credentials()
+    return build("drive", "v3", credentials=creds), creds if using_oauth else None
+
+
+def _build_drive_credentials():
+    """
+    Создать (credentials, using_oauth).
+
+    Приоритет как в _build_drive_service_and_creds: OAuth, затем Service Account.
+    """
     # Попытка 1: OAuth (загрузка на личный Drive пользователя)
     if config.GOOGLE_DRIVE_REFRESH_TOKEN and config.GOOGLE_DRIVE_CLIENT_ID and config.GOOGLE_DRIVE_CLIENT_SECRET:
         try:
@@ -37,7 +54,7 @@ def _build_drive_service_and_creds():
             )
             creds.refresh(Request())
             logger.info("Drive: OAuth connection successful")
-            return build("drive", "v3", credentials=creds), creds
+            return creds, True
         except Exception as e:
             logger.warning(
                 "Drive OAuth failed (%s). Falling back to Service Account.", e
@@ -51,7 +68,7 @@ def _build_drive_service_and_creds():
             config.GOOGLE_SERVICE_ACCOUNT_FILE, scope
         )
         logger.info("Drive: using Service Account")
-        return build("drive", "v3", credentials=creds), None
+        return creds, False
     except Exception as e:
         logger.error("Drive: Service Account also failed: %s", e)
         raise
@@ -61,9 +78,15 @@ class DriveManager:
     """Менеджер для загрузки файлов в Google Drive (OAuth или Service Account)."""
 
     def __init__(self):
-        self.service, self._oauth_creds = _build_drive_service_and_creds()
+        from googleapiclient.discovery import build
+
+        self._credentials, self._using_oauth = _build_drive_credentials()
+        self._oauth_creds = self._credentials if self._using_oauth else None
+        self.service = build("drive", "v3", credentials=self._credentials)
+        # Отдельный service на поток: httplib2 не потокобезопасен,
+        # а очередь загрузок работает из пула потоков
+        self._local = threading.local()
         self.qr_codes_folder_id = config.GOOGLE_DRIVE_FOLDER_ID if config.GOOGLE_DRIVE_FOLDER_ID else None
-        self._using_oauth = self._oauth_creds is not None
         if self.qr_codes_folder_id:
             logger.info("Files will be uploaded to folder: %s", self.qr_codes_folder_id)
         logger.info("Drive mode: %s", "OAuth" if self._using_oauth else "Service Account")
@@ -156,6 +179,77 @@ class DriveManager:
             logger.error(traceback.format_exc())
             return None
 
+    def _thread_service(self):
+        """Drive service текущего потока (credentials общие, соединение своё)."""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            from googleapiclient.discovery import build
+            service = build("drive", "v3", credentials=self._credentials, cache_discovery=False)
+            self._local.service = service
+        return service
+
+    def upload_file(
+        self,
+        path: str,
+        filename: str,
+        mime_type: str = "image/jpeg",
+        folder_id: str = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+    ) -> str:
+        """
+        Загрузить файл с диска resumable-загрузкой по частям.
+
+        Файл не читается в память целиком: уходит частями по chunk_size байт,
+        упавшая часть повторяется (CHUNK_RETRIES) с того же места.
+        Потокобезопасен — вызывается из пула DriveUploadQueue.
+
+        Returns:
+            Ссылка на файл.
+
+        Raises:
+            Exception — загрузка не удалась (очередь повторит её целиком).
+        """
+        from googleapiclient.http import MediaFileUpload
+
+        service = self._thread_service()
+        fields = "id, webViewLink, webContentLink"
+
+        def _create(metadata: dict) -> dict:
+            media = MediaFileUpload(path, mimetype=mime_type, chunksize=chunk_size, resumable=True)
+            request = service.files().create(body=metadata, media_body=media, fields=fields)
+            response = None
+            while response is None:
+                status, response = request.next_chunk(num_retries=CHUNK_RETRIES)
+                if status:
+                    logger.debug("Upload %s: %d%%", filename, int(status.progress() * 100))
+            return response
+
+        file_metadata = {"name": filename, "mimeType": mime_type}
+        target_folder = folder_id or self.qr_codes_folder_id
+        if target_folder:
+            file_metadata["parents"] = [target_folder]
+
+        try:
+            file = _create(file_metadata)
+        except Exception as folder_err:
+            if not target_folder:
+                raise
+            logger.warning(
+                "Upload to folder failed (%s). Retrying without folder...", folder_err
+            )
+            file_metadata.pop("parents", None)
+            file = _create(file_metadata)
+
+        file_id = file.get("id")
+        permission = {"type": "anyone", "role": "reader"}
+        service.permissions().create(fileId=file_id, body=permission).execute(
+            num_retries=CHUNK_RETRIES
+        )
+
+        view_link = file.get("webViewLink") or f"https://drive.google.com/file/d/{file_id}/view"
+        logger.info("Файл успешно загружен: %s (ID: %s)", filename, file_id)
+        return view_link
+
     def create_folder(self, folder_name: str, parent_folder_id: str = None) -> Optional[str]:
         """Создать папку в Google Drive."""
         try:
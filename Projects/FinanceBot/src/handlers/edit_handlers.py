@@ -7,6 +7,7 @@ from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, filt
 from src.utils.categories import determine_category
 from src.utils.formatters import format_amount
 from src import config
+from src.async_sheets import get_async_sheets
 
 
 # Состояния для редактирования
@@ -84,7 +85,7 @@ async def save_purpose(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def save_field(update: Update, context: ContextTypes.DEFAULT_TYPE, **kwargs):
     """Общая функция сохранения поля через update_request_fields"""
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         await update.message.reply_text("⚠️ Ошибка подключения к системе.")
@@ -100,7 +101,7 @@ async def save_field(update: Update, context: ContextTypes.DEFAULT_TYPE, **kwarg
         return ConversationHandler.END
 
     # Вызываем НОВЫЙ API update_request_fields с валютой
-    success = sheets.update_request_fields(
+    success = await sheets.update_request_fields(
         date=date,
         amount=amount,
         currency=currency,
@@ -219,7 +220,7 @@ async def set_usdt_type_callback(update: Update, context: ContextTypes.DEFAULT_T
         purpose = context.user_data.get('edit_purpose', '')
         new_category = determine_category(purpose)
 
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
@@ -233,7 +234,7 @@ async def set_usdt_type_callback(update: Update, context: ContextTypes.DEFAULT_T
         await query.edit_message_text("❌ Ошибка: данные заявки не найдены.")
         return
 
-    success = sheets.update_request_fields(
+    success = await sheets.update_request_fields(
         date=date,
         amount=amount,
         currency=config.CURRENCY_USDT,
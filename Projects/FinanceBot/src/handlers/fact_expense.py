@@ -16,6 +16,7 @@ from telegram.ext import (
 )
 
 from src import config
+from src.async_sheets import get_async_sheets
 from src.utils.auth import require_auth, require_role
 
 logger = logging.getLogger(__name__)
@@ -170,7 +171,7 @@ async def fact_confirm_callback(update: Update, context: ContextTypes.DEFAULT_TY
         return ConversationHandler.END
 
     if query.data == "fact_save":
-        sheets = context.bot_data.get('sheets')
+        sheets = get_async_sheets(context)
 
         if not sheets:
             await query.edit_message_text("⚠️ Ошибка подключения к системе.")
@@ -183,7 +184,7 @@ async def fact_confirm_callback(update: Update, context: ContextTypes.DEFAULT_TY
 
         # Сохраняем в таблицу
         try:
-            expense_id = sheets.create_fact_expense(
+            expense_id = await sheets.create_fact_expense(
                 amount=amount,
                 recipient=recipient,
                 purpose=purpose,
@@ -5,6 +5,7 @@ from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ContextTypes
 from src.utils.auth import get_user_info
 from src import config
+from src.async_sheets import get_async_sheets
 
 
 def get_main_menu_keyboard(user_role: str) -> ReplyKeyboardMarkup:
@@ -84,14 +85,14 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE,
         message: Опциональное сообщение для отображения
     """
     user = update.effective_user
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         await update.message.reply_text("⚠️ Ошибка подключения к системе.")
         return
 
     # Получаем роль пользователя
-    user_role = sheets.get_user_role(user.id)
+    user_role = await sheets.get_user_role(user.id)
 
     if not user_role:
         await update.message.reply_text(
@@ -18,6 +18,8 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 from src import config
+from src.async_sheets import get_async_sheets
+from src.request_mirror import RequestStats
 from src.utils.formatters import format_amount, format_currency_symbol
 
 logger = logging.getLogger(__name__)
@@ -45,10 +47,10 @@ def _esc(value) -> str:
     return html.escape(str(value or ''))
 
 
-def _get_assignable_users(sheets) -> List[Dict]:
+async def _get_assignable_users(sheets) -> List[Dict]:
     """Пользователи которых можно назначить исполнителем: EXECUTOR + OWNER (без дубликатов)."""
-    executors = sheets.get_users_by_role(config.ROLE_EXECUTOR)
-    owners = sheets.get_users_by_role(config.ROLE_OWNER)
+    executors = await sheets.get_users_by_role(config.ROLE_EXECUTOR)
+    owners = await sheets.get_users_by_role(config.ROLE_OWNER)
     seen_ids: set = set()
     result: List[Dict] = []
     for u in executors + owners:
@@ -113,36 +115,29 @@ def _build_list_keyboard(
     return InlineKeyboardMarkup(keyboard)
 
 
-def _fetch_requests(sheets, filter_code: str) -> List[Dict]:
-    """Получить заявки для выбранного фильтра."""
-    status = FILTER_MAP.get(filter_code)
-    if status is None:
-        return sheets.get_all_requests()
-    return sheets.get_requests_by_status(status)
-
-
 async def _show_list(
     update: Update,
     context: ContextTypes.DEFAULT_TYPE,
     edit: bool = False
 ) -> None:
     """Показать текущую страницу списка заявок."""
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         return
 
     filter_code = context.user_data.get('ow_filter', 'cr')
     page = context.user_data.get('ow_page', 0)
 
-    requests = _fetch_requests(sheets, filter_code)
-    total = len(requests)
+    # Страница из зеркала заявок — листы не перечитываются при листании
+    status = FILTER_MAP.get(filter_code)
+    total, page_reqs = await sheets.get_requests_page(status, page * PAGE_SIZE, PAGE_SIZE)
     total_pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
-    page = max(0, min(page, total_pages - 1))
+    if page > total_pages - 1:
+        # Заявок стало меньше — показываем последнюю страницу
+        page = total_pages - 1
+        total, page_reqs = await sheets.get_requests_page(status, page * PAGE_SIZE, PAGE_SIZE)
     context.user_data['ow_page'] = page
 
-    start = page * PAGE_SIZE
-    page_reqs = requests[start: start + PAGE_SIZE]
-
     filter_label = FILTER_LABELS.get(filter_code, 'Все')
     text = (
         f"<b>📊 Все заявки — {filter_label}</b>\n"
@@ -176,7 +171,7 @@ async def owner_all_requests(
     context: ContextTypes.DEFAULT_TYPE
 ) -> None:
     """Точка входа — кнопка меню «📊 Все заявки» или /owner_requests."""
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         msg = update.message or (update.callback_query.message if update.callback_query else None)
         if msg:
@@ -184,7 +179,7 @@ async def owner_all_requests(
         return
 
     user = update.effective_user
-    role = sheets.get_user_role(user.id)
+    role = await sheets.get_user_role(user.id)
     if role != config.ROLE_OWNER:
         msg = update.message or (update.callback_query.message if update.callback_query else None)
         if msg:
@@ -239,12 +234,12 @@ async def view_all_req_callback(
     await query.answer()
 
     request_id = query.data.replace('view_all_req_', '')
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
 
-    req = sheets.get_request_by_request_id(request_id)
+    req = await sheets.get_request_by_request_id(request_id)
     if not req:
         await query.edit_message_text("❌ Заявка не найдена.")
         return
@@ -352,12 +347,12 @@ async def assign_exec_callback(
     await query.answer()
 
     request_id = query.data.replace('assign_exec_', '')
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
 
-    executors = _get_assignable_users(sheets)
+    executors = await _get_assignable_users(sheets)
     if not executors:
         await query.answer("Нет доступных исполнителей.", show_alert=True)
         return
@@ -411,12 +406,12 @@ async def set_exec_callback(
         return
 
     request_id = parts[3]
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
 
-    executors = _get_assignable_users(sheets)
+    executors = await _get_assignable_users(sheets)
     if exec_idx >= len(executors):
         await query.edit_message_text("❌ Исполнитель не найден.")
         return
@@ -425,7 +420,7 @@ async def set_exec_callback(
     executor_name = executor.get('name') or executor.get('username') or ''
     executor_tid = executor.get('telegram_id', '')
 
-    success = sheets.assign_executor(request_id, executor_name)
+    success = await sheets.assign_executor(request_id, executor_name)
     if not success:
         await query.edit_message_text("❌ Ошибка при назначении исполнителя. Попробуйте позже.")
         return
@@ -433,7 +428,7 @@ async def set_exec_callback(
     # Уведомить исполнителя
     if executor_tid:
         try:
-            req = sheets.get_request_by_request_id(request_id)
+            req = await sheets.get_request_by_request_id(request_id)
             if req:
                 currency = req.get('currency', '')
                 sym = format_currency_symbol(currency)
@@ -474,12 +469,12 @@ async def owner_cancel_req_callback(
     await query.answer()
 
     request_id = query.data.replace('own_cancel_req_', '')
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
 
-    req = sheets.get_request_by_request_id(request_id)
+    req = await sheets.get_request_by_request_id(request_id)
     if not req:
         await query.edit_message_text("❌ Заявка не найдена.")
         return
@@ -493,7 +488,7 @@ async def owner_cancel_req_callback(
         )
         return
 
-    success = sheets.update_request_status_by_id(request_id, config.STATUS_CANCELLED)
+    success = await sheets.update_request_status_by_id(request_id, config.STATUS_CANCELLED)
     if not success:
         await query.edit_message_text("❌ Ошибка при отмене заявки. Попробуйте позже.")
         return
@@ -563,7 +558,7 @@ async def owner_users(
     context: ContextTypes.DEFAULT_TYPE
 ) -> None:
     """Точка входа — кнопка «👥 Пользователи»."""
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     msg = update.message or (update.callback_query.message if update.callback_query else None)
     if not sheets or not msg:
         if msg:
@@ -571,7 +566,7 @@ async def owner_users(
         return
 
     user = update.effective_user
-    role = sheets.get_user_role(user.id)
+    role = await sheets.get_user_role(user.id)
     if role != config.ROLE_OWNER:
         await msg.reply_text("❌ Раздел доступен только владельцам.")
         return
@@ -585,11 +580,11 @@ async def _show_users_list(
     edit: bool = False
 ) -> None:
     """Список всех пользователей, сгруппированный по ролям."""
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         return
 
-    all_users = sheets.get_all_users()
+    all_users = await sheets.get_all_users()
 
     by_role: Dict[str, List[Dict]] = {r: [] for r in ROLE_ORDER}
     for u in all_users:
@@ -641,7 +636,7 @@ async def ow_user_callback(
     await query.answer()
 
     tid_str = query.data[len('ow_user_'):]
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
@@ -652,7 +647,7 @@ async def ow_user_callback(
         await query.edit_message_text("❌ Ошибка формата данных.")
         return
 
-    user_data = sheets.get_user(tid)
+    user_data = await sheets.get_user(tid)
     if not user_data:
         await query.edit_message_text(
             "❌ Пользователь не найден.",
@@ -692,7 +687,7 @@ async def ow_chgrole_callback(
     await query.answer()
 
     tid_str = query.data[len('ow_chgrole_'):]
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
@@ -703,7 +698,7 @@ async def ow_chgrole_callback(
         await query.edit_message_text("❌ Ошибка формата данных.")
         return
 
-    user_data = sheets.get_user(tid)
+    user_data = await sheets.get_user(tid)
     name = _esc((user_data.get('name') or tid_str) if user_data else tid_str)
 
     text = (
@@ -742,7 +737,7 @@ async def ow_setrole_callback(
         await query.edit_message_text("❌ Неизвестная роль.")
         return
 
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
@@ -754,11 +749,11 @@ async def ow_setrole_callback(
         return
 
     sheet_role = ROLE_TO_SHEET[role_key]
-    success = sheets.update_user_role(tid, sheet_role)
+    success = await sheets.update_user_role(tid, sheet_role)
     emoji, role_label = ROLE_DISPLAY[role_key]
 
     if success:
-        user_data = sheets.get_user(tid)
+        user_data = await sheets.get_user(tid)
         name = _esc((user_data.get('name') or tid_str) if user_data else tid_str)
         await query.edit_message_text(
             f"✅ <b>Роль изменена</b>\n\n"
@@ -787,7 +782,7 @@ async def ow_rmuser_callback(
     await query.answer()
 
     tid_str = query.data[len('ow_rmuser_'):]
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
@@ -798,7 +793,7 @@ async def ow_rmuser_callback(
         await query.edit_message_text("❌ Ошибка формата данных.")
         return
 
-    user_data = sheets.get_user(tid)
+    user_data = await sheets.get_user(tid)
     name = _esc((user_data.get('name') or tid_str) if user_data else tid_str)
 
     text = (
@@ -823,7 +818,7 @@ async def ow_confirmrm_callback(
     await query.answer()
 
     tid_str = query.data[len('ow_confirmrm_'):]
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
@@ -834,10 +829,10 @@ async def ow_confirmrm_callback(
         await query.edit_message_text("❌ Ошибка формата данных.")
         return
 
-    user_data = sheets.get_user(tid)
+    user_data = await sheets.get_user(tid)
     name = _esc((user_data.get('name') or tid_str) if user_data else tid_str)
 
-    success = sheets.deactivate_user(tid)
+    success = await sheets.deactivate_user(tid)
 
     if success:
         await query.edit_message_text(
@@ -884,11 +879,11 @@ async def notify_owners_new_request(
 
     Вызывается из handlers/request.py после успешного create_request().
     """
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         return
 
-    owners = sheets.get_users_by_role(config.ROLE_OWNER)
+    owners = await sheets.get_users_by_role(config.ROLE_OWNER)
     if not owners:
         return
 
@@ -937,23 +932,8 @@ async def notify_owners_new_request(
 
 # ===== BLOCK 5: СТАТИСТИКА =====
 
-def _parse_month_year(date_str: str):
-    """Извлечь (month, year) из строки даты. Поддерживает DD.MM.YYYY и YYYY-MM-DD."""
-    from datetime import datetime
-    if not date_str:
-        return None, None
-    for fmt in ('%d.%m.%Y', '%Y-%m-%d', '%d.%m.%y'):
-        try:
-            d = datetime.strptime(str(date_str).strip()[:10], fmt)
-            return d.month, d.year
-        except ValueError:
-            continue
-    return None, None
-
-
-def _build_stats_text(all_requests: List[Dict]) -> str:
-    """Сформировать текст статистики из списка заявок."""
-    from collections import Counter, defaultdict
+def _build_stats_text(stats: RequestStats) -> str:
+    """Сформировать текст статистики из агрегатов зеркала заявок."""
     from datetime import datetime
 
     now = datetime.now()
@@ -965,43 +945,27 @@ def _build_stats_text(all_requests: List[Dict]) -> str:
         9: 'сентябрь', 10: 'октябрь', 11: 'ноябрь', 12: 'декабрь',
     }
 
-    # Разбиваем по статусам
-    created = [r for r in all_requests if r.get('status') == config.STATUS_CREATED]
-    paid = [r for r in all_requests if r.get('status') == config.STATUS_PAID]
-    cancelled = [r for r in all_requests if r.get('status') == config.STATUS_CANCELLED]
+    # Счётчики по статусам
+    created = stats.counts.get(config.STATUS_CREATED, 0)
+    paid = stats.counts.get(config.STATUS_PAID, 0)
+    cancelled = stats.counts.get(config.STATUS_CANCELLED, 0)
 
-    # Оплаченные в текущем месяце
-    paid_month = [
-        r for r in paid
-        if _parse_month_year(r.get('date', '')) == (cur_month, cur_year)
-    ]
-
-    # Суммы по валюте
-    def sums_by_currency(reqs: List[Dict]) -> dict:
-        totals: Dict[str, float] = defaultdict(float)
-        for r in reqs:
-            totals[r.get('currency', config.CURRENCY_RUB)] += float(r.get('amount', 0) or 0)
-        return dict(totals)
-
-    active_sums = sums_by_currency(created)
-    month_sums = sums_by_currency(paid_month)
+    # Суммы по валюте: активные и оплаченные в текущем месяце
+    active_sums = stats.currency_sums(config.STATUS_CREATED)
+    month_sums = stats.month_currency_sums(config.STATUS_PAID, cur_month, cur_year)
+    paid_month = stats.month_counts.get((config.STATUS_PAID, cur_month, cur_year), 0)
 
     # Топ исполнителей по числу оплат
-    executor_counts = Counter(
-        r.get('executor', '').strip()
-        for r in paid
-        if r.get('executor', '').strip()
-    )
-    top_exec = executor_counts.most_common(5)
+    top_exec = stats.top_executors(config.STATUS_PAID, 5)
 
     lines = [f"<b>📈 Статистика системы</b>", ""]
 
     # --- Общие счётчики ---
     lines.append("<b>Всего заявок</b>")
-    lines.append(f"🔵 Создана:  {len(created)}")
-    lines.append(f"✅ Оплачена: {len(paid)}")
-    lines.append(f"❌ Отменена: {len(cancelled)}")
-    lines.append(f"Итого: {len(all_requests)}")
+    lines.append(f"🔵 Создана:  {created}")
+    lines.append(f"✅ Оплачена: {paid}")
+    lines.append(f"❌ Отменена: {cancelled}")
+    lines.append(f"Итого: {stats.total}")
     lines.append("")
 
     # --- Активные (на оплату) ---
@@ -1021,7 +985,7 @@ def _build_stats_text(all_requests: List[Dict]) -> str:
         for currency in sorted(month_sums):
             sym = format_currency_symbol(currency)
             lines.append(f"  {format_amount(month_sums[currency], currency)} {sym}")
-        lines.append(f"  ({len(paid_month)} выплат)")
+        lines.append(f"  ({paid_month} выплат)")
     else:
         lines.append("  Нет выплат в этом месяце")
     lines.append("")
@@ -1044,7 +1008,7 @@ async def owner_stats(
     context: ContextTypes.DEFAULT_TYPE
 ) -> None:
     """Точка входа — кнопка «📈 Статистика» или /stats."""
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     msg = update.message or (update.callback_query.message if update.callback_query else None)
     if not sheets or not msg:
         if msg:
@@ -1052,7 +1016,7 @@ async def owner_stats(
         return
 
     user = update.effective_user
-    role = sheets.get_user_role(user.id)
+    role = await sheets.get_user_role(user.id)
     if role != config.ROLE_OWNER:
         await msg.reply_text("❌ Раздел доступен только владельцам.")
         return
@@ -1060,8 +1024,7 @@ async def owner_stats(
     loading = await msg.reply_text("⏳ Собираю статистику…")
 
     try:
-        all_requests = sheets.get_all_requests()
-        text = _build_stats_text(all_requests)
+        text = _build_stats_text(await sheets.get_request_stats())
     except Exception as e:
         logger.error(f"owner_stats error: {e}")
         await loading.edit_text("❌ Ошибка при сборе статистики. Попробуйте позже.")
@@ -1082,14 +1045,13 @@ async def owner_stats_refresh_callback(
     query = update.callback_query
     await query.answer("Обновляю…")
 
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
 
     try:
-        all_requests = sheets.get_all_requests()
-        text = _build_stats_text(all_requests)
+        text = _build_stats_text(await sheets.get_request_stats(refresh=True))
     except Exception as e:
         logger.error(f"owner_stats_refresh error: {e}")
         await query.answer("Ошибка при обновлении.", show_alert=True)
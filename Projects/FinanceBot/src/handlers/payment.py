@@ -9,6 +9,8 @@ Handler для оплаты заявок (исполнители)
 5. Owner получает уведомление
 """
 import logging
+from typing import Optional
+
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ContextTypes,
@@ -20,8 +22,11 @@ from telegram.ext import (
 )
 from src.utils.auth import require_auth, require_role
 from src.utils.formatters import escape_md, format_amount, get_currency_symbols_dict
-from src.utils.tronscan import parse_tronscan_url, extract_hash_from_url
+from src.utils.tronscan import TronTransaction, extract_hash_from_url
+from src.utils.tronscan_client import get_tronscan_client
 from src import config
+from src.async_sheets import get_async_sheets
+from src.upload_queue import UploadJob, background_context
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +36,20 @@ SHOW_DETAILS, ENTER_DEAL_ID, ENTER_ACCOUNT, ENTER_USDT, CONFIRM_PAYMENT, UPLOAD_
 # Пагинация
 ITEMS_PER_PAGE = 5
 
+# Данные оплаты, нужные уведомлениям после фоновой загрузки чека
+# (user_data к этому моменту уже очищен)
+RECEIPT_NOTIFY_KEYS = (
+    'payment_request', 'payment_currency', 'payment_amount', 'payment_date',
+    'executor_name', 'deal_id', 'amount_usdt',
+)
+
+
+async def fetch_tronscan_tx(
+    context: ContextTypes.DEFAULT_TYPE, url: str
+) -> Optional[TronTransaction]:
+    """Tronscan-ссылка -> транзакция через общий async-клиент бота (пул соединений, кэш)."""
+    return await get_tronscan_client(context).parse_url(url)
+
 
 def _parse_creation_datetime(request_id: str) -> str:
     """
@@ -88,14 +107,14 @@ async def pending_payments(update: Update, context: ContextTypes.DEFAULT_TYPE):
       БЕЗ назначения платежа. НЕ показывает оплаченные/отменённые.
     - Для owner: ВСЕ заявки со статусом "Создана"
     """
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         await update.message.reply_text("Ошибка подключения к системе.")
         return
 
     user = update.effective_user
-    user_info = sheets.get_user(user.id)
+    user_info = await sheets.get_user(user.id)
     if not user_info or not user_info.get('name'):
         await update.message.reply_text(
             "Не удалось определить ваше имя.\n"
@@ -109,11 +128,11 @@ async def pending_payments(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if user_role == config.ROLE_OWNER:
         # Owner видит ВСЕ заявки со статусом "Создана"
-        requests = sheets.get_requests_by_status(config.STATUS_CREATED)
+        requests = await sheets.get_requests_by_status(config.STATUS_CREATED)
     else:
         # Executor: ТОЛЬКО "Создана" + точное совпадение имени исполнителя.
         # get_assigned_requests уже фильтрует по STATUS_CREATED и executor_name.
-        requests = sheets.get_assigned_requests(executor_name)
+        requests = await sheets.get_assigned_requests(executor_name)
 
     if not requests:
         if user_role == config.ROLE_OWNER:
@@ -220,7 +239,7 @@ async def start_payment_callback(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     await query.answer()
 
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("Ошибка подключения к системе.")
         return ConversationHandler.END
@@ -231,15 +250,15 @@ async def start_payment_callback(update: Update, context: ContextTypes.DEFAULT_T
 
     if data.startswith('payreq_'):
         request_id = data.replace('payreq_', '')
-        request = sheets.get_request_by_request_id(request_id)
+        request = await sheets.get_request_by_request_id(request_id)
     elif data.startswith('ow_pay_req_'):
         request_id = data.replace('ow_pay_req_', '')
         # Авто-назначить владельца исполнителем
-        user_info_now = sheets.get_user(update.effective_user.id)
+        user_info_now = await sheets.get_user(update.effective_user.id)
         owner_name = user_info_now.get('name', '').strip() if user_info_now else ''
         if owner_name and request_id:
-            sheets.assign_executor(request_id, owner_name)
-        request = sheets.get_request_by_request_id(request_id)
+            await sheets.assign_executor(request_id, owner_name)
+        request = await sheets.get_request_by_request_id(request_id)
     elif data.startswith('pay_'):
         parts = data.replace('pay_', '').rsplit('_', 2)
         if len(parts) >= 2:
@@ -250,7 +269,7 @@ async def start_payment_callback(update: Update, context: ContextTypes.DEFAULT_T
                 await query.edit_message_text("Ошибка формата данных.")
                 return ConversationHandler.END
             currency = parts[2] if len(parts) == 3 else config.CURRENCY_RUB
-            request = sheets.get_request_by_id(date, amount, currency)
+            request = await sheets.get_request_by_id(date, amount, currency)
 
     if not request:
         await query.edit_message_text("Заявка не найдена.")
@@ -266,7 +285,7 @@ async def start_payment_callback(update: Update, context: ContextTypes.DEFAULT_T
     currency = request.get('currency', config.CURRENCY_RUB)
 
     # Определяем роль
-    user_info = sheets.get_user(update.effective_user.id)
+    user_info = await sheets.get_user(update.effective_user.id)
     is_executor = (user_info.get('role', '') == config.ROLE_EXECUTOR) if user_info else False
 
     # Формируем детали с КОПИРУЕМЫМИ полями (HTML parse_mode)
@@ -398,7 +417,7 @@ async def enter_deal_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
             expected_amount = float(request.get('amount', 0))
 
             await update.message.reply_text("Проверяю транзакцию...")
-            tx = parse_tronscan_url(text)
+            tx = await fetch_tronscan_tx(context, text)
 
             manual_btn = [[InlineKeyboardButton("Ввести вручную", callback_data="usdt_enter_manual")]]
 
@@ -661,7 +680,7 @@ async def confirm_payment_callback(update: Update, context: ContextTypes.DEFAULT
         context.user_data.clear()
         return ConversationHandler.END
 
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("Ошибка подключения к системе.")
         return ConversationHandler.END
@@ -686,7 +705,7 @@ async def confirm_payment_callback(update: Update, context: ContextTypes.DEFAULT
         return ConversationHandler.END
 
     user = update.effective_user
-    user_info = sheets.get_user(user.id)
+    user_info = await sheets.get_user(user.id)
     executor_name = user_info.get('name', f"ID{user.id}") if user_info else f"ID{user.id}"
     context.user_data['executor_name'] = executor_name
 
@@ -695,10 +714,10 @@ async def confirm_payment_callback(update: Update, context: ContextTypes.DEFAULT
     if user_role == config.ROLE_OWNER and request_id:
         current_executor = request.get('executor', '').strip()
         if not current_executor:
-            sheets.assign_executor(request_id, executor_name)
+            await sheets.assign_executor(request_id, executor_name)
 
     # Завершаем оплату (поиск по request_id приоритетнее date+amount)
-    success = sheets.complete_payment(
+    success = await sheets.complete_payment(
         date=date,
         amount=amount,
         executor_name=executor_name,
@@ -735,7 +754,7 @@ async def confirm_payment_callback(update: Update, context: ContextTypes.DEFAULT
     # Если TronScan был верифицирован — сохраняем ссылку как чек автоматически
     tronscan_url = context.user_data.get('tronscan_receipt_url')
     if tronscan_url and sheets:
-        sheets.update_receipt_url(date, amount, currency, tronscan_url, request_id=request_id)
+        await sheets.update_receipt_url(date, amount, currency, tronscan_url, request_id=request_id)
         done_text += f"\n\nЧек (TronScan) сохранён автоматически."
         await query.edit_message_text(done_text, parse_mode='Markdown')
         await _notify_owners_about_payment(context, receipt_url=tronscan_url)
@@ -790,7 +809,7 @@ async def receipt_choice_callback(update: Update, context: ContextTypes.DEFAULT_
 
 async def handle_receipt_upload(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработать загрузку чека (фото, документ или ссылка TronScan)"""
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     drive = context.bot_data.get('drive_manager')
 
     date = context.user_data.get('payment_date', '')
@@ -811,7 +830,7 @@ async def handle_receipt_upload(update: Update, context: ContextTypes.DEFAULT_TY
             )
             return UPLOAD_RECEIPT
         if sheets:
-            sheets.update_receipt_url(date, amount, currency, url, request_id=req_id)
+            await sheets.update_receipt_url(date, amount, currency, url, request_id=req_id)
         await _notify_owners_about_payment(context, receipt_url=url)
         await _notify_initiator_about_payment(context, receipt_url=url)
         await update.message.reply_text(
@@ -820,7 +839,8 @@ async def handle_receipt_upload(update: Update, context: ContextTypes.DEFAULT_TY
         context.user_data.clear()
         return ConversationHandler.END
 
-    if not drive:
+    uploads = context.bot_data.get('drive_uploads')
+    if not drive and not uploads:
         await update.message.reply_text(
             "Google Drive недоступен. Чек не загружен.\n"
             "Оплата уже записана в таблицу."
@@ -856,6 +876,38 @@ async def handle_receipt_upload(update: Update, context: ContextTypes.DEFAULT_TY
         )
         return UPLOAD_RECEIPT
 
+    # Очередь загрузок: файл сразу на диск, ответ — не дожидаясь Drive
+    if uploads:
+        job = uploads.new_job('receipt', filename, mime_type, meta={
+            'request_id': req_id,
+            'date': date,
+            'amount': amount,
+            'currency': currency,
+            'chat_id': update.effective_chat.id,
+            'user_data': {
+                k: context.user_data[k] for k in RECEIPT_NOTIFY_KEYS if k in context.user_data
+            },
+        })
+        try:
+            await file.download_to_drive(job.path)
+            uploads.submit(job)
+        except Exception as e:
+            logger.error(f"Receipt spool error: {e}")
+            uploads.discard(job)
+            await _notify_owners_about_payment(context, receipt_error=True)
+            await _notify_initiator_about_payment(context, receipt_error=True)
+            await update.message.reply_text(
+                "Ошибка загрузки чека в Google Drive.\n"
+                "Оплата записана, но чек не сохранен."
+            )
+        else:
+            await update.message.reply_text(
+                "Чек принят, загружаю в Google Drive.\n\n"
+                "Оплата полностью завершена. Ссылку на чек пришлю после загрузки."
+            )
+        context.user_data.clear()
+        return ConversationHandler.END
+
     # Отдельный try/except только для загрузки файла
     receipt_url = None
     upload_error = False
@@ -873,7 +925,7 @@ async def handle_receipt_upload(update: Update, context: ContextTypes.DEFAULT_TY
     # Уведомления и ответ исполнителю — вне try/except загрузки
     if receipt_url and sheets:
         req_id = context.user_data.get('payment_request_id', '') or context.user_data.get('payment_request', {}).get('request_id', '')
-        sheets.update_receipt_url(date, amount, currency, receipt_url, request_id=req_id)
+        await sheets.update_receipt_url(date, amount, currency, receipt_url, request_id=req_id)
         await _notify_owners_about_payment(context, receipt_url=receipt_url)
         await _notify_initiator_about_payment(context, receipt_url=receipt_url)
         await update.message.reply_text(
@@ -891,26 +943,60 @@ async def handle_receipt_upload(update: Update, context: ContextTypes.DEFAULT_TY
     return ConversationHandler.END
 
 
+async def on_receipt_uploaded(application, job: UploadJob, receipt_url: Optional[str]):
+    """
+    Чек загружен очередью DriveUploadQueue (receipt_url=None — не загрузился).
+
+    Side effects:
+        - Ссылка записывается в заявку (update_receipt_url).
+        - Владельцы и инициатор получают уведомление об оплате, исполнитель — ссылку.
+    """
+    meta = job.meta
+    context = background_context(application, meta.get('user_data', {}))
+    sheets = get_async_sheets(context)
+
+    if receipt_url and sheets:
+        await sheets.update_receipt_url(
+            meta.get('date', ''), meta.get('amount', 0),
+            meta.get('currency', config.CURRENCY_RUB), receipt_url,
+            request_id=meta.get('request_id', ''),
+        )
+        await _notify_owners_about_payment(context, receipt_url=receipt_url)
+        await _notify_initiator_about_payment(context, receipt_url=receipt_url)
+        text = f"Чек загружен!\n\nСсылка: {receipt_url}"
+    else:
+        await _notify_owners_about_payment(context, receipt_error=True)
+        await _notify_initiator_about_payment(context, receipt_error=True)
+        text = "Ошибка загрузки чека в Google Drive.\nОплата записана, но чек не сохранен."
+
+    chat_id = meta.get('chat_id')
+    if chat_id:
+        try:
+            await application.bot.send_message(chat_id=chat_id, text=text)
+        except Exception as e:
+            logger.error(f"Failed to send receipt result to {chat_id}: {e}")
+
+
 # ===== MY PAYMENTS (history) =====
 
 @require_auth
 @require_role(config.ROLE_EXECUTOR, config.ROLE_OWNER)
 async def my_payments(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать историю выплат текущего исполнителя"""
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         await update.message.reply_text("Ошибка подключения к системе.")
         return
 
     user = update.effective_user
-    user_info = sheets.get_user(user.id)
+    user_info = await sheets.get_user(user.id)
     if not user_info or not user_info.get('name'):
         await update.message.reply_text("Не удалось определить ваше имя.")
         return
 
     executor_name = user_info['name'].strip()
-    payments = sheets.get_payments_by_executor(executor_name)
+    payments = await sheets.get_payments_by_executor(executor_name)
 
     if not payments:
         await update.message.reply_text("У вас пока нет завершенных выплат.")
@@ -976,17 +1062,17 @@ async def my_payments_navigation(update: Update, context: ContextTypes.DEFAULT_T
     page = int(query.data.replace('mypay_page_', ''))
     context.user_data['my_payments_page'] = page
 
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         return
 
     user = update.effective_user
-    user_info = sheets.get_user(user.id)
+    user_info = await sheets.get_user(user.id)
     if not user_info or not user_info.get('name'):
         return
 
     executor_name = user_info['name'].strip()
-    payments = sheets.get_payments_by_executor(executor_name)
+    payments = await sheets.get_payments_by_executor(executor_name)
 
     if not payments:
         await query.edit_message_text("У вас пока нет завершенных выплат.")
@@ -1047,11 +1133,11 @@ async def _notify_owners_about_payment(
     receipt_error: bool = False,
 ):
     """Отправить уведомление всем owner о завершении оплаты (с результатом загрузки чека)"""
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         return
 
-    owners = sheets.get_users_by_role(config.ROLE_OWNER)
+    owners = await sheets.get_users_by_role(config.ROLE_OWNER)
     if not owners:
         return
 
@@ -16,9 +16,12 @@ from src.utils.categories import determine_category
 from src.utils.formatters import format_amount, get_currency_symbols_dict
 from datetime import datetime
 from src import config
+from src.async_sheets import get_async_sheets
+from src.upload_queue import UploadJob, background_context
 import re
 import logging
 import asyncio
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +39,9 @@ def _escape_md(text: str) -> str:
 (CURRENCY, AMOUNT, CNY_PAYMENT_METHOD, QR_CODE_OR_REQUISITES,
  CARD_OR_PHONE, RECIPIENT, BANK, PURPOSE, CONFIRM, USDT_TYPE) = range(10)
 
+# Сколько подтверждение заявки ждёт фоновую загрузку QR-кода (секунд)
+QR_UPLOAD_WAIT = 60
+
 
 def convert_to_direct_download(drive_link: str) -> str:
     """
@@ -266,60 +272,54 @@ async def request_qr_code_or_requisites(update: Update, context: ContextTypes.DE
 
     # Проверяем, получено ли фото (QR-код)
     if update.message.photo:
-        await update.message.reply_text("⏳ Загружаю QR-код в Google Drive...")
-
         try:
+            uploads = context.bot_data.get('drive_uploads')
+            if not uploads:
+                await update.message.reply_text(
+                    "⚠️ Google Drive недоступен. Введите текстовые реквизиты:"
+                )
+                return QR_CODE_OR_REQUISITES
+
             # Получаем файл с самым высоким разрешением
             photo = update.message.photo[-1]
             file = await context.bot.get_file(photo.file_id)
 
-            # Скачиваем байты файла
-            file_bytes = await file.download_as_bytearray()
-
-            # Загружаем в Google Drive
-            from drive_manager import DriveManager
-            drive = DriveManager()
-
             # Генерируем имя файла
-            from datetime import datetime
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             user_id = update.effective_user.id
             payment_method = context.user_data.get('cny_payment_method', 'unknown')
             filename = f"QR_{payment_method}_{user_id}_{timestamp}.jpg"
 
-            # Загружаем в Drive
-            qr_link = drive.upload_file_from_bytes(
-                file_bytes=bytes(file_bytes),
-                filename=filename,
-                mime_type='image/jpeg'
-            )
-
-            if qr_link:
-                context.user_data['qr_code_link'] = qr_link
-                context.user_data['card_or_phone'] = ''  # Пока пусто, спросим позже
-                context.user_data['recipient'] = ''  # Нет получателя для CNY
-                context.user_data['bank'] = payment_method.upper()  # Alipay/WeChat как "банк"
+            # Загрузка идёт в фоне, пока пользователь вводит реквизиты и назначение;
+            # ссылку дожидается request_confirm (_resolve_qr_link)
+            job = uploads.new_job('', filename, 'image/jpeg')
+            try:
+                await file.download_to_drive(job.path)
+            except Exception:
+                uploads.discard(job)
+                raise
+            context.user_data['qr_upload'] = uploads.submit(job)
+            context.user_data['qr_code_link'] = ''
+            context.user_data['card_or_phone'] = ''  # Пока пусто, спросим позже
+            context.user_data['recipient'] = ''  # Нет получателя для CNY
+            context.user_data['bank'] = payment_method.upper()  # Alipay/WeChat как "банк"
 
-                # Предлагаем добавить текстовые реквизиты (опционально)
-                keyboard = [
-                    [InlineKeyboardButton("✅ Добавить реквизиты (номер карты, имя и т.д.)", callback_data="cny_add_text_requisites")],
-                    [InlineKeyboardButton("⏭️ Пропустить, перейти к назначению платежа", callback_data="cny_skip_text_requisites")]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+            # Предлагаем добавить текстовые реквизиты (опционально)
+            keyboard = [
+                [InlineKeyboardButton("✅ Добавить реквизиты (номер карты, имя и т.д.)",
+                                      callback_data="cny_add_text_requisites")],
+                [InlineKeyboardButton("⏭️ Пропустить, перейти к назначению платежа",
+                                      callback_data="cny_skip_text_requisites")]
+            ]
+            reply_markup = InlineKeyboardMarkup(keyboard)
 
-                await update.message.reply_text(
-                    f"✅ QR-код успешно загружен в Google Drive!\n\n"
-                    f"📸 Ссылка: {qr_link[:50]}...\n\n"
-                    f"Хотите добавить текстовые реквизиты для дублирования?\n"
-                    f"(Номер карты, имя получателя, название банка)",
-                    reply_markup=reply_markup
-                )
-                return QR_CODE_OR_REQUISITES  # Остаёмся на этом этапе
-            else:
-                await update.message.reply_text(
-                    "❌ Ошибка загрузки QR-кода. Попробуйте ещё раз или введите текстовые реквизиты:"
-                )
-                return QR_CODE_OR_REQUISITES
+            await update.message.reply_text(
+                "✅ QR-код принят и загружается в Google Drive.\n\n"
+                "Хотите добавить текстовые реквизиты для дублирования?\n"
+                "(Номер карты, имя получателя, название банка)",
+                reply_markup=reply_markup
+            )
+            return QR_CODE_OR_REQUISITES  # Остаёмся на этом этапе
 
         except Exception as e:
             logger.error(f"Ошибка обработки QR-кода: {e}")
@@ -524,7 +524,7 @@ async def show_confirmation(update, context):
             f"💳 Способ оплаты: {method_display}\n"
         )
 
-        if qr_code_link:
+        if qr_code_link or context.user_data.get('qr_upload'):
             summary += f"📸 QR-код: загружен ✅\n"
         else:
             summary += f"💳 Реквизиты: {card_or_phone[:50]}...\n"
@@ -564,6 +564,29 @@ async def show_confirmation(update, context):
     return CONFIRM
 
 
+async def _resolve_qr_link(context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """
+    Ссылка на QR-код CNY-заявки.
+
+    Если QR-код ещё загружается в фоне (user_data['qr_upload']), ждём
+    загрузку не дольше QR_UPLOAD_WAIT секунд.
+
+    Returns:
+        Ссылка, '' — QR-кода нет (только текстовые реквизиты),
+        None — загрузка не удалась.
+    """
+    upload = context.user_data.pop('qr_upload', None)
+    if upload is None:
+        return context.user_data.get('qr_code_link', '')
+    try:
+        link = await asyncio.wait_for(asyncio.shield(upload), QR_UPLOAD_WAIT)
+    except asyncio.TimeoutError:
+        logger.error("QR upload did not finish in time")
+        return None
+    context.user_data['qr_code_link'] = link or ''
+    return link or None
+
+
 async def request_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Подтверждение создания заявки"""
     query = update.callback_query
@@ -576,7 +599,7 @@ async def request_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Создаем заявку
     user = update.effective_user
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
@@ -590,9 +613,17 @@ async def request_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
     currency = context.user_data.get('currency', config.CURRENCY_RUB)
 
     # Для CNY добавляем QR-код ссылку
-    qr_code_link = context.user_data.get('qr_code_link', '') if currency == config.CURRENCY_CNY else None
+    qr_code_link = None
+    if currency == config.CURRENCY_CNY:
+        qr_code_link = await _resolve_qr_link(context)
+        if qr_code_link is None:
+            await query.edit_message_text(
+                "❌ QR-код не удалось загрузить в Google Drive. Создайте заявку заново."
+            )
+            context.user_data.clear()
+            return ConversationHandler.END
 
-    request_id = sheets.create_request(
+    request_id = await sheets.create_request(
         recipient=context.user_data.get('recipient', ''),
         amount=context.user_data['amount'],
         card_or_phone=context.user_data['card_or_phone'],
@@ -674,7 +705,7 @@ def parse_date(date_str):
 async def my_requests(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Просмотр своих заявок"""
     user = update.effective_user
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         await update.message.reply_text("⚠️ Ошибка подключения к системе.")
@@ -682,7 +713,7 @@ async def my_requests(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         # Один проход по всем листам для обоих статусов (было 2 прохода = 10 API-запросов)
-        all_requests = sheets.get_requests_by_status(
+        all_requests = await sheets.get_requests_by_status(
             [config.STATUS_CREATED, config.STATUS_PAID],
             author_id=str(user.id)
         )
@@ -794,7 +825,7 @@ async def my_requests_navigation_callback(update: Update, context: ContextTypes.
 
     # Получаем данные
     user = update.effective_user
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
@@ -802,7 +833,7 @@ async def my_requests_navigation_callback(update: Update, context: ContextTypes.
 
     try:
         # Один проход по всем листам для обоих статусов
-        all_requests = sheets.get_requests_by_status(
+        all_requests = await sheets.get_requests_by_status(
             [config.STATUS_CREATED, config.STATUS_PAID],
             author_id=str(user.id)
         )
@@ -900,13 +931,13 @@ async def view_request_callback(update: Update, context: ContextTypes.DEFAULT_TY
     # Сохраняем страницу для возврата
     context.user_data['return_to_page'] = page
 
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
 
     # Получаем заявку по уникальному request_id
-    request = sheets.get_request_by_request_id(request_id)
+    request = await sheets.get_request_by_request_id(request_id)
 
     if not request:
         await query.edit_message_text("❌ Заявка не найдена.")
@@ -954,7 +985,7 @@ async def view_request_callback(update: Update, context: ContextTypes.DEFAULT_TY
         details_text += f"📝 Назначение: {request['purpose']}\n"
 
         # Категория и инициатор - только для owner/executor, менеджеру не показываем
-        user_role = sheets.get_user_role(update.effective_user.id) or ''
+        user_role = await sheets.get_user_role(update.effective_user.id) or ''
         if user_role != config.ROLE_MANAGER:
             details_text += f"🏷 Категория: {request['category']}\n"
 
@@ -984,7 +1015,7 @@ async def view_request_callback(update: Update, context: ContextTypes.DEFAULT_TY
         )
 
     # Если оплачена — доп. инфо (Исполнитель, ID сделки) только для owner/executor; менеджеру не показываем
-    user_role = sheets.get_user_role(update.effective_user.id) or ''
+    user_role = await sheets.get_user_role(update.effective_user.id) or ''
     show_executor_info = request['status'] == config.STATUS_PAID and user_role != config.ROLE_MANAGER
     if show_executor_info:
         if request.get('executor'):
@@ -1097,12 +1128,12 @@ async def edit_menu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     page = int(parts[1]) if len(parts) == 2 else 1
 
     # Получаем заявку чтобы сохранить её данные
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
 
-    request = sheets.get_request_by_request_id(request_id)
+    request = await sheets.get_request_by_request_id(request_id)
     if not request:
         await query.edit_message_text("❌ Заявка не найдена.")
         return
@@ -1178,7 +1209,7 @@ async def back_to_list_callback(update: Update, context: ContextTypes.DEFAULT_TY
 
     # Получаем данные
     user = update.effective_user
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
@@ -1186,7 +1217,7 @@ async def back_to_list_callback(update: Update, context: ContextTypes.DEFAULT_TY
 
     try:
         # Один проход по всем листам для обоих статусов
-        all_requests = sheets.get_requests_by_status(
+        all_requests = await sheets.get_requests_by_status(
             [config.STATUS_CREATED, config.STATUS_PAID],
             author_id=str(user.id)
         )
@@ -1276,26 +1307,26 @@ async def cancel_request_callback(update: Update, context: ContextTypes.DEFAULT_
         await query.edit_message_text("❌ Ошибка формата данных.")
         return
 
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
     if not sheets:
         await query.edit_message_text("⚠️ Ошибка подключения к системе.")
         return
 
     # Получаем заявку для проверки прав
-    request = sheets.get_request_by_request_id(request_id)
+    request = await sheets.get_request_by_request_id(request_id)
     if not request:
         await query.edit_message_text("❌ Заявка не найдена.")
         return
 
     # Проверяем права: своя заявка или роль owner
     user = update.effective_user
-    user_role = sheets.get_user_role(user.id)
+    user_role = await sheets.get_user_role(user.id)
     if str(request.get('author_id')) != str(user.id) and user_role != config.ROLE_OWNER:
         await query.edit_message_text("❌ Вы можете отменять только свои заявки.")
         return
 
     # Отменяем заявку (используем новую функцию с request_id)
-    success = sheets.update_request_status_by_id(
+    success = await sheets.update_request_status_by_id(
         request_id,
         config.STATUS_CANCELLED
     )
@@ -1355,49 +1386,66 @@ async def handle_qr_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Ошибка: заявка не найдена.")
         return
 
-    sheets = context.bot_data.get('sheets')
-    drive_manager = context.bot_data.get('drive_manager')
+    sheets = get_async_sheets(context)
+    uploads = context.bot_data.get('drive_uploads')
 
-    if not sheets or not drive_manager:
+    if not sheets or not uploads:
         await update.message.reply_text("⚠️ Ошибка подключения к системе.")
         return
 
-    # Загружаем новый QR-код
-    await update.message.reply_text("⏳ Загружаю новый QR-код в Google Drive...")
+    request = await sheets.get_request_by_request_id(request_id)
+    if not request:
+        await update.message.reply_text("❌ Заявка не найдена.")
+        return
 
+    # Файл — в очередь загрузок; ссылку в таблицу запишет on_qr_uploaded
+    job = uploads.new_job(
+        'qr',
+        filename=f"cny_qr_{request_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg",
+        mime_type="image/jpeg",
+        meta={'request_id': request_id, 'page': page, 'chat_id': update.effective_chat.id},
+    )
     try:
         photo = update.message.photo[-1]  # Берём самое большое разрешение
         file = await context.bot.get_file(photo.file_id)
-        file_bytes = await file.download_as_bytearray()
+        await file.download_to_drive(job.path)
+        uploads.submit(job)
+    except Exception as e:
+        logger.error(f"Ошибка при обновлении QR-кода: {e}")
+        uploads.discard(job)
+        await update.message.reply_text("❌ Ошибка загрузки QR-кода. Попробуйте ещё раз.")
+        return
 
-        # Загружаем в Google Drive
-        qr_code_link = drive_manager.upload_file_from_bytes(
-            file_bytes,
-            filename=f"cny_qr_{request_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg",
-            mime_type="image/jpeg"
-        )
+    context.user_data.pop('updating_qr', None)
+    await update.message.reply_text(
+        "⏳ QR-код принят и загружается в Google Drive.\n"
+        "Ссылка в заявке обновится автоматически — я сообщу, когда будет готово."
+    )
 
-        if qr_code_link:
-            # Обновляем ссылку в таблице
-            request = sheets.get_request_by_request_id(request_id)
-            if request:
-                sheets.update_request_qr_code(request_id, qr_code_link)
 
-                context.user_data.pop('updating_qr', None)
+async def on_qr_uploaded(application, job: UploadJob, qr_code_link: Optional[str]):
+    """QR-код загружен очередью DriveUploadQueue — записать ссылку в заявку и сообщить автору."""
+    request_id = job.meta.get('request_id', '')
+    page = job.meta.get('page', 1)
+    context = background_context(application, {})
+    sheets = get_async_sheets(context)
+
+    markup = None
+    if qr_code_link and sheets and await sheets.update_request_qr_code(request_id, qr_code_link):
+        text = "✅ QR-код успешно обновлён!"
+        markup = InlineKeyboardMarkup([[
+            InlineKeyboardButton("« Вернуться к заявке",
+                                 callback_data=f"view_req_{request_id}_{page}")
+        ]])
+    else:
+        text = "❌ Ошибка загрузки QR-кода. Попробуйте ещё раз."
 
-                await update.message.reply_text(
-                    "✅ QR-код успешно обновлён!",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("« Вернуться к заявке", callback_data=f"view_req_{request_id}_{page}")
-                    ]])
-                )
-            else:
-                await update.message.reply_text("❌ Заявка не найдена.")
-        else:
-            await update.message.reply_text("❌ Ошибка загрузки QR-кода. Попробуйте ещё раз.")
-    except Exception as e:
-        logger.error(f"Ошибка при обновлении QR-кода: {e}")
-        await update.message.reply_text("❌ Ошибка загрузки QR-кода. Попробуйте ещё раз.")
+    chat_id = job.meta.get('chat_id')
+    if chat_id:
+        try:
+            await application.bot.send_message(chat_id=chat_id, text=text, reply_markup=markup)
+        except Exception as e:
+            logger.error(f"Failed to send QR update result to {chat_id}: {e}")
 
 
 # ========== CONVERSATION HANDLER ==========
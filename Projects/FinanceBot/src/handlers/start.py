@@ -5,12 +5,13 @@ from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 from src.utils.auth import require_auth, get_user_info
 from src import config
+from src.async_sheets import get_async_sheets
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /start - сбрасывает незаконченные разговоры и показывает меню"""
     user = update.effective_user
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     # Сбрасываем любой активный разговор
     context.user_data.clear()
@@ -22,7 +23,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ConversationHandler.END
 
     # Проверяем, зарегистрирован ли пользователь
-    user_info = sheets.get_user(user.id)
+    user_info = await sheets.get_user(user.id)
 
     if not user_info:
         # Новый пользователь
@@ -53,7 +54,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 @require_auth
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Команда /help"""
-    user_info = get_user_info(update, context)
+    user_info = await get_user_info(update, context)
 
     if not user_info:
         await update.message.reply_text("⚠️ Ошибка получения данных пользователя.")
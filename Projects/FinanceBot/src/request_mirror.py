@@ -0,0 +1,352 @@
+"""
+Зеркало листов заявок в памяти
+Finance Bot - панель владельца (список, пагинация, статистика) без
+перечитывания всех листов на каждое открытие
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src import config
+from src.row_decoder import RowDecoder
+
+logger = logging.getLogger(__name__)
+
+
+# Статусы, которые попадают в список и статистику (как в get_all_requests)
+MIRROR_STATUSES = (config.STATUS_CREATED, config.STATUS_PAID, config.STATUS_CANCELLED)
+
+# load_values(sheet_name) -> all_values листа (с заголовком)
+LoadValues = Callable[[str], List[List[str]]]
+
+# decoder_for(sheet_name, currency, headers) -> RowDecoder
+DecoderFor = Callable[[str, str, List[str]], RowDecoder]
+
+
+def parse_month_year(date_str: str) -> Tuple[Optional[int], Optional[int]]:
+    """Извлечь (month, year) из строки даты. Поддерживает DD.MM.YYYY и YYYY-MM-DD."""
+    if not date_str:
+        return None, None
+    for fmt in ('%d.%m.%Y', '%Y-%m-%d', '%d.%m.%y'):
+        try:
+            d = datetime.strptime(str(date_str).strip()[:10], fmt)
+            return d.month, d.year
+        except ValueError:
+            continue
+    return None, None
+
+
+@dataclass
+class RequestStats:
+    """Агрегаты по заявкам со статусами MIRROR_STATUSES."""
+    # статус -> заявок
+    counts: Dict[str, int] = field(default_factory=dict)
+    # (статус, валюта) -> сумма
+    sums: Dict[Tuple[str, str], float] = field(default_factory=dict)
+    # (статус, месяц, год) -> заявок
+    month_counts: Dict[Tuple[str, int, int], int] = field(default_factory=dict)
+    # (статус, месяц, год, валюта) -> сумма
+    month_sums: Dict[Tuple[str, int, int, str], float] = field(default_factory=dict)
+    # (статус, исполнитель) -> заявок
+    executor_counts: Dict[Tuple[str, str], int] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def currency_sums(self, status: str) -> Dict[str, float]:
+        """Суммы заявок статуса по валютам."""
+        return {cur: amount for (st, cur), amount in self.sums.items() if st == status}
+
+    def month_currency_sums(self, status: str, month: int, year: int) -> Dict[str, float]:
+        """Суммы заявок статуса за месяц по валютам."""
+        return {
+            cur: amount for (st, m, y, cur), amount in self.month_sums.items()
+            if (st, m, y) == (status, month, year)
+        }
+
+    def top_executors(self, status: str, limit: int = 5) -> List[Tuple[str, int]]:
+        """Исполнители с наибольшим числом заявок статуса."""
+        counts = [(name, n) for (st, name), n in self.executor_counts.items() if st == status]
+        counts.sort(key=lambda item: -item[1])
+        return counts[:limit]
+
+
+class _Aggregates:
+    """
+    Инкрементальные агрегаты: строка добавляется (+1) или убирается (-1).
+
+    Рядом с каждой суммой хранится число слагаемых — ключ исчезает,
+    когда из него убраны все строки (без «0.0000001 ₽» от округления).
+    """
+
+    def __init__(self):
+        self.stats = RequestStats()
+        self._sum_terms: Dict[tuple, int] = {}
+
+    @staticmethod
+    def _count(counts: dict, key, sign: int) -> None:
+        value = counts.get(key, 0) + sign
+        if value:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+    def _sum(self, sums: dict, key, amount: float, sign: int) -> None:
+        terms = self._sum_terms.get(key, 0) + sign
+        if terms:
+            self._sum_terms[key] = terms
+            sums[key] = sums.get(key, 0.0) + sign * amount
+        else:
+            self._sum_terms.pop(key, None)
+            sums.pop(key, None)
+
+    def apply(self, record: Dict, sign: int) -> None:
+        status = record.get('status')
+        if status not in MIRROR_STATUSES:
+            return
+        stats = self.stats
+        currency = record.get('currency', config.CURRENCY_RUB)
+        amount = float(record.get('amount', 0) or 0)
+
+        self._count(stats.counts, status, sign)
+        self._sum(stats.sums, (status, currency), amount, sign)
+
+        month, year = parse_month_year(record.get('date', ''))
+        if month is not None:
+            self._count(stats.month_counts, (status, month, year), sign)
+            self._sum(stats.month_sums, (status, month, year, currency), amount, sign)
+
+        executor = record.get('executor', '').strip()
+        if executor:
+            self._count(stats.executor_counts, (status, executor), sign)
+
+
+class RequestMirror:
+    """
+    Разобранные заявки всех листов и агрегаты по ним — в памяти.
+
+    sync() берёт значения листов из снимка, сравнивает хеши строк с
+    прошлой синхронизацией и декодирует только изменившиеся строки;
+    агрегаты правятся на разницу. Запросы панели владельца (page, stats)
+    отвечают из памяти.
+
+    Side effects:
+        - start() синхронизирует зеркало в фоне: сразу и затем раз в interval
+          секунд (refresh — принудительное перечитывание снимка). Пока
+          зеркало никто не читает и бот ничего не писал, фон в Sheets не ходит.
+        - mark_dirty() (после записей бота) — следующий запрос сначала
+          синхронизируется, поэтому владелец видит свои изменения сразу.
+
+    Invariants:
+        - Порядок заявок как у get_requests_by_status / get_all_requests:
+          по листам REQUEST_SHEETS, внутри листа — по строкам.
+        - Запросы отдают копии dict — изменять их безопасно.
+    """
+
+    def __init__(self, load_values: LoadValues, sheets: Iterable[Tuple[str, str]],
+                 decoder_for: DecoderFor, refresh: Optional[Callable[[], None]] = None):
+        self._load_values = load_values
+        self._sheets: List[Tuple[str, str]] = list(sheets)
+        self._decoder_for = decoder_for
+        self._refresh = refresh
+
+        # sheet -> (all_values последней синхронизации, [(хеш строки, dict заявки)])
+        self._rows: Dict[str, Tuple[List[List[str]], List[Tuple[int, Dict]]]] = {}
+        self._aggregates = _Aggregates()
+        # status (None — все) -> заявки в порядке вывода; сбрасывается при изменениях
+        self._ordered: Dict[Optional[str], List[Dict]] = {}
+
+        self._synced = False
+        self._version = 0          # растёт при mark_dirty()
+        self._synced_version = -1
+        # Были ли page()/stats() с прошлой фоновой синхронизации
+        self._read = False
+        self._synced_at = 0.0
+        # Интервал фона (start); зеркало старше него синхронизируется при чтении
+        self._interval: Optional[float] = None
+
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ===== Синхронизация =====
+
+    def sync(self) -> int:
+        """
+        Привести зеркало к текущим данным листов.
+
+        Returns:
+            Число строк, которые пришлось декодировать заново.
+        """
+        with self._lock:
+            version = self._version
+        values = {name: self._load_values(name) for name, _ in self._sheets}
+
+        changed = 0
+        with self._lock:
+            for sheet_name, currency in self._sheets:
+                changed += self._sync_sheet(sheet_name, currency, values[sheet_name])
+            if changed:
+                self._ordered.clear()
+            self._synced = True
+            self._synced_version = version
+            self._synced_at = time.monotonic()
+        if changed:
+            logger.debug(f"RequestMirror: {changed} rows changed")
+        return changed
+
+    def _sync_sheet(self, sheet_name: str, currency: str, all_values: List[List[str]]) -> int:
+        previous_values, previous = self._rows.get(sheet_name, (None, []))
+        if all_values is previous_values:
+            return 0
+
+        rows = all_values[1:] if all_values else []
+        decoder = self._decoder_for(sheet_name, currency, all_values[0]) if all_values else None
+        if previous and (not all_values or previous_values[0] != all_values[0]):
+            # Другие заголовки — прежние dict собраны по старой схеме, разбираем лист заново
+            for _, record in previous:
+                self._aggregates.apply(record, -1)
+            changed = len(previous)
+            previous = []
+        else:
+            changed = 0
+
+        # Неизменившиеся строки узнаются по хешу, даже если сдвинулись
+        reusable: Dict[int, List[Dict]] = {}
+        for row_hash, record in previous:
+            reusable.setdefault(row_hash, []).append(record)
+
+        entries: List[Tuple[int, Dict]] = []
+        aggregates = self._aggregates
+        for row in rows:
+            row_hash = hash(tuple(row))
+            same = reusable.get(row_hash)
+            if same:
+                record = same.pop()
+            else:
+                record = decoder(row)
+                aggregates.apply(record, +1)
+                changed += 1
+            entries.append((row_hash, record))
+
+        for leftovers in reusable.values():
+            for record in leftovers:
+                aggregates.apply(record, -1)
+                changed += 1
+
+        self._rows[sheet_name] = (all_values, entries)
+        return changed
+
+    def mark_dirty(self) -> None:
+        """Данные листов изменились (запись бота) — следующий запрос синхронизирует."""
+        with self._lock:
+            self._version += 1
+
+    def _ensure_synced(self) -> None:
+        with self._lock:
+            idle = (self._interval is not None
+                    and time.monotonic() - self._synced_at > self._interval)
+            if self._synced and self._synced_version == self._version and not idle:
+                return
+        # После простоя фон не обновлял зеркало — берём листы из снимка (по его TTL)
+        self.sync()
+
+    # ===== Запросы =====
+
+    def _ordered_records(self, status: Optional[str]) -> List[Dict]:
+        ordered = self._ordered.get(status)
+        if ordered is None:
+            statuses = MIRROR_STATUSES if status is None else (status,)
+            ordered = [
+                record
+                for st in statuses
+                for sheet_name, _ in self._sheets
+                for _, record in self._rows.get(sheet_name, (None, []))[1]
+                if record.get('status') == st
+            ]
+            self._ordered[status] = ordered
+        return ordered
+
+    def page(self, status: Optional[str], offset: int, limit: int) -> Tuple[int, List[Dict]]:
+        """
+        Страница заявок.
+
+        Args:
+            status: Статус или None — все статусы MIRROR_STATUSES (по статусам,
+                    как get_all_requests).
+
+        Returns:
+            (всего заявок под фильтром, заявки страницы)
+        """
+        self._ensure_synced()
+        with self._lock:
+            self._read = True
+            ordered = self._ordered_records(status)
+            return len(ordered), [dict(r) for r in ordered[offset: offset + limit]]
+
+    def stats(self) -> RequestStats:
+        """Копия агрегатов (счётчики по статусам, суммы по валютам, исполнители)."""
+        self._ensure_synced()
+        with self._lock:
+            self._read = True
+            stats = self._aggregates.stats
+            return RequestStats(
+                counts=dict(stats.counts),
+                sums=dict(stats.sums),
+                month_counts=dict(stats.month_counts),
+                month_sums=dict(stats.month_sums),
+                executor_counts=dict(stats.executor_counts),
+            )
+
+    # ===== Фоновая синхронизация =====
+
+    def start(self, interval: float) -> None:
+        """Синхронизировать в фоне: сразу и затем раз в interval секунд."""
+        if self._thread is not None:
+            return
+        self._interval = interval
+
+        def _loop():
+            while True:
+                try:
+                    self._background_sync()
+                except Exception as e:
+                    logger.error(f"RequestMirror: background sync failed: {e}")
+                if self._stop.wait(interval):
+                    return
+
+        self._thread = threading.Thread(target=_loop, name='request-mirror', daemon=True)
+        self._thread.start()
+
+    def _background_sync(self) -> bool:
+        """
+        Один шаг фоновой синхронизации.
+
+        Листы перечитываются (refresh), только если зеркало читали с прошлого
+        шага — панель владельца открыта. После записей бота достаточно sync():
+        снимок уже сброшен для изменённых листов. Иначе шаг ничего не делает.
+
+        Returns:
+            True если зеркало синхронизировалось.
+        """
+        with self._lock:
+            read, self._read = self._read, False
+            dirty = self._synced_version != self._version
+            synced = self._synced
+        if synced and not read and not dirty:
+            return False
+        if synced and read and self._refresh is not None:
+            self._refresh()
+        self.sync()
+        return True
+
+    def close(self) -> None:
+        """Остановить фоновую синхронизацию."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,103 @@
+"""
+Декодирование строк листов заявок
+Finance Bot - схема листа компилируется один раз, dict собирается
+только для строк, прошедших фильтр
+"""
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Поля, которые в dict заявки всегда float (пустое/мусор -> 0.0)
+FLOAT_FIELDS = frozenset({'amount', 'amount_usdt', 'rate'})
+
+
+def to_float(value) -> float:
+    """Сумма из ячейки: '' и нечисловые значения -> 0.0."""
+    try:
+        return float(value) if value else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+class RowDecoder:
+    """
+    Скомпилированная схема листа: строка таблицы -> dict заявки.
+
+    Индексы колонок собираются в один itemgetter, поэтому строка
+    разбирается одним вызовом вместо цепочки `row[i] if len(row) > i else ''`.
+
+    Invariants:
+        - Сначала подставляются constants, затем поля из колонок
+          (значение из колонки перекрывает константу с тем же ключом).
+        - Колонка за концом строки даёт '' (или 0.0 для FLOAT_FIELDS).
+    """
+
+    __slots__ = ('_keys', '_getter', '_width', '_float_keys', '_constants')
+
+    def __init__(self, fields: Dict[str, int], constants: Optional[Dict[str, Any]] = None):
+        self._keys = tuple(fields)
+        indices = tuple(fields.values())
+        self._width = max(indices) + 1 if indices else 0
+        if len(indices) == 1:
+            index = indices[0]
+            self._getter: Callable = lambda row: (row[index],)
+        elif indices:
+            self._getter = itemgetter(*indices)
+        else:
+            self._getter = lambda row: ()
+        self._float_keys = tuple(k for k in self._keys if k in FLOAT_FIELDS)
+        self._constants = dict(constants or {})
+
+    def __call__(self, row: List[str]) -> Dict[str, Any]:
+        if len(row) < self._width:
+            row = list(row) + [''] * (self._width - len(row))
+        result = dict(self._constants)
+        result.update(zip(self._keys, self._getter(row)))
+        for key in self._float_keys:
+            result[key] = to_float(result[key])
+        return result
+
+
+class DecodedSheet:
+    """
+    Строки листа (без заголовка) с ленивыми колонками для фильтрации.
+
+    Фильтры (статус, исполнитель, автор) проверяют значения колонки,
+    dict заявки собирается только для подошедших строк.
+
+    Invariants:
+        - Строки не копируются и не изменяются.
+        - Значение колонки None — строка короче колонки (такие строки
+          не проходят ни один фильтр).
+    """
+
+    __slots__ = ('rows', 'decoder', '_columns')
+
+    def __init__(self, rows: List[List[str]], decoder: RowDecoder):
+        self.rows = rows
+        self.decoder = decoder
+        self._columns: Dict[tuple, List[Optional[str]]] = {}
+
+    def column(self, index: int, strip: bool = False) -> List[Optional[str]]:
+        """Значения колонки по всем строкам (вычисляются один раз)."""
+        key = (index, strip)
+        values = self._columns.get(key)
+        if values is None:
+            if strip:
+                values = [row[index].strip() if len(row) > index else None for row in self.rows]
+            else:
+                values = [row[index] if len(row) > index else None for row in self.rows]
+            self._columns[key] = values
+        return values
+
+    def match(self, index: int, accepted: Iterable[str], strip: bool = False,
+              candidates: Optional[List[int]] = None) -> List[int]:
+        """Номера строк (0-based), у которых значение колонки входит в accepted."""
+        accepted = accepted if isinstance(accepted, (set, frozenset)) else set(accepted)
+        values = self.column(index, strip)
+        positions = range(len(values)) if candidates is None else candidates
+        return [i for i in positions if values[i] is not None and values[i] in accepted]
+
+    def decode(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        """dict заявок для выбранных строк."""
+        rows, decoder = self.rows, self.decoder
+        return [decoder(rows[i]) for i in positions]
@@ -2,12 +2,17 @@
 Модуль для работы с Google Sheets
 Finance Bot - управление заявками, оплатами, пользователями
 """
-import time
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict, Tuple
 import gspread
+from gspread.utils import absolute_range_name, fill_gaps, rowcol_to_a1
 from oauth2client.service_account import ServiceAccountCredentials
 from src import config
+from src.sheets_snapshot import SheetsSnapshot, RequestIndex, RequestLocation, REQUEST_SHEETS
+from src.write_queue import SheetsWriteQueue, PENDING_ROW, _row_from_append_response
+from src.users_table import UsersTable, UserRecord, parse_telegram_id
+from src.row_decoder import RowDecoder, DecodedSheet
+from src.request_mirror import RequestMirror, RequestStats
 import logging
 
 logger = logging.getLogger(__name__)
@@ -44,6 +49,12 @@ COLUMNS_CNY = {
 }
 
 
+def _is_rate_limited(error: Exception) -> bool:
+    """Ошибка API — превышение квоты (429)"""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return isinstance(error, gspread.exceptions.APIError) and status == 429
+
+
 def _col_map_for_currency(currency: str) -> dict:
     """Получить маппинг колонок по валюте"""
     if currency == config.CURRENCY_USDT:
@@ -68,14 +79,41 @@ class GoogleApiManager:
         self.client = gspread.authorize(creds)
         self.spreadsheet = self.client.open_by_key(spreadsheet_id)
 
+        # Кэш объектов листов: spreadsheet.worksheet() каждый раз
+        # запрашивает метаданные всей таблицы (лишний API-вызов перед записью)
+        self._worksheets: Dict[str, gspread.Worksheet] = {}
+
     def get_worksheet(self, sheet_name: str):
         """Получить лист по названию"""
-        return self.spreadsheet.worksheet(sheet_name)
+        worksheet = self._worksheets.get(sheet_name)
+        if worksheet is None:
+            worksheet = self.spreadsheet.worksheet(sheet_name)
+            self._worksheets[sheet_name] = worksheet
+        return worksheet
 
 
 class SheetsManager(GoogleApiManager):
     """Менеджер для работы с таблицами Finance Bot (14 колонок)"""
 
+    # Снимок листов заявок и индекс request_id создаются лениво
+    # (см. свойства snapshot и request_index)
+    _snapshot: Optional[SheetsSnapshot] = None
+    _request_index: Optional[RequestIndex] = None
+
+    # Очередь записей (write-behind); None — запись сразу в Sheets
+    _write_queue: Optional[SheetsWriteQueue] = None
+
+    # Лист Пользователи в памяти (см. свойство users_table)
+    _users_table: Optional[UsersTable] = None
+
+    # Скомпилированные декодеры строк и разобранные листы
+    # (см. _row_decoder и _decoded_sheet)
+    _row_decoders: Optional[Dict[tuple, RowDecoder]] = None
+    _decoded_sheets: Optional[Dict[tuple, tuple]] = None
+
+    # Зеркало заявок для панели владельца (см. свойство request_mirror)
+    _request_mirror: Optional[RequestMirror] = None
+
     def __init__(self):
         super().__init__(
             credentials_path=config.GOOGLE_SERVICE_ACCOUNT_FILE,
@@ -90,16 +128,290 @@ class SheetsManager(GoogleApiManager):
             logger.error(f"List 'Polzovateli' ne najden! Neobhodimo sozdat: {e}")
             self.users_sheet = None
 
-        # Кэш пользователей: {telegram_id: (user_dict, expires_at)}
-        # Снижает количество обращений к Sheets API с 3-5 до 1 за сессию
-        self._user_cache: Dict[int, tuple] = {}
-        self._user_cache_ttl: float = 60.0  # секунд
-
         # Кэш маппинга заголовков: {tuple(headers): hdr_map}
         # _find_columns_by_headers парсит заголовки при каждом запросе —
         # кеш устраняет повторную работу пока схема не меняется
         self._hdr_cache: Dict[tuple, dict] = {}
 
+        # Листы, которых нет в таблице (исключаются из batch-запросов)
+        self._missing_sheets: set = set()
+
+        # Очередь записей: изменения заявок копятся и уходят одним
+        # batch-запросом раз в SHEETS_FLUSH_INTERVAL секунд
+        if config.SHEETS_WRITE_BEHIND:
+            self._write_queue = SheetsWriteQueue(
+                self.spreadsheet, config.SHEETS_WRITE_JOURNAL,
+                on_appended=self.request_index.add,
+                on_flushed=self._on_writes_flushed,
+            )
+            if len(self._write_queue):
+                self._write_queue.discard_appends(self._is_request_written)
+            self._write_queue.start(config.SHEETS_FLUSH_INTERVAL)
+
+        # Пользователи: весь лист в памяти, обновляется в фоне —
+        # проверки прав (require_auth/require_role) не ходят в Sheets
+        if self.users_sheet:
+            self.users_table.start(config.USERS_REFRESH_INTERVAL)
+
+        # Заявки для панели владельца: зеркало синхронизируется в фоне,
+        # список и статистика открываются без чтения листов
+        self.request_mirror.start(config.REQUESTS_MIRROR_INTERVAL)
+
+    # ===== SNAPSHOT: все листы заявок одним запросом =====
+
+    @property
+    def snapshot(self) -> SheetsSnapshot:
+        """
+        Снимок всех листов заявок в памяти.
+
+        Все чтения листов заявок идут через него: устаревшие листы
+        догружаются одним values_batch_get, записи бота инвалидируют лист.
+        """
+        if self._snapshot is None:
+            self._snapshot = SheetsSnapshot(
+                fetch_values=self._batch_get_values,
+                sheet_names=[name for name, _ in REQUEST_SHEETS],
+                ttl=config.SHEETS_SNAPSHOT_TTL,
+                on_refresh=self.request_index.rebuild,
+                overlay=self._write_queue.overlay if self._write_queue is not None else None,
+            )
+        return self._snapshot
+
+    @property
+    def request_index(self) -> RequestIndex:
+        """Индекс request_id -> (лист, строка, валюта), перестраивается снимком."""
+        if self._request_index is None:
+            self._request_index = RequestIndex(REQUEST_SHEETS)
+        return self._request_index
+
+    @property
+    def users_table(self) -> UsersTable:
+        """Лист Пользователи в памяти с индексами по telegram_id и роли."""
+        if self._users_table is None:
+            self._users_table = UsersTable(self._fetch_users_values, ttl=config.USERS_CACHE_TTL)
+        return self._users_table
+
+    @property
+    def request_mirror(self) -> RequestMirror:
+        """Разобранные заявки всех листов с агрегатами (панель владельца)."""
+        if self._request_mirror is None:
+            self._request_mirror = RequestMirror(
+                load_values=self.snapshot.get_values,
+                sheets=REQUEST_SHEETS,
+                decoder_for=lambda name, currency, headers: self._row_decoder(
+                    'request', name, currency, headers
+                ),
+                refresh=self.snapshot.refresh,
+            )
+        return self._request_mirror
+
+    def _fetch_users_values(self) -> List[List[str]]:
+        """Все значения листа Пользователи (1 API-вызов)."""
+        if not self.users_sheet:
+            return []
+        return self.users_sheet.get_all_values()
+
+    def _locate_request(self, request_id: str) -> Optional[RequestLocation]:
+        """
+        Найти заявку по request_id через индекс.
+
+        Side effects:
+            - Если заявки нет в индексе — догружает устаревшие листы снимка
+              (индекс перестраивается) и ищет повторно. Известная заявка
+              находится без обращения к Sheets.
+
+        Returns:
+            RequestLocation; row == PENDING_ROW — заявка ещё в очереди записей.
+        """
+        if self._write_queue is not None:
+            pending_sheet = self._write_queue.pending_sheet(request_id)
+            if pending_sheet is not None:
+                currency = dict(REQUEST_SHEETS).get(pending_sheet, config.CURRENCY_RUB)
+                return RequestLocation(pending_sheet, PENDING_ROW, currency)
+
+        location = self.request_index.get(request_id)
+        if location is None:
+            for sheet_name, _ in REQUEST_SHEETS:
+                self.snapshot.get_values(sheet_name)
+            location = self.request_index.get(request_id)
+        return location
+
+    def _locate_request_for_write(self, request_id: str) -> Optional[RequestLocation]:
+        """
+        Найти заявку для записи и проверить, что строка всё ещё её.
+
+        Индекс может устареть, если строки в таблице вставили, удалили или
+        отсортировали вручную — тогда запись по номеру строки попала бы в чужую
+        заявку. Поэтому перед записью читается ячейка A{row} (1 API-вызов);
+        при несовпадении лист перечитывается, индекс перестраивается и поиск
+        повторяется.
+
+        Returns:
+            RequestLocation (row == PENDING_ROW — заявка в очереди записей)
+            или None, если заявка не найдена.
+        """
+        for _ in range(2):
+            location = self._locate_request(request_id)
+            if location is None or location.row == PENDING_ROW:
+                return location
+
+            cell = self.get_worksheet(location.sheet_name).acell(f'A{location.row}')
+            if (cell.value or '') == request_id:
+                return location
+
+            logger.warning(
+                f"_locate_request_for_write: stale index for {request_id} "
+                f"({location.sheet_name}:{location.row} holds {cell.value!r}), reloading sheet"
+            )
+            self.snapshot.invalidate(location.sheet_name)
+            self.snapshot.get_values(location.sheet_name)
+
+        logger.error(f"_locate_request_for_write: row of {request_id} could not be verified")
+        return None
+
+    def _headers_for_sheet(self, sheet_name: str) -> List[str]:
+        """Заголовки листа: из индекса, если лист уже загружался, иначе из снимка."""
+        headers = self.request_index.headers(sheet_name)
+        if headers is None:
+            all_values = self.snapshot.get_values(sheet_name)
+            headers = all_values[0] if all_values else []
+        return headers
+
+    def _batch_get_values(self, sheet_names: List[str]) -> Dict[str, List[List[str]]]:
+        """
+        Прочитать несколько листов одним values_batch_get.
+
+        Returns:
+            {sheet_name: all_values} в формате worksheet.get_all_values().
+            Для отсутствующих листов — []. Листы, которые не удалось прочитать
+            (ошибка API), в результат не попадают — снимок оставит прошлые данные.
+
+        Side effects:
+            - 1 API-вызов. Если batch не удался (например, лист удалён) —
+              fallback на get_all_values() по каждому листу; листы, которых
+              нет в таблице, запоминаются и больше не запрашиваются.
+            - При 429 (квота) fallback не выполняется: листы не обновляются.
+        """
+        missing = getattr(self, '_missing_sheets', set())
+        names = [name for name in sheet_names if name not in missing]
+        result: Dict[str, List[List[str]]] = {name: [] for name in sheet_names if name in missing}
+        if not names:
+            return result
+
+        try:
+            response = self.spreadsheet.values_batch_get(
+                [absolute_range_name(name) for name in names]
+            )
+            for name, value_range in zip(names, response.get('valueRanges', [])):
+                values = value_range.get('values', [])
+                result[name] = fill_gaps(values) if values else []
+            return result
+        except Exception as e:
+            if _is_rate_limited(e):
+                # Поштучное чтение только умножит расход квоты — снимок оставит
+                # прошлые данные и повторит batch при следующем чтении
+                logger.warning(f"values_batch_get rate limited, sheets not refreshed: {e}")
+                return result
+            logger.warning(f"values_batch_get failed, reading sheets one by one: {e}")
+
+        for name in names:
+            try:
+                result[name] = self.get_worksheet(name).get_all_values()
+            except gspread.WorksheetNotFound:
+                logger.warning(f"Sheet '{name}' not found, excluded from batch reads")
+                missing.add(name)
+                result[name] = []
+            except Exception as e:
+                logger.error(f"_batch_get_values: sheet '{name}' error: {e}")
+        return result
+
+    def _invalidate_snapshot(self, sheet_name: Optional[str] = None) -> None:
+        """Сбросить снимок листа после записи (None — все листы)."""
+        if self._snapshot is not None:
+            self._snapshot.invalidate(sheet_name)
+        self._mark_requests_changed()
+
+    def _mark_requests_changed(self) -> None:
+        """Заявки изменены ботом — зеркало синхронизируется при следующем запросе."""
+        if self._request_mirror is not None:
+            self._request_mirror.mark_dirty()
+
+    # ===== WRITES: очередь или сразу в Sheets =====
+
+    def _write_cells(self, sheet_name: str, row: int, cells: Dict[int, Any],
+                     request_id: str = '', formulas: Optional[Dict[int, str]] = None,
+                     atomic: bool = False) -> None:
+        """
+        Записать ячейки одной строки заявки.
+
+        Args:
+            cells: {col (1-based): value}
+            request_id: ID заявки — если её строка ещё в очереди, правится сама строка.
+            formulas: {col: шаблон} — '{row}' заменяется номером строки.
+            atomic: Без очереди писать одним update_cells (иначе update_cell на ячейку).
+
+        Side effects:
+            - С очередью: только память и журнал, в Sheets уйдёт при сбросе.
+            - Без очереди: запись в Sheets и сброс снимка листа.
+        """
+        queue = self._write_queue
+        if queue is not None:
+            if request_id and queue.patch_append(sheet_name, request_id, cells, formulas):
+                self._mark_requests_changed()
+                return
+            if row == PENDING_ROW:
+                # Строку дописали между поиском и записью — номер уже в индексе
+                location = self.request_index.get(request_id)
+                if location is None:
+                    raise RuntimeError(
+                        f"{request_id}: строка не найдена ни в очереди, ни в индексе"
+                    )
+                row = location.row
+            resolved = dict(cells)
+            for col, template in (formulas or {}).items():
+                resolved[col] = template.replace('{row}', str(row))
+            queue.put_cells(sheet_name, row, resolved)
+            self._mark_requests_changed()
+            return
+
+        resolved = dict(cells)
+        for col, template in (formulas or {}).items():
+            resolved[col] = template.replace('{row}', str(row))
+        sheet = self.get_worksheet(sheet_name)
+        if atomic:
+            sheet.update_cells(
+                [gspread.Cell(row, col, value) for col, value in resolved.items()],
+                value_input_option='USER_ENTERED',
+            )
+        else:
+            for col, value in resolved.items():
+                sheet.update_cell(row, col, value)
+        self._invalidate_snapshot(sheet_name)
+
+    def _on_writes_flushed(self, sheet_names) -> None:
+        """Очередь отправила изменения — следующее чтение возьмёт их из Sheets."""
+        for sheet_name in sheet_names:
+            self._invalidate_snapshot(sheet_name)
+
+    def _is_request_written(self, sheet_name: str, request_id: str) -> bool:
+        """Есть ли заявка в таблице (по данным Sheets, без учёта очереди)."""
+        for name, _ in REQUEST_SHEETS:
+            self.snapshot.get_values(name)
+        return self.request_index.get(request_id) is not None
+
+    def flush_writes(self) -> bool:
+        """Отправить очередь записей сейчас. True — очередь пуста."""
+        if self._write_queue is None:
+            return True
+        return self._write_queue.flush()
+
+    def close_write_queue(self) -> None:
+        """Остановить фоновый сброс и отправить остаток очереди (при остановке бота)."""
+        if self._request_mirror is not None:
+            self._request_mirror.close()
+        if self._write_queue is not None:
+            self._write_queue.close()
+
     # ===== HELPER: sheet by currency =====
 
     def _get_sheet_for_currency(self, currency: str):
@@ -192,6 +504,72 @@ class SheetsManager(GoogleApiManager):
         self._hdr_cache[cache_key] = col_map
         return col_map
 
+    # ===== ROW DECODING: схема листа -> dict заявки =====
+
+    def _row_decoder(self, view: str, sheet_name: str,
+                     default_currency: str, headers: list) -> RowDecoder:
+        """
+        Декодер строк листа, компилируется один раз на схему (заголовки).
+
+        Args:
+            view: 'request' — dict как в get_requests_by_status /
+                  get_request_by_request_id: USDT/CNY по COLUMNS_USDT/CNY,
+                  RUB/BYN по заголовкам;
+                  'headers' — все листы по заголовкам (_get_requests_filtered).
+            default_currency: Валюта листа (для RUB/BYN перекрывается колонкой «Валюта»).
+        """
+        key = (view, sheet_name, default_currency, tuple(headers))
+        if self._row_decoders is None:
+            self._row_decoders = {}
+        decoder = self._row_decoders.get(key)
+        if decoder is not None:
+            return decoder
+
+        hdr_map = self._find_columns_by_headers(headers)
+        constants = {'currency': default_currency, 'sheet_name': sheet_name}
+
+        if view == 'request' and default_currency in (config.CURRENCY_USDT, config.CURRENCY_CNY):
+            # USDT/CNY: фиксированная структура листа, чек — под ключом receipt_link
+            layout = COLUMNS_USDT if default_currency == config.CURRENCY_USDT else COLUMNS_CNY
+            fields = {
+                ('receipt_link' if field == 'receipt_url' else field): idx
+                for field, idx in layout.items()
+            }
+            fields['amount'] = hdr_map.get('amount', layout['amount'])
+            constants.update(recipient='', details='')
+            if default_currency == config.CURRENCY_USDT:
+                constants['bank'] = ''
+        else:
+            fields = dict(hdr_map)
+            if view == 'request':
+                fields.setdefault('amount', COLUMNS_MAIN['amount'])
+
+        decoder = RowDecoder(fields, constants)
+        self._row_decoders[key] = decoder
+        return decoder
+
+    def _decoded_sheet(self, view: str, sheet_name: str, default_currency: str,
+                       all_values: List[List[str]]) -> DecodedSheet:
+        """
+        Лист с колонками для фильтрации и декодером строк.
+
+        Кэшируется, пока снимок отдаёт тот же список all_values: повторные
+        запросы в пределах TTL снимка не разбирают лист заново.
+        """
+        if self._decoded_sheets is None:
+            self._decoded_sheets = {}
+        key = (view, sheet_name)
+        cached = self._decoded_sheets.get(key)
+        if cached is not None and cached[0] is all_values:
+            return cached[1]
+
+        decoded = DecodedSheet(
+            all_values[1:],
+            self._row_decoder(view, sheet_name, default_currency, all_values[0]),
+        )
+        self._decoded_sheets[key] = (all_values, decoded)
+        return decoded
+
     # ===== MISSING METHODS (needed by payment handler) =====
 
     def find_request_row(self, date: str, amount: float,
@@ -208,8 +586,8 @@ class SheetsManager(GoogleApiManager):
             Номер строки (1-based) или None
         """
         try:
-            sheet = self._get_sheet_for_currency(currency or config.CURRENCY_RUB)
-            all_values = sheet.get_all_values()
+            sheet_name = self._sheet_name_for_currency(currency or config.CURRENCY_RUB)
+            all_values = self.snapshot.get_values(sheet_name)
 
             if not all_values or len(all_values) < 2:
                 return None
@@ -242,31 +620,23 @@ class SheetsManager(GoogleApiManager):
         Найти строку по request_id. Возвращает (row_number, sheet, currency).
 
         Ищет во всех активных листах если currency не указана.
+        row_number == PENDING_ROW — заявка ещё в очереди записей.
+        Строка проверена по ячейке A (см. _locate_request_for_write) — её можно писать.
         """
-        sheets_to_search = []
         if currency:
-            sheets_to_search.append((self._sheet_name_for_currency(currency), currency))
+            allowed_sheets = {self._sheet_name_for_currency(currency)}
         else:
-            sheets_to_search = [
-                (config.SHEET_JOURNAL, config.CURRENCY_RUB),
-                (config.SHEET_USDT, config.CURRENCY_USDT),
-                (config.SHEET_CNY, config.CURRENCY_CNY),
-            ]
-
-        for sheet_name, sheet_currency in sheets_to_search:
-            try:
-                sheet = self.get_worksheet(sheet_name)
-                all_values = sheet.get_all_values()
-                if not all_values or len(all_values) < 2:
-                    continue
+            allowed_sheets = {config.SHEET_JOURNAL, config.SHEET_USDT, config.SHEET_CNY}
 
-                for i, row in enumerate(all_values[1:], start=2):
-                    if len(row) > 0 and row[0] == request_id:
-                        return (i, sheet, sheet_currency)
-            except Exception:
-                continue
-
-        return None
+        try:
+            location = self._locate_request_for_write(request_id)
+            if location is None or location.sheet_name not in allowed_sheets:
+                return None
+            return (location.row, self.get_worksheet(location.sheet_name),
+                    currency or location.currency)
+        except Exception as e:
+            logger.error(f"find_request_row_by_id error: {e}")
+            return None
 
     def get_request_by_id(self, date: str, amount: float,
                           currency: str = None) -> Optional[Dict]:
@@ -275,13 +645,10 @@ class SheetsManager(GoogleApiManager):
         Колонки определяются ДИНАМИЧЕСКИ по заголовкам.
         """
         try:
-            if currency in (config.CURRENCY_USDT, config.CURRENCY_CNY):
-                sheet = self._get_sheet_for_currency(currency)
-            else:
-                sheet = self.journal_sheet
+            if currency not in (config.CURRENCY_USDT, config.CURRENCY_CNY):
                 currency = currency or config.CURRENCY_RUB
 
-            all_values = sheet.get_all_values()
+            all_values = self.snapshot.get_values(self._sheet_name_for_currency(currency))
             if not all_values or len(all_values) < 2:
                 return None
 
@@ -373,8 +740,7 @@ class SheetsManager(GoogleApiManager):
 
         for sheet_name, default_currency in sheets_config:
             try:
-                sheet = self.get_worksheet(sheet_name)
-                all_values = sheet.get_all_values()
+                all_values = self.snapshot.get_values(sheet_name)
 
                 if not all_values or len(all_values) < 2:
                     continue
@@ -398,39 +764,14 @@ class SheetsManager(GoogleApiManager):
                     f"executor at col {executor_idx}"
                 )
 
-                for row in all_values[1:]:
-                    if len(row) <= max(status_idx, executor_idx):
-                        continue
-
-                    row_status = row[status_idx].strip()
-                    row_executor = row[executor_idx].strip()
-
-                    if row_status == target_status and row_executor == executor_name:
-                        # Определяем валюту
-                        currency_idx = hdr_map.get('currency')
-                        if currency_idx is not None and len(row) > currency_idx and row[currency_idx]:
-                            actual_currency = row[currency_idx]
-                        else:
-                            actual_currency = default_currency
-
-                        # Собираем данные из строки, используя динамические индексы
-                        request_data = {
-                            'currency': actual_currency,
-                            'sheet_name': sheet_name,
-                        }
-                        for field, idx in hdr_map.items():
-                            if idx < len(row):
-                                value = row[idx]
-                                if field in ('amount', 'amount_usdt', 'rate'):
-                                    try:
-                                        value = float(value) if value else 0.0
-                                    except (ValueError, TypeError):
-                                        value = 0.0
-                                request_data[field] = value
-                            else:
-                                request_data[field] = '' if field not in ('amount', 'amount_usdt', 'rate') else 0.0
-
-                        results.append(request_data)
+                table = self._decoded_sheet(
+                    'headers', sheet_name, default_currency, all_values
+                )
+                positions = table.match(status_idx, {target_status}, strip=True)
+                positions = table.match(
+                    executor_idx, {executor_name}, strip=True, candidates=positions
+                )
+                results.extend(table.decode(positions))
 
             except Exception as e:
                 logger.error(f"_get_requests_filtered error for {sheet_name}: {e}")
@@ -474,60 +815,23 @@ class SheetsManager(GoogleApiManager):
 
         Returns:
             Список пользователей [{telegram_id, name, username, role}]
+
+        Side effects:
+            - Читает индекс ролей users_table (в Sheets — только если данные устарели).
         """
-        users = []
         if not self.users_sheet:
-            return users
+            return []
 
         try:
-            all_values = self.users_sheet.get_all_values()
-            if len(all_values) < 2:
-                return users
-
-            # Определяем индексы колонок по заголовкам
-            headers = all_values[0]
-            header_map = {}
-            for idx, header in enumerate(headers):
-                h = header.strip().lower()
-                if 'telegram' in h and 'id' in h:
-                    header_map['telegram_id'] = idx
-                elif h in ['имя', 'name']:
-                    header_map['name'] = idx
-                elif 'username' in h:
-                    header_map['username'] = idx
-                elif h in ['роль', 'role']:
-                    header_map['role'] = idx
-
-            if 'telegram_id' not in header_map or 'role' not in header_map:
-                return users
-
-            role_map = {
-                'владелец': config.ROLE_OWNER, 'owner': config.ROLE_OWNER,
-                'менеджер': config.ROLE_MANAGER, 'manager': config.ROLE_MANAGER,
-                'исполнитель': config.ROLE_EXECUTOR, 'executor': config.ROLE_EXECUTOR,
-                'учёт': config.ROLE_REPORT, 'учет': config.ROLE_REPORT, 'report': config.ROLE_REPORT,
-            }
-
-            for row in all_values[1:]:
-                if len(row) <= header_map['role']:
-                    continue
-
-                raw_role = row[header_map['role']].strip().lower()
-                normalized_role = role_map.get(raw_role, raw_role)
-
-                if normalized_role == role:
-                    tid_idx = header_map['telegram_id']
-                    name_idx = header_map.get('name')
-                    uname_idx = header_map.get('username')
-
-                    users.append({
-                        'telegram_id': row[tid_idx] if len(row) > tid_idx else '',
-                        'name': row[name_idx] if name_idx is not None and len(row) > name_idx else '',
-                        'username': row[uname_idx] if uname_idx is not None and len(row) > uname_idx else '',
-                        'role': role
-                    })
-
-            return users
+            return [
+                {
+                    'telegram_id': record.raw_id,
+                    'name': record.name,
+                    'username': record.username,
+                    'role': role,
+                }
+                for record in self.users_table.by_role(role)
+            ]
         except Exception as e:
             logger.error(f"get_users_by_role error: {e}")
             return []
@@ -654,17 +958,37 @@ class SheetsManager(GoogleApiManager):
                     author_fullname                # S: Полное имя инициатора
                 ]
 
+            # Формула для столбца "Реквизиты" (H) только для RUB/BYN/KZT
+            # Формат: Номер/телефон (новая строка) Банк (новая строка) Получатель
+            formulas = {}
+            if currency not in ['USDT', 'CNY']:
+                # H: Реквизиты
+                formulas[8] = ('=IF(OR(ISBLANK(E{row}),ISBLANK(F{row}),ISBLANK(G{row})),"",'
+                               'F{row}&CHAR(10)&G{row}&CHAR(10)&E{row})')
+
+            # С очередью записей строка и формула уйдут при ближайшем сбросе
+            if self._write_queue is not None:
+                self._write_queue.put_append(sheet_name, request_id, row, formulas)
+                self._mark_requests_changed()
+                logger.info(
+                    f"Zajavka v ocheredi: {request_id} "
+                    f"({date}, {amount} {currency} -> {sheet_name})"
+                )
+                return request_id
+
             # Получаем лист и добавляем строку
             sheet = self.get_worksheet(sheet_name)
-            row_number = len(sheet.get_all_values()) + 1  # Номер новой строки
+            response = sheet.append_row(row, value_input_option='USER_ENTERED')
+            self._invalidate_snapshot(sheet_name)
 
-            sheet.append_row(row, value_input_option='USER_ENTERED')
+            # Номер новой строки берём из ответа append (без чтения всего листа)
+            row_number = _row_from_append_response(response)
+            if row_number is None:
+                row_number = len(self.snapshot.get_values(sheet_name))
+            self.request_index.add(sheet_name, request_id, row_number)
 
-            # Добавляем формулу для столбца "Реквизиты" (H) только для RUB/BYN/KZT
-            # Формат: Номер/телефон (новая строка) Банк (новая строка) Получатель
-            if currency not in ['USDT', 'CNY']:
-                formula = f'=IF(OR(ISBLANK(E{row_number}),ISBLANK(F{row_number}),ISBLANK(G{row_number})),"",F{row_number}&CHAR(10)&G{row_number}&CHAR(10)&E{row_number})'
-                sheet.update_cell(row_number, 8, formula)  # H: Реквизиты
+            for col, template in formulas.items():
+                sheet.update_cell(row_number, col, template.replace('{row}', str(row_number)))
 
             logger.info(f"Zajavka sozdana: {request_id} ({date}, {amount} {currency} -> {sheet_name})")
             return request_id
@@ -793,6 +1117,8 @@ class SheetsManager(GoogleApiManager):
             - CNY: обновляет col 3 (сумма), col 5 (реквизиты), col 7 (назначение).
             - RUB/BYN: обновляет col 3 (сумма), col 5 (получатель), col 6 (номер),
               col 7 (банк), col 9 (назначение). Col 8 (реквизиты) — формулой.
+            - Все поля пишутся одной операцией (_write_cells): с очередью
+              записей — одним диапазоном при ближайшем сбросе.
 
         Invariants:
             - Другие колонки (статус, исполнитель, чек и т.д.) НЕ затрагиваются.
@@ -807,8 +1133,7 @@ class SheetsManager(GoogleApiManager):
             request = None
             for sheet_name_check in [config.SHEET_JOURNAL, config.SHEET_OTHER_PAYMENTS, config.SHEET_USDT_SALARIES, config.SHEET_USDT, config.SHEET_CNY]:
                 try:
-                    sheet_check = self.get_worksheet(sheet_name_check)
-                    all_values_check = sheet_check.get_all_values()
+                    all_values_check = self.snapshot.get_values(sheet_name_check)
                     for row in all_values_check[1:]:
                         if len(row) >= 3:
                             try:
@@ -833,9 +1158,8 @@ class SheetsManager(GoogleApiManager):
 
             # Определяем лист и находим номер строки
             sheet_name = request['sheet_name']
-            sheet = self.get_worksheet(sheet_name)
 
-            all_values = sheet.get_all_values()
+            all_values = self.snapshot.get_values(sheet_name)
             row_number = None
 
             # Ищем строку с точным совпадением даты и суммы (NEW STRUCTURE: дата в B, сумма в C)
@@ -865,60 +1189,63 @@ class SheetsManager(GoogleApiManager):
             # CNY (A-O): ID, Дата, Сумма, Способ оплаты, Реквизиты, QR-код, Назначение, ...
             # USDT (A-M): ID, Дата, Сумма, Кошелёк, Назначение, ...
             # RUB/BYN (A-S): ID, Дата, СУММА, ВАЛЮТА, Получатель, Номер, Банк, Реквизиты, Назначение, ...
+            cells: Dict[int, Any] = {}
             if request.get('currency') == config.CURRENCY_CNY:
                 # CNY: структура A-O
                 if new_amount is not None:
-                    sheet.update_cell(row_number, 3, new_amount)  # C: Сумма CNY
+                    cells[3] = new_amount  # C: Сумма CNY
                     logger.debug(f"Обновлена сумма CNY: {new_amount}")
 
                 if card_or_phone is not None:
-                    sheet.update_cell(row_number, 5, card_or_phone)  # E: Текстовые реквизиты
+                    cells[5] = card_or_phone  # E: Текстовые реквизиты
                     logger.debug(f"Обновлены реквизиты CNY: {card_or_phone}")
 
                 if purpose is not None:
-                    sheet.update_cell(row_number, 7, purpose)  # G: Назначение
+                    cells[7] = purpose  # G: Назначение
                     logger.debug(f"Обновлено назначение CNY: {purpose}")
             elif request.get('currency') == config.CURRENCY_USDT:
                 # USDT: структура A-M
                 if new_amount is not None:
-                    sheet.update_cell(row_number, 3, new_amount)  # C: Сумма USDT
+                    cells[3] = new_amount  # C: Сумма USDT
                     logger.debug(f"Обновлена сумма USDT: {new_amount}")
 
                 if card_or_phone is not None:
-                    sheet.update_cell(row_number, 4, card_or_phone)  # D: Кошелёк
+                    cells[4] = card_or_phone  # D: Кошелёк
                     logger.debug(f"Обновлён кошелёк: {card_or_phone}")
 
                 if purpose is not None:
-                    sheet.update_cell(row_number, 5, purpose)  # E: Назначение
+                    cells[5] = purpose  # E: Назначение
                     logger.debug(f"Обновлено назначение: {purpose}")
 
                 if category is not None:
-                    sheet.update_cell(row_number, 6, category)  # F: Категория
+                    cells[6] = category  # F: Категория
                     logger.debug(f"Обновлена категория USDT: {category}")
             else:
                 # RUB/BYN: структура A-S (C=Сумма, D=Валюта)
                 if new_amount is not None:
-                    sheet.update_cell(row_number, 3, new_amount)  # C: Сумма
+                    cells[3] = new_amount  # C: Сумма
                     logger.debug(f"Обновлена сумма RUB/BYN: {new_amount}")
 
                 if recipient is not None:
-                    sheet.update_cell(row_number, 5, recipient)  # E: Получатель
+                    cells[5] = recipient  # E: Получатель
                     logger.debug(f"Обновлён получатель: {recipient}")
 
                 if card_or_phone is not None:
-                    sheet.update_cell(row_number, 6, card_or_phone)  # F: Номер
+                    cells[6] = card_or_phone  # F: Номер
                     logger.debug(f"Обновлен номер: {card_or_phone}")
 
                 if bank is not None:
-                    sheet.update_cell(row_number, 7, bank)  # G: Банк
+                    cells[7] = bank  # G: Банк
                     logger.debug(f"Обновлен банк: {bank}")
 
                 if purpose is not None:
-                    sheet.update_cell(row_number, 9, purpose)  # I: Назначение
+                    cells[9] = purpose  # I: Назначение
                     logger.debug(f"Обновлено назначение: {purpose}")
 
                 # H (Реквизиты) обновится автоматически формулой!
 
+            self._write_cells(sheet_name, row_number, cells,
+                              request_id=request.get('request_id', ''))
             logger.info(f"Polja obnovleny: {date}, {amount}, {currency}")
             return True
         except Exception as e:
@@ -952,101 +1279,23 @@ class SheetsManager(GoogleApiManager):
 
         for sheet_name, default_currency, fallback_status_idx, fallback_author_idx in sheets_config:
             try:
-                sheet = self.get_worksheet(sheet_name)
-                all_values = sheet.get_all_values()
+                all_values = self.snapshot.get_values(sheet_name)
 
                 if not all_values or len(all_values) < 2:
                     continue
 
-                headers = all_values[0]
-                rows = all_values[1:]
-
-                # Динамическое определение индексов из заголовков
-                hdr_map = self._find_columns_by_headers(headers)
+                # Индексы фильтров — из заголовков, иначе фиксированные
+                hdr_map = self._find_columns_by_headers(all_values[0])
                 status_index = hdr_map.get('status', fallback_status_idx)
                 author_index = hdr_map.get('author_id', fallback_author_idx)
-                amount_index = hdr_map.get('amount', 2)
 
-                for row in rows:
-                    if len(row) <= status_index or row[status_index] not in statuses_set:
-                        continue
+                # Фильтры идут по колонкам, dict собирается только для подошедших строк
+                table = self._decoded_sheet('request', sheet_name, default_currency, all_values)
+                positions = table.match(status_index, statuses_set)
+                if author_id and author_index is not None:
+                    positions = table.match(author_index, {str(author_id)}, candidates=positions)
 
-                    # Фильтрация по автору (если указан)
-                    if author_id and author_index is not None:
-                        row_author_id = str(row[author_index]) if len(row) > author_index else ''
-                        if len(row) <= author_index or str(row[author_index]) != str(author_id):
-                            continue
-
-                    # Безопасная конвертация суммы
-                    try:
-                        amount_value = float(row[amount_index]) if len(row) > amount_index and row[amount_index] else 0.0
-                    except (ValueError, TypeError):
-                        amount_value = 0.0
-
-                    # Формируем данные в зависимости от типа листа
-                    if default_currency == config.CURRENCY_CNY:
-                        # CNY: структура A-O (15 колонок)
-                        request_data = {
-                            'request_id': row[0] if len(row) > 0 else '',           # A: ID заявки
-                            'date': row[1] if len(row) > 1 else '',                 # B: Дата
-                            'amount': amount_value,                                  # C: Сумма CNY
-                            'recipient': '',                                         # Нет получателя для CNY
-                            'card_or_phone': row[4] if len(row) > 4 else '',        # E: Текстовые реквизиты
-                            'bank': row[3] if len(row) > 3 else '',                 # D: Способ оплаты (Alipay/WeChat/Bank_card)
-                            'details': '',                                           # Нет отдельного поля реквизитов
-                            'qr_code_link': row[5] if len(row) > 5 else '',         # F: Ссылка на QR-код
-                            'purpose': row[6] if len(row) > 6 else '',              # G: Назначение
-                            'category': row[7] if len(row) > 7 else '',             # H: Категория
-                            'status': row[8] if len(row) > 8 else '',               # I: Статус
-                            'deal_id': row[9] if len(row) > 9 else '',              # J: ID сделки
-                            'account_name': row[10] if len(row) > 10 else '',       # K: Название аккаунта
-                            'executor': row[11] if len(row) > 11 else '',           # L: Исполнитель
-                            'author_id': row[12] if len(row) > 12 else '',          # M: Telegram ID
-                            'author_username': row[13] if len(row) > 13 else '',    # N: Username
-                            'author_fullname': row[14] if len(row) > 14 else '',    # O: Полное имя
-                            'receipt_link': row[15] if len(row) > 15 else '',       # P: Ссылка на чек (если есть)
-                            'currency': default_currency,
-                            'sheet_name': sheet_name
-                        }
-                    elif default_currency == config.CURRENCY_USDT:
-                        # USDT: структура A-N (14 колонок)
-                        request_data = {
-                            'request_id': row[0] if len(row) > 0 else '',           # A: ID заявки
-                            'date': row[1] if len(row) > 1 else '',                 # B: Дата
-                            'amount': amount_value,                                  # C: Сумма USDT
-                            'recipient': '',                                         # Нет получателя для USDT
-                            'card_or_phone': row[3] if len(row) > 3 else '',        # D: Адрес кошелька
-                            'bank': '',                                              # Нет банка для USDT
-                            'details': '',                                           # Нет реквизитов
-                            'purpose': row[4] if len(row) > 4 else '',              # E: Назначение
-                            'category': row[5] if len(row) > 5 else '',             # F: Категория
-                            'status': row[6] if len(row) > 6 else '',               # G: Статус
-                            'deal_id': row[7] if len(row) > 7 else '',              # H: ID транзакции
-                            'account_name': row[8] if len(row) > 8 else '',         # I: Название аккаунта
-                            'executor': row[9] if len(row) > 9 else '',             # J: Исполнитель
-                            'author_id': row[10] if len(row) > 10 else '',          # K: Telegram ID
-                            'author_username': row[11] if len(row) > 11 else '',    # L: Username
-                            'author_fullname': row[12] if len(row) > 12 else '',    # M: Полное имя
-                            'receipt_link': row[13] if len(row) > 13 else '',       # N: Ссылка на чек
-                            'currency': default_currency,
-                            'sheet_name': sheet_name
-                        }
-                    else:
-                        # RUB/BYN: динамический маппинг по заголовкам
-                        hdr_map = self._find_columns_by_headers(headers)
-                        request_data = self._row_to_dict_dynamic(row, hdr_map, default_currency)
-
-                        # amount уже прочитана выше
-                        request_data['amount'] = amount_value
-
-                        # Определяем валюту из данных
-                        currency_idx = hdr_map.get('currency')
-                        if currency_idx is not None and len(row) > currency_idx and row[currency_idx]:
-                            request_data['currency'] = row[currency_idx]
-
-                        request_data['sheet_name'] = sheet_name
-
-                    requests.append(request_data)
+                requests.extend(table.decode(positions))
 
             except Exception as e:
                 logger.exception(f"get_requests_by_status: sheet '{sheet_name}' error: {e}")
@@ -1072,10 +1321,40 @@ class SheetsManager(GoogleApiManager):
             all_requests.extend(self.get_requests_by_status(s))
         return all_requests
 
+    def get_requests_page(self, status: Optional[str], offset: int,
+                          limit: int) -> Tuple[int, List[Dict]]:
+        """
+        Страница заявок из зеркала (панель владельца).
+
+        Args:
+            status: Статус заявки или None для всех статусов
+            offset: Сколько заявок пропустить
+            limit: Размер страницы
+
+        Returns:
+            (всего заявок под фильтром, заявки страницы) — в порядке get_all_requests
+        """
+        return self.request_mirror.page(status, offset, limit)
+
+    def get_request_stats(self, refresh: bool = False) -> RequestStats:
+        """
+        Счётчики по статусам, суммы по валютам и исполнителям (из зеркала).
+
+        Args:
+            refresh: Перечитать листы перед подсчётом (кнопка «Обновить»)
+        """
+        if refresh:
+            self.snapshot.refresh()
+            self.request_mirror.sync()
+        return self.request_mirror.stats()
+
     def assign_executor(self, request_id: str, executor_name: str) -> bool:
         """
         Назначить исполнителя для заявки (обновить поле «Исполнитель»).
 
+        Строка берётся из индекса request_id; перед записью проверяется
+        только ячейка A этой строки (лист целиком не читается).
+
         Args:
             request_id: ID заявки
             executor_name: ФИО/имя исполнителя
@@ -1084,25 +1363,14 @@ class SheetsManager(GoogleApiManager):
             True если успешно
         """
         try:
-            request = self.get_request_by_request_id(request_id)
-            if not request:
+            location = self._locate_request_for_write(request_id)
+            if not location:
                 logger.error(f"assign_executor: заявка не найдена: {request_id}")
                 return False
 
-            sheet_name = request['sheet_name']
-            currency = request['currency']
-            sheet = self.get_worksheet(sheet_name)
-
-            all_values = sheet.get_all_values()
-            row_num = None
-            for i, row in enumerate(all_values[1:], start=2):
-                if len(row) >= 1 and row[0] == request_id:
-                    row_num = i
-                    break
-
-            if not row_num:
-                logger.error(f"assign_executor: строка не найдена: {request_id}")
-                return False
+            sheet_name = location.sheet_name
+            currency = location.currency
+            row_num = location.row
 
             # Определяем колонку исполнителя (1-based для update_cell)
             if currency == config.CURRENCY_USDT:
@@ -1111,15 +1379,15 @@ class SheetsManager(GoogleApiManager):
                 executor_col = COLUMNS_CNY['executor'] + 1
             else:
                 # RUB/BYN: динамически по заголовкам
-                headers = all_values[0]
-                hdr_map = self._find_columns_by_headers(headers)
+                hdr_map = self._find_columns_by_headers(self._headers_for_sheet(sheet_name))
                 executor_idx = hdr_map.get('executor')
                 if executor_idx is None:
                     logger.error(f"assign_executor: колонка executor не найдена в {sheet_name}")
                     return False
                 executor_col = executor_idx + 1  # 0-indexed → 1-based
 
-            sheet.update_cell(row_num, executor_col, executor_name)
+            self._write_cells(sheet_name, row_num, {executor_col: executor_name},
+                              request_id=request_id)
             logger.info(f"assign_executor: {request_id} → {executor_name}")
             return True
 
@@ -1130,111 +1398,57 @@ class SheetsManager(GoogleApiManager):
             return False
 
 
+    def _request_from_row(self, row: list, headers: list,
+                          sheet_name: str, sheet_currency: str) -> Dict:
+        """Собрать dict заявки из строки листа (структура зависит от типа листа)."""
+        return self._row_decoder('request', sheet_name, sheet_currency, headers)(row)
+
     def get_request_by_request_id(self, request_id: str) -> Optional[Dict]:
         """
         Получить заявку по уникальному ID заявки
 
+        Строка находится через индекс request_id (без перебора листов),
+        данные строки берутся из снимка.
+
         Args:
             request_id: Уникальный ID заявки (формат REQ-YYYYMMDD-HHMMSS-XXX)
 
         Returns:
             Dict с данными заявки или None
         """
-        # Ищем во всех листах
-        sheets_to_search = [
-            (config.SHEET_JOURNAL, config.CURRENCY_RUB),
-            (config.SHEET_OTHER_PAYMENTS, config.CURRENCY_BYN),
-            (config.SHEET_USDT_SALARIES, config.CURRENCY_USDT),
-            (config.SHEET_USDT, config.CURRENCY_USDT),
-            (config.SHEET_CNY, config.CURRENCY_CNY)
-        ]
-
-        for sheet_name, sheet_currency in sheets_to_search:
-            try:
-                sheet = self.get_worksheet(sheet_name)
-                all_values = sheet.get_all_values()
-
-                if not all_values or len(all_values) < 2:
-                    continue
-
-                rows = all_values[1:]  # Пропускаем заголовки
+        try:
+            # 2 попытки: если индекс устарел (строки переставили вручную),
+            # сбрасываем лист и ищем по свежим данным
+            for _ in range(2):
+                location = self._locate_request(request_id)
+                if location is None:
+                    return None
+
+                all_values = self.snapshot.get_values(location.sheet_name)
+                if location.row == PENDING_ROW:
+                    # Заявка ещё в очереди записей — её строка в конце данных листа
+                    for row in reversed(all_values[1:]):
+                        if row and row[0] == request_id:
+                            return self._request_from_row(
+                                row, all_values[0], location.sheet_name, location.currency
+                            )
+                    return None
 
-                for row in rows:
-                    if len(row) < 1:
-                        continue
+                if len(all_values) >= location.row:
+                    row = all_values[location.row - 1]
+                    if row and row[0] == request_id:
+                        return self._request_from_row(
+                            row, all_values[0], location.sheet_name, location.currency
+                        )
 
-                    # Сравниваем ID заявки (первая колонка)
-                    if row[0] == request_id:
-                        # Формируем данные в зависимости от типа листа
-                        if sheet_currency == config.CURRENCY_CNY:
-                            try:
-                                row_amount = float(row[2]) if len(row) > 2 and row[2] else 0.0
-                            except (ValueError, TypeError):
-                                row_amount = 0.0
-
-                            return {
-                                'request_id': row[0] if len(row) > 0 else '',           # A: ID заявки
-                                'date': row[1] if len(row) > 1 else '',                 # B: Дата
-                                'amount': row_amount,                                    # C: Сумма CNY
-                                'recipient': '',                                         # Нет получателя для CNY
-                                'card_or_phone': row[4] if len(row) > 4 else '',        # E: Текстовые реквизиты
-                                'bank': row[3] if len(row) > 3 else '',                 # D: Способ оплаты (Alipay/WeChat/Bank_card)
-                                'qr_code_link': row[5] if len(row) > 5 else '',         # F: Ссылка на QR-код
-                                'purpose': row[6] if len(row) > 6 else '',              # G: Назначение
-                                'category': row[7] if len(row) > 7 else '',             # H: Категория
-                                'status': row[8] if len(row) > 8 else '',               # I: Статус
-                                'deal_id': row[9] if len(row) > 9 else '',              # J: ID сделки
-                                'account_name': row[10] if len(row) > 10 else '',       # K: Название аккаунта
-                                'executor': row[11] if len(row) > 11 else '',           # L: Исполнитель
-                                'author_id': row[12] if len(row) > 12 else '',          # M: Telegram ID
-                                'author_username': row[13] if len(row) > 13 else '',    # N: Username
-                                'author_fullname': row[14] if len(row) > 14 else '',    # O: Полное имя
-                                'receipt_link': row[15] if len(row) > 15 else '',       # P: Ссылка на чек (если есть)
-                                'currency': sheet_currency,
-                                'sheet_name': sheet_name
-                            }
-                        elif sheet_currency == config.CURRENCY_USDT:
-                            try:
-                                row_amount = float(row[2]) if len(row) > 2 and row[2] else 0.0
-                            except (ValueError, TypeError):
-                                row_amount = 0.0
-
-                            return {
-                                'request_id': row[0] if len(row) > 0 else '',
-                                'date': row[1] if len(row) > 1 else '',
-                                'amount': row_amount,
-                                'recipient': '',
-                                'card_or_phone': row[3] if len(row) > 3 else '',
-                                'bank': '',
-                                'details': '',
-                                'purpose': row[4] if len(row) > 4 else '',
-                                'category': row[5] if len(row) > 5 else '',
-                                'status': row[6] if len(row) > 6 else '',
-                                'deal_id': row[7] if len(row) > 7 else '',
-                                'account_name': row[8] if len(row) > 8 else '',
-                                'executor': row[9] if len(row) > 9 else '',
-                                'author_id': row[10] if len(row) > 10 else '',
-                                'author_username': row[11] if len(row) > 11 else '',
-                                'author_fullname': row[12] if len(row) > 12 else '',
-                                'receipt_link': row[13] if len(row) > 13 else '',
-                                'currency': sheet_currency,
-                                'sheet_name': sheet_name
-                            }
-                        else:
-                            # Динамический маппинг по заголовкам
-                            hdr_map = self._find_columns_by_headers(all_values[0])
-                            result = self._row_to_dict_dynamic(row, hdr_map, sheet_currency)
-
-                            # Определяем валюту из данных
-                            currency_idx = hdr_map.get('currency')
-                            if currency_idx is not None and len(row) > currency_idx and row[currency_idx]:
-                                result['currency'] = row[currency_idx]
-
-                            result['sheet_name'] = sheet_name
-                            return result
-            except Exception as e:
-                logger.exception(f"get_request_by_request_id: sheet '{sheet_name}' error: {e}")
-                continue
+                logger.warning(
+                    f"get_request_by_request_id: stale index for {request_id} "
+                    f"({location.sheet_name}:{location.row}), reloading sheet"
+                )
+                self.snapshot.invalidate(location.sheet_name)
+                self.snapshot.get_values(location.sheet_name)
+        except Exception as e:
+            logger.exception(f"get_request_by_request_id error: {e}")
 
         return None
 
@@ -1254,32 +1468,15 @@ class SheetsManager(GoogleApiManager):
         try:
             logger.debug(f"update_request_status_by_id: request_id={request_id}, new_status={new_status}")
 
-            # Получаем полные данные заявки
-            request = self.get_request_by_request_id(request_id)
-            if not request:
+            # Лист и строка — из индекса request_id (проверка ячейки A, без чтения листа)
+            location = self._locate_request_for_write(request_id)
+            if not location:
                 logger.error(f"Zajavka ne najdena: {request_id}")
                 return False
 
-            # Определяем лист
-            sheet_name = request['sheet_name']
-            currency = request['currency']
-            sheet = self.get_worksheet(sheet_name)
-
-            all_values = sheet.get_all_values()
-            row_number = None
-
-            # Ищем строку по request_id (колонка A)
-            for i, row in enumerate(all_values[1:], start=2):
-                if len(row) < 1:
-                    continue
-
-                if row[0] == request_id:
-                    row_number = i
-                    break
-
-            if not row_number:
-                logger.error(f"Stroka zajavki ne najdena: {request_id}")
-                return False
+            sheet_name = location.sheet_name
+            currency = location.currency
+            row_number = location.row
 
             # Определяем колонку статуса в зависимости от валюты
             if currency == config.CURRENCY_USDT:
@@ -1290,7 +1487,8 @@ class SheetsManager(GoogleApiManager):
                 status_col = COLUMNS_MAIN['status'] + 1
 
             logger.debug(f"Обновление статуса: row={row_number}, col={status_col}, value={new_status}")
-            sheet.update_cell(row_number, status_col, new_status)
+            self._write_cells(sheet_name, row_number, {status_col: new_status},
+                              request_id=request_id)
             logger.info(f"Status obnovlen: {request_id} -> {new_status}")
             return True
         except Exception as e:
@@ -1311,41 +1509,25 @@ class SheetsManager(GoogleApiManager):
         try:
             logger.debug(f"update_request_qr_code: request_id={request_id}")
 
-            # Получаем полные данные заявки
-            request = self.get_request_by_request_id(request_id)
-            if not request:
+            # Лист и строка — из индекса request_id (проверка ячейки A, без чтения листа)
+            location = self._locate_request_for_write(request_id)
+            if not location:
                 logger.error(f"Заявка не найдена: {request_id}")
                 return False
 
-            if request['currency'] != config.CURRENCY_CNY:
+            if location.currency != config.CURRENCY_CNY:
                 logger.error(f"Заявка не CNY: {request_id}")
                 return False
 
-            # Определяем лист
-            sheet_name = request['sheet_name']
-            sheet = self.get_worksheet(sheet_name)
-
-            all_values = sheet.get_all_values()
-            row_number = None
-
-            # Ищем строку по request_id (колонка A)
-            for i, row in enumerate(all_values[1:], start=2):
-                if len(row) < 1:
-                    continue
-
-                if row[0] == request_id:
-                    row_number = i
-                    break
-
-            if not row_number:
-                logger.error(f"Строка заявки не найдена: {request_id}")
-                return False
+            sheet_name = location.sheet_name
+            row_number = location.row
 
             # Для CNY QR-код
             qr_col = COLUMNS_CNY['qr_code_link'] + 1
 
             logger.debug(f"Обновление QR-кода: row={row_number}, col={qr_col}")
-            sheet.update_cell(row_number, qr_col, qr_code_link)
+            self._write_cells(sheet_name, row_number, {qr_col: qr_code_link},
+                              request_id=request_id)
             logger.info(f"QR-код обновлён: {request_id}")
             return True
         except Exception as e:
@@ -1369,70 +1551,65 @@ class SheetsManager(GoogleApiManager):
         try:
             currency = currency or config.CURRENCY_RUB
 
-            # Приоритет: поиск по request_id (надежнее)
+            # Приоритет: поиск по request_id (надежнее).
+            # row_num == PENDING_ROW — заявка ещё в очереди записей.
             row_num = None
-            sheet = None
             if request_id:
                 result = self.find_request_row_by_id(request_id, currency)
                 if result:
-                    row_num, sheet, currency = result
+                    row_num, _, currency = result
                     logger.info(f"complete_payment: found by request_id={request_id}, row={row_num}")
 
             # Fallback: поиск по дате и сумме
-            if not row_num:
-                sheet = self._get_sheet_for_currency(currency)
-                if date and amount:
-                    row_num = self.find_request_row(date, amount, currency)
+            if row_num is None and date and amount:
+                row_num = self.find_request_row(date, amount, currency)
 
-            if not row_num:
+            if row_num is None:
                 logger.error(f"Zajavka ne najdena: request_id={request_id}, date={date}, amount={amount}, currency={currency}")
                 return False
 
-            if sheet is None:
-                sheet = self._get_sheet_for_currency(currency)
+            sheet_name = self._sheet_name_for_currency(currency)
 
-            # Получаем данные и заголовки
-            all_values = sheet.get_all_values()
-            if not all_values or len(all_values) < 2:
+            # Заголовки — из индекса (лист уже загружался при поиске строки)
+            headers = self._headers_for_sheet(sheet_name)
+            if not headers:
                 logger.error(f"complete_payment: sheet empty for {currency}")
                 return False
 
             # Динамический маппинг колонок
-            headers = all_values[0]
             hdr_map = self._find_columns_by_headers(headers)
 
             # Собираем все изменения и отправляем одним batch_update.
             # Это атомарно: либо все поля записываются, либо ни одно.
             # Предотвращает частично записанную оплату при сбое сети.
-            updates: list[gspread.Cell] = []
+            updates: Dict[int, Any] = {}
+            formulas: Dict[int, str] = {}
 
             status_idx = hdr_map.get('status')
             if status_idx is not None:
-                updates.append(gspread.Cell(row_num, status_idx + 1, config.STATUS_PAID))
+                updates[status_idx + 1] = config.STATUS_PAID
 
             deal_idx = hdr_map.get('deal_id')
             if deal_id and deal_idx is not None:
-                updates.append(gspread.Cell(row_num, deal_idx + 1, deal_id))
+                updates[deal_idx + 1] = deal_id
 
             account_idx = hdr_map.get('account_name')
             if account_name and account_idx is not None:
-                updates.append(gspread.Cell(row_num, account_idx + 1, account_name))
+                updates[account_idx + 1] = account_name
 
             usdt_idx = hdr_map.get('amount_usdt')
             if amount_usdt is not None and usdt_idx is not None:
-                updates.append(gspread.Cell(row_num, usdt_idx + 1, amount_usdt))
+                updates[usdt_idx + 1] = amount_usdt
                 rate_idx = hdr_map.get('rate')
                 amount_idx = hdr_map.get('amount')
                 if rate_idx is not None and amount_idx is not None:
                     amount_col_letter = chr(ord('A') + amount_idx)
                     usdt_col_letter = chr(ord('A') + usdt_idx)
-                    updates.append(gspread.Cell(
-                        row_num, rate_idx + 1,
-                        f'={amount_col_letter}{row_num}/{usdt_col_letter}{row_num}'
-                    ))
+                    formulas[rate_idx + 1] = f'={amount_col_letter}{{row}}/{usdt_col_letter}{{row}}'
 
-            if updates:
-                sheet.update_cells(updates, value_input_option='USER_ENTERED')
+            if updates or formulas:
+                self._write_cells(sheet_name, row_num, updates, request_id=request_id,
+                                  formulas=formulas, atomic=True)
 
             logger.info(
                 f"Payment completed: {date}, {amount} {currency}, "
@@ -1452,44 +1629,41 @@ class SheetsManager(GoogleApiManager):
         Поиск строки: приоритет request_id, потом date+amount.
         """
         try:
-            sheet = None
             row_num = None
 
             # Приоритет: поиск по request_id
             if request_id:
                 result = self.find_request_row_by_id(request_id, currency)
                 if result:
-                    row_num, sheet, currency = result
+                    row_num, _, currency = result
 
             # Fallback: date+amount
-            if not row_num:
-                sheet = self._get_sheet_for_currency(currency)
-                if date and amount:
-                    row_num = self.find_request_row(date, amount, currency)
+            if row_num is None and date and amount:
+                row_num = self.find_request_row(date, amount, currency)
 
-            if not row_num:
+            if row_num is None:
                 logger.error(f"update_receipt_url: row not found request_id={request_id}, {date}, {amount}")
                 return False
 
-            if sheet is None:
-                sheet = self._get_sheet_for_currency(currency)
+            sheet_name = self._sheet_name_for_currency(currency)
 
-            # Динамический поиск колонки "Чек"
-            all_values = sheet.get_all_values()
-            if not all_values:
+            # Динамический поиск колонки "Чек" (заголовки — из индекса)
+            headers = self._headers_for_sheet(sheet_name)
+            if not headers:
                 return False
 
-            hdr_map = self._find_columns_by_headers(all_values[0])
+            hdr_map = self._find_columns_by_headers(headers)
             receipt_col = hdr_map.get('receipt_url')
 
             if receipt_col is None:
                 logger.warning(
-                    f"receipt_url column not found in headers: {all_values[0]}. "
+                    f"receipt_url column not found in headers: {headers}. "
                     f"Skipping receipt URL save."
                 )
                 return False
 
-            sheet.update_cell(row_num, receipt_col + 1, receipt_url)
+            self._write_cells(sheet_name, row_num, {receipt_col + 1: receipt_url},
+                              request_id=request_id)
             logger.info(f"Receipt URL saved: {date}, {amount} -> {receipt_url}")
             return True
         except Exception as e:
@@ -1544,6 +1718,7 @@ class SheetsManager(GoogleApiManager):
             ]
 
             sheet.append_row(row, value_input_option='USER_ENTERED')
+            self._invalidate_snapshot(sheet_name)
 
             return True
         except Exception as e:
@@ -1554,142 +1729,31 @@ class SheetsManager(GoogleApiManager):
         """
         Получить данные пользователя из листа Пользователи
 
-        УЛУЧШЕНО: Автоматическое определение колонок по заголовкам
-        Не зависит от порядка колонок в таблице
+        Колонки определяются по заголовкам (порядок колонок в таблице любой),
+        поиск — по индексу telegram_id в users_table, без чтения листа.
+
+        Returns:
+            {telegram_id (как в ячейке), name, username, role} или None.
+            role=None если роль в таблице очищена (deactivate_user).
         """
         if not self.users_sheet:
             logger.error("Лист Пользователи недоступен!")
             return None
 
-        # Проверяем кэш — если данные свежие, не идём в Sheets
-        try:
-            tid_key = int(telegram_id)
-        except (ValueError, TypeError):
-            tid_key = None
-        if tid_key is not None:
-            cached = self._user_cache.get(tid_key)
-            if cached is not None:
-                user_dict, expires_at = cached
-                if time.monotonic() < expires_at:
-                    return user_dict
-
         try:
-            all_values = self.users_sheet.get_all_values()
-            if len(all_values) < 2:  # Нет данных кроме заголовков
+            record = self.users_table.get(int(telegram_id))
+            if record is None:
+                logger.warning(f"User {telegram_id} NOT found in sheet.")
                 return None
 
-            # Читаем заголовки (первая строка) и создаём mapping
-            headers = all_values[0]
-            header_map = {}
-
-            for idx, header in enumerate(headers):
-                header_lower = header.strip().lower()
-
-                # Telegram ID (поддерживаем разные варианты)
-                if 'telegram' in header_lower and 'id' in header_lower:
-                    header_map['telegram_id'] = idx
-                # Имя / Name
-                elif header_lower in ['имя', 'name', 'ім\'я', 'имя пользователя']:
-                    header_map['name'] = idx
-                # Username
-                elif 'username' in header_lower or header_lower == 'user':
-                    header_map['username'] = idx
-                # Роль / Role
-                elif header_lower in ['роль', 'role', 'роля']:
-                    header_map['role'] = idx
-
-            # Проверяем что нашли обязательные колонки
-            if 'telegram_id' not in header_map or 'role' not in header_map:
-                logger.error(f"Не найдены обязательные колонки в листе Пользователи. Найдено: {header_map}")
-                logger.error(f"Заголовки листа: {headers}")
-                return None
-
-            tid = int(telegram_id)
-            tid_str = str(tid)  # "8450372644" -- без пробелов, точек, E+
-
-            # Маппинг русских названий ролей на ключи
-            role_map = {
-                'владелец': config.ROLE_OWNER,
-                'owner': config.ROLE_OWNER,
-                'менеджер': config.ROLE_MANAGER,
-                'manager': config.ROLE_MANAGER,
-                'исполнитель': config.ROLE_EXECUTOR,
-                'executor': config.ROLE_EXECUTOR,
-                'учёт': config.ROLE_REPORT,
-                'учет': config.ROLE_REPORT,
-                'report': config.ROLE_REPORT,
+            return {
+                'telegram_id': record.raw_id,
+                'name': record.name,
+                'username': record.username,
+                'role': record.role or None,
             }
-
-            # Ищем пользователя в строках (пропускаем заголовок)
-            for row in all_values[1:]:
-                if len(row) <= header_map['telegram_id']:
-                    continue
-
-                raw_id = row[header_map['telegram_id']]
-                if not raw_id:
-                    continue
-
-                # Надёжное сравнение Telegram ID:
-                # Google Sheets может вернуть число как "8450372644",
-                # "8.45037E+09" (научная нотация), "8 450 372 644" (с пробелами)
-                # или "8450372644.0" (float). Обрабатываем все варианты.
-                match = False
-                clean_id = str(raw_id).strip().replace(' ', '').replace('\u00a0', '')
-
-                # 1. Прямое строковое сравнение (самый быстрый путь)
-                if clean_id == tid_str:
-                    match = True
-                else:
-                    # 2. Через float -> int (обрабатывает "8450372644.0" и науч. нотацию)
-                    try:
-                        parsed = int(float(clean_id))
-                        if parsed == tid:
-                            match = True
-                        else:
-                            logger.debug(
-                                f"ID mismatch: raw='{raw_id}', "
-                                f"parsed={parsed}, expected={tid}"
-                            )
-                    except (TypeError, ValueError):
-                        # 3. Убираем все не-цифры и сравниваем
-                        digits_only = ''.join(c for c in clean_id if c.isdigit())
-                        if digits_only == tid_str:
-                            match = True
-
-                if match:
-                    name_idx = header_map.get('name')
-                    username_idx = header_map.get('username')
-                    role_idx = header_map['role']
-
-                    name = row[name_idx] if name_idx is not None and len(row) > name_idx else ''
-                    username = row[username_idx] if username_idx is not None and len(row) > username_idx else ''
-                    role_raw = row[role_idx] if len(row) > role_idx else ''
-
-                    role_str = (str(role_raw).strip().lower() if role_raw else '').strip()
-                    role = role_map.get(role_str) or (role_str if role_str else None)
-
-                    logger.info(
-                        f"User {tid} found: raw_id='{raw_id}', "
-                        f"role={role}, name={name}"
-                    )
-
-                    result = {
-                        'telegram_id': raw_id,
-                        'name': name,
-                        'username': username,
-                        'role': role
-                    }
-                    if tid_key is not None:
-                        self._user_cache[tid_key] = (result, time.monotonic() + self._user_cache_ttl)
-                    return result
-
-            logger.warning(f"User {telegram_id} NOT found in sheet. Checked {len(all_values)-1} rows.")
-            return None
-
         except Exception as e:
             logger.error(f"Ошибка при получении пользователя {telegram_id}: {e}")
-            import traceback
-            traceback.print_exc()
             return None
 
     def get_all_users(self) -> List[Dict]:
@@ -1703,7 +1767,7 @@ class SheetsManager(GoogleApiManager):
             telegram_id всегда int (Google Sheets может хранить как "8.45E+09").
 
         Side effects:
-            - Читает Google Sheets (1 API вызов).
+            - Данные из users_table (в Sheets — только если устарели).
             - НЕ изменяет данные в таблице.
 
         Invariants:
@@ -1713,59 +1777,50 @@ class SheetsManager(GoogleApiManager):
         if not self.users_sheet:
             return []
         try:
-            all_values = self.users_sheet.get_all_values()
-            if len(all_values) < 2:
-                return []
-
-            headers = all_values[0]
-            header_map: Dict[str, int] = {}
-            for idx, header in enumerate(headers):
-                h = header.strip().lower()
-                if 'telegram' in h and 'id' in h:
-                    header_map['telegram_id'] = idx
-                elif h in ['имя', 'name']:
-                    header_map['name'] = idx
-                elif 'username' in h:
-                    header_map['username'] = idx
-                elif h in ['роль', 'role']:
-                    header_map['role'] = idx
-
-            if 'telegram_id' not in header_map or 'role' not in header_map:
-                return []
-
-            role_map = {
-                'владелец': config.ROLE_OWNER, 'owner': config.ROLE_OWNER,
-                'менеджер': config.ROLE_MANAGER, 'manager': config.ROLE_MANAGER,
-                'исполнитель': config.ROLE_EXECUTOR, 'executor': config.ROLE_EXECUTOR,
-                'учёт': config.ROLE_REPORT, 'учет': config.ROLE_REPORT, 'report': config.ROLE_REPORT,
-            }
-
-            users = []
-            for row in all_values[1:]:
-                tid_idx = header_map['telegram_id']
-                if not row or len(row) <= tid_idx or not row[tid_idx]:
-                    continue
-                role_raw = (
-                    row[header_map['role']].strip().lower()
-                    if len(row) > header_map['role'] else ''
-                )
-                name_idx = header_map.get('name')
-                uname_idx = header_map.get('username')
-                try:
-                    tid = int(float(row[tid_idx].strip()))
-                except (ValueError, TypeError):
-                    continue
-                users.append({
-                    'telegram_id': tid,
-                    'name': row[name_idx] if name_idx is not None and len(row) > name_idx else '',
-                    'username': row[uname_idx] if uname_idx is not None and len(row) > uname_idx else '',
-                    'role': role_map.get(role_raw, role_raw),
-                })
-            return users
+            return [
+                {
+                    'telegram_id': record.telegram_id,
+                    'name': record.name,
+                    'username': record.username,
+                    'role': record.role,
+                }
+                for record in self.users_table.all()
+            ]
         except Exception as e:
             logger.error(f"get_all_users error: {e}")
             return []
 
+    def _locate_user_for_write(self, telegram_id: int) -> Optional[UserRecord]:
+        """
+        Строка пользователя для записи, проверенная по ячейке Telegram ID.
+
+        users_table может отставать от листа на USERS_REFRESH_INTERVAL секунд:
+        если строки вставили или удалили вручную, record.row указывает на
+        другого пользователя. Перед записью читается ячейка Telegram ID
+        этой строки; при несовпадении лист перечитывается и поиск повторяется.
+
+        Returns:
+            UserRecord или None (пользователь не найден / строку не подтвердить).
+        """
+        for _ in range(2):
+            record = self.users_table.get(telegram_id)
+            tid_col = self.users_table.columns.get('telegram_id')
+            if record is None or tid_col is None:
+                return None
+
+            cell = self.users_sheet.acell(rowcol_to_a1(record.row, tid_col + 1))
+            if parse_telegram_id(cell.value or '') == int(telegram_id):
+                return record
+
+            logger.warning(
+                f"_locate_user_for_write: row {record.row} holds {cell.value!r} "
+                f"instead of {telegram_id}, reloading users"
+            )
+            self.users_table.invalidate()
+
+        logger.error(f"_locate_user_for_write: row of {telegram_id} could not be verified")
+        return None
+
     def update_user_role(self, telegram_id: int, new_role: str) -> bool:
         """
         Обновить роль пользователя в листе Пользователи.
@@ -1780,8 +1835,10 @@ class SheetsManager(GoogleApiManager):
             False — пользователь не найден или лист недоступен.
 
         Side effects:
+            - Читает ячейку Telegram ID строки (см. _locate_user_for_write).
             - Пишет в Google Sheets: update_cell(row, role_col, new_role).
             - Изменяется ТОЛЬКО ячейка роли. Остальные колонки не трогаются.
+            - Сбрасывает users_table — следующая проверка прав увидит новую роль.
 
         Invariants:
             - Количество строк в таблице не меняется.
@@ -1793,40 +1850,20 @@ class SheetsManager(GoogleApiManager):
         if not self.users_sheet:
             return False
         try:
-            all_values = self.users_sheet.get_all_values()
-            if len(all_values) < 2:
+            record = self._locate_user_for_write(telegram_id)
+            role_col = self.users_table.columns.get('role')
+            if role_col is None:
+                logger.error("update_user_role: колонки telegram_id или role не найдены")
                 return False
 
-            headers = all_values[0]
-            tid_col = role_col = None
-            for idx, header in enumerate(headers):
-                h = header.strip().lower()
-                if 'telegram' in h and 'id' in h:
-                    tid_col = idx
-                elif h in ['роль', 'role']:
-                    role_col = idx
-
-            if tid_col is None or role_col is None:
-                logger.error("update_user_role: колонки telegram_id или role не найдены")
+            if record is None:
+                logger.warning(f"update_user_role: пользователь {telegram_id} не найден")
                 return False
 
-            for row_idx, row in enumerate(all_values[1:], start=2):
-                if len(row) <= tid_col or not row[tid_col]:
-                    continue
-                raw = str(row[tid_col]).strip().replace(' ', '').replace('\u00a0', '')
-                match = False
-                try:
-                    match = int(float(raw)) == telegram_id
-                except (ValueError, TypeError):
-                    match = raw == str(telegram_id)
-                if match:
-                    self.users_sheet.update_cell(row_idx, role_col + 1, new_role)
-                    self._user_cache.pop(telegram_id, None)
-                    logger.info(f"update_user_role: {telegram_id} → {new_role}")
-                    return True
-
-            logger.warning(f"update_user_role: пользователь {telegram_id} не найден")
-            return False
+            self.users_sheet.update_cell(record.row, role_col + 1, new_role)
+            self.users_table.invalidate()
+            logger.info(f"update_user_role: {telegram_id} → {new_role}")
+            return True
         except Exception as e:
             logger.error(f"update_user_role error: {e}")
             return False
@@ -1846,9 +1883,11 @@ class SheetsManager(GoogleApiManager):
             False — пользователь не найден или лист недоступен.
 
         Side effects:
+            - Читает ячейку Telegram ID строки (см. _locate_user_for_write).
             - Пишет в Google Sheets: update_cell(row, role_col, '').
             - ТОЛЬКО ячейка роли устанавливается в пустую строку.
-            - После этого get_user_role(telegram_id) вернёт None → доступ закрыт.
+            - Сбрасывает users_table: после этого get_user_role(telegram_id)
+              вернёт None → доступ закрыт.
 
         Invariants:
             - Строка пользователя НЕ удаляется (delete_rows НЕ вызывается).
@@ -1859,40 +1898,20 @@ class SheetsManager(GoogleApiManager):
         if not self.users_sheet:
             return False
         try:
-            all_values = self.users_sheet.get_all_values()
-            if len(all_values) < 2:
+            record = self._locate_user_for_write(telegram_id)
+            role_col = self.users_table.columns.get('role')
+            if role_col is None:
+                logger.error("deactivate_user: колонки telegram_id или role не найдены")
                 return False
 
-            headers = all_values[0]
-            tid_col = role_col = None
-            for idx, header in enumerate(headers):
-                h = header.strip().lower()
-                if 'telegram' in h and 'id' in h:
-                    tid_col = idx
-                elif h in ['роль', 'role']:
-                    role_col = idx
-
-            if tid_col is None or role_col is None:
-                logger.error("deactivate_user: колонки telegram_id или role не найдены")
+            if record is None:
+                logger.warning(f"deactivate_user: пользователь {telegram_id} не найден")
                 return False
 
-            for row_idx, row in enumerate(all_values[1:], start=2):
-                if len(row) <= tid_col or not row[tid_col]:
-                    continue
-                raw = str(row[tid_col]).strip().replace(' ', '').replace('\u00a0', '')
-                match = False
-                try:
-                    match = int(float(raw)) == telegram_id
-                except (ValueError, TypeError):
-                    match = raw == str(telegram_id)
-                if match:
-                    self.users_sheet.update_cell(row_idx, role_col + 1, '')
-                    self._user_cache.pop(telegram_id, None)
-                    logger.info(f"deactivate_user: роль {telegram_id} очищена")
-                    return True
-
-            logger.warning(f"deactivate_user: пользователь {telegram_id} не найден")
-            return False
+            self.users_sheet.update_cell(record.row, role_col + 1, '')
+            self.users_table.invalidate()
+            logger.info(f"deactivate_user: роль {telegram_id} очищена")
+            return True
         except Exception as e:
             logger.error(f"deactivate_user error: {e}")
             return False
@@ -1920,6 +1939,7 @@ class SheetsManager(GoogleApiManager):
         try:
             row = [telegram_id, name, username, role]
             self.users_sheet.append_row(row, value_input_option='USER_ENTERED')
+            self.users_table.invalidate()
             logger.info(f"Polzovatel {name} ({role}) dobavlen")
             return True
         except Exception as e:
@@ -2036,6 +2056,7 @@ class SheetsManager(GoogleApiManager):
 
             # Записываем кошелек в колонку "Название аккаунта" (K)
             self.journal_sheet.update_cell(row, 11, wallet)
+            self._invalidate_snapshot(config.SHEET_JOURNAL)
 
             logger.info(f"Zajavka odobrena: {request_id}, koshelek: {wallet}")
             return True
@@ -0,0 +1,200 @@
+"""
+Снимок листов заявок в памяти
+Finance Bot - один values_batch_get вместо последовательных get_all_values()
+и индекс request_id -> (лист, строка) для записи без чтения листа
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src import config
+
+logger = logging.getLogger(__name__)
+
+
+# Все листы с заявками: (имя листа, валюта по умолчанию).
+# Порядок важен — в нём идёт поиск заявки по request_id.
+REQUEST_SHEETS = [
+    (config.SHEET_JOURNAL, config.CURRENCY_RUB),
+    (config.SHEET_OTHER_PAYMENTS, config.CURRENCY_BYN),
+    (config.SHEET_USDT_SALARIES, config.CURRENCY_USDT),
+    (config.SHEET_USDT, config.CURRENCY_USDT),
+    (config.SHEET_CNY, config.CURRENCY_CNY),
+]
+
+# fetch_values(sheet_names) -> {sheet_name: all_values};
+# листов, которые не удалось прочитать, в результате нет
+FetchValues = Callable[[List[str]], Dict[str, List[List[str]]]]
+
+# on_refresh(sheet_name, all_values) — вызывается после загрузки листа
+OnRefresh = Callable[[str, List[List[str]]], None]
+
+# overlay(sheet_name, all_values) -> all_values с ещё не отправленными записями
+Overlay = Callable[[str, List[List[str]]], List[List[str]]]
+
+
+class SheetsSnapshot:
+    """
+    Кэш значений листов заявок с коротким TTL.
+
+    Все устаревшие листы догружаются ОДНИМ вызовом fetch_values
+    (values_batch_get), поэтому любое чтение стоит 1 API-запрос или 0.
+
+    Side effects:
+        - get_values() ходит в Sheets только если лист устарел или
+          инвалидирован; вместе с ним обновляются все остальные устаревшие листы.
+
+    Invariants:
+        - Возвращаемые списки общие для всех вызывающих — их нельзя изменять.
+        - Формат данных совпадает с worksheet.get_all_values():
+          первая строка — заголовки, строки дополнены '' до одной длины.
+        - Потокобезопасен: параллельные чтения ждут одну загрузку, а не делают свою.
+        - Лист, который не удалось прочитать, не считается свежим: отдаётся
+          прошлый снимок (если он есть), следующее чтение повторит загрузку.
+        - overlay (очередь записей) применяется вне блокировки снимка и
+          только к результату get_values — в on_refresh идут данные из Sheets.
+    """
+
+    def __init__(self, fetch_values: FetchValues,
+                 sheet_names: Iterable[str], ttl: float,
+                 on_refresh: Optional[OnRefresh] = None,
+                 overlay: Optional[Overlay] = None):
+        self._fetch_values = fetch_values
+        self._sheet_names: List[str] = list(sheet_names)
+        self.ttl = ttl
+        self._on_refresh = on_refresh
+        self._overlay = overlay
+
+        self._values: Dict[str, List[List[str]]] = {}
+        self._fetched_at: Dict[str, float] = {}
+        self._lock = threading.RLock()
+
+    def _is_fresh(self, sheet_name: str, now: float) -> bool:
+        fetched_at = self._fetched_at.get(sheet_name)
+        return fetched_at is not None and now - fetched_at < self.ttl
+
+    def get_values(self, sheet_name: str) -> List[List[str]]:
+        """
+        Получить все значения листа (как get_all_values()).
+
+        Если лист устарел — одним batch-запросом обновляются все устаревшие листы.
+        """
+        values = self._get_stored_values(sheet_name)
+        if self._overlay is not None:
+            return self._overlay(sheet_name, values)
+        return values
+
+    def _get_stored_values(self, sheet_name: str) -> List[List[str]]:
+        """Данные листа из Sheets (без overlay), при необходимости догружает."""
+        with self._lock:
+            if sheet_name not in self._sheet_names:
+                self._sheet_names.append(sheet_name)
+
+            now = time.monotonic()
+            if self._is_fresh(sheet_name, now):
+                return self._values[sheet_name]
+
+            stale = [name for name in self._sheet_names if not self._is_fresh(name, now)]
+            fetched = self._fetch_values(stale)
+            for name in stale:
+                if name not in fetched:
+                    continue
+                self._values[name] = fetched[name]
+                self._fetched_at[name] = now
+                if self._on_refresh is not None:
+                    self._on_refresh(name, self._values[name])
+
+            failed = [name for name in stale if name not in fetched]
+            if failed:
+                logger.warning(f"SheetsSnapshot: failed to refresh {failed}, keeping previous data")
+            logger.debug(f"SheetsSnapshot: refreshed {[n for n in stale if n in fetched]}")
+            if sheet_name not in self._values:
+                raise RuntimeError(f"Sheet '{sheet_name}' could not be read")
+            return self._values[sheet_name]
+
+    def refresh(self) -> None:
+        """Принудительно перечитать все листы одним запросом."""
+        with self._lock:
+            self._fetched_at.clear()
+            if self._sheet_names:
+                self._get_stored_values(self._sheet_names[0])
+
+    def invalidate(self, sheet_name: Optional[str] = None) -> None:
+        """
+        Пометить лист (или все листы при sheet_name=None) устаревшим.
+
+        Вызывается после собственных записей бота — следующее чтение
+        увидит изменения без ожидания TTL.
+        """
+        with self._lock:
+            if sheet_name is None:
+                self._fetched_at.clear()
+            else:
+                self._fetched_at.pop(sheet_name, None)
+
+
+@dataclass(frozen=True)
+class RequestLocation:
+    """Где лежит заявка: лист, номер строки (1-based) и валюта листа."""
+    sheet_name: str
+    row: int
+    currency: str
+
+
+class RequestIndex:
+    """
+    Индекс request_id -> RequestLocation по всем листам заявок.
+
+    Строится из данных снимка (SheetsSnapshot вызывает rebuild() при каждой
+    загрузке листа) и дополняется при append — поэтому запись в известную
+    заявку идёт сразу в update_cell, без чтения листа.
+
+    Invariants:
+        - Бот только дописывает строки заявок и никогда их не удаляет, поэтому
+          номер строки заявки стабилен. Ручные перестановки строк в таблице
+          подхватываются при следующем обновлении снимка (TTL).
+        - При дублях request_id побеждает первая строка, а между листами —
+          порядок REQUEST_SHEETS (как при последовательном поиске).
+    """
+
+    def __init__(self, sheets: Iterable[Tuple[str, str]]):
+        self._sheet_currency: Dict[str, str] = dict(sheets)
+        self._order: List[str] = list(self._sheet_currency)
+        self._rows: Dict[str, Dict[str, int]] = {}
+        self._headers: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, sheet_name: str, all_values: List[List[str]]) -> None:
+        """Перестроить индекс листа по его полным данным (с заголовком)."""
+        rows: Dict[str, int] = {}
+        for i, row in enumerate(all_values[1:], start=2):
+            if row and row[0]:
+                rows.setdefault(row[0], i)
+        with self._lock:
+            if sheet_name not in self._sheet_currency:
+                return
+            self._rows[sheet_name] = rows
+            if all_values:
+                self._headers[sheet_name] = list(all_values[0])
+
+    def add(self, sheet_name: str, request_id: str, row: int) -> None:
+        """Добавить только что дописанную строку."""
+        with self._lock:
+            if sheet_name in self._sheet_currency:
+                self._rows.setdefault(sheet_name, {}).setdefault(request_id, row)
+
+    def get(self, request_id: str) -> Optional[RequestLocation]:
+        """Найти заявку. None — если ни в одном проиндексированном листе её нет."""
+        with self._lock:
+            for sheet_name in self._order:
+                row = self._rows.get(sheet_name, {}).get(request_id)
+                if row is not None:
+                    return RequestLocation(sheet_name, row, self._sheet_currency[sheet_name])
+        return None
+
+    def headers(self, sheet_name: str) -> Optional[List[str]]:
+        """Заголовки листа на момент последней загрузки (None — лист не загружался)."""
+        with self._lock:
+            return self._headers.get(sheet_name)
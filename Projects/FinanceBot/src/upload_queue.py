@@ -0,0 +1,272 @@
+"""
+Очередь загрузок в Google Drive
+Finance Bot - хендлер кладёт файл на диск и сразу отвечает пользователю,
+загрузка идёт в фоне (пул потоков, resumable-загрузка, повторы)
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# upload(path, filename, mime_type) -> ссылка на файл; исключение — повторить
+Upload = Callable[[str, str, str], str]
+
+
+@dataclass
+class UploadJob:
+    """Файл в очереди: лежит в spool-каталоге до успешной загрузки."""
+    job_id: str
+    kind: str                   # выбирает обработчик завершения ('' — без обработчика)
+    filename: str
+    mime_type: str
+    path: str                   # файл в spool-каталоге
+    meta: Dict[str, Any] = field(default_factory=dict)   # данные для обработчика (JSON)
+    attempts: int = 0
+
+
+def background_context(application, user_data: Dict[str, Any]) -> SimpleNamespace:
+    """
+    Context для хендлерных функций вне апдейта (обработчики завершения загрузки).
+
+    Даёт то, что используют get_async_sheets и уведомления: bot, bot_data, user_data.
+    """
+    return SimpleNamespace(
+        bot=application.bot,
+        bot_data=application.bot_data,
+        user_data=dict(user_data),
+    )
+
+
+class DriveUploadQueue:
+    """
+    Фоновые загрузки файлов в Google Drive.
+
+    Использование в хендлере:
+        uploads = context.bot_data['drive_uploads']
+        job = uploads.new_job('receipt', filename, mime_type, meta={...})
+        await file.download_to_drive(job.path)   # файл сразу на диск, не в память
+        uploads.submit(job)                      # ответ пользователю — не дожидаясь Drive
+
+    Side effects:
+        - submit() пишет рядом с файлом манифест <job_id>.json; после
+          перезапуска бота start() подхватывает незагруженные файлы.
+          Задачи без обработчика завершения (kind '' — результат ждал
+          future хендлера, он не пережил перезапуск) удаляются: ссылку
+          некому передать.
+        - Неудачная загрузка повторяется retries раз с растущей паузой;
+          после этого файл переезжает в failed/ (для ручного разбора),
+          обработчик вызывается со ссылкой None.
+
+    Invariants:
+        - Одновременно идёт не больше workers загрузок.
+        - Обработчик завершения (on_done) вызывается в event loop бота
+          ровно один раз на задачу.
+    """
+
+    def __init__(self, upload: Upload, spool_dir: str, workers: int = 2,
+                 retries: int = 4, backoff: float = 2.0):
+        self._upload = upload
+        self.spool_dir = spool_dir
+        self.failed_dir = os.path.join(spool_dir, 'failed')
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+
+        self._handlers: Dict[str, Callable[[UploadJob, Optional[str]], Awaitable[None]]] = {}
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    def on_done(self, kind: str,
+                handler: Callable[[UploadJob, Optional[str]], Awaitable[None]]) -> None:
+        """Обработчик завершения задач вида kind: (job, ссылка или None)."""
+        self._handlers[kind] = handler
+
+    # ===== Постановка в очередь =====
+
+    def new_job(self, kind: str, filename: str, mime_type: str,
+                meta: Optional[Dict[str, Any]] = None) -> UploadJob:
+        """Задача с путём в spool-каталоге — туда хендлер скачивает файл."""
+        job_id = uuid.uuid4().hex
+        ext = os.path.splitext(filename)[1]
+        return UploadJob(
+            job_id=job_id,
+            kind=kind,
+            filename=filename,
+            mime_type=mime_type,
+            path=os.path.join(self.spool_dir, f"{job_id}{ext}"),
+            meta=dict(meta or {}),
+        )
+
+    def submit(self, job: UploadJob) -> asyncio.Future:
+        """
+        Поставить скачанный файл в очередь.
+
+        Returns:
+            Future со ссылкой (None — загрузка не удалась). Ждать не обязательно.
+        """
+        if self._queue is None:
+            raise RuntimeError("DriveUploadQueue не запущена (start)")
+        self._write_manifest(job)
+        future = asyncio.get_running_loop().create_future()
+        self._futures[job.job_id] = future
+        self._queue.put_nowait(job)
+        logger.info(f"Drive upload queued: {job.filename} ({job.kind or 'direct'}, {job.job_id})")
+        return future
+
+    def discard(self, job: UploadJob) -> None:
+        """Удалить файлы задачи (скачивание не удалось — ставить нечего)."""
+        for path in (job.path, self._manifest_path(job.job_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # ===== Spool на диске =====
+
+    def _manifest_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{job_id}.json")
+
+    def _write_manifest(self, job: UploadJob) -> None:
+        path = self._manifest_path(job.job_id)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(job), f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _load_spooled(self) -> List[UploadJob]:
+        """Задачи, оставшиеся на диске с прошлого запуска."""
+        jobs = []
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith('.json'):
+                continue
+            manifest = os.path.join(self.spool_dir, name)
+            try:
+                with open(manifest, encoding='utf-8') as f:
+                    job = UploadJob(**json.load(f))
+            except (OSError, TypeError, ValueError) as e:
+                logger.error(f"Drive upload: broken manifest {name}: {e}")
+                continue
+            if not os.path.exists(job.path):
+                logger.error(f"Drive upload: spooled file missing for {job.filename}, dropped")
+                os.remove(manifest)
+                continue
+            jobs.append(job)
+        return jobs
+
+    def _move_to_failed(self, job: UploadJob) -> None:
+        os.makedirs(self.failed_dir, exist_ok=True)
+        for path in (job.path, self._manifest_path(job.job_id)):
+            if os.path.exists(path):
+                os.replace(path, os.path.join(self.failed_dir, os.path.basename(path)))
+
+    # ===== Воркеры =====
+
+    def start(self) -> None:
+        """
+        Запустить воркеры (в event loop бота) и дозагрузить файлы с прошлого запуска.
+
+        Обработчики завершения (on_done) регистрируются до start().
+        """
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix='drive-upload'
+        )
+        spooled = []
+        for job in self._load_spooled():
+            if job.kind not in self._handlers:
+                logger.warning(f"Drive upload: no handler for spooled {job.filename} "
+                               f"({job.kind or 'direct'}), dropped")
+                self.discard(job)
+                continue
+            spooled.append(job)
+            self._queue.put_nowait(job)
+        if spooled:
+            logger.info(f"Drive upload: resuming {len(spooled)} spooled files")
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f'drive-upload-{i}')
+            for i in range(self.workers)
+        ]
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                logger.error(f"Drive upload worker error ({job.filename}): {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: UploadJob) -> None:
+        loop = asyncio.get_running_loop()
+        link = None
+        while True:
+            job.attempts += 1
+            try:
+                link = await loop.run_in_executor(
+                    self._executor, self._upload, job.path, job.filename, job.mime_type
+                )
+                break
+            except Exception as e:
+                if job.attempts > self.retries:
+                    logger.error(
+                        f"Drive upload failed after {job.attempts} attempts: {job.filename}: {e}"
+                    )
+                    break
+                delay = self.backoff * (2 ** (job.attempts - 1))
+                logger.warning(f"Drive upload error ({job.filename}), retry in {delay:.0f}s: {e}")
+                self._write_manifest(job)
+                await asyncio.sleep(delay)
+
+        if link:
+            self.discard(job)
+            logger.info(f"Drive upload done: {job.filename} -> {link}")
+        else:
+            self._move_to_failed(job)
+
+        future = self._futures.pop(job.job_id, None)
+        if future is not None and not future.done():
+            future.set_result(link)
+
+        handler = self._handlers.get(job.kind)
+        if handler is not None:
+            try:
+                await handler(job, link)
+            except Exception as e:
+                logger.error(f"Drive upload handler '{job.kind}' error: {e}")
+
+    async def join(self) -> None:
+        """Дождаться, пока очередь опустеет."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """
+        Остановить воркеры (при остановке бота).
+
+        Незагруженные файлы остаются в spool-каталоге и загрузятся после запуска.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._queue = None
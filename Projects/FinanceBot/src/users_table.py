@@ -0,0 +1,217 @@
+"""
+Лист «Пользователи» в памяти
+Finance Bot - проверки прав без обращения к Google Sheets
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from src import config
+
+logger = logging.getLogger(__name__)
+
+
+# Русские и английские названия ролей из таблицы -> config.ROLE_*
+ROLE_MAP = {
+    'владелец': config.ROLE_OWNER,
+    'owner': config.ROLE_OWNER,
+    'менеджер': config.ROLE_MANAGER,
+    'manager': config.ROLE_MANAGER,
+    'исполнитель': config.ROLE_EXECUTOR,
+    'executor': config.ROLE_EXECUTOR,
+    'учёт': config.ROLE_REPORT,
+    'учет': config.ROLE_REPORT,
+    'report': config.ROLE_REPORT,
+}
+
+
+def find_user_columns(headers: List[str]) -> Dict[str, int]:
+    """Индексы колонок листа Пользователи по заголовкам (порядок колонок любой)."""
+    header_map: Dict[str, int] = {}
+    for idx, header in enumerate(headers):
+        header_lower = header.strip().lower()
+        if 'telegram' in header_lower and 'id' in header_lower:
+            header_map['telegram_id'] = idx
+        elif header_lower in ['имя', 'name', 'ім\'я', 'имя пользователя']:
+            header_map['name'] = idx
+        elif 'username' in header_lower or header_lower == 'user':
+            header_map['username'] = idx
+        elif header_lower in ['роль', 'role', 'роля']:
+            header_map['role'] = idx
+    return header_map
+
+
+def parse_telegram_id(raw_id) -> Optional[int]:
+    """
+    Telegram ID из ячейки таблицы.
+
+    Google Sheets может вернуть число как "8450372644", "8.45037E+09"
+    (научная нотация), "8 450 372 644" (с пробелами) или "8450372644.0".
+    """
+    clean_id = str(raw_id).strip().replace(' ', '').replace('\u00a0', '')
+    if not clean_id:
+        return None
+    try:
+        return int(float(clean_id))
+    except (TypeError, ValueError):
+        digits_only = ''.join(c for c in clean_id if c.isdigit())
+        return int(digits_only) if digits_only else None
+
+
+def _cell(row: List[str], idx: Optional[int]) -> str:
+    """Значение необязательной колонки ('' если колонки нет или строка короче)."""
+    return row[idx] if idx is not None and len(row) > idx else ''
+
+
+@dataclass(frozen=True)
+class UserRecord:
+    """Строка листа Пользователи."""
+    row: int              # номер строки в листе (1-based)
+    raw_id: str           # Telegram ID как в ячейке
+    telegram_id: int
+    name: str
+    username: str
+    role: str             # config.ROLE_* или как в таблице; '' — роль очищена
+
+
+class UsersTable:
+    """
+    Весь лист «Пользователи» в памяти с индексами по telegram_id и роли.
+
+    Side effects:
+        - Первое обращение (и обращение к данным старше ttl) читает лист
+          одним get_all_values; start() обновляет его в фоне, чтобы
+          проверки прав не ждали Sheets.
+        - Неудачное фоновое обновление оставляет прежние данные.
+
+    Invariants:
+        - При дублях telegram_id побеждает первая строка (как при переборе).
+        - Строки без распознаваемого Telegram ID не индексируются.
+    """
+
+    def __init__(self, fetch_values: Callable[[], List[List[str]]], ttl: float):
+        self._fetch_values = fetch_values
+        self.ttl = ttl
+
+        self._by_id: Dict[int, UserRecord] = {}
+        self._by_role: Dict[str, List[UserRecord]] = {}
+        self._records: List[UserRecord] = []
+        self.columns: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        # Растёт при каждой invalidate(): загрузка, начатая до записи в лист,
+        # не считается свежей
+        self._version = 0
+
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ===== Загрузка =====
+
+    def refresh(self) -> None:
+        """Перечитать лист и перестроить индексы."""
+        with self._lock:
+            version = self._version
+        all_values = self._fetch_values()
+        header_map = find_user_columns(all_values[0]) if all_values else {}
+
+        by_id: Dict[int, UserRecord] = {}
+        by_role: Dict[str, List[UserRecord]] = {}
+        records: List[UserRecord] = []
+
+        if 'telegram_id' in header_map and 'role' in header_map:
+            tid_idx = header_map['telegram_id']
+            role_idx = header_map['role']
+            name_idx = header_map.get('name')
+            uname_idx = header_map.get('username')
+
+            for row_num, row in enumerate(all_values[1:], start=2):
+                if len(row) <= tid_idx or not row[tid_idx]:
+                    continue
+                tid = parse_telegram_id(row[tid_idx])
+                if tid is None:
+                    continue
+
+                role_raw = row[role_idx].strip().lower() if len(row) > role_idx else ''
+                record = UserRecord(
+                    row=row_num,
+                    raw_id=row[tid_idx],
+                    telegram_id=tid,
+                    name=_cell(row, name_idx),
+                    username=_cell(row, uname_idx),
+                    role=ROLE_MAP.get(role_raw, role_raw),
+                )
+                records.append(record)
+                by_id.setdefault(tid, record)
+                by_role.setdefault(record.role, []).append(record)
+        elif all_values:
+            logger.error(
+                f"Не найдены обязательные колонки в листе Пользователи. Найдено: {header_map}"
+            )
+
+        with self._lock:
+            self._by_id = by_id
+            self._by_role = by_role
+            self._records = records
+            self.columns = header_map
+            self._loaded_at = time.monotonic() if version == self._version else None
+        logger.debug(f"UsersTable: loaded {len(records)} users")
+
+    def invalidate(self) -> None:
+        """Следующее обращение перечитает лист (после записи в него)."""
+        with self._lock:
+            self._version += 1
+            self._loaded_at = None
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            loaded_at = self._loaded_at
+            if loaded_at is not None and time.monotonic() - loaded_at < self.ttl:
+                return
+            self.refresh()
+
+    # ===== Чтение =====
+
+    def get(self, telegram_id: int) -> Optional[UserRecord]:
+        """Пользователь по Telegram ID (None — нет в листе)."""
+        self._ensure_loaded()
+        with self._lock:
+            return self._by_id.get(int(telegram_id))
+
+    def by_role(self, role: str) -> List[UserRecord]:
+        """Все строки с ролью role (config.ROLE_*)."""
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._by_role.get(role, []))
+
+    def all(self) -> List[UserRecord]:
+        """Все строки с распознанным Telegram ID в порядке листа."""
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._records)
+
+    # ===== Фоновое обновление =====
+
+    def start(self, interval: float) -> None:
+        """Обновлять лист в фоне раз в interval секунд."""
+        if self._thread is not None:
+            return
+
+        def _loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error(f"UsersTable: background refresh failed: {e}")
+
+        self._thread = threading.Thread(target=_loop, name='users-table', daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Остановить фоновое обновление."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
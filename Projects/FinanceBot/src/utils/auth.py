@@ -5,6 +5,7 @@ from functools import wraps
 from telegram import Update
 from telegram.ext import ContextTypes
 from src import config
+from src.async_sheets import get_async_sheets
 
 
 def require_auth(func):
@@ -14,7 +15,7 @@ def require_auth(func):
     @wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
-        sheets = context.bot_data.get('sheets')
+        sheets = get_async_sheets(context)
 
         if not sheets:
             await update.message.reply_text(
@@ -23,7 +24,7 @@ def require_auth(func):
             return
 
         # Проверяем существование и активность пользователя
-        if not sheets.is_user_active(user_id):
+        if not await sheets.is_user_active(user_id):
             await update.message.reply_text(
                 "🚫 У вас нет доступа к боту.\n\n"
                 "Обратитесь к администратору для получения доступа."
@@ -47,7 +48,7 @@ def require_role(*allowed_roles):
         @wraps(func)
         async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
             user_id = update.effective_user.id
-            sheets = context.bot_data.get('sheets')
+            sheets = get_async_sheets(context)
 
             if not sheets:
                 await update.message.reply_text(
@@ -55,7 +56,7 @@ def require_role(*allowed_roles):
                 )
                 return
 
-            user_role = sheets.get_user_role(user_id)
+            user_role = await sheets.get_user_role(user_id)
 
             if user_role not in allowed_roles:
                 await update.message.reply_text(
@@ -69,7 +70,7 @@ def require_role(*allowed_roles):
     return decorator
 
 
-def get_user_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def get_user_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Получить информацию о текущем пользователе
 
@@ -78,45 +79,45 @@ def get_user_info(update: Update, context: ContextTypes.DEFAULT_TYPE):
         или None если пользователь не найден
     """
     user_id = update.effective_user.id
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         return None
 
-    return sheets.get_user(user_id)
+    return await sheets.get_user(user_id)
 
 
-def is_owner(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+async def is_owner(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Проверить, является ли пользователь владельцем"""
     user_id = update.effective_user.id
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         return False
 
-    user_role = sheets.get_user_role(user_id)
+    user_role = await sheets.get_user_role(user_id)
     return user_role == config.ROLE_OWNER
 
 
-def is_manager(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+async def is_manager(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Проверить, является ли пользователь менеджером"""
     user_id = update.effective_user.id
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         return False
 
-    user_role = sheets.get_user_role(user_id)
+    user_role = await sheets.get_user_role(user_id)
     return user_role == config.ROLE_MANAGER
 
 
-def is_executor(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+async def is_executor(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
     """Проверить, является ли пользователь исполнителем"""
     user_id = update.effective_user.id
-    sheets = context.bot_data.get('sheets')
+    sheets = get_async_sheets(context)
 
     if not sheets:
         return False
 
-    user_role = sheets.get_user_role(user_id)
+    user_role = await sheets.get_user_role(user_id)
     return user_role == config.ROLE_EXECUTOR
@@ -0,0 +1,311 @@
+"""
+Async-клиент Tronscan API.
+
+- Один httpx.AsyncClient на бота (пул keep-alive соединений).
+- Не больше max_concurrency запросов одновременно.
+- 429 / 5xx / сетевые ошибки — повтор с экспоненциальной паузой.
+- Подтверждённые транзакции кэшируются на диске (LRU по хешу):
+  подтверждённая транзакция в блокчейне больше не меняется.
+- verify_payments — пакетная сверка USDT-выплат (для сверки журнала).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional
+
+import httpx
+
+from src import config
+from src.utils.tronscan import (
+    TRONSCAN_API,
+    TronTransaction,
+    extract_hash_from_url,
+    parse_transaction,
+)
+
+logger = logging.getLogger(__name__)
+
+# Допустимое расхождение суммы (как при ручной проверке в payment.py)
+AMOUNT_TOLERANCE = 0.01
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Retry-After больше этого не ждём — пользователь в чате ждёт ответа
+MAX_RETRY_AFTER = 10.0
+
+
+class TronTxCache:
+    """
+    Дисковый LRU-кэш разобранных транзакций: tx_hash -> TronTransaction.
+
+    Хранится в SQLite (один файл, переживает перезапуск бота).
+
+    Invariants:
+        - Не больше max_entries записей: при переполнении удаляются
+          давно не читавшиеся.
+        - Потокобезопасен (одно соединение под блокировкой): методы
+          блокирующие, из event loop их вызывают через asyncio.to_thread.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000):
+        self.path = path
+        self.max_entries = max_entries
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tx ("
+            " tx_hash TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " used_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tx_used_at ON tx(used_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(tx_hash: str) -> str:
+        return tx_hash.lower()
+
+    def get(self, tx_hash: str) -> Optional[TronTransaction]:
+        key = self._key(tx_hash)
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM tx WHERE tx_hash = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE tx SET used_at = ? WHERE tx_hash = ?", (time.time(), key))
+            self._conn.commit()
+        try:
+            return TronTransaction(**json.loads(row[0]))
+        except (TypeError, ValueError):
+            logger.warning("Битая запись кэша Tronscan: %s", tx_hash)
+            return None
+
+    def put(self, tx: TronTransaction) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tx (tx_hash, data, used_at) VALUES (?, ?, ?)",
+                (self._key(tx.tx_hash), json.dumps(asdict(tx)), time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM tx WHERE tx_hash IN ("
+                " SELECT tx_hash FROM tx ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tx").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass(frozen=True)
+class ExpectedPayment:
+    """Выплата из журнала, которую надо сверить с блокчейном."""
+    tx: str                 # Tronscan-ссылка или хеш
+    wallet: str             # кошелёк получателя из заявки
+    amount: float           # сумма USDT из заявки
+    token: str = 'USDT'
+    request_id: str = ''
+
+
+@dataclass(frozen=True)
+class PaymentCheck:
+    """Результат сверки одной выплаты."""
+    expected: ExpectedPayment
+    transaction: Optional[TronTransaction]
+    error: str = ''
+
+    @property
+    def wallet_ok(self) -> bool:
+        return (self.transaction is not None
+                and self.transaction.recipient.lower() == self.expected.wallet.strip().lower())
+
+    @property
+    def amount_ok(self) -> bool:
+        return (self.transaction is not None
+                and abs(self.transaction.amount - float(self.expected.amount)) <= AMOUNT_TOLERANCE)
+
+    @property
+    def token_ok(self) -> bool:
+        return (self.transaction is not None
+                and self.transaction.token.upper() == self.expected.token.upper())
+
+    @property
+    def ok(self) -> bool:
+        return self.wallet_ok and self.amount_ok and self.token_ok
+
+
+class TronscanClient:
+    """
+    Async-клиент Tronscan: пул соединений, ограничение параллельности,
+    повторы с паузой и дисковый кэш транзакций.
+
+    Использование в хендлере:
+        client = get_tronscan_client(context)
+        tx = await client.parse_url(text)
+
+    Side effects:
+        - Подтверждённые транзакции (confirmed=true) попадают в cache;
+          неподтверждённые каждый раз запрашиваются заново.
+    """
+
+    def __init__(self, api_url: str = TRONSCAN_API,
+                 cache: Optional[TronTxCache] = None,
+                 max_concurrency: int = 4,
+                 retries: int = 3,
+                 backoff: float = 0.5,
+                 timeout: float = 15.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.api_url = api_url
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._http = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+            transport=transport,
+        )
+
+    @classmethod
+    def from_config(cls) -> 'TronscanClient':
+        """Клиент с настройками из config (кэш — config.TRONSCAN_CACHE_PATH)."""
+        cache = None
+        if config.TRONSCAN_CACHE_PATH:
+            try:
+                cache = TronTxCache(config.TRONSCAN_CACHE_PATH, config.TRONSCAN_CACHE_SIZE)
+            except (sqlite3.Error, OSError) as e:
+                logger.error("Кэш Tronscan недоступен, работаем без него: %s", e)
+        return cls(
+            api_url=config.TRONSCAN_API_URL,
+            cache=cache,
+            max_concurrency=config.TRONSCAN_MAX_CONCURRENCY,
+        )
+
+    # ===== HTTP =====
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(float(retry_after), MAX_RETRY_AFTER)
+        return self.backoff * (2 ** attempt)
+
+    async def fetch_transaction(self, tx_hash: str) -> Optional[dict]:
+        """Сырые данные транзакции из Tronscan API (None — не найдена или API недоступен)."""
+        for attempt in range(self.retries + 1):
+            response = None
+            try:
+                async with self._semaphore:
+                    response = await self._http.get(self.api_url, params={'hash': tx_hash})
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    data = response.json()
+                    if not data or 'hash' not in data:
+                        logger.error("Транзакция не найдена: %s", tx_hash)
+                        return None
+                    return data
+                reason = f"HTTP {response.status_code}"
+            except httpx.HTTPStatusError as e:
+                logger.error("HTTP ошибка: %s", e)
+                return None
+            except (httpx.TransportError, ValueError) as e:
+                reason = repr(e)
+
+            if attempt == self.retries:
+                logger.error("Tronscan API недоступен (%s): %s", reason, tx_hash)
+                return None
+            delay = self._retry_delay(attempt, response)
+            logger.warning("Tronscan: %s, повтор через %.1f с", reason, delay)
+            await asyncio.sleep(delay)
+        return None
+
+    # ===== Транзакции =====
+
+    async def get_transaction(self, tx_hash: str) -> Optional[TronTransaction]:
+        """Разобранная транзакция по хешу (из кэша, если уже подтверждена)."""
+        if self.cache is not None:
+            # SQLite (чтение + commit used_at) — не в event loop
+            cached = await asyncio.to_thread(self.cache.get, tx_hash)
+            if cached is not None:
+                return cached
+
+        data = await self.fetch_transaction(tx_hash)
+        if not data:
+            return None
+        tx = parse_transaction(data)
+        if tx is not None and self.cache is not None and data.get('confirmed'):
+            await asyncio.to_thread(self.cache.put, tx)
+        return tx
+
+    async def parse_url(self, url: str) -> Optional[TronTransaction]:
+        """Tronscan-ссылка или голый хеш -> TronTransaction (async-аналог parse_tronscan_url)."""
+        tx_hash = extract_hash_from_url(url)
+        if not tx_hash:
+            logger.error("Не удалось извлечь tx hash из: %s", url)
+            return None
+        logger.info("Запрашиваю транзакцию: %s", tx_hash)
+        return await self.get_transaction(tx_hash)
+
+    async def verify_payments(self, payments: Iterable[ExpectedPayment]) -> List[PaymentCheck]:
+        """
+        Сверить пачку выплат с блокчейном.
+
+        Запросы идут параллельно (не больше max_concurrency), одинаковые
+        хеши запрашиваются один раз. Порядок результатов = порядок payments.
+        """
+        payments = list(payments)
+        hashes = [extract_hash_from_url(p.tx) for p in payments]
+        unique = list(dict.fromkeys(h for h in hashes if h))
+        fetched = await asyncio.gather(
+            *(self.get_transaction(h) for h in unique), return_exceptions=True
+        )
+        by_hash = dict(zip(unique, fetched))
+
+        results = []
+        for payment, tx_hash in zip(payments, hashes):
+            if not tx_hash:
+                results.append(PaymentCheck(payment, None, 'нет хеша транзакции'))
+                continue
+            tx = by_hash[tx_hash]
+            if isinstance(tx, Exception):
+                results.append(PaymentCheck(payment, None, f'ошибка запроса: {tx}'))
+            elif tx is None:
+                results.append(PaymentCheck(payment, None, 'транзакция не найдена'))
+            else:
+                results.append(PaymentCheck(payment, tx))
+        return results
+
+    async def aclose(self) -> None:
+        """Закрыть пул соединений и кэш (при остановке бота)."""
+        await self._http.aclose()
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.close)
+
+
+def get_tronscan_client(context) -> TronscanClient:
+    """
+    TronscanClient для хендлера.
+
+    Берётся из bot_data['tronscan'] (создаётся в post_init); если его нет —
+    создаётся по config и сохраняется там же.
+    """
+    client = context.bot_data.get('tronscan')
+    if not isinstance(client, TronscanClient):
+        client = TronscanClient.from_config()
+        context.bot_data['tronscan'] = client
+    return client
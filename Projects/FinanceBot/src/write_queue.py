@@ -0,0 +1,588 @@
+"""
+Очередь записей в Google Sheets (write-behind)
+Finance Bot - все изменения за окно сброса уходят одним values_batch_update
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from gspread.exceptions import APIError
+from gspread.utils import absolute_range_name, rowcol_to_a1
+
+logger = logging.getLogger(__name__)
+
+
+# Номер строки для заявки, которая ещё не дописана в лист (лежит в очереди)
+PENDING_ROW = 0
+
+# on_appended(sheet_name, key, row_number) — строка дописана, номер известен
+OnAppended = Callable[[str, str, int], None]
+
+# on_flushed(sheet_names) — изменения листов записаны в Sheets
+OnFlushed = Callable[[Iterable[str]], None]
+
+# Сколько сбросов подряд диапазон может отклоняться API (4xx), прежде чем
+# уйти в dead-letter файл
+MAX_RANGE_ATTEMPTS = 3
+
+
+def _is_rejected(error: Exception) -> bool:
+    """
+    Ошибка относится к самому запросу (4xx, кроме 429) — повтор не поможет.
+
+    Квота, 5xx и сетевые ошибки — временные: изменения ждут следующего сброса.
+    """
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return (isinstance(error, APIError) and status is not None
+            and 400 <= status < 500 and status != 429)
+
+
+def _row_from_append_response(response) -> Optional[int]:
+    """
+    Номер первой добавленной строки (1-based) из ответа values.append.
+
+    Example:
+        {'updates': {'updatedRange': "'Основные'!A124:S124"}} -> 124
+    """
+    try:
+        updated_range = response['updates']['updatedRange']
+    except (KeyError, TypeError):
+        return None
+    match = re.search(r'![A-Z]+(\d+)', updated_range)
+    return int(match.group(1)) if match else None
+
+
+class PendingAppend:
+    """Строка, ожидающая дописывания в лист."""
+
+    __slots__ = ('key', 'values', 'formulas')
+
+    def __init__(self, key: str, values: List[Any], formulas: Optional[Dict[int, str]] = None):
+        self.key = key
+        self.values = list(values)
+        # {col (1-based): шаблон формулы с {row}} — пишутся после append,
+        # когда номер строки уже известен
+        self.formulas = dict(formulas or {})
+
+
+class SheetsWriteQueue:
+    """
+    Write-behind очередь изменений листов.
+
+    Изменения ячеек и новые строки копятся в памяти и журнале на диске,
+    фоновый поток раз в interval секунд отправляет их в Sheets:
+    новые строки — одним values_append на лист, все ячейки (включая
+    формулы новых строк) — одним values_batch_update.
+
+    Side effects:
+        - Каждая операция сразу дописывается в журнал (fsync) — после
+          падения процесса очередь восстанавливается из журнала.
+        - После успешного сброса журнал переписывается остатком очереди.
+        - Диапазоны, которые API отклоняет MAX_RANGE_ATTEMPTS сбросов подряд,
+          убираются из очереди в dead-letter файл ({journal_path}.dead).
+
+    Invariants:
+        - Повторная запись той же ячейки до сброса заменяет предыдущую.
+        - Запись в ещё не дописанную строку (patch_append) меняет саму строку
+          в очереди — номер строки для этого не нужен.
+        - Сбросы идут по одному (_flush_lock), но запросы к API выполняются
+          без блокировки очереди: новые операции и overlay не ждут сети.
+        - При ошибке API неотправленные изменения остаются в очереди и
+          уходят при следующем сбросе (доставка at-least-once).
+        - Одна отклонённая операция не блокирует остальные: если batch-запрос
+          упал, диапазоны отправляются по одному.
+    """
+
+    def __init__(self, spreadsheet, journal_path: str,
+                 on_appended: Optional[OnAppended] = None,
+                 on_flushed: Optional[OnFlushed] = None):
+        self.spreadsheet = spreadsheet
+        self.journal_path = journal_path
+        self.dead_letter_path = f"{journal_path}.dead"
+        self._on_appended = on_appended
+        self._on_flushed = on_flushed
+
+        # {sheet_name: {(row, col): value}}
+        self._cells: Dict[str, Dict[tuple, Any]] = {}
+        # {sheet_name: [PendingAppend]} в порядке поступления
+        self._appends: Dict[str, List[PendingAppend]] = {}
+        # {range A1: число сбросов подряд, в которых API отклонил диапазон}
+        self._rejections: Dict[str, int] = {}
+
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._replay_journal()
+
+    # ===== Операции =====
+
+    def put_cells(self, sheet_name: str, row: int, cells: Dict[int, Any]) -> None:
+        """Поставить в очередь запись ячеек строки {col (1-based): value}."""
+        self._submit({'op': 'cells', 'sheet': sheet_name, 'row': row,
+                      'cells': {str(col): value for col, value in cells.items()}})
+
+    def put_append(self, sheet_name: str, key: str, values: List[Any],
+                   formulas: Optional[Dict[int, str]] = None) -> None:
+        """
+        Поставить в очередь новую строку.
+
+        Args:
+            key: Значение колонки A (request_id) — по нему строку находят до сброса.
+            formulas: {col: шаблон} — '{row}' заменяется номером новой строки.
+        """
+        self._submit({'op': 'append', 'sheet': sheet_name, 'key': key, 'values': list(values),
+                      'formulas': {str(col): f for col, f in (formulas or {}).items()}})
+
+    def patch_append(self, sheet_name: str, key: str, cells: Dict[int, Any],
+                     formulas: Optional[Dict[int, str]] = None) -> bool:
+        """
+        Изменить ячейки строки, которая ещё в очереди.
+
+        Returns:
+            False если строки с таким key в очереди нет (уже дописана).
+        """
+        with self._lock:
+            if self._find_append(sheet_name, key) is None:
+                return False
+            self._submit({'op': 'patch', 'sheet': sheet_name, 'key': key,
+                          'cells': {str(col): value for col, value in cells.items()},
+                          'formulas': {str(col): f for col, f in (formulas or {}).items()}})
+            return True
+
+    def pending_sheet(self, key: str) -> Optional[str]:
+        """Лист, в который ждёт дописывания строка с key (None — такой нет)."""
+        with self._lock:
+            for sheet_name, appends in self._appends.items():
+                if any(item.key == key for item in appends):
+                    return sheet_name
+        return None
+
+    def discard_appends(self, is_written: Callable[[str, str], bool]) -> None:
+        """
+        Убрать из очереди строки, которые уже есть в таблице.
+
+        Вызывается при старте после восстановления из журнала: если процесс
+        упал между ответом values_append и перезаписью журнала, строка
+        не будет дописана второй раз.
+        """
+        with self._lock:
+            for sheet_name, appends in self._appends.items():
+                kept = [item for item in appends if not is_written(sheet_name, item.key)]
+                if len(kept) != len(appends):
+                    logger.warning(
+                        f"SheetsWriteQueue: {len(appends) - len(kept)} row(s) of "
+                        f"'{sheet_name}' already written, dropped from queue"
+                    )
+                    self._appends[sheet_name] = kept
+            self._rewrite_journal()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return (sum(len(cells) for cells in self._cells.values())
+                    + sum(len(appends) for appends in self._appends.values()))
+
+    # ===== Чтение своих записей =====
+
+    def overlay(self, sheet_name: str, values: List[List[str]]) -> List[List[str]]:
+        """
+        Наложить неотправленные изменения на данные листа (read-your-writes).
+
+        Returns:
+            values без изменений, если по листу ничего не ждёт отправки,
+            иначе копию с изменёнными ячейками и дописанными строками очереди.
+            Исходные списки (общие для снимка) не изменяются.
+        """
+        with self._lock:
+            cells = self._cells.get(sheet_name)
+            appends = self._appends.get(sheet_name)
+            if not cells and not appends:
+                return values
+
+            result = list(values)
+            width = len(values[0]) if values else 0
+
+            for (row, col), value in (cells or {}).items():
+                if row > len(result):
+                    continue
+                line = result[row - 1]
+                if line is values[row - 1]:
+                    line = result[row - 1] = list(line)
+                if col > len(line):
+                    line.extend([''] * (col - len(line)))
+                line[col - 1] = '' if value is None else str(value)
+
+            if appends:
+                # Строка уже может быть в свежем снимке (сброс прошёл,
+                # а очередь ещё не очищена) — не показываем её дважды
+                written = {line[0] for line in values[1:] if line}
+                for item in appends:
+                    if item.key in written:
+                        continue
+                    line = ['' if v is None else str(v) for v in item.values]
+                    if len(line) < width:
+                        line.extend([''] * (width - len(line)))
+                    result.append(line)
+            return result
+
+    # ===== Сброс =====
+
+    def flush(self) -> bool:
+        """
+        Отправить всё накопленное в Sheets.
+
+        Блокировка очереди держится только пока снимается пакет и пока
+        применяется результат: запросы к API идут без неё, так что enqueue
+        и overlay не ждут медленный Sheets. Изменения, пришедшие во время
+        отправки, остаются в очереди до следующего сброса.
+
+        Returns:
+            True если очередь пуста после сброса.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._cells and not self._appends:
+                    return True
+                touched = set(self._cells) | set(self._appends)
+
+            try:
+                self._flush_appends()
+                self._flush_cells()
+            except Exception as e:
+                logger.error(f"SheetsWriteQueue: flush failed, {len(self)} change(s) kept: {e}")
+            finally:
+                with self._lock:
+                    self._rewrite_journal()
+                if self._on_flushed is not None:
+                    self._on_flushed(touched)
+
+            with self._lock:
+                return not self._cells and not self._appends
+
+    def _flush_appends(self) -> None:
+        """Новые строки — одним values_append на лист (в порядке поступления)."""
+        with self._lock:
+            # Отправляемые значения копируются: patch_append во время запроса
+            # меняет строку в очереди, разница дописывается ячейками
+            batches = {
+                sheet_name: [(item, list(item.values)) for item in appends]
+                for sheet_name, appends in self._appends.items() if appends
+            }
+            for sheet_name in [name for name, appends in self._appends.items() if not appends]:
+                del self._appends[sheet_name]
+
+        for sheet_name, batch in batches.items():
+            response = self.spreadsheet.values_append(
+                absolute_range_name(sheet_name),
+                params={'valueInputOption': 'USER_ENTERED'},
+                body={'values': [values for _, values in batch]},
+            )
+            first_row = _row_from_append_response(response)
+            if first_row is not None:
+                rows = {item.key: first_row + offset for offset, (item, _) in enumerate(batch)}
+            else:
+                logger.warning(
+                    f"SheetsWriteQueue: no row number in append response for '{sheet_name}', "
+                    f"looking rows up by key"
+                )
+                rows = self._lookup_rows(sheet_name, [item.key for item, _ in batch])
+
+            with self._lock:
+                self._appended(sheet_name, batch, rows)
+                # Строки дописаны — журнал не должен дописать их повторно
+                self._rewrite_journal()
+
+    def _appended(self, sheet_name: str, batch: List[tuple], rows: Dict[str, int]) -> None:
+        """
+        Убрать дописанные строки из очереди, поставить их формулы и изменения.
+
+        Args:
+            batch: [(PendingAppend, отправленные values)]
+            rows: {key: номер строки в листе}
+        """
+        sent = {id(item) for item, _ in batch}
+        remaining = [item for item in self._appends.get(sheet_name, []) if id(item) not in sent]
+        if remaining:
+            self._appends[sheet_name] = remaining
+        else:
+            self._appends.pop(sheet_name, None)
+
+        sheet_cells = self._cells.setdefault(sheet_name, {})
+        for item, values in batch:
+            row = rows.get(item.key)
+            if row is None:
+                logger.error(
+                    f"SheetsWriteQueue: row of '{item.key}' in '{sheet_name}' not found, "
+                    f"formulas {sorted(item.formulas)} not written"
+                )
+                continue
+            for col, value in enumerate(item.values, start=1):
+                if col > len(values) or values[col - 1] != value:
+                    sheet_cells[(row, col)] = value
+            for col, template in item.formulas.items():
+                sheet_cells.setdefault((row, col), template.replace('{row}', str(row)))
+            if self._on_appended is not None:
+                self._on_appended(sheet_name, item.key, row)
+        if not sheet_cells:
+            del self._cells[sheet_name]
+
+    def _lookup_rows(self, sheet_name: str, keys: List[str]) -> Dict[str, int]:
+        """
+        Номера строк по значению колонки A (последнее вхождение — только что дописанное).
+
+        Запасной путь, когда ответ values_append не содержит номер строки.
+        При ошибке чтения возвращает {} — формулы этих строк не пишутся,
+        индекс заявок перестроится при следующем чтении листа.
+        """
+        try:
+            response = self.spreadsheet.values_get(absolute_range_name(sheet_name, 'A:A'))
+        except Exception as e:
+            logger.error(f"SheetsWriteQueue: row lookup in '{sheet_name}' failed: {e}")
+            return {}
+
+        wanted = set(keys)
+        rows: Dict[str, int] = {}
+        for row, line in enumerate(response.get('values', []), start=1):
+            if line and line[0] in wanted:
+                rows[line[0]] = row
+        return rows
+
+    def _flush_cells(self) -> None:
+        """
+        Все ячейки всех листов — одним values_batch_update.
+
+        Если batch-запрос упал, диапазоны отправляются по одному: записанные
+        убираются из очереди, отклонённые API (см. _is_rejected) после
+        MAX_RANGE_ATTEMPTS сбросов уходят в dead-letter файл. При временной
+        ошибке отправка прекращается — остаток ждёт следующего сброса.
+        """
+        with self._lock:
+            data = []
+            for sheet_name, cells in self._cells.items():
+                data.extend(self._ranges_for_cells(sheet_name, cells))
+            for sheet_name in [name for name, cells in self._cells.items() if not cells]:
+                del self._cells[sheet_name]
+        if not data:
+            return
+
+        try:
+            self.spreadsheet.values_batch_update(
+                {'valueInputOption': 'USER_ENTERED', 'data': [self._public(r) for r in data]}
+            )
+        except Exception as e:
+            logger.warning(f"SheetsWriteQueue: batch update of {len(data)} range(s) failed, "
+                           f"retrying one by one: {e}")
+            self._flush_ranges_one_by_one(data)
+            return
+
+        logger.debug(f"SheetsWriteQueue: {len(data)} range(s) written")
+        with self._lock:
+            for item in data:
+                self._rejections.pop(item['range'], None)
+                self._drop_cells(item)
+
+    def _flush_ranges_one_by_one(self, data: List[Dict]) -> None:
+        for item in data:
+            try:
+                self.spreadsheet.values_batch_update(
+                    {'valueInputOption': 'USER_ENTERED', 'data': [self._public(item)]}
+                )
+            except Exception as e:
+                if not _is_rejected(e):
+                    raise
+                with self._lock:
+                    attempts = self._rejections.get(item['range'], 0) + 1
+                    if attempts < MAX_RANGE_ATTEMPTS:
+                        self._rejections[item['range']] = attempts
+                        logger.error(f"SheetsWriteQueue: {item['range']} rejected "
+                                     f"({attempts}/{MAX_RANGE_ATTEMPTS}): {e}")
+                        continue
+                self._dead_letter(item, e)
+            with self._lock:
+                self._rejections.pop(item['range'], None)
+                self._drop_cells(item)
+
+    def _drop_cells(self, item: Dict) -> None:
+        """Убрать записанные ячейки; изменённые во время отправки остаются в очереди."""
+        sheet_cells = self._cells.get(item['_sheet'], {})
+        for key, value in zip(item['_keys'], item['values'][0]):
+            if key in sheet_cells and sheet_cells[key] == value:
+                del sheet_cells[key]
+        if not sheet_cells:
+            self._cells.pop(item['_sheet'], None)
+
+    def _dead_letter(self, item: Dict, error: Exception) -> None:
+        """Убрать диапазон из очереди навсегда: записать в dead-letter файл для разбора."""
+        logger.error(f"SheetsWriteQueue: {item['range']} rejected {MAX_RANGE_ATTEMPTS} times, "
+                     f"moved to {self.dead_letter_path}: {error}")
+        directory = os.path.dirname(self.dead_letter_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        record = {'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'error': str(error),
+                  **self._public(item)}
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    @staticmethod
+    def _public(item: Dict) -> Dict:
+        """Диапазон в формате values_batch_update (без служебных полей)."""
+        return {'range': item['range'], 'values': item['values']}
+
+    @staticmethod
+    def _ranges_for_cells(sheet_name: str, cells: Dict[tuple, Any]) -> List[Dict]:
+        """
+        Соседние ячейки одной строки склеиваются в один диапазон A1.
+
+        Служебные поля '_sheet' и '_keys' (ячейки очереди, вошедшие в диапазон)
+        нужны, чтобы убрать из очереди записанный диапазон; в API не уходят.
+        """
+        ranges = []
+        sheet = absolute_range_name(sheet_name)
+        for row, col in sorted(cells):
+            value = cells[(row, col)]
+            last = ranges[-1] if ranges else None
+            if last and last['_row'] == row and last['_end'] == col - 1:
+                last['values'][0].append(value)
+                last['_end'] = col
+            else:
+                ranges.append({'_row': row, '_start': col, '_end': col, 'values': [[value]]})
+
+        result = []
+        for r in ranges:
+            a1 = rowcol_to_a1(r['_row'], r['_start'])
+            if r['_end'] != r['_start']:
+                a1 += f":{rowcol_to_a1(r['_row'], r['_end'])}"
+            item = {
+                'range': f"{sheet}!{a1}",
+                'values': r['values'],
+                '_sheet': sheet_name,
+                '_keys': [(r['_row'], col) for col in range(r['_start'], r['_end'] + 1)],
+            }
+            result.append(item)
+        return result
+
+    # ===== Фоновый поток =====
+
+    def start(self, interval: float) -> None:
+        """Запустить фоновый сброс раз в interval секунд."""
+        if self._thread is not None:
+            return
+
+        def _loop():
+            while not self._stop.wait(interval):
+                self.flush()
+
+        self._thread = threading.Thread(target=_loop, name='sheets-write-queue', daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Остановить фоновый поток и отправить остаток очереди."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    # ===== Журнал =====
+
+    def _submit(self, op: Dict) -> None:
+        with self._lock:
+            self._apply(op)
+            self._append_journal(op)
+
+    def _find_append(self, sheet_name: str, key: str) -> Optional[PendingAppend]:
+        for item in self._appends.get(sheet_name, []):
+            if item.key == key:
+                return item
+        return None
+
+    def _apply(self, op: Dict) -> None:
+        """Применить операцию к очереди в памяти (и при записи, и при восстановлении)."""
+        sheet_name = op['sheet']
+        if op['op'] == 'cells':
+            sheet_cells = self._cells.setdefault(sheet_name, {})
+            for col, value in op['cells'].items():
+                sheet_cells[(op['row'], int(col))] = value
+        elif op['op'] == 'append':
+            self._appends.setdefault(sheet_name, []).append(PendingAppend(
+                op['key'], op['values'],
+                {int(col): f for col, f in op.get('formulas', {}).items()},
+            ))
+        elif op['op'] == 'patch':
+            item = self._find_append(sheet_name, op['key'])
+            if item is None:
+                return
+            for col, value in op['cells'].items():
+                col = int(col)
+                if col > len(item.values):
+                    item.values.extend([''] * (col - len(item.values)))
+                item.values[col - 1] = value
+            for col, template in op.get('formulas', {}).items():
+                item.formulas[int(col)] = template
+
+    def _append_journal(self, op: Dict) -> None:
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(op, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _snapshot_ops(self) -> List[Dict]:
+        """Текущее состояние очереди как минимальный список операций."""
+        ops = []
+        for sheet_name, appends in self._appends.items():
+            for item in appends:
+                ops.append({'op': 'append', 'sheet': sheet_name, 'key': item.key,
+                            'values': item.values,
+                            'formulas': {str(c): f for c, f in item.formulas.items()}})
+        for sheet_name, cells in self._cells.items():
+            by_row: Dict[int, Dict[str, Any]] = {}
+            for (row, col), value in cells.items():
+                by_row.setdefault(row, {})[str(col)] = value
+            for row, row_cells in sorted(by_row.items()):
+                ops.append({'op': 'cells', 'sheet': sheet_name, 'row': row, 'cells': row_cells})
+        return ops
+
+    def _rewrite_journal(self) -> None:
+        """Атомарно заменить журнал текущим содержимым очереди."""
+        ops = self._snapshot_ops()
+        if not ops:
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            return
+
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for op in ops:
+                f.write(json.dumps(op, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _replay_journal(self) -> None:
+        """Восстановить очередь из журнала после перезапуска."""
+        if not os.path.exists(self.journal_path):
+            return
+
+        count = 0
+        with open(self.journal_path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    self._apply(json.loads(line))
+                    count += 1
+                except (ValueError, KeyError) as e:
+                    # Оборванная последняя строка при падении во время записи
+                    logger.warning(f"SheetsWriteQueue: skipped broken journal line: {e}")
+
+        if count:
+            logger.info(f"SheetsWriteQueue: restored {count} operation(s) from journal")
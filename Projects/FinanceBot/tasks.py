@@ -71,6 +71,12 @@ def test_legacy(c):
     c.run(f'"{PY}" tests/test_usdt_fixes.py')
 
 
+@task
+def bench(c, rows=50000, flows=100, mode="both"):
+    """Нагрузочный прогон SheetsManager на таблице в памяти (без Google Sheets)"""
+    c.run(f'"{PY}" -m tests.sheets_benchmark --rows {rows} --flows {flows} --mode {mode}')
+
+
 # ── VPS ────────────────────────────────────────────────────────────────────────
 
 @task
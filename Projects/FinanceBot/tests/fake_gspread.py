@@ -0,0 +1,424 @@
+"""
+Google Sheets в памяти для нагрузочных тестов SheetsManager
+===========================================================
+FakeSpreadsheet повторяет ту часть gspread, которой пользуется бот
+(values_batch_get / values_append / values_batch_update, worksheet(),
+get_all_values / append_row / update_cell / update_cells), и для каждого
+вызова запоминает метод, байты запроса/ответа и задержку.
+
+Моделируется:
+- задержка сети: latency на вызов + seconds_per_mb на объём данных;
+- квота Sheets API: не больше quota_per_minute чтений (и отдельно записей)
+  за скользящую минуту, сверх — APIError 429, как у настоящего API;
+- формат ответов: values_batch_get обрезает пустые хвосты строк,
+  get_all_values дополняет строки до одной длины.
+
+Сеть не нужна: generate_book() строит таблицу на 10k–200k заявок.
+"""
+import json
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import gspread
+from gspread.utils import a1_to_rowcol, fill_gaps, rowcol_to_a1
+from requests import Response
+
+from src import config
+
+
+MAIN_HEADER = [
+    "ID заявки", "Дата", "Сумма", "Валюта", "Получатель", "Номер карты/телефона",
+    "Банк", "Реквизиты", "Назначение", "Категория", "Статус", "ID сделки",
+    "Название аккаунта", "Сумма USDT", "Курс", "Исполнитель",
+    "Telegram ID инициатора", "Username инициатора", "Полное имя инициатора",
+    "Ссылка на чек",
+]
+USDT_HEADER = [
+    "ID заявки", "Дата", "Сумма", "Адрес кошелька", "Назначение", "Категория",
+    "Статус", "ID транзакции", "Название аккаунта", "Исполнитель",
+    "Telegram ID инициатора", "Username инициатора", "Полное имя инициатора",
+    "Ссылка на чек",
+]
+CNY_HEADER = [
+    "ID заявки", "Дата", "Сумма", "Способ оплаты", "Реквизиты", "Ссылка на QR",
+    "Назначение", "Категория", "Статус", "ID сделки", "Название аккаунта",
+    "Исполнитель", "Telegram ID инициатора", "Username инициатора",
+    "Полное имя инициатора", "Ссылка на чек",
+]
+USERS_HEADER = ["Telegram ID", "Имя", "Username", "Роль"]
+
+EXECUTORS = ["Иван Петров", "Пётр Сидоров", "Анна Смирнова", "Олег Кузнецов", "Мария Волкова"]
+
+# Доли листов в журнале: (лист, заголовки, валюта строки) — как в рабочей таблице
+BOOK_LAYOUT = [
+    (config.SHEET_JOURNAL, MAIN_HEADER, config.CURRENCY_RUB, 0.60),
+    (config.SHEET_OTHER_PAYMENTS, MAIN_HEADER, config.CURRENCY_BYN, 0.05),
+    (config.SHEET_USDT_SALARIES, USDT_HEADER, config.CURRENCY_USDT, 0.05),
+    (config.SHEET_USDT, USDT_HEADER, config.CURRENCY_USDT, 0.20),
+    (config.SHEET_CNY, CNY_HEADER, config.CURRENCY_CNY, 0.10),
+]
+
+
+@dataclass
+class ApiCall:
+    """Один вызов Sheets API."""
+    method: str
+    kind: str                   # 'read' | 'write'
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    overhead: float = 0.0       # время работы самой подделки (вычитается из задержки операции)
+    throttled: bool = False     # отклонён по квоте (429)
+
+
+def _payload_size(payload: Any) -> int:
+    """Размер тела запроса/ответа в байтах (JSON, как по сети)."""
+    if payload is None:
+        return 0
+    return len(json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+def _sheet_from_range(range_name: str) -> str:
+    """"'Основные'!A1:B2" -> "Основные"."""
+    name = range_name.rsplit('!', 1)[0] if '!' in range_name else range_name
+    if len(name) >= 2 and name[0] == name[-1] == "'":
+        name = name[1:-1].replace("''", "'")
+    return name
+
+
+def _stored(value: Any) -> str:
+    """Значение ячейки как его отдаст Sheets (FORMATTED_VALUE); формулы не вычисляются."""
+    if value is None:
+        return ''
+    value = str(value)
+    return '' if value.startswith('=') else value
+
+
+def _quota_response(kind: str) -> Response:
+    metric = 'Read requests' if kind == 'read' else 'Write requests'
+    response = Response()
+    response.status_code = 429
+    response._content = json.dumps({
+        'error': {
+            'code': 429,
+            'message': f"Quota exceeded for quota metric '{metric}' "
+                       f"and limit '{metric} per minute per user'",
+            'status': 'RESOURCE_EXHAUSTED',
+        }
+    }).encode('utf-8')
+    return response
+
+
+class FakeSpreadsheet:
+    """
+    Таблица в памяти с учётом API-вызовов.
+
+    Side effects:
+        - Каждый вызов API засыпает на latency + seconds_per_mb * МБ данных.
+        - Вызовы пишутся в список текущего capture() этого потока; вызовы
+          из потоков без capture() (фоновые потоки бота) — в background.
+
+    Invariants:
+        - Данные листов — списки строк str; записи применяются атомарно
+          (одна блокировка на таблицу, как последовательность запросов к API).
+    """
+
+    def __init__(self, sheets: Dict[str, List[List[Any]]], latency: float = 0.0,
+                 seconds_per_mb: float = 0.0, quota_per_minute: Optional[int] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.latency = latency
+        self.seconds_per_mb = seconds_per_mb
+        self.quota_per_minute = quota_per_minute
+        self._clock = clock
+
+        self._sheets: Dict[str, List[List[str]]] = {
+            name: [[_stored(v) for v in row] for row in rows] for name, rows in sheets.items()
+        }
+        self._worksheets: Dict[str, 'FakeWorksheet'] = {}
+        self._window: Dict[str, deque] = {'read': deque(), 'write': deque()}
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+        self.calls: List[ApiCall] = []
+        self.background: List[ApiCall] = []
+
+    # ===== Учёт вызовов =====
+
+    @contextmanager
+    def capture(self) -> Iterator[List[ApiCall]]:
+        """Собрать вызовы API этого потока внутри блока."""
+        previous = getattr(self._local, 'calls', None)
+        calls: List[ApiCall] = []
+        self._local.calls = calls
+        try:
+            yield calls
+        finally:
+            self._local.calls = previous
+
+    def _record(self, call: ApiCall) -> None:
+        with self._lock:
+            self.calls.append(call)
+        target = getattr(self._local, 'calls', None)
+        (target if target is not None else self.background).append(call)
+
+    def _check_quota(self, kind: str, now: float) -> bool:
+        if not self.quota_per_minute:
+            return True
+        window = self._window[kind]
+        while window and now - window[0] >= 60.0:
+            window.popleft()
+        if len(window) >= self.quota_per_minute:
+            return False
+        window.append(now)
+        return True
+
+    def _call(self, method: str, kind: str, request: Any, handler: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        call = ApiCall(method, kind, bytes_sent=_payload_size(request))
+        with self._lock:
+            allowed = self._check_quota(kind, self._clock())
+            try:
+                response = handler() if allowed else None
+            except Exception:
+                call.overhead = time.perf_counter() - started
+                self._record(call)
+                raise
+        if not allowed:
+            call.throttled = True
+            call.overhead = time.perf_counter() - started
+            self._record(call)
+            raise gspread.exceptions.APIError(_quota_response(kind))
+
+        call.bytes_received = _payload_size(response)
+        call.overhead = time.perf_counter() - started
+        self._record(call)
+        delay = self.latency + (call.bytes_sent + call.bytes_received) / 1e6 * self.seconds_per_mb
+        if delay > 0:
+            time.sleep(delay)
+        return response
+
+    # ===== Данные =====
+
+    def values(self, sheet_name: str) -> List[List[str]]:
+        """Текущие значения листа (для проверок; без учёта как API-вызов)."""
+        with self._lock:
+            return fill_gaps([list(row) for row in self._sheets[sheet_name]])
+
+    def row_count(self, sheet_name: str) -> int:
+        """Строк данных в листе без заголовка (0 — листа нет)."""
+        with self._lock:
+            return max(0, len(self._sheets.get(sheet_name, [])) - 1)
+
+    def _rows(self, sheet_name: str) -> List[List[str]]:
+        rows = self._sheets.get(sheet_name)
+        if rows is None:
+            raise gspread.exceptions.APIError(self._not_found_response(sheet_name))
+        return rows
+
+    @staticmethod
+    def _not_found_response(sheet_name: str) -> Response:
+        response = Response()
+        response.status_code = 400
+        response._content = json.dumps({
+            'error': {'code': 400, 'message': f"Unable to parse range: {sheet_name}",
+                      'status': 'INVALID_ARGUMENT'}
+        }).encode('utf-8')
+        return response
+
+    def _set_cell(self, sheet_name: str, row: int, col: int, value: Any) -> None:
+        rows = self._rows(sheet_name)
+        while len(rows) < row:
+            rows.append([])
+        line = rows[row - 1]
+        if len(line) < col:
+            line.extend([''] * (col - len(line)))
+        line[col - 1] = _stored(value)
+
+    def _append(self, sheet_name: str, values: List[List[Any]]) -> Dict:
+        rows = self._rows(sheet_name)
+        while rows and not any(rows[-1]):
+            rows.pop()
+        first = len(rows) + 1
+        width = 1
+        for line in values:
+            rows.append([_stored(v) for v in line])
+            width = max(width, len(line))
+        last = len(rows)
+        return {
+            'tableRange': f"'{sheet_name}'!A1:{rowcol_to_a1(max(first - 1, 1), width)}",
+            'updates': {
+                'updatedRange': f"'{sheet_name}'!A{first}:{rowcol_to_a1(last, width)}",
+                'updatedRows': len(values),
+            },
+        }
+
+    # ===== API таблицы (gspread.Spreadsheet) =====
+
+    def worksheet(self, title: str) -> 'FakeWorksheet':
+        def handler():
+            if title not in self._sheets:
+                return None
+            return {'sheets': [{'properties': {'title': name}} for name in self._sheets]}
+
+        if self._call('fetch_sheet_metadata', 'read', None, handler) is None:
+            raise gspread.WorksheetNotFound(title)
+        if title not in self._worksheets:
+            self._worksheets[title] = FakeWorksheet(self, title)
+        return self._worksheets[title]
+
+    def values_batch_get(self, ranges: List[str], params: Optional[Dict] = None) -> Dict:
+        def handler():
+            value_ranges = []
+            for range_name in ranges:
+                rows = [list(row) for row in self._rows(_sheet_from_range(range_name))]
+                for line in rows:
+                    while line and line[-1] == '':
+                        line.pop()
+                while rows and not rows[-1]:
+                    rows.pop()
+                value_ranges.append({'range': range_name, 'majorDimension': 'ROWS', 'values': rows})
+            return {'valueRanges': value_ranges}
+
+        return self._call('values_batch_get', 'read', {'ranges': ranges}, handler)
+
+    def values_append(self, range_name: str, params: Optional[Dict] = None,
+                      body: Optional[Dict] = None) -> Dict:
+        values = (body or {}).get('values', [])
+        return self._call('values_append', 'write', body,
+                          lambda: self._append(_sheet_from_range(range_name), values))
+
+    def values_batch_update(self, body: Dict) -> Dict:
+        def handler():
+            for item in body.get('data', []):
+                sheet_name = _sheet_from_range(item['range'])
+                start = item['range'].rsplit('!', 1)[1].split(':')[0]
+                row, col = a1_to_rowcol(start)
+                for r, line in enumerate(item['values']):
+                    for c, value in enumerate(line):
+                        self._set_cell(sheet_name, row + r, col + c, value)
+            return {'totalUpdatedCells': sum(len(line) for item in body.get('data', [])
+                                             for line in item['values'])}
+
+        return self._call('values_batch_update', 'write', body, handler)
+
+
+class FakeWorksheet:
+    """Лист таблицы (gspread.Worksheet): каждый метод — один API-вызов."""
+
+    def __init__(self, spreadsheet: FakeSpreadsheet, title: str):
+        self.spreadsheet = spreadsheet
+        self.title = title
+
+    def get_all_values(self) -> List[List[str]]:
+        return self.spreadsheet._call(
+            'get_all_values', 'read', None,
+            lambda: fill_gaps([list(row) for row in self.spreadsheet._rows(self.title)]),
+        )
+
+    def acell(self, label: str) -> gspread.Cell:
+        def handler():
+            row, col = a1_to_rowcol(label)
+            rows = self.spreadsheet._rows(self.title)
+            line = rows[row - 1] if row <= len(rows) else []
+            return gspread.Cell(row, col, line[col - 1] if col <= len(line) else None)
+
+        return self.spreadsheet._call('acell', 'read', None, handler)
+
+    def append_row(self, values: List[Any], value_input_option: str = 'RAW', **kwargs) -> Dict:
+        return self.spreadsheet._call(
+            'append_row', 'write', {'values': [values]},
+            lambda: self.spreadsheet._append(self.title, [values]),
+        )
+
+    def update_cell(self, row: int, col: int, value: Any) -> Dict:
+        def handler():
+            self.spreadsheet._set_cell(self.title, row, col, value)
+            return {'updatedCells': 1}
+
+        return self.spreadsheet._call('update_cell', 'write', {'values': [[value]]}, handler)
+
+    def update_cells(self, cells: List[gspread.Cell], value_input_option: str = 'RAW') -> Dict:
+        def handler():
+            for cell in cells:
+                self.spreadsheet._set_cell(self.title, cell.row, cell.col, cell.value)
+            return {'updatedCells': len(cells)}
+
+        return self.spreadsheet._call(
+            'update_cells', 'write', {'values': [[cell.value] for cell in cells]}, handler
+        )
+
+
+class FakeClient:
+    """gspread.Client: open_by_key отдаёт заранее собранную таблицу."""
+
+    def __init__(self, spreadsheet: FakeSpreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open_by_key(self, key: str) -> FakeSpreadsheet:
+        return self.spreadsheet
+
+
+# ===== Генерация таблицы =====
+
+def _request_row(header: List[str], currency: str, n: int, rnd: random.Random) -> List[str]:
+    """Строка заявки под заголовки листа (статусы и суммы распределены как в журнале)."""
+    status = rnd.choices(
+        [config.STATUS_PAID, config.STATUS_CANCELLED, config.STATUS_CREATED],
+        weights=[85, 10, 5],
+    )[0]
+    executor = rnd.choice(EXECUTORS) if status != config.STATUS_CANCELLED else ''
+    author = 100000 + rnd.randrange(20)
+    values = {
+        "ID заявки": f"REQ-{20240101 + n % 28:08d}-{n % 240000:06d}-{n:08X}",
+        "Дата": f"{1 + n % 28:02d}.{1 + (n // 28) % 12:02d}.{2024 + (n // 336) % 3}",
+        "Сумма": str(rnd.randrange(500, 500000) if currency != config.CURRENCY_USDT
+                     else rnd.randrange(10, 5000)),
+        "Валюта": currency,
+        "Получатель": f"Получатель {n % 997}",
+        "Номер карты/телефона": f"2200{n:012d}",
+        "Адрес кошелька": f"T{n:033d}",
+        "Банк": rnd.choice(["Сбер", "Тинькофф", "Альфа"]),
+        "Способ оплаты": rnd.choice(["Alipay", "WeChat", "Bank_card"]),
+        "Назначение": f"Оплата по договору {n % 5000}",
+        "Категория": rnd.choice(["Зарплата", "Реклама", "Прочее", "Аренда"]),
+        "Статус": status,
+        "ID сделки": f"D{n}" if status == config.STATUS_PAID else '',
+        "ID транзакции": f"{n:064x}" if status == config.STATUS_PAID else '',
+        "Название аккаунта": "Основной" if status == config.STATUS_PAID else '',
+        "Исполнитель": executor,
+        "Telegram ID инициатора": str(author),
+        "Username инициатора": f"user{author}",
+        "Полное имя инициатора": f"Инициатор {author}",
+    }
+    return [values.get(column, '') for column in header]
+
+
+def generate_book(rows: int, users: int = 30, seed: int = 1) -> Dict[str, List[List[str]]]:
+    """
+    Таблица бота с rows заявками, разложенными по листам по BOOK_LAYOUT.
+
+    Returns:
+        {лист: all_values} — вход для FakeSpreadsheet (плюс лист Пользователи).
+    """
+    rnd = random.Random(seed)
+    book: Dict[str, List[List[str]]] = {}
+    n = 0
+    for sheet_name, header, currency, share in BOOK_LAYOUT:
+        count = int(rows * share)
+        data = [list(header)]
+        for _ in range(count):
+            data.append(_request_row(header, currency, n, rnd))
+            n += 1
+        book[sheet_name] = data
+
+    roles = ["Владелец", "Менеджер"] + ["Исполнитель"] * len(EXECUTORS)
+    book[config.SHEET_USERS] = [list(USERS_HEADER)] + [
+        [str(100000 + i), EXECUTORS[i - 2] if 2 <= i < 2 + len(EXECUTORS) else f"Пользователь {i}",
+         f"user{100000 + i}", roles[i] if i < len(roles) else "Менеджер"]
+        for i in range(users)
+    ]
+    return book
@@ -0,0 +1,340 @@
+"""
+Нагрузочный прогон SheetsManager на таблице в памяти
+====================================================
+Настоящий SheetsManager (очередь записей, снимок, индекс, зеркало)
+работает поверх FakeSpreadsheet (tests/fake_gspread.py) и проходит
+сценарии хендлеров: создание заявки → назначение исполнителя → список
+исполнителя → оплата → чек → списки менеджера и владельца.
+
+По каждой операции — API-вызовов на операцию, p50/p99 задержки
+(с моделью сети и без времени работы самой подделки), байт на операцию,
+отказы по квоте (429) и неудачные операции.
+
+Фоновые потоки бота остановлены, чтобы цифры были воспроизводимы:
+очередь записей сбрасывается явной операцией flush_writes
+(в боте — раз в SHEETS_FLUSH_INTERVAL секунд).
+
+Запуск:
+    .venv/Scripts/python -m tests.sheets_benchmark --rows 50000 --flows 100
+    .venv/Scripts/python -m tests.sheets_benchmark --rows 200000 --mode direct --json bench.json
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+from unittest.mock import patch
+
+from src import config
+from src.sheets import SheetsManager
+from src.sheets_snapshot import REQUEST_SHEETS
+
+from tests.fake_gspread import EXECUTORS, ApiCall, FakeClient, FakeSpreadsheet, generate_book
+
+# Фоновые потоки бота за время прогона не просыпаются
+IDLE_INTERVAL = 24 * 3600.0
+
+# Валюты новых заявок — в тех же долях, что листы журнала
+FLOW_CURRENCIES = ([config.CURRENCY_RUB] * 12 + [config.CURRENCY_USDT] * 5
+                   + [config.CURRENCY_CNY] * 3)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Перцентиль методом ближайшего ранга (0 для пустого списка)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class OperationStats:
+    """Замеры одной операции SheetsManager."""
+    name: str
+    latencies: List[float] = field(default_factory=list)
+    api_calls: List[int] = field(default_factory=list)
+    reads: int = 0
+    writes: int = 0
+    bytes: int = 0
+    throttled: int = 0
+    failures: int = 0
+
+    def add(self, latency: float, calls: List[ApiCall], failed: bool) -> None:
+        self.latencies.append(latency)
+        self.api_calls.append(len(calls))
+        for call in calls:
+            if call.kind == 'read':
+                self.reads += 1
+            else:
+                self.writes += 1
+            self.bytes += call.bytes_sent + call.bytes_received
+            self.throttled += call.throttled
+        self.failures += failed
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def calls_per_op(self) -> float:
+        return sum(self.api_calls) / self.count if self.count else 0.0
+
+    @property
+    def max_calls(self) -> int:
+        return max(self.api_calls, default=0)
+
+    @property
+    def bytes_per_op(self) -> float:
+        return self.bytes / self.count if self.count else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'api_calls_per_op': round(self.calls_per_op, 3),
+            'max_api_calls': self.max_calls,
+            'reads': self.reads,
+            'writes': self.writes,
+            'bytes_per_op': round(self.bytes_per_op),
+            'p50_ms': round(percentile(self.latencies, 50) * 1000, 3),
+            'p99_ms': round(percentile(self.latencies, 99) * 1000, 3),
+            'throttled': self.throttled,
+            'failures': self.failures,
+        }
+
+
+@dataclass
+class BenchmarkReport:
+    """Результат прогона: операции в порядке первого выполнения, запуск и фон."""
+    rows: int
+    flows: int
+    write_behind: bool
+    operations: Dict[str, OperationStats]
+    setup: List[ApiCall]
+    background: List[ApiCall]
+    seconds: float
+
+    def to_dict(self) -> Dict:
+        def summary(calls: List[ApiCall]) -> Dict:
+            return {
+                'api_calls': len(calls),
+                'bytes': sum(c.bytes_sent + c.bytes_received for c in calls),
+            }
+
+        return {
+            'rows': self.rows,
+            'flows': self.flows,
+            'mode': 'write-behind' if self.write_behind else 'direct',
+            'seconds': round(self.seconds, 3),
+            'setup': summary(self.setup),
+            'background': summary(self.background),
+            'operations': {name: op.to_dict() for name, op in self.operations.items()},
+        }
+
+    def format(self) -> str:
+        mode = 'write-behind' if self.write_behind else 'direct'
+        lines = [
+            f"SheetsManager: {self.rows} строк, {self.flows} сценариев, запись: {mode}, "
+            f"{self.seconds:.1f} с",
+            f"{'операция':<28}{'n':>6}{'API/оп':>9}{'max':>5}{'чтен.':>7}{'запис.':>7}"
+            f"{'КБ/оп':>10}{'p50 мс':>10}{'p99 мс':>10}{'429':>5}{'сбои':>6}",
+        ]
+        for op in self.operations.values():
+            lines.append(
+                f"{op.name:<28}{op.count:>6}{op.calls_per_op:>9.2f}{op.max_calls:>5}"
+                f"{op.reads:>7}{op.writes:>7}{op.bytes_per_op / 1024:>10.1f}"
+                f"{percentile(op.latencies, 50) * 1000:>10.2f}"
+                f"{percentile(op.latencies, 99) * 1000:>10.2f}"
+                f"{op.throttled:>5}{op.failures:>6}"
+            )
+        for title, calls in (('запуск', self.setup), ('фон', self.background)):
+            size = sum(c.bytes_sent + c.bytes_received for c in calls)
+            lines.append(f"{title}: {len(calls)} API-вызовов, {size / 1024:.1f} КБ")
+        return '\n'.join(lines)
+
+
+@contextmanager
+def fake_sheets_manager(spreadsheet: FakeSpreadsheet, write_behind: bool,
+                        workdir: str) -> Iterator[SheetsManager]:
+    """
+    SheetsManager поверх FakeSpreadsheet (настоящий __init__, без сети).
+
+    Side effects:
+        - Пока открыт контекст, config.SHEETS_WRITE_BEHIND/SHEETS_WRITE_JOURNAL
+          и интервалы фоновых потоков подменены; журнал очереди — в workdir.
+        - Первая фоновая синхронизация зеркала дожидается завершения
+          (её вызовы попадают в spreadsheet.background).
+        - На выходе очередь записей сбрасывается, фоновые потоки останавливаются.
+    """
+    overrides = {
+        'SHEETS_WRITE_BEHIND': write_behind,
+        'SHEETS_WRITE_JOURNAL': os.path.join(workdir, 'sheets_write_journal.jsonl'),
+        'SHEETS_FLUSH_INTERVAL': IDLE_INTERVAL,
+        'USERS_REFRESH_INTERVAL': IDLE_INTERVAL,
+        'REQUESTS_MIRROR_INTERVAL': IDLE_INTERVAL,
+    }
+    with ExitStack() as stack:
+        for name, value in overrides.items():
+            stack.enter_context(patch.object(config, name, value))
+        stack.enter_context(patch('src.sheets.ServiceAccountCredentials'))
+        stack.enter_context(patch('src.sheets.gspread.authorize',
+                                  return_value=FakeClient(spreadsheet)))
+        sheets = SheetsManager()
+        sheets.request_mirror.close()
+        try:
+            yield sheets
+        finally:
+            sheets.close_write_queue()
+            sheets.users_table.close()
+
+
+class FlowRunner:
+    """Сценарии хендлеров над SheetsManager с замером каждой операции."""
+
+    def __init__(self, sheets: SheetsManager, spreadsheet: FakeSpreadsheet, seed: int = 1):
+        self.sheets = sheets
+        self.spreadsheet = spreadsheet
+        self.operations: Dict[str, OperationStats] = {}
+        self._rnd = random.Random(seed)
+
+    def measure(self, name: str, func: Callable, *args,
+                ok: Callable = bool, **kwargs):
+        """Выполнить операцию и записать замер; ok(result) — операция удалась."""
+        with self.spreadsheet.capture() as calls:
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                failed = not ok(result)
+            except Exception:
+                result, failed = None, True
+            elapsed = time.perf_counter() - started
+        latency = max(0.0, elapsed - sum(call.overhead for call in calls))
+        self.operations.setdefault(name, OperationStats(name)).add(latency, calls, failed)
+        return result
+
+    def run_flow(self, n: int) -> Optional[str]:
+        """Один сценарий: заявка от создания до оплаты и списки после неё."""
+        sheets = self.sheets
+        currency = self._rnd.choice(FLOW_CURRENCIES)
+        executor = self._rnd.choice(EXECUTORS)
+        author_id = str(100000 + self._rnd.randrange(20))
+
+        request_id = self.measure(
+            'create_request', sheets.create_request,
+            recipient=f"Получатель {n}", amount=self._rnd.randrange(1000, 90000),
+            card_or_phone=f"2200{n:012d}", bank="Сбер", purpose=f"Нагрузка {n}",
+            currency=currency, author_id=author_id,
+            qr_code_link=(f"https://drive.google.com/file/d/qr{n}"
+                          if currency == config.CURRENCY_CNY else None),
+        )
+        if request_id is None:
+            return None
+
+        def has_request(requests):
+            return any(r.get('request_id') == request_id for r in requests)
+
+        self.measure('assign_executor', sheets.assign_executor, request_id, executor)
+        self.measure('get_assigned_requests', sheets.get_assigned_requests, executor,
+                     ok=has_request)
+        self.measure('get_request_by_request_id', sheets.get_request_by_request_id, request_id)
+        self.measure('complete_payment', sheets.complete_payment, '', 0, executor,
+                     deal_id=f"D-bench-{n}", account_name="Основной",
+                     currency=currency, request_id=request_id)
+        self.measure('update_receipt_url', sheets.update_receipt_url, '', 0, currency,
+                     f"https://drive.google.com/file/d/receipt{n}", request_id=request_id)
+        self.measure('get_requests_by_status', sheets.get_requests_by_status,
+                     config.STATUS_CREATED, ok=lambda requests: not has_request(requests))
+        self.measure('get_requests_page', sheets.get_requests_page, None, 0, 10,
+                     ok=lambda page: page[0] > 0)
+        self.measure('get_request_stats', sheets.get_request_stats,
+                     ok=lambda stats: stats.counts.get(config.STATUS_PAID, 0) > 0)
+        return request_id
+
+
+def run_benchmark(spreadsheet: FakeSpreadsheet, flows: int, write_behind: bool = True,
+                  flush_every: int = 1, seed: int = 1,
+                  workdir: Optional[str] = None) -> BenchmarkReport:
+    """
+    Прогнать flows сценариев над таблицей.
+
+    Args:
+        flush_every: Сбрасывать очередь записей после каждых N сценариев.
+        workdir: Каталог для журнала очереди (по умолчанию — временный).
+    """
+    rows = sum(spreadsheet.row_count(name) for name, _ in REQUEST_SHEETS)
+    started = time.perf_counter()
+    with ExitStack() as stack:
+        if workdir is None:
+            workdir = stack.enter_context(tempfile.TemporaryDirectory())
+        with spreadsheet.capture() as setup:
+            manager = stack.enter_context(fake_sheets_manager(spreadsheet, write_behind, workdir))
+            # Первое открытие панели владельца — прогрев снимка и зеркала
+            manager.get_request_stats()
+
+        runner = FlowRunner(manager, spreadsheet, seed)
+        for n in range(flows):
+            runner.run_flow(n)
+            if write_behind and (n + 1) % flush_every == 0:
+                runner.measure('flush_writes', manager.flush_writes)
+
+    return BenchmarkReport(
+        rows=rows,
+        flows=flows,
+        write_behind=write_behind,
+        operations=runner.operations,
+        setup=setup,
+        background=list(spreadsheet.background),
+        seconds=time.perf_counter() - started,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный прогон SheetsManager без Google Sheets"
+    )
+    parser.add_argument('--rows', type=int, default=50000, help="заявок в таблице (10k–200k)")
+    parser.add_argument('--flows', type=int, default=100, help="сценариев создание→оплата→списки")
+    parser.add_argument('--mode', choices=['write-behind', 'direct', 'both'], default='both',
+                        help="запись через очередь, сразу в Sheets или оба прогона")
+    parser.add_argument('--flush-every', type=int, default=1,
+                        help="сброс очереди записей после каждых N сценариев")
+    parser.add_argument('--latency', type=float, default=0.1, help="задержка API-вызова, с")
+    parser.add_argument('--seconds-per-mb', type=float, default=0.5,
+                        help="добавка к задержке на каждый МБ данных, с")
+    parser.add_argument('--quota', type=int, default=60,
+                        help="лимит чтений (и записей) в минуту, 0 — без лимита")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="сохранить отчёт в JSON (для сравнения прогонов)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.ERROR)
+    book = generate_book(args.rows, seed=args.seed)
+    modes = {'write-behind': [True], 'direct': [False], 'both': [True, False]}[args.mode]
+
+    reports = []
+    for write_behind in modes:
+        spreadsheet = FakeSpreadsheet(
+            book, latency=args.latency, seconds_per_mb=args.seconds_per_mb,
+            quota_per_minute=args.quota or None,
+        )
+        report = run_benchmark(spreadsheet, args.flows, write_behind=write_behind,
+                               flush_every=args.flush_every, seed=args.seed)
+        print(report.format())
+        print()
+        reports.append(report.to_dict())
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
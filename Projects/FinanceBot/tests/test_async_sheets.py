@@ -0,0 +1,150 @@
+"""
+Тесты async-фасада над SheetsManager (AsyncSheetsManager)
+=========================================================
+Контракт:
+- Вызовы Sheets выполняются в пуле потоков, а не в event loop.
+- Одинаковые параллельные чтения склеиваются в один вызов.
+- Записи не склеиваются и отделяют чтения «до» от чтений «после».
+
+Запуск: .venv/Scripts/python -m pytest tests/test_async_sheets.py -v
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.async_sheets import AsyncSheetsManager, get_async_sheets
+
+
+def slow(result, delay: float = 0.05):
+    """Синхронная функция-заглушка, имитирующая поход в Sheets."""
+    calls = []
+
+    def _call(*args, **kwargs):
+        calls.append((threading.current_thread().name, args, kwargs))
+        time.sleep(delay)
+        return result
+
+    _call.calls = calls
+    return _call
+
+
+class TestAsyncSheetsManager:
+
+    @pytest.mark.asyncio
+    async def test_calls_run_in_thread_pool(self):
+        sheets = MagicMock()
+        sheets.get_user = slow({"name": "Иван"})
+        facade = AsyncSheetsManager(sheets, max_workers=2)
+
+        user = await facade.get_user(42)
+
+        assert user == {"name": "Иван"}
+        thread_name, args, _ = sheets.get_user.calls[0]
+        assert thread_name.startswith("sheets")
+        assert args == (42,)
+        facade.close()
+
+    @pytest.mark.asyncio
+    async def test_identical_reads_are_coalesced(self):
+        sheets = MagicMock()
+        sheets.get_requests_by_status = slow([{"request_id": "REQ-1"}])
+        facade = AsyncSheetsManager(sheets, max_workers=4)
+
+        results = await asyncio.gather(*[
+            facade.get_requests_by_status("Создана") for _ in range(5)
+        ])
+
+        assert len(sheets.get_requests_by_status.calls) == 1
+        assert all(r == [{"request_id": "REQ-1"}] for r in results)
+        # Каждый получил свой список — сортировка на месте не задевает соседей
+        assert len({id(r) for r in results}) == 5
+        facade.close()
+
+    @pytest.mark.asyncio
+    async def test_different_arguments_are_not_coalesced(self):
+        sheets = MagicMock()
+        sheets.get_requests_by_status = slow([])
+        facade = AsyncSheetsManager(sheets, max_workers=4)
+
+        await asyncio.gather(
+            facade.get_requests_by_status("Создана"),
+            facade.get_requests_by_status("Оплачена"),
+        )
+
+        assert len(sheets.get_requests_by_status.calls) == 2
+        facade.close()
+
+    @pytest.mark.asyncio
+    async def test_writes_are_never_coalesced(self):
+        sheets = MagicMock()
+        sheets.assign_executor = slow(True)
+        facade = AsyncSheetsManager(sheets, max_workers=4)
+
+        await asyncio.gather(
+            facade.assign_executor("REQ-1", "Пётр"),
+            facade.assign_executor("REQ-1", "Пётр"),
+        )
+
+        assert len(sheets.assign_executor.calls) == 2
+        assert facade._generation == 2
+        facade.close()
+
+    @pytest.mark.asyncio
+    async def test_read_after_write_does_not_join_older_read(self):
+        sheets = MagicMock()
+        sheets.get_request_by_request_id = slow({"status": "Создана"}, delay=0.1)
+        sheets.update_request_status_by_id = slow(True, delay=0)
+        facade = AsyncSheetsManager(sheets, max_workers=4)
+
+        before = asyncio.ensure_future(facade.get_request_by_request_id("REQ-1"))
+        await asyncio.sleep(0)
+        await facade.update_request_status_by_id("REQ-1", "Оплачена")
+        await facade.get_request_by_request_id("REQ-1")
+        await before
+
+        assert len(sheets.get_request_by_request_id.calls) == 2
+        facade.close()
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_caller(self):
+        sheets = MagicMock()
+        sheets.get_user.side_effect = RuntimeError("quota")
+        facade = AsyncSheetsManager(sheets, max_workers=1)
+
+        with pytest.raises(RuntimeError):
+            await facade.get_user(1)
+        assert facade._inflight == {}
+        facade.close()
+
+
+class TestGetAsyncSheets:
+
+    def test_returns_none_without_sheets(self):
+        context = MagicMock()
+        context.bot_data = {}
+
+        assert get_async_sheets(context) is None
+
+    def test_creates_once_and_reuses(self):
+        sheets = MagicMock()
+        context = MagicMock()
+        context.bot_data = {"sheets": sheets}
+
+        first = get_async_sheets(context)
+        second = get_async_sheets(context)
+
+        assert first is second
+        assert first.sheets is sheets
+        assert context.bot_data["sheets_async"] is first
+
+    def test_rewraps_when_sheets_replaced(self):
+        context = MagicMock()
+        context.bot_data = {"sheets": MagicMock()}
+        old = get_async_sheets(context)
+
+        context.bot_data["sheets"] = MagicMock()
+
+        assert get_async_sheets(context) is not old
@@ -0,0 +1,187 @@
+"""
+Тесты индекса request_id -> (лист, строка, валюта)
+==================================================
+Контракт:
+- Индекс строится из данных снимка и дополняется при create_request.
+- Запись в известную заявку (статус, исполнитель, оплата, чек) идёт
+  сразу в update_cell/update_cells — без чтения листа; читается только
+  ячейка A строки, чтобы не записать в чужую заявку по устаревшему индексу.
+- Если строки переставили вручную, чтение заявки перестраивает индекс.
+
+Запуск: .venv/Scripts/python -m pytest tests/test_request_index.py -v
+"""
+from unittest.mock import MagicMock
+
+from src import config
+from src.sheets_snapshot import RequestIndex, RequestLocation, REQUEST_SHEETS
+
+from tests.test_sheets_snapshot import full_book, main_row, make_sheets
+
+
+def warm(sheets):
+    """Прогреть снимок и индекс, затем сбросить счётчики вызовов."""
+    sheets.get_requests_by_status(config.STATUS_CREATED)
+    sheets.spreadsheet.values_batch_get.reset_mock()
+    sheets.get_worksheet.reset_mock()
+
+
+# ── RequestIndex ──────────────────────────────────────────────────────────────
+
+class TestRequestIndex:
+
+    def test_rebuild_maps_ids_to_rows(self):
+        index = RequestIndex(REQUEST_SHEETS)
+
+        index.rebuild(config.SHEET_USDT, [["ID"], ["REQ-A"], [""], ["REQ-B"]])
+
+        assert index.get("REQ-B") == RequestLocation(config.SHEET_USDT, 4, config.CURRENCY_USDT)
+        assert index.get("REQ-X") is None
+
+    def test_first_duplicate_and_sheet_order_win(self):
+        index = RequestIndex(REQUEST_SHEETS)
+
+        index.rebuild(config.SHEET_CNY, [["ID"], ["REQ-A"]])
+        index.rebuild(config.SHEET_JOURNAL, [["ID"], ["REQ-A"], ["REQ-A"]])
+
+        assert index.get("REQ-A") == RequestLocation(config.SHEET_JOURNAL, 2, config.CURRENCY_RUB)
+
+    def test_rebuild_replaces_previous_rows_of_sheet(self):
+        index = RequestIndex(REQUEST_SHEETS)
+        index.rebuild(config.SHEET_JOURNAL, [["ID"], ["REQ-A"]])
+
+        index.rebuild(config.SHEET_JOURNAL, [["ID"], ["REQ-B"], ["REQ-A"]])
+
+        assert index.get("REQ-A").row == 3
+
+    def test_add_and_headers(self):
+        index = RequestIndex(REQUEST_SHEETS)
+        index.rebuild(config.SHEET_CNY, [["ID", "Дата"]])
+
+        index.add(config.SHEET_CNY, "REQ-NEW", 2)
+
+        assert index.get("REQ-NEW").row == 2
+        assert index.headers(config.SHEET_CNY) == ["ID", "Дата"]
+        assert index.headers(config.SHEET_USDT) is None
+
+
+# ── Запись без чтения листа ───────────────────────────────────────────────────
+
+class TestWritesWithoutReads:
+
+    def test_status_update_goes_straight_to_cell(self):
+        sheets = make_sheets(full_book())
+        warm(sheets)
+
+        assert sheets.update_request_status_by_id("REQ-2", config.STATUS_CANCELLED) is True
+
+        journal = sheets.get_worksheet(config.SHEET_JOURNAL)
+        journal.update_cell.assert_called_once_with(3, 11, config.STATUS_CANCELLED)
+        sheets.spreadsheet.values_batch_get.assert_not_called()
+        journal.get_all_values.assert_not_called()
+
+    def test_assign_executor_uses_cached_headers(self):
+        sheets = make_sheets(full_book())
+        warm(sheets)
+
+        assert sheets.assign_executor("REQ-1", "Пётр") is True
+
+        journal = sheets.get_worksheet(config.SHEET_JOURNAL)
+        journal.update_cell.assert_called_once_with(2, 16, "Пётр")
+        sheets.spreadsheet.values_batch_get.assert_not_called()
+
+    def test_complete_payment_by_id_issues_single_write(self):
+        sheets = make_sheets(full_book())
+        warm(sheets)
+
+        ok = sheets.complete_payment(
+            date="", amount=0, executor_name="Иван", deal_id="D-1",
+            currency=config.CURRENCY_USDT, request_id="REQ-3",
+        )
+
+        assert ok is True
+        usdt = sheets.get_worksheet(config.SHEET_USDT)
+        cells = usdt.update_cells.call_args.args[0]
+        assert {(c.row, c.col, c.value) for c in cells} == {
+            (2, 7, config.STATUS_PAID), (2, 8, "D-1"),
+        }
+        sheets.spreadsheet.values_batch_get.assert_not_called()
+
+    def test_created_request_is_indexed_from_append_response(self):
+        sheets = make_sheets(full_book())
+        warm(sheets)
+        usdt = sheets.get_worksheet(config.SHEET_USDT)
+        usdt.append_row.return_value = {
+            "updates": {"updatedRange": f"'{config.SHEET_USDT}'!A7:M7"}
+        }
+
+        request_id = sheets.create_request(
+            recipient="", amount=10, card_or_phone="TWallet", bank="",
+            purpose="тест", currency=config.CURRENCY_USDT,
+        )
+        usdt.acell.side_effect = None
+        usdt.acell.return_value = MagicMock(value=request_id)
+        sheets.update_request_status_by_id(request_id, config.STATUS_CANCELLED)
+
+        usdt.acell.assert_called_once_with("A7")
+        usdt.update_cell.assert_called_once_with(7, 7, config.STATUS_CANCELLED)
+        sheets.spreadsheet.values_batch_get.assert_not_called()
+
+    def test_shifted_rows_are_detected_before_write(self):
+        book = full_book()
+        sheets = make_sheets(book)
+        warm(sheets)
+
+        # Строку вставили вручную, снимок ещё свежий — индекс указывает на REQ-0
+        book[config.SHEET_JOURNAL].insert(1, main_row("REQ-0", "Создана"))
+
+        assert sheets.assign_executor("REQ-1", "Пётр") is True
+
+        journal = sheets.get_worksheet(config.SHEET_JOURNAL)
+        journal.update_cell.assert_called_once_with(3, 16, "Пётр")
+        assert sheets.request_index.get("REQ-1").row == 3
+
+    def test_deleted_row_is_not_overwritten(self):
+        book = full_book()
+        sheets = make_sheets(book)
+        warm(sheets)
+
+        # REQ-1 удалили вручную — на её строке теперь REQ-2
+        del book[config.SHEET_JOURNAL][1]
+
+        assert sheets.update_request_status_by_id("REQ-1", config.STATUS_CANCELLED) is False
+        sheets.get_worksheet(config.SHEET_JOURNAL).update_cell.assert_not_called()
+
+    def test_unknown_request_returns_false_without_write(self):
+        sheets = make_sheets(full_book())
+        warm(sheets)
+
+        assert sheets.update_request_status_by_id("REQ-404", config.STATUS_PAID) is False
+        sheets.get_worksheet.assert_not_called()
+
+
+# ── Чтение по индексу ─────────────────────────────────────────────────────────
+
+class TestReadsThroughIndex:
+
+    def test_get_request_by_request_id(self):
+        sheets = make_sheets(full_book())
+
+        request = sheets.get_request_by_request_id("REQ-3")
+
+        assert request["sheet_name"] == config.SHEET_USDT
+        assert request["amount"] == 50.0
+        assert request["status"] == "Создана"
+
+    def test_stale_row_is_detected_and_index_rebuilt(self):
+        book = full_book()
+        sheets = make_sheets(book)
+        warm(sheets)
+
+        # Кто-то вставил строку вручную — REQ-1 съехала на строку 3
+        book[config.SHEET_JOURNAL].insert(1, main_row("REQ-0", "Создана"))
+        sheets.snapshot.invalidate(config.SHEET_JOURNAL)
+
+        request = sheets.get_request_by_request_id("REQ-1")
+
+        assert request["request_id"] == "REQ-1"
+        assert sheets.request_index.get("REQ-1").row == 3
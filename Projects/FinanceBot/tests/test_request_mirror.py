@@ -0,0 +1,208 @@
+"""
+Тесты зеркала заявок для панели владельца (RequestMirror)
+=========================================================
+Контракт:
+- Страницы и статистика отдаются из памяти; порядок и состав как у
+  get_all_requests / get_requests_by_status.
+- Синхронизация декодирует только изменившиеся строки (по хешу строки),
+  агрегаты правятся на разницу.
+- Собственные записи бота видны в следующем запросе без ожидания фона.
+- Фон перечитывает листы, только пока зеркало читают или бот что-то записал.
+
+Запуск: .venv/Scripts/python -m pytest tests/test_request_mirror.py -v
+"""
+from src import config
+from src.request_mirror import RequestMirror
+from src.row_decoder import RowDecoder
+
+from tests.test_sheets_snapshot import full_book, main_row, make_sheets
+from tests.test_write_queue import with_queue
+
+
+HEADER = ["ID", "Дата", "Сумма", "Валюта", "Статус", "Исполнитель"]
+FIELDS = {"request_id": 0, "date": 1, "amount": 2, "currency": 3, "status": 4, "executor": 5}
+
+
+def make_mirror(data: dict, decoded: list) -> RequestMirror:
+    """Зеркало над словарём {лист: all_values}; decoded собирает разобранные строки."""
+    decoder = RowDecoder(FIELDS)
+
+    def decoder_for(sheet_name, currency, headers):
+        def decode(row):
+            decoded.append(row[0])
+            return decoder(row)
+        return decode
+
+    return RequestMirror(
+        load_values=lambda name: data[name],
+        sheets=[("A", "RUB"), ("B", "USDT")],
+        decoder_for=decoder_for,
+    )
+
+
+class TestRequestMirror:
+
+    def test_only_changed_rows_are_decoded(self):
+        data = {
+            "A": [HEADER, ["R1", "01.01.2026", "100", "RUB", "Создана", ""],
+                  ["R2", "02.01.2026", "50", "RUB", "Оплачена", "Иван"]],
+            "B": [HEADER, ["R3", "03.01.2026", "7", "USDT", "Создана", ""]],
+        }
+        decoded = []
+        mirror = make_mirror(data, decoded)
+        mirror.sync()
+        decoded.clear()
+
+        data["A"] = [HEADER, ["R1", "01.01.2026", "100", "RUB", "Оплачена", "Пётр"],
+                     data["A"][2]]
+        mirror.sync()
+
+        assert decoded == ["R1"]
+        stats = mirror.stats()
+        assert stats.counts == {config.STATUS_PAID: 2, config.STATUS_CREATED: 1}
+        assert stats.currency_sums(config.STATUS_CREATED) == {"USDT": 7.0}
+        assert stats.currency_sums(config.STATUS_PAID) == {"RUB": 150.0}
+        assert stats.top_executors(config.STATUS_PAID) == [("Иван", 1), ("Пётр", 1)]
+
+    def test_unchanged_values_are_not_rehashed(self):
+        data = {"A": [HEADER, ["R1", "", "1", "RUB", "Создана", ""]], "B": []}
+        decoded = []
+        mirror = make_mirror(data, decoded)
+
+        assert mirror.sync() == 1
+        assert mirror.sync() == 0
+
+    def test_removed_rows_leave_no_empty_keys(self):
+        data = {"A": [HEADER, ["R1", "15.01.2026", "0.1", "RUB", "Создана", "Иван"]], "B": []}
+        mirror = make_mirror(data, [])
+        mirror.sync()
+
+        data["A"] = [HEADER]
+        mirror.sync()
+
+        stats = mirror.stats()
+        assert stats.counts == stats.sums == stats.month_sums == stats.executor_counts == {}
+
+    def test_header_change_redecodes_sheet(self):
+        row = ["R1", "", "1", "RUB", "Создана", ""]
+        data = {"A": [HEADER, row], "B": []}
+        decoded = []
+        mirror = make_mirror(data, decoded)
+        mirror.sync()
+
+        data["A"] = [HEADER + ["Новая"], row]
+        mirror.sync()
+
+        assert decoded == ["R1", "R1"]
+        assert mirror.stats().counts == {config.STATUS_CREATED: 1}
+
+    def test_page_order_and_total(self):
+        data = {
+            "A": [HEADER,
+                  ["R1", "", "1", "RUB", "Оплачена", ""],
+                  ["R2", "", "1", "RUB", "Создана", ""]],
+            "B": [HEADER,
+                  ["R3", "", "1", "USDT", "Создана", ""],
+                  ["R4", "", "1", "USDT", "Черновик", ""]],
+        }
+        mirror = make_mirror(data, [])
+
+        total, page = mirror.page(None, 1, 5)
+
+        assert total == 3
+        assert [r["request_id"] for r in page] == ["R3", "R1"]
+        page[0]["status"] = "изменено"
+        assert mirror.page(config.STATUS_CREATED, 0, 5)[1][1]["status"] == config.STATUS_CREATED
+
+
+class TestSheetsManagerMirror:
+
+    def test_page_matches_get_all_requests(self):
+        sheets = make_sheets(full_book())
+
+        total, page = sheets.get_requests_page(None, 0, 100)
+
+        assert page == sheets.get_all_requests()
+        assert total == 3
+
+    def test_stats_from_sheets(self):
+        book = full_book()
+        book[config.SHEET_JOURNAL].append(main_row("REQ-4", config.STATUS_PAID, "Пётр"))
+        sheets = make_sheets(book)
+
+        stats = sheets.get_request_stats()
+
+        assert stats.counts == {config.STATUS_CREATED: 2, config.STATUS_PAID: 2}
+        assert stats.currency_sums(config.STATUS_CREATED) == {"RUB": 1000.0, "USDT": 50.0}
+        assert stats.month_currency_sums(config.STATUS_PAID, 1, 2026) == {"RUB": 2000.0}
+        assert stats.top_executors(config.STATUS_PAID) == [("Иван", 1), ("Пётр", 1)]
+
+    def test_own_write_visible_without_background_sync(self, tmp_path):
+        sheets = with_queue(tmp_path)
+        assert sheets.get_request_stats().counts[config.STATUS_CREATED] == 2
+
+        sheets.update_request_status_by_id("REQ-1", config.STATUS_CANCELLED)
+
+        stats = sheets.get_request_stats()
+        assert stats.counts[config.STATUS_CREATED] == 1
+        assert stats.counts[config.STATUS_CANCELLED] == 1
+        total, page = sheets.get_requests_page(config.STATUS_CANCELLED, 0, 5)
+        assert (total, page[0]["request_id"]) == (1, "REQ-1")
+
+    def test_refresh_rereads_sheets(self):
+        book = full_book()
+        sheets = make_sheets(book)
+        sheets.get_request_stats()
+        calls = sheets.spreadsheet.values_batch_get.call_count
+
+        book[config.SHEET_USDT].append(["REQ-5", "", "5", "", "", "", config.STATUS_CREATED])
+        sheets.get_request_stats()
+        stats = sheets.get_request_stats(refresh=True)
+
+        assert sheets.spreadsheet.values_batch_get.call_count == calls + 1
+        assert stats.currency_sums(config.STATUS_CREATED)["USDT"] == 55.0
+
+
+class TestBackgroundSync:
+
+    def make(self, data):
+        refreshed = []
+        mirror = make_mirror(data, [])
+        mirror._refresh = lambda: refreshed.append(1)
+        return mirror, refreshed
+
+    def test_idle_mirror_is_not_refreshed(self):
+        mirror, refreshed = self.make({"A": [HEADER], "B": [HEADER]})
+
+        assert mirror._background_sync() is True   # первая синхронизация
+        assert mirror._background_sync() is False
+        assert refreshed == []
+
+    def test_read_mirror_is_refreshed_once_per_tick(self):
+        mirror, refreshed = self.make({"A": [HEADER], "B": [HEADER]})
+        mirror._background_sync()
+
+        mirror.stats()
+        assert mirror._background_sync() is True
+        assert mirror._background_sync() is False
+        assert refreshed == [1]
+
+    def test_local_write_syncs_without_refresh(self):
+        mirror, refreshed = self.make({"A": [HEADER], "B": [HEADER]})
+        mirror._background_sync()
+
+        mirror.mark_dirty()
+        assert mirror._background_sync() is True
+        assert refreshed == []
+
+    def test_read_after_idle_resyncs(self):
+        data = {"A": [HEADER], "B": [HEADER]}
+        mirror, _ = self.make(data)
+        mirror._background_sync()
+        mirror._interval = 30
+
+        data["A"] = [HEADER, ["REQ-1", "", "10", "RUB", config.STATUS_CREATED, ""]]
+        assert mirror.stats().total == 0
+
+        mirror._synced_at -= 31
+        assert mirror.stats().total == 1
@@ -0,0 +1,125 @@
+"""
+Тесты декодера строк листов заявок (RowDecoder / DecodedSheet)
+==============================================================
+Контракт:
+- Декодер даёт тот же dict заявки, что и прежний разбор строки:
+  короткие строки дополняются '', суммы — float.
+- Фильтры по статусу/исполнителю/автору идут по колонкам, dict
+  собирается только для подошедших строк.
+- Лист разбирается один раз, пока снимок отдаёт те же данные.
+
+Запуск: .venv/Scripts/python -m pytest tests/test_row_decoder.py -v
+"""
+from unittest.mock import patch
+
+from src import config
+from src.row_decoder import DecodedSheet, RowDecoder
+
+from tests.test_sheets_snapshot import MAIN_HEADER, USDT_HEADER, full_book, main_row, make_sheets
+
+
+class TestRowDecoder:
+
+    def test_short_row_is_padded_and_amount_is_float(self):
+        decode = RowDecoder({"request_id": 0, "amount": 2, "executor": 5}, {"currency": "RUB"})
+
+        assert decode(["REQ-1", "", "1 000"]) == {
+            "currency": "RUB", "request_id": "REQ-1", "amount": 0.0, "executor": "",
+        }
+        assert decode(["REQ-1", "", "12.5"])["amount"] == 12.5
+
+    def test_column_overrides_constant(self):
+        decode = RowDecoder({"currency": 1}, {"currency": "RUB", "sheet_name": "S"})
+
+        assert decode(["x", "BYN"]) == {"currency": "BYN", "sheet_name": "S"}
+
+    def test_match_skips_short_rows_and_narrows_candidates(self):
+        rows = [["A", " Создана "], ["B", "Создана"], ["C"], ["D", "Оплачена"]]
+        table = DecodedSheet(rows, RowDecoder({"id": 0}))
+
+        assert table.match(1, {"Создана"}) == [1]
+        assert table.match(1, {"Создана"}, strip=True) == [0, 1]
+        assert table.match(0, {"A", "D"}, candidates=[1, 3]) == [3]
+        assert table.decode([0, 3]) == [{"id": "A"}, {"id": "D"}]
+
+
+class TestSheetsManagerDecoding:
+
+    def test_usdt_request_shape(self):
+        sheets = make_sheets(full_book())
+
+        request = sheets.get_request_by_request_id("REQ-3")
+
+        assert request == {
+            "request_id": "REQ-3", "date": "15.01.2026", "amount": 50.0,
+            "recipient": "", "card_or_phone": "", "bank": "", "details": "",
+            "purpose": "", "category": "", "status": "Создана", "deal_id": "",
+            "account_name": "", "executor": "", "author_id": "",
+            "author_username": "", "author_fullname": "", "receipt_link": "",
+            "currency": config.CURRENCY_USDT, "sheet_name": config.SHEET_USDT,
+        }
+
+    def test_cny_request_shape(self):
+        row = ["REQ-C", "15.01.2026", "300", "Alipay", "acc", "https://qr", "p", "c", "Создана"]
+        book = full_book()
+        book[config.SHEET_CNY] = [["ID заявки", "Дата", "Сумма"], row]
+        sheets = make_sheets(book)
+
+        found = sheets.get_requests_by_status("Создана")
+        request = next(r for r in found if r["request_id"] == "REQ-C")
+
+        assert (request["amount"], request["bank"], request["qr_code_link"]) == (
+            300.0, "Alipay", "https://qr"
+        )
+        assert (request["recipient"], request["details"], request["receipt_link"]) == ("", "", "")
+        assert request["sheet_name"] == config.SHEET_CNY
+
+    def test_rub_currency_comes_from_row(self):
+        row = main_row("REQ-9", "Создана")
+        row[3] = "BYN"
+        book = full_book()
+        book[config.SHEET_JOURNAL] = [MAIN_HEADER, row]
+        sheets = make_sheets(book)
+
+        request = sheets.get_request_by_request_id("REQ-9")
+
+        assert (request["currency"], request["amount"], request["sheet_name"]) == (
+            "BYN", 1000.0, config.SHEET_JOURNAL,
+        )
+
+    def test_author_filter(self):
+        mine, other = main_row("REQ-1", "Создана"), main_row("REQ-2", "Создана")
+        mine[16], other[16] = "111", "222"
+        book = full_book()
+        book[config.SHEET_JOURNAL] = [MAIN_HEADER, mine, other]
+        sheets = make_sheets(book)
+
+        found = sheets.get_requests_by_status(["Создана"], author_id=111)
+
+        assert [r["request_id"] for r in found] == ["REQ-1"]
+
+    def test_executor_filter_strips_cells(self):
+        padded = main_row("REQ-5", " Создана ", " Иван ")
+        book = full_book()
+        book[config.SHEET_JOURNAL].append(padded)
+        book[config.SHEET_USDT] = [USDT_HEADER]
+        sheets = make_sheets(book)
+
+        found = sheets._get_requests_filtered("Иван", "Создана")
+
+        assert [r["request_id"] for r in found] == ["REQ-1", "REQ-5"]
+        assert found[0]["currency"] == "RUB" and found[0]["sheet_name"] == config.SHEET_JOURNAL
+
+    def test_sheet_decoded_once_per_snapshot(self):
+        sheets = make_sheets(full_book())
+
+        with patch("src.sheets.DecodedSheet", wraps=DecodedSheet) as decoded:
+            sheets.get_requests_by_status("Создана")
+            sheets.get_requests_by_status("Оплачена")
+            built = decoded.call_count
+            sheets.snapshot.invalidate(config.SHEET_JOURNAL)
+            sheets.get_requests_by_status("Создана")
+
+        # Листы с данными: Журнал и USDT; после invalidate — только Журнал
+        assert built == 2
+        assert decoded.call_count == 3
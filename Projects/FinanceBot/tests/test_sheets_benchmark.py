@@ -0,0 +1,158 @@
+"""
+Бюджет API-вызовов SheetsManager на нагрузочном прогоне
+=======================================================
+Короткий прогон tests/sheets_benchmark.py (2000 строк, без задержек)
+в обоих режимах записи. Тесты ловят регрессии, которые видны только
+на цифрах: лишнее чтение листа в get_requests_by_status /
+_get_requests_filtered, запись мимо очереди, устаревшие списки.
+
+Полный прогон (10k–200k строк, задержки, квота):
+    .venv/Scripts/python -m tests.sheets_benchmark --rows 200000
+
+Запуск: .venv/Scripts/python -m pytest tests/test_sheets_benchmark.py -v
+"""
+import gspread
+import pytest
+
+from src import config
+from src.sheets_snapshot import REQUEST_SHEETS
+from src.write_queue import _row_from_append_response
+
+from tests.fake_gspread import FakeSpreadsheet, generate_book
+from tests.sheets_benchmark import run_benchmark
+
+FLOWS = 12
+
+
+@pytest.fixture(scope="module")
+def book():
+    return generate_book(2000)
+
+
+@pytest.fixture(scope="module")
+def write_behind_report(book, tmp_path_factory):
+    return run_benchmark(FakeSpreadsheet(book), FLOWS, write_behind=True,
+                         workdir=str(tmp_path_factory.mktemp("wb")))
+
+
+@pytest.fixture(scope="module")
+def direct_report(book, tmp_path_factory):
+    return run_benchmark(FakeSpreadsheet(book), FLOWS, write_behind=False,
+                         workdir=str(tmp_path_factory.mktemp("direct")))
+
+
+class TestFakeSpreadsheet:
+
+    def test_response_formats_match_sheets_api(self):
+        spreadsheet = FakeSpreadsheet({"A": [["h1", "h2", "h3"], ["1", "", ""]]})
+
+        batch = spreadsheet.values_batch_get(["'A'"])
+        response = spreadsheet.values_append(
+            "'A'", params={"valueInputOption": "USER_ENTERED"}, body={"values": [["2", "x"]]}
+        )
+
+        assert batch["valueRanges"][0]["values"] == [["h1", "h2", "h3"], ["1"]]
+        assert _row_from_append_response(response) == 3
+        assert spreadsheet.worksheet("A").get_all_values()[2] == ["2", "x", ""]
+        assert [c.method for c in spreadsheet.calls] == [
+            "values_batch_get", "values_append", "fetch_sheet_metadata", "get_all_values",
+        ]
+
+    def test_quota_exceeded_raises_429(self):
+        spreadsheet = FakeSpreadsheet({"A": [["h"]]}, quota_per_minute=2)
+        ws = spreadsheet.worksheet("A")
+        ws.get_all_values()
+
+        with pytest.raises(gspread.exceptions.APIError) as exc:
+            ws.get_all_values()
+
+        assert exc.value.response.status_code == 429
+        assert [c.throttled for c in spreadsheet.calls] == [False, False, True]
+        ws.update_cell(1, 1, "x")    # квота записей считается отдельно
+
+    def test_calls_are_attributed_to_capturing_thread(self):
+        spreadsheet = FakeSpreadsheet({"A": [["h"]]})
+
+        with spreadsheet.capture() as calls:
+            spreadsheet.values_batch_get(["'A'"])
+        spreadsheet.values_batch_get(["'A'"])
+
+        assert len(calls) == 1
+        assert len(spreadsheet.background) == 1
+        assert calls[0].bytes_received > 0
+
+
+class TestWriteBehindBudget:
+
+    def test_no_operation_fails(self, write_behind_report):
+        ops = write_behind_report.operations
+        assert {name: op.failures for name, op in ops.items() if op.failures} == {}
+        assert ops["create_request"].count == FLOWS
+
+    def test_handler_writes_do_not_call_api(self, write_behind_report):
+        ops = write_behind_report.operations
+        for name in ("create_request", "assign_executor", "update_receipt_url"):
+            assert ops[name].max_calls == 0, name
+
+    def test_flush_is_one_append_and_one_batch_update(self, write_behind_report):
+        assert write_behind_report.operations["flush_writes"].max_calls <= 2
+
+    def test_lists_read_sheets_at_most_once_per_flush(self, write_behind_report):
+        ops = write_behind_report.operations
+        list_reads = sum(ops[name].reads for name in (
+            "get_assigned_requests", "get_request_by_request_id", "complete_payment",
+            "get_requests_by_status", "get_requests_page", "get_request_stats",
+        ))
+
+        # Одно чтение снимка после каждого сброса плюс однократные
+        # метаданные листов (get_worksheet кэширует лист)
+        assert list_reads <= FLOWS + len(REQUEST_SHEETS)
+        assert ops["get_requests_by_status"].max_calls <= 1
+        assert ops["get_assigned_requests"].max_calls <= 1
+        assert ops["get_requests_page"].max_calls == 0
+        assert ops["get_request_stats"].max_calls == 0
+
+
+class TestDirectWriteBudget:
+
+    def test_no_operation_fails(self, direct_report):
+        ops = direct_report.operations
+        assert {name: op.failures for name, op in ops.items() if op.failures} == {}
+
+    def test_reads_cost_at_most_one_batch_call(self, direct_report):
+        ops = direct_report.operations
+        assert ops["get_requests_by_status"].max_calls <= 1
+        assert ops["get_assigned_requests"].max_calls <= 1
+        assert ops["get_request_by_request_id"].max_calls == 0
+
+    def test_writes_do_not_read_sheets(self, direct_report):
+        ops = direct_report.operations
+        assert ops["create_request"].max_calls <= 2
+        for name in ("assign_executor", "complete_payment", "update_receipt_url"):
+            # Единственное чтение — проверка ячейки A строки перед записью
+            assert ops[name].reads == ops[name].writes, name
+            assert ops[name].max_calls == 2, name
+
+
+class TestBenchmarkResult:
+
+    def test_paid_requests_reach_spreadsheet(self, book, tmp_path):
+        spreadsheet = FakeSpreadsheet(book)
+        run_benchmark(spreadsheet, 3, write_behind=True, workdir=str(tmp_path))
+
+        journal = spreadsheet.values(config.SHEET_JOURNAL)
+        created = [row for row in journal if "Нагрузка" in row[8]]
+
+        assert created
+        assert all(row[10] == config.STATUS_PAID for row in created)
+        assert all(row[19].startswith("https://drive.google.com/") for row in created)
+
+    def test_report_lists_every_operation(self, write_behind_report):
+        data = write_behind_report.to_dict()
+        text = write_behind_report.format()
+
+        assert data["mode"] == "write-behind"
+        assert data["rows"] == 2000
+        for name, op in data["operations"].items():
+            assert name in text
+            assert op["p99_ms"] >= op["p50_ms"]
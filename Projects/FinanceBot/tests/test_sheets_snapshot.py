@@ -0,0 +1,276 @@
+"""
+Тесты снимка листов заявок (SheetsSnapshot)
+===========================================
+Контракт:
+- Все листы заявок читаются ОДНИМ values_batch_get.
+- Повторные чтения в пределах TTL не ходят в Sheets.
+- Собственные записи бота инвалидируют снимок листа.
+
+Запуск: .venv/Scripts/python -m pytest tests/test_sheets_snapshot.py -v
+"""
+from unittest.mock import MagicMock
+
+import gspread
+import pytest
+
+from src import config
+from src.sheets import SheetsManager
+from src.sheets_snapshot import SheetsSnapshot
+
+
+MAIN_HEADER = [
+    "ID заявки", "Дата", "Сумма", "Валюта", "Получатель", "Номер карты/телефона",
+    "Банк", "Реквизиты", "Назначение", "Категория", "Статус", "ID сделки",
+    "Название аккаунта", "Сумма USDT", "Курс", "Исполнитель",
+    "Telegram ID инициатора", "Username инициатора", "Полное имя инициатора",
+]
+USDT_HEADER = [
+    "ID заявки", "Дата", "Сумма", "Адрес кошелька", "Назначение", "Категория",
+    "Статус", "ID транзакции", "Название аккаунта", "Исполнитель",
+    "Telegram ID инициатора", "Username инициатора", "Полное имя инициатора",
+]
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def make_sheets(data: dict) -> SheetsManager:
+    """
+    Создать SheetsManager с замоканной таблицей.
+
+    Args:
+        data: {sheet_name: all_values}. Листов, которых нет в data, "не существует".
+
+    Side effects:
+        - spreadsheet.values_batch_get отдаёт значения из data (хвосты строк
+          обрезаются, как это делает Sheets API).
+        - get_worksheet(name) → мок листа (acell читает колонку A из data);
+          для отсутствующего листа — WorksheetNotFound.
+    """
+    sheets = SheetsManager.__new__(SheetsManager)
+    sheets._hdr_cache = {}
+    sheets._missing_sheets = set()
+
+    def _batch_get(ranges):
+        value_ranges = []
+        for rng in ranges:
+            name = rng.strip("'")
+            if name not in data:
+                raise gspread.exceptions.APIError(MagicMock())
+            rows = [list(row) for row in data[name]]
+            for row in rows:
+                while row and row[-1] == "":
+                    row.pop()
+            value_ranges.append({"range": rng, "values": rows})
+        return {"valueRanges": value_ranges}
+
+    sheets.spreadsheet = MagicMock()
+    sheets.spreadsheet.values_batch_get = MagicMock(side_effect=_batch_get)
+
+    worksheets = {}
+
+    def _get_ws(name):
+        if name not in data:
+            raise gspread.WorksheetNotFound(name)
+        if name not in worksheets:
+            ws = MagicMock()
+            ws.get_all_values.return_value = data[name]
+            ws.acell.side_effect = lambda label, rows=data[name]: _cell(rows, label)
+            worksheets[name] = ws
+        return worksheets[name]
+
+    sheets.get_worksheet = MagicMock(side_effect=_get_ws)
+    return sheets
+
+
+def _cell(rows: list, label: str) -> MagicMock:
+    """Ячейка A1-нотации из rows, как Worksheet.acell (только колонка A)."""
+    row = int(label[1:])
+    value = rows[row - 1][0] if row <= len(rows) and rows[row - 1] else None
+    return MagicMock(value=value)
+
+
+def main_row(request_id: str, status: str, executor: str = "") -> list:
+    row = [""] * len(MAIN_HEADER)
+    row[0], row[1], row[2], row[3] = request_id, "15.01.2026", "1000", "RUB"
+    row[10], row[15] = status, executor
+    return row
+
+
+def usdt_row(request_id: str, status: str) -> list:
+    row = [""] * len(USDT_HEADER)
+    row[0], row[1], row[2], row[6] = request_id, "15.01.2026", "50", status
+    return row
+
+
+def full_book() -> dict:
+    return {
+        config.SHEET_JOURNAL: [MAIN_HEADER, main_row("REQ-1", "Создана", "Иван"),
+                               main_row("REQ-2", "Оплачена", "Иван")],
+        config.SHEET_OTHER_PAYMENTS: [MAIN_HEADER],
+        config.SHEET_USDT_SALARIES: [USDT_HEADER],
+        config.SHEET_USDT: [USDT_HEADER, usdt_row("REQ-3", "Создана")],
+        config.SHEET_CNY: [["ID заявки", "Дата", "Сумма"]],
+    }
+
+
+# ── SheetsSnapshot ────────────────────────────────────────────────────────────
+
+class TestSheetsSnapshot:
+
+    def test_stale_sheets_are_fetched_in_one_call(self):
+        fetch = MagicMock(return_value={"A": [["h"]], "B": [["h"], ["1"]]})
+        snap = SheetsSnapshot(fetch, ["A", "B"], ttl=60)
+
+        assert snap.get_values("A") == [["h"]]
+        assert snap.get_values("B") == [["h"], ["1"]]
+        fetch.assert_called_once_with(["A", "B"])
+
+    def test_invalidate_refetches_only_that_sheet(self):
+        fetch = MagicMock(return_value={"A": [], "B": []})
+        snap = SheetsSnapshot(fetch, ["A", "B"], ttl=60)
+        snap.get_values("A")
+
+        snap.invalidate("B")
+        snap.get_values("A")
+        assert fetch.call_count == 1
+
+        snap.get_values("B")
+        assert fetch.call_args.args[0] == ["B"]
+
+    def test_expired_ttl_refetches(self):
+        fetch = MagicMock(return_value={"A": []})
+        snap = SheetsSnapshot(fetch, ["A"], ttl=0)
+
+        snap.get_values("A")
+        snap.get_values("A")
+
+        assert fetch.call_count == 2
+
+    def test_failed_refresh_keeps_previous_data_and_retries(self):
+        fetch = MagicMock(return_value={"A": [["h"], ["1"]]})
+        snap = SheetsSnapshot(fetch, ["A"], ttl=60)
+        snap.get_values("A")
+
+        snap.invalidate("A")
+        fetch.return_value = {}
+        assert snap.get_values("A") == [["h"], ["1"]]
+
+        fetch.return_value = {"A": [["h"], ["2"]]}
+        assert snap.get_values("A") == [["h"], ["2"]]
+        assert fetch.call_count == 3
+
+    def test_failed_first_read_raises(self):
+        snap = SheetsSnapshot(MagicMock(return_value={}), ["A"], ttl=60)
+
+        with pytest.raises(RuntimeError):
+            snap.get_values("A")
+
+
+# ── SheetsManager поверх снимка ───────────────────────────────────────────────
+
+class TestSheetsManagerSnapshot:
+
+    def test_status_lookup_costs_one_batch_call(self):
+        sheets = make_sheets(full_book())
+
+        created = sheets.get_requests_by_status(config.STATUS_CREATED)
+
+        assert {r["request_id"] for r in created} == {"REQ-1", "REQ-3"}
+        assert sheets.spreadsheet.values_batch_get.call_count == 1
+        sheets.get_worksheet.assert_not_called()
+
+    def test_repeated_reads_are_served_from_memory(self):
+        sheets = make_sheets(full_book())
+
+        sheets.get_requests_by_status(config.STATUS_CREATED)
+        sheets.get_request_by_request_id("REQ-3")
+        sheets.get_assigned_requests("Иван")
+
+        assert sheets.spreadsheet.values_batch_get.call_count == 1
+
+    def test_rows_are_padded_like_get_all_values(self):
+        sheets = make_sheets(full_book())
+
+        rows = sheets.snapshot.get_values(config.SHEET_JOURNAL)
+
+        assert all(len(row) == len(MAIN_HEADER) for row in rows)
+        assert rows[1][15] == "Иван"
+
+    def test_write_invalidates_written_sheet(self):
+        sheets = make_sheets(full_book())
+        sheets.get_request_by_request_id("REQ-1")
+
+        assert sheets.assign_executor("REQ-1", "Пётр") is True
+        sheets.get_request_by_request_id("REQ-1")
+
+        assert sheets.spreadsheet.values_batch_get.call_count == 2
+        last_ranges = sheets.spreadsheet.values_batch_get.call_args.args[0]
+        assert last_ranges == [f"'{config.SHEET_JOURNAL}'"]
+
+    def test_missing_sheet_falls_back_and_is_excluded(self):
+        book = full_book()
+        del book[config.SHEET_OTHER_PAYMENTS]
+        sheets = make_sheets(book)
+
+        created = sheets.get_requests_by_status(config.STATUS_CREATED)
+        assert len(created) == 2
+        assert config.SHEET_OTHER_PAYMENTS in sheets._missing_sheets
+
+        sheets.snapshot.invalidate()
+        sheets.get_requests_by_status(config.STATUS_CREATED)
+        last_ranges = sheets.spreadsheet.values_batch_get.call_args.args[0]
+        assert f"'{config.SHEET_OTHER_PAYMENTS}'" not in last_ranges
+
+    def test_transient_error_is_not_cached_as_empty_sheet(self):
+        sheets = make_sheets(full_book())
+        assert sheets.get_request_by_request_id("REQ-1") is not None
+
+        # batch и чтение листа падают с ошибкой API
+        sheets.spreadsheet.values_batch_get.side_effect = Exception("503")
+        journal = sheets.get_worksheet(config.SHEET_JOURNAL)
+        journal.get_all_values.side_effect = Exception("503")
+        sheets.snapshot.invalidate()
+
+        assert sheets.get_request_by_request_id("REQ-1") is not None
+        assert config.SHEET_JOURNAL not in sheets._missing_sheets
+
+    def test_rate_limited_batch_is_not_split_into_sheet_reads(self):
+        sheets = make_sheets(full_book())
+        assert sheets.get_request_by_request_id("REQ-1") is not None
+        journal = sheets.get_worksheet(config.SHEET_JOURNAL)
+        sheets.get_worksheet.reset_mock()
+
+        sheets.spreadsheet.values_batch_get.side_effect = (
+            gspread.exceptions.APIError(MagicMock(status_code=429))
+        )
+        sheets.snapshot.invalidate()
+
+        assert sheets.get_request_by_request_id("REQ-1") is not None
+        assert sheets.spreadsheet.values_batch_get.call_count == 2
+        sheets.get_worksheet.assert_not_called()
+        journal.get_all_values.assert_not_called()
+        assert sheets._missing_sheets == set()
+
+    def test_create_request_takes_row_number_from_append_response(self):
+        sheets = make_sheets(full_book())
+        journal = sheets.get_worksheet(config.SHEET_JOURNAL)
+        journal.append_row.return_value = {
+            "updates": {"updatedRange": f"'{config.SHEET_JOURNAL}'!A124:S124"}
+        }
+
+        request_id = sheets.create_request(
+            recipient="Иван", amount=1000, card_or_phone="4276", bank="Сбер",
+            purpose="тест", currency=config.CURRENCY_RUB,
+        )
+
+        assert request_id is not None
+        journal.get_all_values.assert_not_called()
+        row, col, formula = journal.update_cell.call_args.args
+        assert (row, col) == (124, 8)
+        assert "E124" in formula
+
+
+@pytest.mark.parametrize("response", [None, {}, {"updates": {"updatedRange": "bad"}}])
+def test_row_from_append_response_handles_garbage(response):
+    from src.sheets import _row_from_append_response
+    assert _row_from_append_response(response) is None
@@ -0,0 +1,202 @@
+"""
+Тесты async-клиента Tronscan — src/utils/tronscan_client.py
+===========================================================
+Клиент ходит в локальный stub-сервер (http.server в потоке), сеть не нужна.
+
+Контракт:
+- 429 / 5xx повторяются с паузой, 404 — сразу None.
+- Подтверждённые транзакции кэшируются на диске и переживают перезапуск.
+- verify_payments: одинаковые хеши запрашиваются один раз, параллельность
+  ограничена max_concurrency.
+
+Запуск: .venv/Scripts/python -m pytest tests/test_tronscan_client.py -v
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.utils.tronscan import TronTransaction
+from src.utils.tronscan_client import ExpectedPayment, TronscanClient, TronTxCache
+
+HASH_A = "a" * 64
+HASH_B = "b" * 64
+WALLET = "TXYZabc123"
+
+
+def usdt_tx(tx_hash: str, amount_str: str = "1500000000", confirmed: bool = True) -> dict:
+    return {
+        "hash": tx_hash,
+        "confirmed": confirmed,
+        "ownerAddress": "TSender",
+        "trc20TransferInfo": [
+            {"to_address": WALLET, "symbol": "USDT", "decimals": 6, "amount_str": amount_str}
+        ],
+    }
+
+
+class StubTronscan:
+    """
+    Локальный Tronscan: transactions[hash] -> dict, script[hash] -> список
+    HTTP-статусов, которые отдаются перед успешным ответом.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.transactions = {}
+        self.script = {}
+        self.requests = []
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                tx_hash = parse_qs(urlparse(self.path).query).get("hash", [""])[0]
+                with stub._lock:
+                    stub.requests.append(tx_hash)
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                    statuses = stub.script.get(tx_hash, [])
+                    status = statuses.pop(0) if statuses else None
+                time.sleep(stub.delay)
+                with stub._lock:
+                    stub.active -= 1
+
+                if status is None:
+                    tx = stub.transactions.get(tx_hash)
+                    status, body = (200, tx) if tx else (200, {})
+                else:
+                    body = {"error": "stub"}
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/transaction-info"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubTronscan()
+    yield server
+    server.close()
+
+
+def make_client(stub, cache=None, **kwargs) -> TronscanClient:
+    kwargs.setdefault("backoff", 0)
+    return TronscanClient(api_url=stub.url, cache=cache, **kwargs)
+
+
+class TestTronscanClient:
+
+    async def test_retries_429_and_5xx(self, stub):
+        stub.transactions[HASH_A] = usdt_tx(HASH_A)
+        stub.script[HASH_A] = [429, 503]
+        client = make_client(stub)
+
+        tx = await client.get_transaction(HASH_A)
+        await client.aclose()
+
+        assert tx == TronTransaction(HASH_A, "TSender", WALLET, 1500.0, "USDT")
+        assert stub.requests == [HASH_A] * 3
+
+    async def test_gives_up_after_retries(self, stub):
+        stub.script[HASH_A] = [500] * 5
+        client = make_client(stub, retries=2)
+
+        assert await client.get_transaction(HASH_A) is None
+        await client.aclose()
+        assert len(stub.requests) == 3
+
+    async def test_client_error_is_not_retried(self, stub):
+        stub.script[HASH_A] = [404]
+        client = make_client(stub)
+
+        assert await client.get_transaction(HASH_A) is None
+        await client.aclose()
+        assert len(stub.requests) == 1
+
+    async def test_confirmed_tx_cached_on_disk(self, stub, tmp_path):
+        stub.transactions[HASH_A] = usdt_tx(HASH_A)
+        path = str(tmp_path / "cache.sqlite3")
+        client = make_client(stub, cache=TronTxCache(path))
+        await client.parse_url(f"https://tronscan.org/#/transaction/{HASH_A}")
+        await client.aclose()
+
+        restarted = make_client(stub, cache=TronTxCache(path))
+        tx = await restarted.get_transaction(HASH_A.upper())
+        await restarted.aclose()
+
+        assert tx.amount == 1500.0
+        assert stub.requests == [HASH_A]
+
+    async def test_unconfirmed_tx_not_cached(self, stub, tmp_path):
+        stub.transactions[HASH_A] = usdt_tx(HASH_A, confirmed=False)
+        client = make_client(stub, cache=TronTxCache(str(tmp_path / "c.sqlite3")))
+
+        await client.get_transaction(HASH_A)
+        await client.get_transaction(HASH_A)
+        await client.aclose()
+
+        assert len(stub.requests) == 2
+
+    async def test_verify_payments_batch(self, stub):
+        stub.delay = 0.05
+        hashes = [f"{i:064x}" for i in range(8)]
+        for h in hashes:
+            stub.transactions[h] = usdt_tx(h)
+        payments = [ExpectedPayment(h, WALLET, 1500.0) for h in hashes]
+        payments.append(ExpectedPayment(hashes[0], "TOther", 1500.0))   # тот же хеш
+        payments.append(ExpectedPayment(HASH_B, WALLET, 1500.0))        # не найдена
+        payments.append(ExpectedPayment("не ссылка", WALLET, 1500.0))
+        client = make_client(stub, max_concurrency=3)
+
+        checks = await client.verify_payments(payments)
+        await client.aclose()
+
+        assert [c.ok for c in checks] == [True] * 8 + [False, False, False]
+        assert checks[8].wallet_ok is False and checks[8].amount_ok is True
+        assert checks[9].error == "транзакция не найдена"
+        assert checks[10].error == "нет хеша транзакции"
+        assert sorted(stub.requests) == sorted(hashes + [HASH_B])
+        assert stub.max_active <= 3
+
+
+class TestTronTxCache:
+
+    def test_lru_evicts_least_recently_used(self, tmp_path):
+        cache = TronTxCache(str(tmp_path / "c.sqlite3"), max_entries=2)
+        a = TronTransaction(HASH_A, "s", "r", 1.0, "USDT")
+        b = TronTransaction(HASH_B, "s", "r", 2.0, "USDT")
+        c = TronTransaction("c" * 64, "s", "r", 3.0, "USDT")
+        cache.put(a)
+        time.sleep(0.01)
+        cache.put(b)
+        time.sleep(0.01)
+        cache.get(HASH_A)
+        time.sleep(0.01)
+
+        cache.put(c)
+
+        assert len(cache) == 2
+        assert cache.get(HASH_B) is None
+        assert cache.get(HASH_A) == a
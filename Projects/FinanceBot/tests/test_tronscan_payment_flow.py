@@ -103,7 +103,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context()
 
-        with patch("src.handlers.payment.parse_tronscan_url", return_value=make_tx()), \
+        with patch("src.handlers.payment.fetch_tronscan_tx", return_value=make_tx()), \
              patch("src.handlers.payment.show_payment_confirmation_message",
                    new=AsyncMock(return_value=CONFIRM_PAYMENT)) as mock_confirm:
             result = await enter_deal_id(update, ctx)
@@ -117,7 +117,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context()
 
-        with patch("src.handlers.payment.parse_tronscan_url", return_value=make_tx()), \
+        with patch("src.handlers.payment.fetch_tronscan_tx", return_value=make_tx()), \
              patch("src.handlers.payment.show_payment_confirmation_message",
                    new=AsyncMock(return_value=CONFIRM_PAYMENT)):
             await enter_deal_id(update, ctx)
@@ -130,7 +130,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context()
 
-        with patch("src.handlers.payment.parse_tronscan_url", return_value=make_tx()), \
+        with patch("src.handlers.payment.fetch_tronscan_tx", return_value=make_tx()), \
              patch("src.handlers.payment.show_payment_confirmation_message",
                    new=AsyncMock(return_value=CONFIRM_PAYMENT)):
             await enter_deal_id(update, ctx)
@@ -143,7 +143,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context()
 
-        with patch("src.handlers.payment.parse_tronscan_url", return_value=make_tx()), \
+        with patch("src.handlers.payment.fetch_tronscan_tx", return_value=make_tx()), \
              patch("src.handlers.payment.show_payment_confirmation_message",
                    new=AsyncMock(return_value=CONFIRM_PAYMENT)):
             await enter_deal_id(update, ctx)
@@ -156,7 +156,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context(wallet=WALLET_OK)
 
-        with patch("src.handlers.payment.parse_tronscan_url",
+        with patch("src.handlers.payment.fetch_tronscan_tx",
                    return_value=make_tx(recipient=WALLET_WRONG)):
             result = await enter_deal_id(update, ctx)
 
@@ -168,7 +168,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context(wallet=WALLET_OK)
 
-        with patch("src.handlers.payment.parse_tronscan_url",
+        with patch("src.handlers.payment.fetch_tronscan_tx",
                    return_value=make_tx(recipient=WALLET_WRONG)):
             await enter_deal_id(update, ctx)
 
@@ -182,7 +182,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context(wallet=WALLET_OK)
 
-        with patch("src.handlers.payment.parse_tronscan_url",
+        with patch("src.handlers.payment.fetch_tronscan_tx",
                    return_value=make_tx(recipient=WALLET_WRONG)):
             await enter_deal_id(update, ctx)
 
@@ -198,7 +198,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context(amount=AMOUNT_OK)
 
-        with patch("src.handlers.payment.parse_tronscan_url",
+        with patch("src.handlers.payment.fetch_tronscan_tx",
                    return_value=make_tx(amount=AMOUNT_WRONG)):
             result = await enter_deal_id(update, ctx)
 
@@ -210,7 +210,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context(amount=AMOUNT_OK)
 
-        with patch("src.handlers.payment.parse_tronscan_url",
+        with patch("src.handlers.payment.fetch_tronscan_tx",
                    return_value=make_tx(amount=AMOUNT_WRONG)):
             await enter_deal_id(update, ctx)
 
@@ -224,7 +224,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context(wallet=WALLET_OK, amount=AMOUNT_OK)
 
-        with patch("src.handlers.payment.parse_tronscan_url",
+        with patch("src.handlers.payment.fetch_tronscan_tx",
                    return_value=make_tx(recipient=WALLET_WRONG, amount=AMOUNT_WRONG)):
             result = await enter_deal_id(update, ctx)
 
@@ -239,7 +239,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context()
 
-        with patch("src.handlers.payment.parse_tronscan_url", return_value=None):
+        with patch("src.handlers.payment.fetch_tronscan_tx", return_value=None):
             result = await enter_deal_id(update, ctx)
 
         assert result == ENTER_DEAL_ID
@@ -250,7 +250,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context()
 
-        with patch("src.handlers.payment.parse_tronscan_url", return_value=None):
+        with patch("src.handlers.payment.fetch_tronscan_tx", return_value=None):
             await enter_deal_id(update, ctx)
 
         call_kwargs = update.message.reply_text.call_args_list[-1][1]
@@ -265,7 +265,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context(amount=1500.0)
 
-        with patch("src.handlers.payment.parse_tronscan_url",
+        with patch("src.handlers.payment.fetch_tronscan_tx",
                    return_value=make_tx(amount=1500.005)), \
              patch("src.handlers.payment.show_payment_confirmation_message",
                    new=AsyncMock(return_value=CONFIRM_PAYMENT)):
@@ -279,7 +279,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context(amount=1500.0)
 
-        with patch("src.handlers.payment.parse_tronscan_url",
+        with patch("src.handlers.payment.fetch_tronscan_tx",
                    return_value=make_tx(amount=1500.02)):
             result = await enter_deal_id(update, ctx)
 
@@ -291,7 +291,7 @@ class TestTronscanAutoMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context(wallet=WALLET_OK.upper())
 
-        with patch("src.handlers.payment.parse_tronscan_url",
+        with patch("src.handlers.payment.fetch_tronscan_tx",
                    return_value=make_tx(recipient=WALLET_OK.lower())), \
              patch("src.handlers.payment.show_payment_confirmation_message",
                    new=AsyncMock(return_value=CONFIRM_PAYMENT)):
@@ -344,7 +344,7 @@ class TestManualMode:
         update = make_update(TRONSCAN_URL)
         ctx = make_context(currency=config.CURRENCY_RUB)
 
-        with patch("src.handlers.payment.parse_tronscan_url") as mock_parse:
+        with patch("src.handlers.payment.fetch_tronscan_tx") as mock_parse:
             result = await enter_deal_id(update, ctx)
 
         mock_parse.assert_not_called()
@@ -361,7 +361,7 @@ class TestUsdtManualFlag:
         update = make_update(VALID_HASH)
         ctx = make_context(usdt_manual=True)
 
-        with patch("src.handlers.payment.parse_tronscan_url") as mock_parse:
+        with patch("src.handlers.payment.fetch_tronscan_tx") as mock_parse:
             result = await enter_deal_id(update, ctx)
 
         mock_parse.assert_not_called()
@@ -373,7 +373,7 @@ class TestUsdtManualFlag:
         update = make_update(VALID_HASH)
         ctx = make_context(usdt_manual=True)
 
-        with patch("src.handlers.payment.parse_tronscan_url"):
+        with patch("src.handlers.payment.fetch_tronscan_tx"):
             await enter_deal_id(update, ctx)
 
         assert ctx.user_data["deal_id"] == VALID_HASH
@@ -384,7 +384,7 @@ class TestUsdtManualFlag:
         update = make_update("some deal id")
         ctx = make_context(usdt_manual=True)
 
-        with patch("src.handlers.payment.parse_tronscan_url"):
+        with patch("src.handlers.payment.fetch_tronscan_tx"):
             await enter_deal_id(update, ctx)
 
         assert "usdt_manual" not in ctx.user_data
@@ -395,7 +395,7 @@ class TestUsdtManualFlag:
         update = make_update(TRONSCAN_URL)
         ctx = make_context(usdt_manual=True)
 
-        with patch("src.handlers.payment.parse_tronscan_url") as mock_parse:
+        with patch("src.handlers.payment.fetch_tronscan_tx") as mock_parse:
             result = await enter_deal_id(update, ctx)
 
         mock_parse.assert_not_called()
@@ -0,0 +1,140 @@
+"""
+Тесты очереди загрузок в Google Drive (DriveUploadQueue)
+========================================================
+Контракт:
+- Файл лежит в spool-каталоге до успешной загрузки; после перезапуска
+  незагруженные файлы догружаются.
+- Ошибка загрузки повторяется; после исчерпания повторов файл уходит
+  в failed/, обработчик получает ссылку None.
+- Обработчик завершения вызывается один раз, future submit() получает ссылку.
+- Задачи без обработчика после перезапуска удаляются (их ждал future хендлера).
+
+Запуск: .venv/Scripts/python -m pytest tests/test_upload_queue.py -v
+"""
+import os
+import threading
+from unittest.mock import AsyncMock
+
+from src.upload_queue import DriveUploadQueue
+
+
+class FakeDrive:
+    """upload(path, filename, mime_type): падает fail_times раз, потом отдаёт ссылку."""
+
+    def __init__(self, fail_times: int = 0):
+        self.fail_times = fail_times
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def upload(self, path, filename, mime_type):
+        with open(path, "rb") as f:
+            data = f.read()
+        with self._lock:
+            self.calls.append((filename, data))
+            if len(self.calls) <= self.fail_times:
+                raise RuntimeError("503")
+        return f"https://drive/{filename}"
+
+
+def make_queue(tmp_path, drive, **kwargs) -> DriveUploadQueue:
+    kwargs.setdefault("backoff", 0)
+    return DriveUploadQueue(drive.upload, str(tmp_path / "spool"), **kwargs)
+
+
+def spool(queue: DriveUploadQueue, kind: str, filename: str, data: bytes, meta=None):
+    job = queue.new_job(kind, filename, "image/jpeg", meta=meta)
+    with open(job.path, "wb") as f:
+        f.write(data)
+    return job
+
+
+class TestDriveUploadQueue:
+
+    async def test_upload_calls_handler_and_cleans_spool(self, tmp_path):
+        drive = FakeDrive()
+        queue = make_queue(tmp_path, drive)
+        handler = AsyncMock()
+        queue.on_done("receipt", handler)
+        queue.start()
+
+        job = spool(queue, "receipt", "r.jpg", b"img", meta={"request_id": "REQ-1"})
+        link = await queue.submit(job)
+        await queue.join()
+        await queue.close()
+
+        assert link == "https://drive/r.jpg"
+        handler.assert_awaited_once()
+        done_job, done_link = handler.await_args.args
+        assert (done_job.meta["request_id"], done_link) == ("REQ-1", link)
+        assert os.listdir(queue.spool_dir) == []
+
+    async def test_transient_errors_are_retried(self, tmp_path):
+        drive = FakeDrive(fail_times=2)
+        queue = make_queue(tmp_path, drive, retries=3)
+        queue.start()
+
+        link = await queue.submit(spool(queue, "", "r.jpg", b"img"))
+        await queue.close()
+
+        assert link == "https://drive/r.jpg"
+        assert len(drive.calls) == 3
+
+    async def test_exhausted_retries_move_file_to_failed(self, tmp_path):
+        drive = FakeDrive(fail_times=10)
+        queue = make_queue(tmp_path, drive, retries=1)
+        handler = AsyncMock()
+        queue.on_done("qr", handler)
+        queue.start()
+
+        job = spool(queue, "qr", "q.jpg", b"img")
+        assert await queue.submit(job) is None
+        await queue.join()
+        await queue.close()
+
+        assert handler.await_args.args[1] is None
+        assert sorted(os.listdir(queue.failed_dir)) == sorted(
+            [os.path.basename(job.path), f"{job.job_id}.json"]
+        )
+
+    async def test_spooled_files_resume_after_restart(self, tmp_path):
+        # Бот упал после постановки в очередь: на диске файл и манифест
+        first = make_queue(tmp_path, FakeDrive())
+        first._write_manifest(spool(first, "receipt", "r.jpg", b"data", meta={"chat_id": 1}))
+
+        drive = FakeDrive()
+        restarted = make_queue(tmp_path, drive)
+        handler = AsyncMock()
+        restarted.on_done("receipt", handler)
+        restarted.start()
+        await restarted.join()
+        await restarted.close()
+
+        assert drive.calls == [("r.jpg", b"data")]
+        assert handler.await_args.args[0].meta == {"chat_id": 1}
+
+    async def test_spooled_jobs_without_handler_are_dropped(self, tmp_path):
+        # Задача без обработчика: её результат ждал хендлер, которого уже нет
+        first = make_queue(tmp_path, FakeDrive())
+        job = spool(first, "", "qr.jpg", b"data")
+        first._write_manifest(job)
+
+        drive = FakeDrive()
+        restarted = make_queue(tmp_path, drive)
+        restarted.start()
+        await restarted.join()
+        await restarted.close()
+
+        assert drive.calls == []
+        assert not os.path.exists(job.path)
+        assert restarted._load_spooled() == []
+
+    async def test_handler_error_does_not_stop_worker(self, tmp_path):
+        queue = make_queue(tmp_path, FakeDrive(), workers=1)
+        queue.on_done("receipt", AsyncMock(side_effect=RuntimeError("sheets down")))
+        queue.start()
+
+        await queue.submit(spool(queue, "receipt", "a.jpg", b"1"))
+        second = await queue.submit(spool(queue, "receipt", "b.jpg", b"2"))
+        await queue.close()
+
+        assert second == "https://drive/b.jpg"
@@ -12,6 +12,8 @@ from unittest.mock import MagicMock, call
 from src import config
 from src.sheets import SheetsManager
 
+from tests.test_users_table import serve_cells
+
 
 # ── Fixtures ──────────────────────────────────────────────────────────────────
 
@@ -31,7 +33,7 @@ def make_sheets_with_users(users: list[dict]) -> SheetsManager:
         - НЕ подключается к Google Sheets.
     """
     sheets = SheetsManager.__new__(SheetsManager)
-    ws = MagicMock()
+    ws = serve_cells(MagicMock())
 
     header = ["Telegram ID", "Имя", "Username", "Роль"]
     rows = [[str(u["telegram_id"]), u["name"], "", u["role"]] for u in users]
@@ -121,7 +123,7 @@ class TestUpdateUserRole:
     def test_given_scientific_notation_tid_when_role_changed_then_success(self):
         """Google Sheets хранит большие ID как 8.45E+09 — должно работать."""
         sheets = SheetsManager.__new__(SheetsManager)
-        ws = MagicMock()
+        ws = serve_cells(MagicMock())
         # Google Sheets возвращает научную нотацию для больших TID
         ws.get_all_values.return_value = [
             ["Telegram ID", "Имя", "Username", "Роль"],
@@ -159,7 +161,7 @@ class TestGetAllUsers:
     def test_empty_sheet_returns_empty_list(self):
         """Пустой лист → []."""
         sheets = SheetsManager.__new__(SheetsManager)
-        ws = MagicMock()
+        ws = serve_cells(MagicMock())
         ws.get_all_values.return_value = [
             ["Telegram ID", "Имя", "Username", "Роль"]  # только заголовок
         ]
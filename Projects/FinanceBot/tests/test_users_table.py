@@ -0,0 +1,184 @@
+"""
+Тесты листа Пользователи в памяти (UsersTable)
+==============================================
+Контракт:
+- Лист читается один раз; get_user / get_user_role / is_user_active /
+  get_users_by_role / get_all_users дальше работают из памяти.
+- update_user_role / deactivate_user / add_user сбрасывают таблицу —
+  следующая проверка прав видит изменение.
+
+Запуск: .venv/Scripts/python -m pytest tests/test_users_table.py -v
+"""
+from unittest.mock import MagicMock
+
+from gspread.utils import a1_to_rowcol
+
+from src import config
+from src.sheets import SheetsManager
+from src.users_table import UsersTable, parse_telegram_id
+
+
+HEADER = ["Telegram ID", "Имя", "Username", "Роль"]
+
+
+def serve_cells(ws: MagicMock) -> MagicMock:
+    """ws.acell(label) отдаёт ячейку из текущего ws.get_all_values.return_value."""
+    def _acell(label):
+        row, col = a1_to_rowcol(label)
+        values = ws.get_all_values.return_value
+        line = values[row - 1] if row <= len(values) else []
+        return MagicMock(value=line[col - 1] if col <= len(line) else None)
+
+    ws.acell.side_effect = _acell
+    return ws
+
+
+def make_sheets(rows: list) -> SheetsManager:
+    sheets = SheetsManager.__new__(SheetsManager)
+    ws = serve_cells(MagicMock())
+    ws.get_all_values.return_value = [HEADER] + rows
+    sheets.users_sheet = ws
+    return sheets
+
+
+USERS = [
+    ["111", "Иван", "ivan", "Владелец"],
+    ["8.45E+09", "Константин", "kostya", "Менеджер"],
+    ["222", "Мария", "", "Исполнитель"],
+    ["333", "Пётр", "", "Исполнитель"],
+    ["444", "Уволен", "", ""],
+    ["", "Без ID", "", "Менеджер"],
+]
+
+
+class TestUsersTable:
+
+    def test_indexes_by_id_and_role(self):
+        table = UsersTable(lambda: [HEADER] + USERS, ttl=60)
+
+        assert table.get(8450000000).name == "Константин"
+        assert table.get(444).role == ""
+        assert [r.name for r in table.by_role(config.ROLE_EXECUTOR)] == ["Мария", "Пётр"]
+        assert len(table.all()) == 5
+
+    def test_duplicate_id_first_row_wins(self):
+        rows = [HEADER, ["1", "A", "", "Владелец"], ["1", "B", "", "Менеджер"]]
+        table = UsersTable(lambda: rows, ttl=60)
+
+        record = table.get(1)
+
+        assert (record.name, record.row) == ("A", 2)
+
+    def test_sheet_read_once_within_ttl(self):
+        fetch = MagicMock(return_value=[HEADER] + USERS)
+        table = UsersTable(fetch, ttl=60)
+
+        table.get(111)
+        table.by_role(config.ROLE_OWNER)
+        table.all()
+
+        assert fetch.call_count == 1
+
+    def test_invalidate_forces_reload(self):
+        fetch = MagicMock(return_value=[HEADER] + USERS)
+        table = UsersTable(fetch, ttl=60)
+        table.get(111)
+
+        table.invalidate()
+        table.get(111)
+
+        assert fetch.call_count == 2
+
+    def test_parse_telegram_id_variants(self):
+        assert parse_telegram_id("8450372644") == 8450372644
+        assert parse_telegram_id("8450372644.0") == 8450372644
+        assert parse_telegram_id("8 450 372 644") == 8450372644
+        assert parse_telegram_id("id:42") == 42
+        assert parse_telegram_id("  ") is None
+
+
+class TestPermissionChecksFromMemory:
+
+    def test_permission_checks_do_not_reread_sheet(self):
+        sheets = make_sheets(USERS)
+
+        for _ in range(10):
+            assert sheets.get_user_role(111) == config.ROLE_OWNER
+            assert sheets.is_user_active(222) is True
+            assert sheets.check_user_permission(8450000000, config.ROLE_MANAGER) is True
+        sheets.get_users_by_role(config.ROLE_EXECUTOR)
+        sheets.get_all_users()
+
+        assert sheets.users_sheet.get_all_values.call_count == 1
+
+    def test_get_user_keeps_raw_id_and_none_role(self):
+        sheets = make_sheets(USERS)
+
+        assert sheets.get_user(8450000000)["telegram_id"] == "8.45E+09"
+        assert sheets.get_user(444)["role"] is None
+        assert sheets.get_user(999) is None
+
+    def test_get_users_by_role_shape(self):
+        sheets = make_sheets(USERS)
+
+        assert sheets.get_users_by_role(config.ROLE_OWNER) == [
+            {"telegram_id": "111", "name": "Иван", "username": "ivan", "role": config.ROLE_OWNER}
+        ]
+
+    def test_role_change_is_visible_to_next_check(self):
+        sheets = make_sheets(USERS)
+        assert sheets.get_user_role(333) == config.ROLE_EXECUTOR
+
+        assert sheets.update_user_role(333, "Менеджер") is True
+        sheets.users_sheet.update_cell.assert_called_once_with(5, 4, "Менеджер")
+        sheets.users_sheet.get_all_values.return_value = [HEADER] + [
+            row if row[0] != "333" else ["333", "Пётр", "", "Менеджер"] for row in USERS
+        ]
+
+        assert sheets.get_user_role(333) == config.ROLE_MANAGER
+
+    def test_deactivate_then_access_closed(self):
+        sheets = make_sheets(USERS)
+        sheets.get_user_role(222)
+
+        assert sheets.deactivate_user(222) is True
+        sheets.users_sheet.get_all_values.return_value = [HEADER] + [
+            row if row[0] != "222" else ["222", "Мария", "", ""] for row in USERS
+        ]
+
+        assert sheets.get_user_role(222) is None
+        assert sheets.check_user_permission(222, config.ROLE_EXECUTOR) is False
+
+    def test_role_write_follows_shifted_row(self):
+        sheets = make_sheets(USERS)
+        sheets.get_user_role(333)
+
+        # Кто-то вставил строку над Петром — в памяти он ещё на строке 5
+        sheets.users_sheet.get_all_values.return_value = (
+            [HEADER, ["999", "Новый", "", "Исполнитель"]] + USERS
+        )
+
+        assert sheets.update_user_role(333, "Менеджер") is True
+        sheets.users_sheet.update_cell.assert_called_once_with(6, 4, "Менеджер")
+
+    def test_deactivate_does_not_touch_other_user_row(self):
+        sheets = make_sheets(USERS)
+        sheets.get_user_role(222)
+
+        # Марию удалили вручную — на её строке теперь Пётр
+        sheets.users_sheet.get_all_values.return_value = [HEADER] + [
+            row for row in USERS if row[0] != "222"
+        ]
+
+        assert sheets.deactivate_user(222) is False
+        sheets.users_sheet.update_cell.assert_not_called()
+
+    def test_add_user_invalidates_table(self):
+        sheets = make_sheets(USERS)
+
+        assert sheets.add_user(555, "Новый", "new", "Исполнитель") is True
+        sheets.users_sheet.get_all_values.return_value = [HEADER] + USERS + [
+            ["555", "Новый", "new", "Исполнитель"]
+        ]
+
+        assert sheets.get_user_role(555) == config.ROLE_EXECUTOR
@@ -0,0 +1,381 @@
+"""
+Тесты очереди записей в Sheets (SheetsWriteQueue)
+=================================================
+Контракт:
+- Все изменения ячеек за окно сброса уходят ОДНИМ values_batch_update,
+  новые строки — одним values_append на лист.
+- Каждая операция сразу попадает в журнал; после перезапуска очередь
+  восстанавливается из него.
+- Чтения через снимок видят ещё не отправленные изменения (read-your-writes).
+- Отклонённый API диапазон не блокирует остальные; после MAX_RANGE_ATTEMPTS
+  сбросов он уходит в dead-letter файл.
+
+Запуск: .venv/Scripts/python -m pytest tests/test_write_queue.py -v
+"""
+import json
+import threading
+from unittest.mock import MagicMock
+
+import gspread
+import pytest
+
+from src import config
+from src.write_queue import MAX_RANGE_ATTEMPTS, SheetsWriteQueue
+
+from tests.test_sheets_snapshot import full_book, make_sheets
+
+
+def make_queue(tmp_path, spreadsheet=None, **callbacks) -> SheetsWriteQueue:
+    return SheetsWriteQueue(
+        spreadsheet or MagicMock(), str(tmp_path / "journal.jsonl"), **callbacks
+    )
+
+
+def with_queue(tmp_path, book=None):
+    """SheetsManager поверх замоканной таблицы с включённой очередью записей."""
+    sheets = make_sheets(book or full_book())
+    sheets._write_queue = make_queue(
+        tmp_path, sheets.spreadsheet,
+        on_appended=sheets.request_index.add,
+        on_flushed=sheets._on_writes_flushed,
+    )
+    return sheets
+
+
+# ── SheetsWriteQueue ──────────────────────────────────────────────────────────
+
+class TestSheetsWriteQueue:
+
+    def test_cells_of_all_sheets_go_in_one_batch_update(self, tmp_path):
+        queue = make_queue(tmp_path)
+
+        queue.put_cells("A", 3, {11: "Оплачена", 12: "D-1"})
+        queue.put_cells("B", 2, {7: "Отменена"})
+        queue.put_cells("A", 3, {11: "Отменена"})  # та же ячейка — последняя запись
+        assert queue.flush() is True
+
+        queue.spreadsheet.values_batch_update.assert_called_once()
+        body = queue.spreadsheet.values_batch_update.call_args.args[0]
+        assert body["valueInputOption"] == "USER_ENTERED"
+        assert body["data"] == [
+            {"range": "'A'!K3:L3", "values": [["Отменена", "D-1"]]},
+            {"range": "'B'!G2", "values": [["Отменена"]]},
+        ]
+
+    def test_appends_resolve_row_formulas_and_report_rows(self, tmp_path):
+        appended = []
+        queue = make_queue(tmp_path, on_appended=lambda *a: appended.append(a))
+        queue.spreadsheet.values_append.return_value = {
+            "updates": {"updatedRange": "'A'!A10:C11"}
+        }
+
+        queue.put_append("A", "REQ-1", ["REQ-1", "x"], formulas={3: "=B{row}"})
+        queue.put_append("A", "REQ-2", ["REQ-2", "y"])
+        queue.flush()
+
+        queue.spreadsheet.values_append.assert_called_once()
+        assert queue.spreadsheet.values_append.call_args.kwargs["body"] == {
+            "values": [["REQ-1", "x"], ["REQ-2", "y"]]
+        }
+        assert appended == [("A", "REQ-1", 10), ("A", "REQ-2", 11)]
+        body = queue.spreadsheet.values_batch_update.call_args.args[0]
+        assert body["data"] == [{"range": "'A'!C10", "values": [["=B10"]]}]
+
+    def test_patch_changes_pending_row_in_place(self, tmp_path):
+        queue = make_queue(tmp_path)
+        queue.put_append("A", "REQ-1", ["REQ-1", "", ""])
+
+        assert queue.patch_append("A", "REQ-1", {3: "Пётр"}) is True
+        assert queue.patch_append("A", "REQ-404", {3: "Пётр"}) is False
+        assert queue.overlay("A", [["ID", "x", "y"]])[-1] == ["REQ-1", "", "Пётр"]
+
+    def test_journal_survives_restart(self, tmp_path):
+        queue = make_queue(tmp_path)
+        queue.put_append("A", "REQ-1", ["REQ-1"])
+        queue.put_cells("B", 5, {2: "v"})
+        queue.patch_append("A", "REQ-1", {2: "p"})
+
+        restored = make_queue(tmp_path)
+
+        assert len(restored) == 2
+        assert restored.pending_sheet("REQ-1") == "A"
+        assert restored.overlay("A", [["ID", "x"]])[-1] == ["REQ-1", "p"]
+        assert restored.overlay("B", [["h", "h"]] * 5)[4] == ["h", "v"]
+
+    def test_failed_flush_keeps_changes_and_journal(self, tmp_path):
+        queue = make_queue(tmp_path)
+        queue.spreadsheet.values_batch_update.side_effect = RuntimeError("429")
+        queue.put_cells("A", 2, {1: "v"})
+
+        assert queue.flush() is False
+
+        assert len(queue) == 1
+        assert len(make_queue(tmp_path)) == 1
+
+    def test_successful_flush_clears_journal(self, tmp_path):
+        queue = make_queue(tmp_path)
+        queue.put_cells("A", 2, {1: "v"})
+
+        queue.flush()
+
+        assert not (tmp_path / "journal.jsonl").exists()
+        assert len(make_queue(tmp_path)) == 0
+
+    def test_broken_last_journal_line_is_skipped(self, tmp_path):
+        queue = make_queue(tmp_path)
+        queue.put_cells("A", 2, {1: "v"})
+        with open(tmp_path / "journal.jsonl", "a", encoding="utf-8") as f:
+            f.write('{"op": "cells", "sheet"')
+
+        assert len(make_queue(tmp_path)) == 1
+
+    def test_discard_appends_drops_already_written_rows(self, tmp_path):
+        queue = make_queue(tmp_path)
+        queue.put_append("A", "REQ-1", ["REQ-1"])
+        queue.put_append("A", "REQ-2", ["REQ-2"])
+
+        queue.discard_appends(lambda sheet, key: key == "REQ-1")
+
+        assert queue.pending_sheet("REQ-1") is None
+        assert len(make_queue(tmp_path)) == 1
+
+    def test_overlay_does_not_mutate_source_rows(self, tmp_path):
+        queue = make_queue(tmp_path)
+        source = [["ID", "Статус"], ["REQ-1", "Создана"]]
+        queue.put_cells("A", 2, {2: "Оплачена"})
+
+        result = queue.overlay("A", source)
+
+        assert result[1] == ["REQ-1", "Оплачена"]
+        assert source[1] == ["REQ-1", "Создана"]
+        assert queue.overlay("B", source) is source
+
+
+# ── Сброс без блокировки очереди ──────────────────────────────────────────────
+
+class TestFlushWithoutQueueLock:
+
+    def test_enqueue_and_overlay_do_not_wait_for_network(self, tmp_path):
+        queue = make_queue(tmp_path)
+        started, release = threading.Event(), threading.Event()
+        queue.spreadsheet.values_batch_update.side_effect = (
+            lambda body: (started.set(), release.wait(5))
+        )
+        queue.put_cells("A", 2, {2: "Оплачена"})
+
+        flusher = threading.Thread(target=queue.flush)
+        flusher.start()
+        assert started.wait(5)
+
+        writer = threading.Thread(target=queue.put_cells, args=("A", 2, {2: "Отменена"}))
+        writer.start()
+        writer.join(1)
+        assert not writer.is_alive()
+        assert queue.overlay("A", [["ID", "Статус"], ["REQ-1", ""]])[1] == ["REQ-1", "Отменена"]
+
+        release.set()
+        flusher.join(5)
+
+        # Запись, пришедшая во время запроса, не потеряна и уходит следующим сбросом
+        assert len(queue) == 1
+        queue.spreadsheet.values_batch_update.side_effect = None
+        assert queue.flush() is True
+        body = queue.spreadsheet.values_batch_update.call_args.args[0]
+        assert body["data"] == [{"range": "'A'!B2", "values": [["Отменена"]]}]
+
+    def test_patch_during_append_is_written_to_new_row(self, tmp_path):
+        queue = make_queue(tmp_path)
+        queue.put_append("A", "REQ-1", ["REQ-1", ""])
+
+        def append(*args, **kwargs):
+            assert queue.patch_append("A", "REQ-1", {2: "Пётр"}) is True
+            return {"updates": {"updatedRange": "'A'!A10:B10"}}
+
+        queue.spreadsheet.values_append.side_effect = append
+        assert queue.flush() is True
+
+        assert queue.spreadsheet.values_append.call_args.kwargs["body"] == {
+            "values": [["REQ-1", ""]]
+        }
+        body = queue.spreadsheet.values_batch_update.call_args.args[0]
+        assert body["data"] == [{"range": "'A'!B10", "values": [["Пётр"]]}]
+        assert len(make_queue(tmp_path)) == 0
+
+
+# ── SheetsManager поверх очереди ──────────────────────────────────────────────
+
+class TestSheetsManagerWriteBehind:
+
+    def test_writes_are_merged_until_flush(self, tmp_path):
+        sheets = with_queue(tmp_path)
+
+        sheets.assign_executor("REQ-1", "Пётр")
+        sheets.update_request_status_by_id("REQ-2", config.STATUS_CANCELLED)
+        sheets.update_request_fields(
+            date="15.01.2026", amount=50, currency=config.CURRENCY_USDT,
+            purpose="новое", category="Прочее",
+        )
+
+        sheets.spreadsheet.values_batch_update.assert_not_called()
+        journal = sheets.get_worksheet(config.SHEET_JOURNAL)
+        journal.update_cell.assert_not_called()
+
+        sheets.flush_writes()
+
+        sheets.spreadsheet.values_batch_update.assert_called_once()
+        body = sheets.spreadsheet.values_batch_update.call_args.args[0]
+        ranges = [d["range"] for d in body["data"]]
+        assert ranges == [
+            f"'{config.SHEET_JOURNAL}'!P2",
+            f"'{config.SHEET_JOURNAL}'!K3",
+            f"'{config.SHEET_USDT}'!E2:F2",
+        ]
+
+    def test_reads_see_pending_writes(self, tmp_path):
+        sheets = with_queue(tmp_path)
+
+        sheets.update_request_status_by_id("REQ-1", config.STATUS_PAID)
+
+        request = sheets.get_request_by_request_id("REQ-1")
+        assert request["status"] == config.STATUS_PAID
+        assert "REQ-1" not in {
+            r["request_id"] for r in sheets.get_requests_by_status(config.STATUS_CREATED)
+        }
+
+    def test_created_request_is_readable_and_editable_before_flush(self, tmp_path):
+        sheets = with_queue(tmp_path)
+
+        request_id = sheets.create_request(
+            recipient="Иван", amount=1000, card_or_phone="4276", bank="Сбер",
+            purpose="тест", currency=config.CURRENCY_RUB,
+        )
+        assert sheets.get_request_by_request_id(request_id)["recipient"] == "Иван"
+
+        assert sheets.assign_executor(request_id, "Пётр") is True
+        assert sheets.get_request_by_request_id(request_id)["executor"] == "Пётр"
+        sheets.spreadsheet.values_append.assert_not_called()
+
+    def test_flush_appends_row_and_indexes_it(self, tmp_path):
+        sheets = with_queue(tmp_path)
+        sheets.spreadsheet.values_append.return_value = {
+            "updates": {"updatedRange": f"'{config.SHEET_JOURNAL}'!A4:S4"}
+        }
+        request_id = sheets.create_request(
+            recipient="Иван", amount=1000, card_or_phone="4276", bank="Сбер",
+            purpose="тест", currency=config.CURRENCY_RUB,
+        )
+        sheets.assign_executor(request_id, "Пётр")
+
+        sheets.flush_writes()
+
+        row = sheets.spreadsheet.values_append.call_args.kwargs["body"]["values"][0]
+        assert row[0] == request_id and row[15] == "Пётр"
+        data = sheets.spreadsheet.values_batch_update.call_args.args[0]["data"]
+        assert data[0]["range"] == f"'{config.SHEET_JOURNAL}'!H4"
+        assert "E4" in data[0]["values"][0][0]
+        assert sheets.request_index.get(request_id).row == 4
+
+    def test_complete_payment_rate_formula_uses_row(self, tmp_path):
+        sheets = with_queue(tmp_path)
+
+        ok = sheets.complete_payment(
+            date="", amount=0, executor_name="Иван", deal_id="D-1",
+            amount_usdt=12.5, request_id="REQ-2",
+        )
+        sheets.flush_writes()
+
+        assert ok is True
+        data = sheets.spreadsheet.values_batch_update.call_args.args[0]["data"]
+        assert data == [
+            {"range": f"'{config.SHEET_JOURNAL}'!K3:L3",
+             "values": [[config.STATUS_PAID, "D-1"]]},
+            {"range": f"'{config.SHEET_JOURNAL}'!N3:O3", "values": [[12.5, "=C3/N3"]]},
+        ]
+
+
+@pytest.mark.parametrize("response", [None, {}, {"updates": {"updatedRange": "bad"}}])
+def test_append_without_row_number_is_not_retried(tmp_path, response):
+    queue = make_queue(tmp_path)
+    queue.spreadsheet.values_append.return_value = response
+    queue.spreadsheet.values_get.side_effect = RuntimeError("503")
+    queue.put_append("A", "REQ-1", ["REQ-1"], formulas={2: "=A{row}"})
+
+    queue.flush()
+
+    assert queue.pending_sheet("REQ-1") is None
+    queue.spreadsheet.values_batch_update.assert_not_called()
+
+
+def test_append_without_row_number_looks_row_up(tmp_path):
+    appended = []
+    queue = make_queue(tmp_path, on_appended=lambda *a: appended.append(a))
+    queue.spreadsheet.values_append.return_value = {}
+    queue.spreadsheet.values_get.return_value = {"values": [["ID"], ["REQ-0"], [], ["REQ-1"]]}
+    queue.put_append("A", "REQ-1", ["REQ-1"], formulas={2: "=A{row}"})
+
+    queue.flush()
+
+    queue.spreadsheet.values_get.assert_called_once_with("'A'!A:A")
+    assert appended == [("A", "REQ-1", 4)]
+    body = queue.spreadsheet.values_batch_update.call_args.args[0]
+    assert body["data"] == [{"range": "'A'!B4", "values": [["=A4"]]}]
+
+
+# ── Отклонённые диапазоны ─────────────────────────────────────────────────────
+
+def api_error(status: int) -> gspread.exceptions.APIError:
+    response = MagicMock(status_code=status)
+    response.json.return_value = {"error": {"code": status, "message": "bad range"}}
+    return gspread.exceptions.APIError(response)
+
+
+def reject_range(bad_range: str):
+    """values_batch_update, который падает на любом запросе с bad_range."""
+    def _update(body):
+        if any(item["range"] == bad_range for item in body["data"]):
+            raise api_error(400)
+        return {}
+    return _update
+
+
+class TestRejectedRanges:
+
+    def test_bad_range_does_not_block_others(self, tmp_path):
+        queue = make_queue(tmp_path)
+        queue.spreadsheet.values_batch_update.side_effect = reject_range("'B'!A2")
+        queue.put_cells("A", 2, {1: "ok"})
+        queue.put_cells("B", 2, {1: "bad"})
+
+        assert queue.flush() is False
+
+        calls = queue.spreadsheet.values_batch_update.call_args_list
+        assert [c.args[0]["data"] for c in calls[1:]] == [
+            [{"range": "'A'!A2", "values": [["ok"]]}],
+            [{"range": "'B'!A2", "values": [["bad"]]}],
+        ]
+        assert queue.overlay("A", [["h"], ["h"]]) == [["h"], ["h"]]
+        assert len(queue) == 1
+
+    def test_range_rejected_repeatedly_goes_to_dead_letter(self, tmp_path):
+        queue = make_queue(tmp_path)
+        queue.spreadsheet.values_batch_update.side_effect = reject_range("'B'!A2")
+        queue.put_cells("B", 2, {1: "bad"})
+
+        results = [queue.flush() for _ in range(MAX_RANGE_ATTEMPTS)]
+
+        assert results[-1] is True and not any(results[:-1])
+        assert len(make_queue(tmp_path)) == 0
+        lines = (tmp_path / "journal.jsonl.dead").read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 1
+        assert json.loads(lines[0])["range"] == "'B'!A2"
+
+    def test_transient_error_keeps_everything(self, tmp_path):
+        queue = make_queue(tmp_path)
+        queue.spreadsheet.values_batch_update.side_effect = api_error(429)
+        queue.put_cells("A", 2, {1: "v"})
+
+        for _ in range(MAX_RANGE_ATTEMPTS + 1):
+            assert queue.flush() is False
+
+        assert len(queue) == 1
+        assert not (tmp_path / "journal.jsonl.dead").exists()
@@ -3,6 +3,8 @@ TelegramHub AI Assistant Module
 Provides AI-powered chat analysis, reply suggestions, and summarization.
 Supports OpenAI and Anthropic Claude APIs.
 """
+import asyncio
+import hashlib
 import json
 import logging
 from datetime import datetime
@@ -28,10 +30,51 @@ from config import (
     AI_CUSTOM_INSTRUCTIONS,
     DRAFTS_DIR
 )
+from crm_store import CRMStore, crm_store
+from live_updates import EventHub, event_hub
+from metrics import ai_latency, ai_tokens
 
 logger = logging.getLogger("TelegramHub.AI")
 
 
+# Review mode: analysis and reply suggestions in a single request
+REVIEW_SYSTEM_PROMPT = """Ты помощник для разбора переписок в Telegram.
+Анализируй диалог и предлагай естественные, уместные ответы с учетом тона и стиля переписки.
+
+ВАЖНЫЕ ПРАВИЛА ДЛЯ ОТВЕТОВ:
+{instructions}
+
+Отвечай ТОЛЬКО валидным JSON без markdown форматирования."""
+
+REVIEW_USER_PROMPT = """Диалог с "{chat_name}" (тип: {chat_type}):
+
+{context}
+
+Верни JSON в формате:
+{{
+    "analysis": {{
+        "summary": "Краткое описание диалога (1-2 предложения)",
+        "topics": ["список основных тем"],
+        "sentiment": "positive/neutral/negative",
+        "action_items": ["что нужно сделать"],
+        "urgency": "high/medium/low",
+        "needs_reply": true/false,
+        "last_question": "последний вопрос собеседника, если есть, иначе null"
+    }},
+    "suggestions": [
+        {{"text": "текст ответа", "tone": "formal/casual/brief"}}
+    ]
+}}
+
+В suggestions {num_suggestions} варианта ответа с разным тоном (формальный, дружеский, краткий).
+Если ответ не нужен, suggestions - пустой массив []."""
+
+# Cached AI results are valid only for the same prompts, instructions and model
+AI_PROMPT_VERSION = hashlib.sha1(
+    (REVIEW_SYSTEM_PROMPT + REVIEW_USER_PROMPT + AI_CUSTOM_INSTRUCTIONS + AI_PROVIDER + AI_MODEL).encode("utf-8")
+).hexdigest()[:12]
+
+
 class AIAssistant:
     """AI-powered assistant for chat analysis and reply generation"""
 
@@ -75,7 +118,9 @@ class AIAssistant:
     async def _call_openai(self, system_prompt: str, user_prompt: str) -> str:
         """Make a call to OpenAI API"""
         try:
-            response = self.client.chat.completions.create(
+            # Sync SDK client - run in thread so the event loop isn't blocked
+            response = await asyncio.to_thread(
+                self.client.chat.completions.create,
                 model=self.model,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -84,6 +129,8 @@ class AIAssistant:
                 temperature=0.7,
                 max_tokens=2000
             )
+            if response.usage:
+                self._count_tokens(response.usage.prompt_tokens, response.usage.completion_tokens)
             return response.choices[0].message.content
         except Exception as e:
             logger.error(f"OpenAI API error: {e}")
@@ -92,7 +139,8 @@ class AIAssistant:
     async def _call_anthropic(self, system_prompt: str, user_prompt: str) -> str:
         """Make a call to Anthropic Claude API"""
         try:
-            response = self.client.messages.create(
+            response = await asyncio.to_thread(
+                self.client.messages.create,
                 model=self.model,
                 max_tokens=2000,
                 system=system_prompt,
@@ -100,6 +148,8 @@ class AIAssistant:
                     {"role": "user", "content": user_prompt}
                 ]
             )
+            if response.usage:
+                self._count_tokens(response.usage.input_tokens, response.usage.output_tokens)
             return response.content[0].text
         except Exception as e:
             logger.error(f"Anthropic API error: {e}")
@@ -110,12 +160,17 @@ class AIAssistant:
         if not self.is_available:
             raise ValueError("AI is not configured")
 
-        if self.provider == "openai":
-            return await self._call_openai(system_prompt, user_prompt)
-        elif self.provider == "anthropic":
-            return await self._call_anthropic(system_prompt, user_prompt)
-        else:
-            raise ValueError(f"Unknown provider: {self.provider}")
+        with ai_latency.time(provider=self.provider, model=self.model):
+            if self.provider == "openai":
+                return await self._call_openai(system_prompt, user_prompt)
+            elif self.provider == "anthropic":
+                return await self._call_anthropic(system_prompt, user_prompt)
+            else:
+                raise ValueError(f"Unknown provider: {self.provider}")
+
+    def _count_tokens(self, prompt_tokens: int, completion_tokens: int):
+        ai_tokens.inc(prompt_tokens or 0, provider=self.provider, model=self.model, direction="input")
+        ai_tokens.inc(completion_tokens or 0, provider=self.provider, model=self.model, direction="output")
 
     async def analyze_chat(self, messages: list[dict], chat_info: dict = None) -> dict:
         """
@@ -244,6 +299,45 @@ class AIAssistant:
             logger.error(f"AI suggestion failed: {e}")
             return [{"text": f"Ошибка: {e}", "tone": "error"}]
 
+    async def review_chat(self, messages: list[dict], chat_info: dict = None, num_suggestions: int = 3) -> dict:
+        """
+        Analysis + reply suggestions in one AI call (review mode).
+
+        Returns:
+        {
+            "analysis": {... same as analyze_chat ...},
+            "suggestions": [... same as suggest_replies ...]
+        }
+        """
+        if not self.is_available:
+            return {"analysis": {"error": "AI not configured", "needs_reply": False}, "suggestions": []}
+
+        context = self._format_messages_for_context(messages)
+        chat_name = chat_info.get("name", "Unknown") if chat_info else "Unknown"
+        chat_type = chat_info.get("type", "chat") if chat_info else "chat"
+
+        system_prompt = REVIEW_SYSTEM_PROMPT.format(instructions=AI_CUSTOM_INSTRUCTIONS)
+        user_prompt = REVIEW_USER_PROMPT.format(
+            chat_name=chat_name, chat_type=chat_type, context=context, num_suggestions=num_suggestions
+        )
+
+        try:
+            response = await self._call_ai(system_prompt, user_prompt)
+            response = response.strip()
+            if response.startswith("```"):
+                response = response.split("\n", 1)[1]
+                response = response.rsplit("```", 1)[0]
+
+            result = json.loads(response)
+            suggestions = result.get("suggestions")
+            return {
+                "analysis": result.get("analysis") or {},
+                "suggestions": suggestions if isinstance(suggestions, list) else []
+            }
+        except Exception as e:
+            logger.error(f"AI review failed: {e}")
+            return {"analysis": {"error": str(e), "needs_reply": False}, "suggestions": [], "error": str(e)}
+
     async def summarize_conversation(self, messages: list[dict], chat_info: dict = None) -> str:
         """
         Create a brief summary of the conversation.
@@ -306,34 +400,16 @@ class AIAssistant:
 
 
 class DraftsManager:
-    """Manages draft messages for later sending"""
+    """Manages draft messages for later sending (stored in crm_store)"""
 
-    def __init__(self):
+    def __init__(self, store: CRMStore = crm_store, live: EventHub = event_hub):
+        self.store = store
+        self.live = live
         self.drafts_file = DRAFTS_DIR / "outbox.json"
-        self.drafts: dict[str, dict] = {}
-        self._load_drafts()
-
-    def _load_drafts(self):
-        """Load drafts from file"""
-        if self.drafts_file.exists():
-            try:
-                with open(self.drafts_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        self.drafts = {d["id"]: d for d in data if "id" in d}
-                    else:
-                        self.drafts = data
-            except Exception as e:
-                logger.error(f"Failed to load drafts: {e}")
-                self.drafts = {}
-
-    def _save_drafts(self):
-        """Save drafts to file"""
-        try:
-            with open(self.drafts_file, "w", encoding="utf-8") as f:
-                json.dump(list(self.drafts.values()), f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to save drafts: {e}")
+
+    def load(self):
+        """Import old JSON outbox once (app startup)"""
+        self.store.migrate_drafts_json(self.drafts_file)
 
     def create_draft(
         self,
@@ -357,49 +433,49 @@ class DraftsManager:
             "status": "pending"
         }
 
-        self.drafts[draft_id] = draft
-        self._save_drafts()
+        self.store.save_draft(draft)
         logger.info(f"Draft created: {draft_id}")
+        self._publish("created", draft)
         return draft
 
+    def _publish(self, action: str, draft: dict):
+        self.live.publish("draft", account=draft["account"], chat_id=draft["chat_id"], action=action, draft=draft)
+
     def get_draft(self, draft_id: str) -> Optional[dict]:
         """Get a draft by ID"""
-        return self.drafts.get(draft_id)
+        return self.store.get_draft(draft_id)
 
     def get_all_drafts(self, status: str = None) -> list[dict]:
         """Get all drafts, optionally filtered by status"""
-        drafts = list(self.drafts.values())
-        if status:
-            drafts = [d for d in drafts if d.get("status") == status]
-        return sorted(drafts, key=lambda x: x.get("created_at", ""), reverse=True)
+        return self.store.get_drafts(status)
 
     def get_drafts_for_chat(self, account: str, chat_id: int) -> list[dict]:
         """Get all drafts for a specific chat"""
-        return [
-            d for d in self.drafts.values()
-            if d.get("account") == account and d.get("chat_id") == chat_id
-        ]
+        return self.store.get_chat_drafts(account, chat_id)
 
     def update_draft(self, draft_id: str, text: str = None, status: str = None) -> Optional[dict]:
         """Update a draft"""
-        if draft_id not in self.drafts:
+        draft = self.store.get_draft(draft_id)
+        if draft is None:
             return None
 
         if text is not None:
-            self.drafts[draft_id]["text"] = text
+            draft["text"] = text
         if status is not None:
-            self.drafts[draft_id]["status"] = status
+            draft["status"] = status
 
-        self.drafts[draft_id]["updated_at"] = datetime.now().isoformat()
-        self._save_drafts()
-        return self.drafts[draft_id]
+        draft["updated_at"] = datetime.now().isoformat()
+        self.store.save_draft(draft)
+        self._publish("updated", draft)
+        return draft
 
     def delete_draft(self, draft_id: str) -> bool:
         """Delete a draft"""
-        if draft_id in self.drafts:
-            del self.drafts[draft_id]
-            self._save_drafts()
+        draft = self.store.get_draft(draft_id)
+        if self.store.delete_draft(draft_id):
             logger.info(f"Draft deleted: {draft_id}")
+            if draft:
+                self._publish("deleted", draft)
             return True
         return False
 
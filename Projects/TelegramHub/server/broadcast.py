@@ -0,0 +1,422 @@
+"""
+Broadcast Scheduler - parallel multi-account broadcasts
+One worker per account, each limited by its own adaptive token bucket.
+Progress is persisted to sqlite so an interrupted broadcast can be resumed without double-sending.
+Store calls from the scheduler run in a worker thread - sqlite commits never block the event loop.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("TelegramHub")
+
+
+class TokenBucket:
+    """
+    Per-account send limiter.
+    FloodWait -> bucket blocked for the wait and rate halved;
+    successes restore the rate step by step (AIMD).
+    """
+
+    def __init__(self, interval: float, burst: int = 1, min_rate_factor: float = 0.1, recover_after: int = 10):
+        self.base_rate = 1.0 / max(interval, 0.01)
+        self.rate = self.base_rate
+        self.min_rate = self.base_rate * min_rate_factor
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.recover_after = recover_after
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._successes = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self._successes += 1
+        if self._successes >= self.recover_after and self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+            self._successes = 0
+
+    def on_flood_wait(self, seconds: float):
+        now = time.monotonic()
+        self._refill(now)
+        self._blocked_until = max(self._blocked_until, now + seconds)
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        self._successes = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "rate_per_minute": round(self.rate * 60, 2),
+            "blocked_for": round(max(0.0, self._blocked_until - time.monotonic()), 1)
+        }
+
+
+class BroadcastStore:
+    """
+    sqlite storage of broadcasts and per-target progress.
+    Target states: pending -> sending -> sent / failed.
+    'sending' is committed before the API call: a target found in this state after a crash
+    may or may not have been delivered and is never sent again (marked 'unknown').
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        # Opened by open() in the app startup hook - importing the module creates no files
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        """Open the database and create the tables (idempotent)"""
+        with self._lock:
+            if self._connection is not None:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS broadcasts (
+                    id TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    delay REAL NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    finished_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS broadcast_targets (
+                    broadcast_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    account TEXT NOT NULL,
+                    chat_id INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    error TEXT,
+                    message_id INTEGER,
+                    updated_at TEXT,
+                    PRIMARY KEY (broadcast_id, position)
+                );
+                """
+            )
+            conn.commit()
+            self._connection = conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.open()
+        return self._connection
+
+    def _execute(self, sql: str, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def create(self, text: str, delay: float, targets: list[dict]) -> str:
+        broadcast_id = uuid.uuid4().hex[:12]
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO broadcasts (id, text, delay, status, created_at) VALUES (?, ?, ?, 'running', ?)",
+                (broadcast_id, text, delay, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO broadcast_targets (broadcast_id, position, account, chat_id, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(broadcast_id, i, t["account"], int(t["chat_id"]), now) for i, t in enumerate(targets)]
+            )
+        return broadcast_id
+
+    def get(self, broadcast_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM broadcasts WHERE id = ?", (broadcast_id,)).fetchone()
+        return dict(row) if row else None
+
+    def recent(self, limit: int = 20) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM broadcasts ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def pending_targets(self, broadcast_id: str) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position, account, chat_id FROM broadcast_targets"
+                " WHERE broadcast_id = ? AND status = 'pending' ORDER BY position",
+                (broadcast_id,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def set_target(self, broadcast_id: str, position: int, status: str,
+                   error: str = None, message_id: int = None):
+        self._execute(
+            "UPDATE broadcast_targets SET status = ?, error = ?, message_id = ?, updated_at = ?"
+            " WHERE broadcast_id = ? AND position = ?",
+            (status, error, message_id, datetime.now().isoformat(), broadcast_id, position)
+        )
+
+    def set_status(self, broadcast_id: str, status: str):
+        finished_at = datetime.now().isoformat() if status in ("completed", "cancelled") else None
+        self._execute(
+            "UPDATE broadcasts SET status = ?, finished_at = ? WHERE id = ?",
+            (status, finished_at, broadcast_id)
+        )
+
+    def interrupt(self, broadcast_id: str):
+        """Worker crashed: in-flight targets become 'unknown', broadcast 'interrupted' (resumable)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE broadcast_targets SET status = 'unknown', error = 'interrupted while sending'"
+                " WHERE broadcast_id = ? AND status = 'sending'",
+                (broadcast_id,)
+            )
+            self._conn.execute(
+                "UPDATE broadcasts SET status = 'interrupted' WHERE id = ?", (broadcast_id,)
+            )
+
+    def recover_interrupted(self) -> list[str]:
+        """After restart: running broadcasts become 'interrupted', in-flight targets 'unknown'"""
+        with self._lock, self._conn:
+            ids = [r["id"] for r in self._conn.execute("SELECT id FROM broadcasts WHERE status = 'running'")]
+            self._conn.execute(
+                "UPDATE broadcast_targets SET status = 'unknown', error = 'interrupted while sending'"
+                " WHERE status = 'sending'"
+            )
+            self._conn.execute("UPDATE broadcasts SET status = 'interrupted' WHERE status = 'running'")
+        return ids
+
+    def summary(self, broadcast_id: str) -> dict:
+        """Result dict in broadcast_message() format"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT account, chat_id, status, error FROM broadcast_targets WHERE broadcast_id = ?",
+                (broadcast_id,)
+            ).fetchall()
+        counts: dict[str, int] = {}
+        errors = []
+        for r in rows:
+            counts[r["status"]] = counts.get(r["status"], 0) + 1
+            if r["status"] in ("failed", "unknown"):
+                errors.append({
+                    "target": {"account": r["account"], "chat_id": r["chat_id"]},
+                    "error": r["error"]
+                })
+        return {
+            "broadcast_id": broadcast_id,
+            "total": len(rows),
+            "sent": counts.get("sent", 0),
+            "failed": counts.get("failed", 0),
+            "pending": counts.get("pending", 0) + counts.get("sending", 0),
+            "unknown": counts.get("unknown", 0),
+            "errors": errors
+        }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class BroadcastScheduler:
+    """Runs broadcasts: targets grouped by account, one worker per account"""
+
+    def __init__(self, manager, store: BroadcastStore, burst: int = 1, max_flood_retries: int = 3, live=None):
+        self.manager = manager
+        self.store = store
+        self.live = live  # EventHub: progress pushed to dashboard
+        self.burst = burst
+        self.max_flood_retries = max_flood_retries
+        self.buckets: dict[str, TokenBucket] = {}
+        self._running: dict[str, asyncio.Task] = {}
+        self._cancelled: set[str] = set()
+
+    @property
+    def in_progress(self) -> bool:
+        return any(not task.done() for task in self._running.values())
+
+    def _bucket(self, account: str, delay: float) -> TokenBucket:
+        """Buckets live across broadcasts - flood wait history of the account is kept"""
+        bucket = self.buckets.get(account)
+        if bucket is None or abs(bucket.base_rate - 1.0 / max(delay, 0.01)) > 1e-9:
+            bucket = TokenBucket(delay, self.burst)
+            self.buckets[account] = bucket
+        return bucket
+
+    def start(self, targets: list[dict], text: str, delay: float = 3.0, progress_callback=None) -> str:
+        broadcast_id = self.store.create(text, delay, targets)
+        self._launch(broadcast_id, text, delay, progress_callback)
+        logger.info(f"Broadcast {broadcast_id}: {len(targets)} targets queued")
+        return broadcast_id
+
+    def resume(self, broadcast_id: str, progress_callback=None) -> bool:
+        """
+        Continue interrupted broadcast (restart or worker crash) - only targets never attempted are sent.
+        Completed and cancelled broadcasts are not resumed.
+        """
+        broadcast = self.store.get(broadcast_id)
+        if not broadcast or broadcast["status"] != "interrupted":
+            return False
+        if broadcast_id in self._running and not self._running[broadcast_id].done():
+            return False
+        self._cancelled.discard(broadcast_id)
+        self.store.set_status(broadcast_id, "running")
+        self._launch(broadcast_id, broadcast["text"], broadcast["delay"], progress_callback)
+        logger.info(f"Broadcast {broadcast_id}: resumed")
+        return True
+
+    def cancel(self, broadcast_id: str = None):
+        """Cancel one broadcast or all running ones; targets in flight finish"""
+        ids = [broadcast_id] if broadcast_id else [
+            bid for bid, task in self._running.items() if not task.done()
+        ]
+        self._cancelled.update(ids)
+
+    async def wait(self, broadcast_id: str) -> dict:
+        task = self._running.get(broadcast_id)
+        if task:
+            await asyncio.shield(task)
+        return self.status(broadcast_id)
+
+    def status(self, broadcast_id: str) -> Optional[dict]:
+        broadcast = self.store.get(broadcast_id)
+        if not broadcast:
+            return None
+        result = self.store.summary(broadcast_id)
+        result["status"] = broadcast["status"]
+        result["created_at"] = broadcast["created_at"]
+        result["finished_at"] = broadcast["finished_at"]
+        if broadcast["status"] == "cancelled":
+            result["cancelled"] = True
+        return result
+
+    def limits(self) -> dict:
+        return {account: bucket.to_dict() for account, bucket in self.buckets.items()}
+
+    def _launch(self, broadcast_id: str, text: str, delay: float, progress_callback):
+        self._running[broadcast_id] = asyncio.create_task(
+            self._run(broadcast_id, text, delay, progress_callback)
+        )
+
+    async def _run(self, broadcast_id: str, text: str, delay: float, progress_callback):
+        targets = await asyncio.to_thread(self.store.pending_targets, broadcast_id)
+        by_account: dict[str, list[dict]] = {}
+        for target in targets:
+            by_account.setdefault(target["account"], []).append(target)
+
+        progress = {"done": 0, "total": len(targets)}
+        workers = [
+            asyncio.create_task(
+                self._account_worker(broadcast_id, account, queue, text, delay, progress, progress_callback)
+            )
+            for account, queue in by_account.items()
+        ]
+        try:
+            if workers:
+                # One worker failing stops the others - the broadcast is resumable, not half-running
+                await asyncio.wait(workers, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            results = await asyncio.gather(*workers, return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+
+        if errors:
+            logger.error(f"Broadcast {broadcast_id}: worker error - {errors[0]!r}, broadcast interrupted")
+            await asyncio.to_thread(self.store.interrupt, broadcast_id)
+            status = "interrupted"
+        elif broadcast_id in self._cancelled:
+            status = "cancelled"
+        else:
+            status = "completed"
+        if status != "interrupted":
+            await asyncio.to_thread(self.store.set_status, broadcast_id, status)
+        self._cancelled.discard(broadcast_id)
+
+        summary = await asyncio.to_thread(self.store.summary, broadcast_id)
+        logger.info(f"Broadcast {broadcast_id} {status}: {summary['sent']}/{summary['total']} sent")
+        if self.live:
+            self.live.publish("broadcast", broadcast_id=broadcast_id, finished=True, summary=summary)
+
+    async def _account_worker(self, broadcast_id: str, account_name: str, queue: list[dict],
+                              text: str, delay: float, progress: dict, progress_callback):
+        bucket = self._bucket(account_name, delay)
+
+        for target in queue:
+            if broadcast_id in self._cancelled:
+                return
+
+            account = self.manager.get_account(account_name)
+            if not account or not account.connected:
+                result = {"success": False, "error": "Account not connected"}
+                await self._set_target(broadcast_id, target["position"], "failed", result["error"])
+            else:
+                result = await self._send(broadcast_id, account, bucket, target, text)
+
+            progress["done"] += 1
+            if self.live:
+                self.live.publish(
+                    "broadcast", broadcast_id=broadcast_id, finished=False,
+                    done=progress["done"], total=progress["total"], target_account=account_name,
+                    target_chat_id=target["chat_id"], success=result.get("success", False)
+                )
+            if progress_callback:
+                await progress_callback(progress["done"], progress["total"], result)
+
+    async def _send(self, broadcast_id: str, account, bucket: TokenBucket, target: dict, text: str) -> dict:
+        for _ in range(self.max_flood_retries + 1):
+            await bucket.acquire()
+            if broadcast_id in self._cancelled:
+                return {"success": False, "error": "Cancelled"}
+
+            await self._set_target(broadcast_id, target["position"], "sending")
+            result = await account.send_message(target["chat_id"], text, retry_flood_wait=False)
+
+            if result["success"]:
+                bucket.on_success()
+                await self._set_target(broadcast_id, target["position"], "sent",
+                                       message_id=result.get("message_id"))
+                return result
+
+            if "flood_wait" in result:
+                # Not sent - safe to retry after the bucket waits it out
+                bucket.on_flood_wait(result["flood_wait"])
+                await self._set_target(broadcast_id, target["position"], "pending")
+                logger.warning(
+                    f"{account.name}: broadcast slowed down to "
+                    f"{bucket.to_dict()['rate_per_minute']}/min after flood wait {result['flood_wait']}s"
+                )
+                continue
+
+            await self._set_target(broadcast_id, target["position"], "failed", result.get("error"))
+            return result
+
+        await self._set_target(broadcast_id, target["position"], "failed", "Flood wait retries exceeded")
+        return {"success": False, "error": "Flood wait retries exceeded"}
+
+    async def _set_target(self, broadcast_id: str, position: int, status: str,
+                          error: str = None, message_id: int = None):
+        """Awaited before the next step: 'sending' is still committed before the API call"""
+        await asyncio.to_thread(self.store.set_target, broadcast_id, position, status, error, message_id)
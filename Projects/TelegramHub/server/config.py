@@ -11,6 +11,7 @@ ACCOUNTS_DIR = BASE_DIR / "accounts"
 SESSIONS_DIR = ACCOUNTS_DIR / "sessions"
 CONTEXT_DIR = BASE_DIR / "context"
 DRAFTS_DIR = BASE_DIR / "drafts"
+DATA_DIR = BASE_DIR / "data"
 
 # Ayugram tdata
 AYUGRAM_TDATA_PATH = Path(r"C:\Users\Admin\Documents\AyuGram\tdata")
@@ -26,8 +27,41 @@ PORT = 8765
 
 # Sync settings
 SYNC_INTERVAL_SECONDS = 60  # Как часто синхронизировать чаты
+CONTEXT_SYNC_DEBOUNCE_SECONDS = 2  # Пауза после события, чтобы записать пачку изменений одним проходом
 MAX_MESSAGES_PER_CHAT = 100  # Сколько сообщений загружать из каждого чата
 
+# Кэш диалогов: загружается один раз, дальше обновляется событиями Telethon
+DIALOG_CACHE_PATH = DATA_DIR / "dialog_cache.db"
+DIALOG_CACHE_LIMIT = 200  # Сколько диалогов загружать при полной синхронизации аккаунта
+DIALOG_CACHE_FLUSH_SECONDS = 5  # Как часто сохранять изменения кэша в sqlite
+
+# Параллельные запросы ко всем аккаунтам: медленный аккаунт не задерживает остальные
+ACCOUNT_TIMEOUT_SECONDS = 15  # Сколько ждать один аккаунт (дашборд, синхронизация)
+ACCOUNT_EXPORT_TIMEOUT_SECONDS = 120  # То же для экспорта чатов (много сообщений)
+EXPORT_CHAT_CONCURRENCY = 4  # Сколько чатов одного аккаунта выгружать одновременно
+ACCOUNT_SLOW_SECONDS = 3  # Аккаунт дольше этого попадает в отчёт как медленный
+
+# CRM (теги, заметки, статусы, шаблоны, черновики) - sqlite вместо JSON файлов
+CRM_DB_PATH = DATA_DIR / "crm.db"
+
+# Медиа: отдаются потоком (с поддержкой Range), скачанные файлы кэшируются на диске
+MEDIA_CACHE_DIR = DATA_DIR / "media_cache"
+MEDIA_CACHE_MAX_MB = 1024  # Размер кэша, старые файлы удаляются (LRU)
+MEDIA_CACHE_EAGER_MB = 5  # Файлы меньше этого сначала целиком скачиваются в кэш
+MEDIA_CHUNK_SIZE = 512 * 1024  # Размер запроса к Telegram (максимум 512 KB)
+
+# Поиск по сообщениям (sqlite FTS5), наполняется при загрузке чатов и новыми сообщениями
+SEARCH_INDEX_PATH = DATA_DIR / "search.db"
+SEARCH_RANK_WINDOW = 5000  # По релевантности сортируются столько последних совпадений
+
+# Рассылки: каждый аккаунт шлёт параллельно со своим лимитом, прогресс в sqlite
+BROADCAST_DB_PATH = DATA_DIR / "broadcasts.db"
+BROADCAST_BURST = 1  # Сколько сообщений аккаунт может отправить подряд без паузы
+
+# Живые обновления дашборда через WebSocket (/ws)
+LIVE_QUEUE_SIZE = 256  # Очередь событий клиента; при переполнении клиент получает "resync"
+LIVE_SEND_TIMEOUT_SECONDS = 10  # Клиент, не принявший событие за это время, отключается
+
 # =============================================================================
 # AI Configuration
 # =============================================================================
@@ -68,9 +102,15 @@ REVIEW_MIN_UNREAD = 1
 REVIEW_MAX_CHATS = 50
 # Skip groups/channels in review by default
 REVIEW_SKIP_GROUPS = True
+# Messages loaded for review / AI analysis
+REVIEW_MESSAGES_LIMIT = 30
+# Background AI precompute for top chats of the review queue
+REVIEW_PRECOMPUTE_TOP = 10
+REVIEW_PRECOMPUTE_CONCURRENCY = 3
+REVIEW_PRECOMPUTE_INTERVAL_SECONDS = 120
 
 # Создание директорий
-for dir_path in [ACCOUNTS_DIR, SESSIONS_DIR, CONTEXT_DIR, DRAFTS_DIR]:
+for dir_path in [ACCOUNTS_DIR, SESSIONS_DIR, CONTEXT_DIR, DRAFTS_DIR, DATA_DIR]:
     dir_path.mkdir(parents=True, exist_ok=True)
 
 (CONTEXT_DIR / "active_chats").mkdir(exist_ok=True)
@@ -0,0 +1,249 @@
+"""
+Context Sync - keeps the Cursor context directory current from the dialog cache
+Only chats changed since the last pass (DialogCache.changed_since) are re-rendered; every file
+is written atomically (temp + rename) and only if its content changed, so file watchers and
+downstream tools see real changes only.
+
+context/active_chats/chats/<account>/<chat_id>.json  one file per chat
+context/active_chats/index.json                      small list of all chats (+ file paths)
+context/pending_replies/unread.json, unread.md       chats with unread messages
+context/summaries/dialogs_summary.md                 overview table
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from dialog_cache import DialogCache, dialog_sort_key
+
+logger = logging.getLogger("TelegramHub")
+
+# Replaced by the current time on write; not part of the content hash
+UPDATED = "\x00updated\x00"
+
+
+class ContextSync:
+    def __init__(self, cache: DialogCache, context_dir: Path):
+        self.cache = cache
+        self.dir = Path(context_dir)
+        self.chats_dir = self.dir / "active_chats" / "chats"
+        self._version = -1                  # dialog cache version of the last pass
+        self._accounts: set[str] = set()
+        self._hashes: dict[Path, str] = {}
+        self._report: Optional[dict] = None  # last fan-out report (failed accounts in summary)
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()      # API sync and background pass may overlap
+        self.stats = {"passes": 0, "written": 0, "unchanged": 0, "removed": 0}
+
+    # ===== Files =====
+
+    def _write(self, path: Path, content: str) -> bool:
+        """Atomic write if content (without UPDATED stamp) differs from what is on disk"""
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        if path not in self._hashes and path.exists():
+            # First pass after restart: compare with file on disk (stamp normalized)
+            try:
+                existing = path.read_text(encoding="utf-8")
+                self._hashes[path] = hashlib.sha1(self._unstamp(existing, content).encode("utf-8")).hexdigest()
+            except (OSError, UnicodeDecodeError):
+                pass
+        if self._hashes.get(path) == digest:
+            self.stats["unchanged"] += 1
+            return False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content.replace(UPDATED, datetime.now().strftime("%Y-%m-%d %H:%M")))
+        os.replace(tmp, path)
+        self._hashes[path] = digest
+        self.stats["written"] += 1
+        return True
+
+    @staticmethod
+    def _unstamp(existing: str, template: str) -> str:
+        """Put the UPDATED marker back into the line where template has it"""
+        if UPDATED not in template:
+            return existing
+        prefix = template[:template.index(UPDATED)].rsplit("\n", 1)[-1]
+        lines = existing.split("\n")
+        for i, line in enumerate(lines):
+            if prefix and line.startswith(prefix):
+                lines[i] = prefix + UPDATED
+                break
+        return "\n".join(lines)
+
+    def _remove(self, path: Path):
+        self._hashes.pop(path, None)
+        try:
+            path.unlink()
+            self.stats["removed"] += 1
+        except FileNotFoundError:
+            pass
+
+    def chat_path(self, account: str, chat_id: int) -> Path:
+        return self.chats_dir / account / f"{chat_id}.json"
+
+    # ===== Sync =====
+
+    def sync(self, accounts: set[str], report: Optional[dict] = None) -> dict:
+        """One pass (blocking file IO - run in a thread); returns changed file counts"""
+        with self._lock:
+            return self._sync(accounts, report)
+
+    def _sync(self, accounts: set[str], report: Optional[dict]) -> dict:
+        if report is not None:
+            self._report = report
+        written_before = self.stats["written"]
+        removed_before = self.stats["removed"]
+        version = self.cache.version
+
+        if accounts != self._accounts or self._version < 0:
+            # Account set changed or first pass: every chat, stale files removed
+            # (all_chats.json - one big file of older versions, replaced by chats/ + index.json)
+            self._remove(self.dir / "active_chats" / "all_chats.json")
+            _, dialogs = self.cache.all_dialogs(accounts)
+            for dialog in dialogs:
+                self._write(self.chat_path(dialog["account"], dialog["id"]), json.dumps(dialog, ensure_ascii=False, indent=2))
+            current = {self.chat_path(d["account"], d["id"]) for d in dialogs}
+            if self.chats_dir.exists():
+                for path in self.chats_dir.glob("*/*.json"):
+                    if path not in current:
+                        self._remove(path)
+                for folder in self.chats_dir.iterdir():
+                    if folder.is_dir() and folder.name not in accounts:
+                        shutil.rmtree(folder, ignore_errors=True)
+        else:
+            changed, removed = self.cache.changed_since(self._version)
+            for account, chat_id in changed:
+                if account not in accounts:
+                    continue
+                dialog = self.cache.get_dialog(account, chat_id)
+                path = self.chat_path(account, chat_id)
+                if dialog is None:
+                    self._remove(path)
+                else:
+                    self._write(path, json.dumps(dialog, ensure_ascii=False, indent=2))
+            for account, chat_id in removed:
+                self._remove(self.chat_path(account, chat_id))
+
+        self._version = version
+        self._accounts = set(accounts)
+
+        # Aggregates: rebuilt from memory (cheap), written only if changed
+        _, dialogs = self.cache.all_dialogs(accounts)
+        dialogs.sort(key=dialog_sort_key, reverse=True)
+        pending = [d for d in dialogs if d.get("unread_count", 0) > 0]
+
+        self._write(self.dir / "active_chats" / "index.json", json.dumps([
+            {
+                "account": d["account"],
+                "id": d["id"],
+                "name": d.get("name"),
+                "type": d.get("type"),
+                "unread_count": d.get("unread_count", 0),
+                "last_message_date": d.get("last_message_date"),
+                "file": self.chat_path(d["account"], d["id"]).relative_to(self.dir).as_posix()
+            }
+            for d in dialogs
+        ], ensure_ascii=False, indent=2))
+        self._write(self.dir / "pending_replies" / "unread.json", json.dumps(pending, ensure_ascii=False, indent=2))
+        self._write(self.dir / "pending_replies" / "unread.md", self._pending_md(pending))
+        self._write(self.dir / "summaries" / "dialogs_summary.md", self._summary_md(dialogs, len(accounts), self._report))
+
+        self.stats["passes"] += 1
+        return {
+            "dialogs": len(dialogs),
+            "pending": len(pending),
+            "written": self.stats["written"] - written_before,
+            "removed": self.stats["removed"] - removed_before
+        }
+
+    def _summary_md(self, dialogs: list[dict], accounts: int, report: Optional[dict]) -> str:
+        content = f"""# Telegram Dialogs Overview
+
+**Updated:** {UPDATED}
+**Accounts:** {accounts}
+**Dialogs:** {len(dialogs)}
+"""
+        if report and report["failed"]:
+            failed = ", ".join(f"{name} ({error})" for name, error in report["failed"].items())
+            content += f"**Not synced:** {failed}\n"
+        content += """
+## Recent Dialogs
+
+| # | Account | Chat | Type | Unread | Last Message |
+|---|---------|------|------|--------|--------------|
+"""
+        for i, d in enumerate(dialogs[:50], 1):
+            last_msg = d.get("last_message", {}).get("text", "-")[:40]
+            if len(d.get("last_message", {}).get("text", "")) > 40:
+                last_msg += "..."
+            last_msg = last_msg.replace("|", "/").replace("\n", " ")
+            name = (d.get("name") or "Unknown")[:25]
+
+            content += f"| {i} | {d['account']} | {name} | {d['type']} | {d.get('unread_count', 0)} | {last_msg} |\n"
+        return content
+
+    def _pending_md(self, pending: list[dict]) -> str:
+        content = f"""# Pending Replies
+
+**Updated:** {UPDATED}
+**Unread Chats:** {len(pending)}
+
+## List
+
+"""
+        for d in pending:
+            msg_text = d.get('last_message', {}).get('text', '-')[:100]
+            content += f"""### {d.get('name', 'Unknown')} ({d['account']})
+- **Type:** {d['type']}
+- **Unread:** {d['unread_count']} messages
+- **Last:** {msg_text}
+
+"""
+        return content
+
+    # ===== Background =====
+
+    def start(self, hub, accounts: Callable[[], set[str]], interval: float, debounce: float):
+        """Sync on dialog events (debounced) and at least every `interval` seconds"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(hub, accounts, interval, debounce))
+
+    async def _loop(self, hub, accounts: Callable[[], set[str]], interval: float, debounce: float):
+        subscription = hub.subscribe()
+        subscription.update(types=["message", "read", "dialog"])
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(subscription.queue.get(), interval)
+                    # Collect the burst, then one pass
+                    await asyncio.sleep(debounce)
+                except asyncio.TimeoutError:
+                    pass
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                if self.cache.version == self._version and accounts() == self._accounts:
+                    continue
+                try:
+                    await asyncio.to_thread(self.sync, accounts())
+                except Exception as e:
+                    logger.error(f"Context sync failed - {e}")
+        finally:
+            hub.unsubscribe(subscription)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
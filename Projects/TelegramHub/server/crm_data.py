@@ -1,13 +1,13 @@
 """
 CRM Data Manager - управление тегами, заметками, статусами чатов
 """
-import json
 from pathlib import Path
-from datetime import datetime
+
+from crm_store import CRMStore, crm_store, split_chat_key
 
 DATA_DIR = Path(__file__).parent.parent / "data"
-DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# Old JSON storage - imported into crm_store once
 CRM_FILE = DATA_DIR / "crm_chats.json"
 TEMPLATES_FILE = DATA_DIR / "templates.json"
 
@@ -30,41 +30,32 @@ DEFAULT_TEMPLATES = [
 ]
 
 
+def _new_chat() -> dict:
+    return {"tags": [], "notes": "", "status": "new", "pinned": False}
+
+
 class CRMData:
-    def __init__(self):
+    """
+    In-memory view of CRM data for fast reads (dashboard enriches every dialog).
+    Every change is written as a single row to crm_store (sqlite).
+    Chat changes are stamped with a growing `version` (see changed_since).
+    Data is read from the store by load() (app startup), not in the constructor.
+    """
+
+    def __init__(self, store: CRMStore = crm_store):
+        self.store = store
         self.chats = {}  # "account:chat_id" -> {tags, notes, status, pinned}
-        self.tags = DEFAULT_TAGS.copy()
-        self.templates = DEFAULT_TEMPLATES.copy()
-        self.load()
+        self.tags = []
+        self.templates = []
+        self.version = 0
+        self._versions: dict[str, int] = {}  # chat key -> version of last change
 
     def load(self):
-        """Load CRM data from file"""
-        if CRM_FILE.exists():
-            try:
-                with open(CRM_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.chats = data.get("chats", {})
-                    self.tags = data.get("tags", DEFAULT_TAGS)
-            except:
-                pass
-
-        if TEMPLATES_FILE.exists():
-            try:
-                with open(TEMPLATES_FILE, "r", encoding="utf-8") as f:
-                    self.templates = json.load(f)
-            except:
-                pass
-
-    def save(self):
-        """Save CRM data to file"""
-        with open(CRM_FILE, "w", encoding="utf-8") as f:
-            json.dump({
-                "chats": self.chats,
-                "tags": self.tags
-            }, f, ensure_ascii=False, indent=2)
-
-        with open(TEMPLATES_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.templates, f, ensure_ascii=False, indent=2)
+        """Load CRM data from store (imports old JSON files once)"""
+        self.store.migrate_crm_json(CRM_FILE, TEMPLATES_FILE, DEFAULT_TAGS, DEFAULT_TEMPLATES)
+        self.chats = self.store.load_chats()
+        self.tags = self.store.load_tags()
+        self.templates = self.store.load_templates()
 
     def get_chat_key(self, account: str, chat_id: int) -> str:
         return f"{account}:{chat_id}"
@@ -72,61 +63,61 @@ class CRMData:
     def get_chat_data(self, account: str, chat_id: int) -> dict:
         """Get CRM data for a chat"""
         key = self.get_chat_key(account, chat_id)
-        return self.chats.get(key, {
-            "tags": [],
-            "notes": "",
-            "status": "new",
-            "pinned": False
-        })
+        return self.chats.get(key, _new_chat())
+
+    def _update_chat(self, account: str, chat_id: int, **changes) -> dict:
+        key = self.get_chat_key(account, chat_id)
+        chat = self.chats.setdefault(key, _new_chat())
+        chat.update(changes)
+        self.store.save_chat(account, chat_id, chat)
+        self._touch(key)
+        return chat
+
+    def _touch(self, key: str):
+        self.version += 1
+        self._versions[key] = self.version
+
+    def changed_since(self, version: int) -> list[tuple[str, int]]:
+        """(account, chat_id) of chats whose CRM data changed after given version"""
+        keys = [key for key, v in self._versions.items() if v > version]
+        return [pair for pair in map(split_chat_key, keys) if pair]
 
     def set_chat_tags(self, account: str, chat_id: int, tags: list):
         """Set tags for a chat"""
-        key = self.get_chat_key(account, chat_id)
-        if key not in self.chats:
-            self.chats[key] = {"tags": [], "notes": "", "status": "new", "pinned": False}
-        self.chats[key]["tags"] = tags
-        self.save()
+        self._update_chat(account, chat_id, tags=list(tags))
 
     def add_chat_tag(self, account: str, chat_id: int, tag_id: str):
         """Add a tag to a chat"""
-        key = self.get_chat_key(account, chat_id)
-        if key not in self.chats:
-            self.chats[key] = {"tags": [], "notes": "", "status": "new", "pinned": False}
-        if tag_id not in self.chats[key]["tags"]:
-            self.chats[key]["tags"].append(tag_id)
-        self.save()
+        tags = self.get_chat_data(account, chat_id)["tags"]
+        if tag_id not in tags:
+            self._update_chat(account, chat_id, tags=tags + [tag_id])
 
     def remove_chat_tag(self, account: str, chat_id: int, tag_id: str):
         """Remove a tag from a chat"""
         key = self.get_chat_key(account, chat_id)
         if key in self.chats and tag_id in self.chats[key]["tags"]:
-            self.chats[key]["tags"].remove(tag_id)
-            self.save()
+            self._update_chat(account, chat_id, tags=[t for t in self.chats[key]["tags"] if t != tag_id])
 
     def set_chat_notes(self, account: str, chat_id: int, notes: str):
         """Set notes for a chat"""
-        key = self.get_chat_key(account, chat_id)
-        if key not in self.chats:
-            self.chats[key] = {"tags": [], "notes": "", "status": "new", "pinned": False}
-        self.chats[key]["notes"] = notes
-        self.save()
+        self._update_chat(account, chat_id, notes=notes)
 
     def set_chat_status(self, account: str, chat_id: int, status: str):
         """Set status for a chat (new, active, pending, closed)"""
-        key = self.get_chat_key(account, chat_id)
-        if key not in self.chats:
-            self.chats[key] = {"tags": [], "notes": "", "status": "new", "pinned": False}
-        self.chats[key]["status"] = status
-        self.save()
+        self._update_chat(account, chat_id, status=status)
 
     def toggle_chat_pinned(self, account: str, chat_id: int) -> bool:
         """Toggle pinned status for a chat"""
-        key = self.get_chat_key(account, chat_id)
-        if key not in self.chats:
-            self.chats[key] = {"tags": [], "notes": "", "status": "new", "pinned": False}
-        self.chats[key]["pinned"] = not self.chats[key]["pinned"]
-        self.save()
-        return self.chats[key]["pinned"]
+        pinned = not self.get_chat_data(account, chat_id)["pinned"]
+        self._update_chat(account, chat_id, pinned=pinned)
+        return pinned
+
+    def get_chats_by_tag(self, tag_id: str) -> list[tuple[str, int]]:
+        """(account, chat_id) of all chats with tag (indexed query)"""
+        return self.store.chats_with_tag(tag_id)
+
+    def get_chats_by_status(self, status: str) -> list[tuple[str, int]]:
+        return self.store.chats_with_status(status)
 
     # Tags management
     def get_tags(self) -> list:
@@ -135,17 +126,29 @@ class CRMData:
     def add_tag(self, tag_id: str, name: str, color: str = "#888888"):
         """Add a new tag"""
         if not any(t["id"] == tag_id for t in self.tags):
-            self.tags.append({"id": tag_id, "name": name, "color": color})
-            self.save()
+            tag = {"id": tag_id, "name": name, "color": color}
+            self.tags.append(tag)
+            self.store.save_tag(tag)
+
+    def update_tag(self, tag_id: str, name: str, color: str) -> bool:
+        """Update a tag"""
+        for tag in self.tags:
+            if tag["id"] == tag_id:
+                tag["name"] = name
+                tag["color"] = color
+                self.store.save_tag(tag)
+                return True
+        return False
 
     def remove_tag(self, tag_id: str):
         """Remove a tag"""
         self.tags = [t for t in self.tags if t["id"] != tag_id]
         # Remove from all chats
-        for chat_data in self.chats.values():
+        for key, chat_data in self.chats.items():
             if tag_id in chat_data.get("tags", []):
                 chat_data["tags"].remove(tag_id)
-        self.save()
+                self._touch(key)
+        self.store.delete_tag(tag_id)
 
     # Templates management
     def get_templates(self) -> list:
@@ -153,24 +156,27 @@ class CRMData:
 
     def add_template(self, name: str, text: str) -> str:
         """Add a new template"""
-        template_id = str(len(self.templates) + 1)
-        self.templates.append({"id": template_id, "name": name, "text": text})
-        self.save()
+        # Next free numeric id (len + 1 collides after deletions)
+        template_id = str(max((int(t["id"]) for t in self.templates if str(t["id"]).isdigit()), default=0) + 1)
+        template = {"id": template_id, "name": name, "text": text}
+        self.templates.append(template)
+        self.store.save_template(template)
         return template_id
 
-    def update_template(self, template_id: str, name: str, text: str):
+    def update_template(self, template_id: str, name: str, text: str) -> bool:
         """Update a template"""
         for t in self.templates:
             if t["id"] == template_id:
                 t["name"] = name
                 t["text"] = text
-                self.save()
-                break
+                self.store.save_template(t)
+                return True
+        return False
 
     def remove_template(self, template_id: str):
         """Remove a template"""
         self.templates = [t for t in self.templates if t["id"] != template_id]
-        self.save()
+        self.store.delete_template(template_id)
 
     def enrich_dialogs(self, dialogs: list) -> list:
         """Add CRM data to dialogs list"""
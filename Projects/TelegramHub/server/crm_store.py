@@ -0,0 +1,365 @@
+"""
+CRM Store - sqlite хранилище CRM: чаты (теги, заметки, статус, закрепление), теги, шаблоны, черновики.
+Каждое изменение - upsert одной строки вместо перезаписи всего JSON.
+Старые JSON файлы импортируются один раз (флаг в meta), сами файлы остаются как резервная копия
+"""
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from config import CRM_DB_PATH
+
+logger = logging.getLogger("TelegramHub")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS chats (
+    account TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    notes TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'new',
+    pinned INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (account, chat_id)
+);
+CREATE INDEX IF NOT EXISTS idx_chats_status ON chats (status);
+CREATE TABLE IF NOT EXISTS chat_tags (
+    account TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    tag_id TEXT NOT NULL,
+    PRIMARY KEY (account, chat_id, tag_id)
+);
+CREATE INDEX IF NOT EXISTS idx_chat_tags_tag ON chat_tags (tag_id);
+CREATE TABLE IF NOT EXISTS tags (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    color TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS templates (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    text TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS drafts (
+    id TEXT PRIMARY KEY,
+    account TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_drafts_status ON drafts (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_drafts_chat ON drafts (account, chat_id);
+CREATE TABLE IF NOT EXISTS ai_results (
+    account TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    last_message_id INTEGER NOT NULL,
+    prompt_version TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (account, chat_id, kind)
+);
+CREATE TABLE IF NOT EXISTS export_state (
+    export_key TEXT NOT NULL,
+    account TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    last_message_id INTEGER NOT NULL,
+    exported_at TEXT NOT NULL,
+    PRIMARY KEY (export_key, account, chat_id)
+);
+"""
+
+
+def split_chat_key(key: str) -> Optional[tuple[str, int]]:
+    """"account:chat_id" -> (account, chat_id)"""
+    account, _, chat_id = key.rpartition(":")
+    try:
+        return account, int(chat_id)
+    except ValueError:
+        return None
+
+
+class CRMStore:
+    """
+    Одно соединение на процесс (WAL), запись под блокировкой.
+    Файл базы открывается при первом обращении (или open() в startup) - импорт модуля его не создаёт
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        """Открыть базу и создать схему (идемпотентно)"""
+        with self._lock:
+            if self._connection is not None:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.commit()
+            self._connection = conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.open()
+        return self._connection
+
+    def _query(self, sql: str, params=()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, sql: str, params=()):
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+    # ===== Migration =====
+
+    def _is_migrated(self, key: str) -> bool:
+        return bool(self._query("SELECT 1 FROM meta WHERE key = ?", (key,)))
+
+    def _read_json(self, path: Path):
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"CRM store: can't read {path.name} for migration - {e}")
+            return None
+
+    def _finish_migration(self, key: str):
+        self._write("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, datetime.now().isoformat()))
+
+    def migrate_crm_json(self, crm_file: Path, templates_file: Path,
+                         default_tags: list[dict], default_templates: list[dict]):
+        """One-time import of crm_chats.json + templates.json (defaults for fresh install)"""
+        if self._is_migrated("crm_json"):
+            return
+
+        data = self._read_json(crm_file) or {}
+        templates = self._read_json(templates_file)
+        chats = data.get("chats", {})
+        tags = data.get("tags", default_tags)
+        if templates is None:
+            templates = default_templates
+
+        with self._lock, self._conn:
+            for key, chat in chats.items():
+                parsed = split_chat_key(key)
+                if not parsed:
+                    continue
+                self._upsert_chat(*parsed, chat)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tags (id, name, color, position) VALUES (?, ?, ?, ?)",
+                [(t["id"], t["name"], t.get("color", "#888888"), i) for i, t in enumerate(tags)]
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO templates (id, name, text, position) VALUES (?, ?, ?, ?)",
+                [(str(t["id"]), t["name"], t["text"], i) for i, t in enumerate(templates)]
+            )
+
+        self._finish_migration("crm_json")
+        logger.info(f"CRM store: migrated {len(chats)} chats, {len(tags)} tags, {len(templates)} templates")
+
+    def migrate_drafts_json(self, drafts_file: Path):
+        """One-time import of drafts/outbox.json"""
+        if self._is_migrated("drafts_json"):
+            return
+
+        data = self._read_json(drafts_file) or []
+        drafts = list(data.values()) if isinstance(data, dict) else data
+        with self._lock, self._conn:
+            for draft in drafts:
+                if "id" in draft:
+                    self._upsert_draft(draft)
+
+        self._finish_migration("drafts_json")
+        logger.info(f"CRM store: migrated {len(drafts)} drafts")
+
+    # ===== Chats =====
+
+    def _upsert_chat(self, account: str, chat_id: int, chat: dict):
+        self._conn.execute(
+            "INSERT INTO chats (account, chat_id, notes, status, pinned, updated_at) VALUES (?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (account, chat_id) DO UPDATE SET"
+            " notes = excluded.notes, status = excluded.status, pinned = excluded.pinned,"
+            " updated_at = excluded.updated_at",
+            (account, chat_id, chat.get("notes", ""), chat.get("status", "new"),
+             int(bool(chat.get("pinned"))), datetime.now().isoformat())
+        )
+        self._conn.execute("DELETE FROM chat_tags WHERE account = ? AND chat_id = ?", (account, chat_id))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO chat_tags (account, chat_id, tag_id) VALUES (?, ?, ?)",
+            [(account, chat_id, tag_id) for tag_id in chat.get("tags", [])]
+        )
+
+    def save_chat(self, account: str, chat_id: int, chat: dict):
+        """Upsert one chat with its tags"""
+        with self._lock, self._conn:
+            self._upsert_chat(account, chat_id, chat)
+
+    def load_chats(self) -> dict[str, dict]:
+        """All chats as "account:chat_id" -> {tags, notes, status, pinned}"""
+        chats = {}
+        for r in self._query("SELECT account, chat_id, notes, status, pinned FROM chats"):
+            chats[f"{r['account']}:{r['chat_id']}"] = {
+                "tags": [], "notes": r["notes"], "status": r["status"], "pinned": bool(r["pinned"])
+            }
+        for r in self._query("SELECT account, chat_id, tag_id FROM chat_tags ORDER BY rowid"):
+            chat = chats.get(f"{r['account']}:{r['chat_id']}")
+            if chat is not None:
+                chat["tags"].append(r["tag_id"])
+        return chats
+
+    def chats_with_tag(self, tag_id: str) -> list[tuple[str, int]]:
+        return [(r["account"], r["chat_id"]) for r in self._query(
+            "SELECT account, chat_id FROM chat_tags WHERE tag_id = ?", (tag_id,)
+        )]
+
+    def chats_with_status(self, status: str) -> list[tuple[str, int]]:
+        return [(r["account"], r["chat_id"]) for r in self._query(
+            "SELECT account, chat_id FROM chats WHERE status = ?", (status,)
+        )]
+
+    # ===== Tags =====
+
+    def load_tags(self) -> list[dict]:
+        return [dict(r) for r in self._query("SELECT id, name, color FROM tags ORDER BY position")]
+
+    def save_tag(self, tag: dict):
+        self._write(
+            "INSERT INTO tags (id, name, color, position)"
+            " VALUES (?, ?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM tags))"
+            " ON CONFLICT (id) DO UPDATE SET name = excluded.name, color = excluded.color",
+            (tag["id"], tag["name"], tag["color"])
+        )
+
+    def delete_tag(self, tag_id: str):
+        """Tag and its links to chats"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM tags WHERE id = ?", (tag_id,))
+            self._conn.execute("DELETE FROM chat_tags WHERE tag_id = ?", (tag_id,))
+
+    # ===== Templates =====
+
+    def load_templates(self) -> list[dict]:
+        return [dict(r) for r in self._query("SELECT id, name, text FROM templates ORDER BY position")]
+
+    def save_template(self, template: dict):
+        self._write(
+            "INSERT INTO templates (id, name, text, position)"
+            " VALUES (?, ?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM templates))"
+            " ON CONFLICT (id) DO UPDATE SET name = excluded.name, text = excluded.text",
+            (template["id"], template["name"], template["text"])
+        )
+
+    def delete_template(self, template_id: str):
+        self._write("DELETE FROM templates WHERE id = ?", (template_id,))
+
+    # ===== Drafts =====
+
+    def _upsert_draft(self, draft: dict):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO drafts (id, account, chat_id, status, created_at, data)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (draft["id"], draft.get("account", ""), int(draft.get("chat_id", 0)),
+             draft.get("status", "pending"), draft.get("created_at", ""),
+             json.dumps(draft, ensure_ascii=False))
+        )
+
+    def save_draft(self, draft: dict):
+        with self._lock, self._conn:
+            self._upsert_draft(draft)
+
+    def get_draft(self, draft_id: str) -> Optional[dict]:
+        rows = self._query("SELECT data FROM drafts WHERE id = ?", (draft_id,))
+        return json.loads(rows[0]["data"]) if rows else None
+
+    def get_drafts(self, status: str = None) -> list[dict]:
+        """Newest first"""
+        if status:
+            rows = self._query(
+                "SELECT data FROM drafts WHERE status = ? ORDER BY created_at DESC", (status,)
+            )
+        else:
+            rows = self._query("SELECT data FROM drafts ORDER BY created_at DESC")
+        return [json.loads(r["data"]) for r in rows]
+
+    def get_chat_drafts(self, account: str, chat_id: int) -> list[dict]:
+        rows = self._query(
+            "SELECT data FROM drafts WHERE account = ? AND chat_id = ? ORDER BY created_at",
+            (account, chat_id)
+        )
+        return [json.loads(r["data"]) for r in rows]
+
+    def delete_draft(self, draft_id: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM drafts WHERE id = ?", (draft_id,)).rowcount > 0
+
+    # ===== AI results =====
+
+    def get_ai_result(self, account: str, chat_id: int, kind: str,
+                      last_message_id: int, prompt_version: str) -> Optional[dict]:
+        """Cached result, only if computed for the same last message and prompt version"""
+        rows = self._query(
+            "SELECT data, created_at FROM ai_results WHERE account = ? AND chat_id = ? AND kind = ?"
+            " AND last_message_id = ? AND prompt_version = ?",
+            (account, chat_id, kind, last_message_id, prompt_version)
+        )
+        if not rows:
+            return None
+        result = json.loads(rows[0]["data"])
+        result["cached_at"] = rows[0]["created_at"]
+        return result
+
+    def save_ai_result(self, account: str, chat_id: int, kind: str,
+                       last_message_id: int, prompt_version: str, data: dict):
+        """One row per chat and kind - a newer message replaces the old result"""
+        self._write(
+            "INSERT OR REPLACE INTO ai_results"
+            " (account, chat_id, kind, last_message_id, prompt_version, data, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (account, chat_id, kind, last_message_id, prompt_version,
+             json.dumps(data, ensure_ascii=False), datetime.now().isoformat())
+        )
+
+    # ===== Incremental exports =====
+
+    def get_export_state(self, export_key: str) -> dict[tuple[str, int], int]:
+        """(account, chat_id) -> last exported message id"""
+        return {(r["account"], r["chat_id"]): r["last_message_id"] for r in self._query(
+            "SELECT account, chat_id, last_message_id FROM export_state WHERE export_key = ?", (export_key,)
+        )}
+
+    def save_export_state(self, export_key: str, account: str, chat_id: int, last_message_id: int):
+        self._write(
+            "INSERT OR REPLACE INTO export_state (export_key, account, chat_id, last_message_id, exported_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (export_key, account, chat_id, last_message_id, datetime.now().isoformat())
+        )
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+# Global instance (lazy: the database is opened in the app startup hook)
+crm_store = CRMStore(CRM_DB_PATH)
@@ -2,16 +2,63 @@
 Cursor AI Integration Module
 Export chat context for AI analysis
 """
+import asyncio
 import json
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
 
+from config import ACCOUNT_EXPORT_TIMEOUT_SECONDS, EXPORT_CHAT_CONCURRENCY
+from crm_store import crm_store
+
 CONTEXT_DIR = Path(__file__).parent.parent / "context"
 EXPORTS_DIR = CONTEXT_DIR / "exports"
 EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
 
 
+class ExportWriter:
+    """
+    Streams an export to <file>.part, renamed to the final name on close().
+    json:   {"meta": ..., "chats": [...], "summary": ...}
+    ndjson: {"type": "meta", ...} / {"type": "chat", ...} per chat / {"type": "summary", ...}
+    """
+
+    def __init__(self, path: Path, format: str, meta: dict):
+        self.path = path
+        self.ndjson = format == "ndjson"
+        self._part = path.with_name(path.name + ".part")
+        self._file = open(self._part, "w", encoding="utf-8")
+        self._first = True
+        if self.ndjson:
+            self._line({"type": "meta", **meta})
+        else:
+            self._file.write('{"meta": ' + json.dumps(meta, ensure_ascii=False) + ',\n"chats": [\n')
+
+    def _line(self, obj: dict):
+        self._file.write(json.dumps(obj, ensure_ascii=False) + "\n")
+
+    def write_chat(self, chat: dict):
+        if self.ndjson:
+            self._line({"type": "chat", **chat})
+            return
+        if not self._first:
+            self._file.write(",\n")
+        self._first = False
+        self._file.write(json.dumps(chat, ensure_ascii=False))
+
+    def close(self, summary: dict):
+        if self.ndjson:
+            self._line({"type": "summary", **summary})
+        else:
+            self._file.write('\n],\n"summary": ' + json.dumps(summary, ensure_ascii=False) + "}\n")
+        self._file.close()
+        self._part.replace(self.path)
+
+    def abort(self):
+        self._file.close()
+        self._part.unlink(missing_ok=True)
+
+
 class CursorExporter:
     """Export chat data for Cursor AI analysis"""
 
@@ -32,8 +79,7 @@ class CursorExporter:
         messages.reverse()  # Oldest first
 
         # Get chat info
-        dialogs = await acc.get_dialogs(limit=200)
-        chat_info = next((d for d in dialogs if d["id"] == chat_id), {})
+        chat_info = await self.manager.get_dialog(acc.name, chat_id)
         chat_name = chat_info.get("name", f"chat_{chat_id}")
 
         # Build markdown
@@ -85,8 +131,7 @@ class CursorExporter:
         messages = await acc.get_messages(chat_id, limit)
         messages.reverse()
 
-        dialogs = await acc.get_dialogs(limit=200)
-        chat_info = next((d for d in dialogs if d["id"] == chat_id), {})
+        chat_info = await self.manager.get_dialog(acc.name, chat_id)
 
         # Calculate statistics
         my_messages = [m for m in messages if m["is_outgoing"]]
@@ -153,38 +198,78 @@ class CursorExporter:
 
         return str(filepath)
 
-    async def export_multiple_chats(self, chats: list[dict], limit_per_chat: int = 100) -> str:
+    async def export_multiple_chats(
+        self,
+        chats: list[dict],
+        limit_per_chat: int = 100,
+        format: str = "json",
+        incremental: bool = False,
+        export_key: str = "multi"
+    ) -> str:
         """
         Export multiple chats into single analysis file.
         chats: [{"account": "acc1", "chat_id": 123}, ...]
+        format: "json" or "ndjson" (one JSON object per line: meta, chats..., summary)
+        incremental: only messages newer than the previous incremental export with the same export_key
+            (oldest first, up to limit_per_chat per run - the rest comes in the next run)
+
+        Chats are written to disk as soon as they are fetched (in completion order),
+        so memory holds at most a few chats per account, not the whole export.
         """
-        all_data = {
-            "meta": {
-                "exported_at": datetime.now().isoformat(),
-                "chat_count": len(chats),
-                "description": "Multi-chat export for Cursor AI analysis"
-            },
-            "chats": []
-        }
+        # Chat names/types from one dialog snapshot instead of a lookup per chat
+        dialogs = {(d["account"], d["id"]): d for d in await self.manager.get_all_dialogs()}
+        state = crm_store.get_export_state(export_key) if incremental else {}
 
+        by_account: dict[str, list[dict]] = {}
         for chat in chats:
-            acc = self.manager.get_account(chat["account"])
-            if not acc or not acc.connected:
-                continue
+            by_account.setdefault(chat["account"], []).append(chat)
 
-            messages = await acc.get_messages(chat["chat_id"], limit_per_chat)
-            messages.reverse()
-
-            dialogs = await acc.get_dialogs(limit=200)
-            chat_info = next((d for d in dialogs if d["id"] == chat["chat_id"]), {})
-
-            all_data["chats"].append({
-                "account": chat["account"],
-                "chat_id": chat["chat_id"],
+        meta = {
+            "exported_at": datetime.now().isoformat(),
+            "chat_count": len(chats),
+            "incremental": incremental,
+            "description": "Multi-chat export for Cursor AI analysis"
+        }
+        summary = {"exported_chats": 0, "unchanged_chats": 0, "messages": 0}
+        failed_chats = []
+
+        suffix = "ndjson" if format == "ndjson" else "json"
+        filepath = EXPORTS_DIR / f"multi_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{suffix}"
+        writer = ExportWriter(filepath, format, meta)
+
+        async def export_chat(acc, chat: dict, semaphore: asyncio.Semaphore):
+            chat_id = chat["chat_id"]
+            min_id = state.get((acc.name, chat_id), 0)
+            try:
+                async with semaphore:
+                    # After min_id: the oldest new messages first, so nothing between runs is skipped
+                    messages = await acc.get_messages(
+                        chat_id, limit_per_chat, min_id=min_id, reverse=bool(min_id), raise_errors=True
+                    )
+            except Exception as e:
+                # Not "no new messages" - state stays as is and the chat is retried next run
+                failed_chats.append({"account": acc.name, "chat_id": chat_id, "error": str(e)})
+                return
+            if incremental and not messages:
+                summary["unchanged_chats"] += 1
+                return
+            if not min_id:
+                messages.reverse()
+
+            chat_info = dialogs.get((acc.name, chat_id), {})
+            # No await between write and state update - a cancelled account never
+            # leaves a chat written but not recorded (or the other way round)
+            writer.write_chat({
+                "account": acc.name,
+                "chat_id": chat_id,
                 "chat_name": chat_info.get("name", "Unknown"),
                 "type": chat_info.get("type", "unknown"),
+                "after_message_id": min_id or None,
+                # Incremental export hit the limit - newer messages come in the next run
+                "truncated": bool(min_id) and len(messages) >= limit_per_chat,
                 "messages": [
                     {
+                        "id": m["id"],
                         "date": m["date"],
                         "is_outgoing": m["is_outgoing"],
                         "text": m["text"]
@@ -192,37 +277,56 @@ class CursorExporter:
                     for m in messages
                 ]
             })
-
-        filename = f"multi_export_{datetime.now().strftime('%Y%m%d_%H%M')}.json"
-        filepath = EXPORTS_DIR / filename
-
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(all_data, f, ensure_ascii=False, indent=2)
+            summary["exported_chats"] += 1
+            summary["messages"] += len(messages)
+            if messages:
+                # Last message actually written (messages are oldest first)
+                crm_store.save_export_state(export_key, acc.name, chat_id, messages[-1]["id"])
+
+        async def export_account(acc):
+            semaphore = asyncio.Semaphore(EXPORT_CHAT_CONCURRENCY)
+            await asyncio.gather(*(export_chat(acc, chat, semaphore) for chat in by_account[acc.name]))
+
+        accounts = [
+            acc for acc in map(self.manager.get_account, by_account)
+            if acc and acc.connected
+        ]
+        try:
+            _, report = await self.manager.run_per_account(
+                export_account, accounts, timeout=ACCOUNT_EXPORT_TIMEOUT_SECONDS, label="export"
+            )
+        except BaseException:
+            writer.abort()
+            raise
+
+        if report["failed"]:
+            summary["incomplete_accounts"] = report["failed"]
+        if failed_chats:
+            summary["failed_chats"] = failed_chats
+        writer.close(summary)
 
         return str(filepath)
 
-    async def export_by_tag(self, tag_id: str, limit_per_chat: int = 50) -> str:
+    async def export_by_tag(self, tag_id: str, limit_per_chat: int = 50,
+                            format: str = "json", incremental: bool = False) -> str:
         """
         Export all chats with specific tag.
         Great for analyzing all client conversations, supplier talks, etc.
         """
         from crm_data import crm
 
-        # Find all chats with this tag
-        tagged_chats = []
-        for chat_key, chat_data in crm.chats.items():
-            if tag_id in chat_data.get("tags", []):
-                parts = chat_key.split(":")
-                if len(parts) == 2:
-                    tagged_chats.append({
-                        "account": parts[0],
-                        "chat_id": int(parts[1])
-                    })
+        # Find all chats with this tag (indexed query)
+        tagged_chats = [
+            {"account": account, "chat_id": chat_id}
+            for account, chat_id in crm.get_chats_by_tag(tag_id)
+        ]
 
         if not tagged_chats:
             return None
 
-        return await self.export_multiple_chats(tagged_chats, limit_per_chat)
+        return await self.export_multiple_chats(
+            tagged_chats, limit_per_chat, format=format, incremental=incremental, export_key=f"tag:{tag_id}"
+        )
 
     async def create_analysis_prompt(self, filepath: str) -> str:
         """
@@ -0,0 +1,248 @@
+"""
+Dialog Cache - dialogs of all accounts in memory, kept current by Telethon updates
+and persisted to sqlite so the dashboard is warm right after a restart
+"""
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("TelegramHub")
+
+
+def dialog_sort_key(dialog: dict) -> str:
+    return dialog.get("last_message_date") or ""
+
+
+class DialogCache:
+    """
+    account -> chat_id -> dialog dict (same shape as TelegramAccount.get_dialogs()).
+
+    Accounts are loaded once with iter_dialogs (replace_account); after that
+    NewMessage / MessageRead / ChatAction handlers patch single dialogs.
+    Changes are written to sqlite in batches by flush().
+    Every change bumps `version` and stamps the dialog with it, so readers can ask
+    what changed since a version they have seen (see changed_since).
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._dialogs: dict[str, dict[int, dict]] = {}
+        self._fresh: set[str] = set()      # accounts synced with Telegram in this run
+        self._dirty: set[tuple[str, int]] = set()
+        self._removed: set[tuple[str, int]] = set()
+        self._replaced: set[str] = set()
+        self.version = 0
+        self._versions: dict[tuple[str, int], int] = {}     # dialog -> version of last change
+        self._tombstones: dict[tuple[str, int], int] = {}   # removed dialog -> version of removal
+        self._lock = threading.Lock()
+        self._db_lock = threading.RLock()
+        # Opened by open() in the app startup hook - importing the module creates no files
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        """Open the database and create the table (idempotent)"""
+        with self._db_lock:
+            if self._connection is not None:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS dialogs ("
+                " account TEXT NOT NULL,"
+                " chat_id INTEGER NOT NULL,"
+                " data TEXT NOT NULL,"
+                " PRIMARY KEY (account, chat_id))"
+            )
+            conn.commit()
+            self._connection = conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.open()
+        return self._connection
+
+    # ===== Persistence =====
+
+    def load(self) -> int:
+        """Load dialogs saved by the previous run (served until accounts are re-synced)"""
+        count = 0
+        with self._lock:
+            for account, chat_id, data in self._conn.execute("SELECT account, chat_id, data FROM dialogs"):
+                try:
+                    self._dialogs.setdefault(account, {})[chat_id] = json.loads(data)
+                    count += 1
+                except ValueError:
+                    logger.warning(f"Dialog cache: broken row {account}:{chat_id}")
+        logger.info(f"Dialog cache: {count} dialogs loaded from {self.db_path.name}")
+        return count
+
+    def flush(self):
+        """Write changed dialogs to sqlite in one transaction"""
+        with self._lock:
+            if not (self._dirty or self._removed or self._replaced):
+                return
+            replaced, self._replaced = self._replaced, set()
+            removed, self._removed = self._removed, set()
+            dirty, self._dirty = self._dirty, set()
+            rows = []
+            for account, chat_id in dirty:
+                dialog = self._dialogs.get(account, {}).get(chat_id)
+                if dialog is not None:
+                    rows.append((account, chat_id, json.dumps(dialog, ensure_ascii=False)))
+
+        # Handlers keep updating memory while the batch is written
+        try:
+            with self._db_lock, self._conn:
+                for account in replaced:
+                    self._conn.execute("DELETE FROM dialogs WHERE account = ?", (account,))
+                self._conn.executemany(
+                    "DELETE FROM dialogs WHERE account = ? AND chat_id = ?", list(removed)
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO dialogs (account, chat_id, data) VALUES (?, ?, ?)", rows
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Dialog cache: flush failed - {e}")
+            with self._lock:
+                self._replaced |= replaced
+                self._removed |= removed
+                self._dirty |= dirty
+
+    def close(self):
+        self.flush()
+        with self._db_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    # ===== Reads =====
+
+    def has_account(self, account: str) -> bool:
+        return account in self._dialogs
+
+    def is_fresh(self, account: str) -> bool:
+        """Account was synced with Telegram in this run (updates keep it current)"""
+        return account in self._fresh
+
+    def mark_stale(self, account: str):
+        """Updates may have been missed (reconnect) - re-sync on next occasion"""
+        self._fresh.discard(account)
+
+    def get_dialogs(self, account: str) -> list[dict]:
+        """Dialogs of one account, newest first (copies - safe to enrich)"""
+        with self._lock:
+            dialogs = [dict(d) for d in self._dialogs.get(account, {}).values()]
+        dialogs.sort(key=dialog_sort_key, reverse=True)
+        return dialogs
+
+    def get_dialog(self, account: str, chat_id: int) -> Optional[dict]:
+        with self._lock:
+            dialog = self._dialogs.get(account, {}).get(chat_id)
+            return dict(dialog) if dialog is not None else None
+
+    def all_dialogs(self, accounts: Optional[set[str]] = None) -> tuple[int, list[dict]]:
+        """(version, dialogs of given accounts) - copies, unsorted"""
+        with self._lock:
+            return self.version, [
+                dict(d)
+                for account, dialogs in self._dialogs.items() if accounts is None or account in accounts
+                for d in dialogs.values()
+            ]
+
+    def changed_since(self, version: int) -> tuple[list[tuple[str, int]], list[tuple[str, int]]]:
+        """(changed, removed) dialog keys after given version"""
+        with self._lock:
+            changed = [key for key, v in self._versions.items() if v > version]
+            removed = [key for key, v in self._tombstones.items() if v > version]
+        return changed, removed
+
+    def _touch(self, key: tuple[str, int]):
+        """Stamp changed dialog (called under _lock)"""
+        self.version += 1
+        self._versions[key] = self.version
+        self._tombstones.pop(key, None)
+        self._dirty.add(key)
+
+    def _bury(self, key: tuple[str, int]):
+        self.version += 1
+        self._versions.pop(key, None)
+        self._tombstones[key] = self.version
+
+    # ===== Writes =====
+
+    def replace_account(self, account: str, dialogs: list[dict]):
+        """Full dialog list of account fetched from Telegram"""
+        with self._lock:
+            old = self._dialogs.get(account, {})
+            self._dialogs[account] = {d["id"]: dict(d) for d in dialogs}
+            self._replaced.add(account)
+            self._removed = {key for key in self._removed if key[0] != account}
+            self._dirty = {key for key in self._dirty if key[0] != account}
+            for chat_id, dialog in self._dialogs[account].items():
+                if old.get(chat_id) != dialog:
+                    self._touch((account, chat_id))
+            self._dirty.update((account, chat_id) for chat_id in self._dialogs[account])
+            for chat_id in old.keys() - self._dialogs[account].keys():
+                self._bury((account, chat_id))
+            self._fresh.add(account)
+
+    def apply_message(self, account: str, chat_id: int, last_message: dict,
+                      incoming: bool, dialog: Optional[dict] = None):
+        """
+        New message in chat: becomes last message, incoming messages add to unread.
+        dialog - base info (name, type) for a chat that is not cached yet.
+        """
+        with self._lock:
+            dialogs = self._dialogs.get(account)
+            if dialogs is None:
+                return              # account not loaded yet - the full load will include it
+            current = dialogs.get(chat_id)
+            if current is None:
+                if dialog is None:
+                    return
+                current = dict(dialog, unread_count=0)
+                dialogs[chat_id] = current
+
+            current["last_message"] = last_message
+            current["last_message_date"] = last_message.get("date")
+            if incoming:
+                current["unread_count"] = current.get("unread_count", 0) + 1
+            else:
+                # Replying from any client means the chat was read
+                current["unread_count"] = 0
+            self._touch((account, chat_id))
+
+    def mark_read(self, account: str, chat_id: int, max_id: int) -> bool:
+        """
+        Incoming messages up to max_id were read (on any client).
+        Returns False if the remaining unread count can't be known from cache.
+        """
+        with self._lock:
+            current = self._dialogs.get(account, {}).get(chat_id)
+            if current is None or not current.get("unread_count"):
+                return True
+            last_id = (current.get("last_message") or {}).get("id")
+            if last_id is not None and max_id >= last_id:
+                current["unread_count"] = 0
+                self._touch((account, chat_id))
+                return True
+            return False
+
+    def rename(self, account: str, chat_id: int, name: str):
+        with self._lock:
+            current = self._dialogs.get(account, {}).get(chat_id)
+            if current is not None:
+                current["name"] = name
+                self._touch((account, chat_id))
+
+    def remove(self, account: str, chat_id: int):
+        with self._lock:
+            if self._dialogs.get(account, {}).pop(chat_id, None) is not None:
+                self._dirty.discard((account, chat_id))
+                self._removed.add((account, chat_id))
+                self._bury((account, chat_id))
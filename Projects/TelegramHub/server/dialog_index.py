@@ -0,0 +1,152 @@
+"""
+Dialog Index - server-side filtering, cursor pagination and deltas for /api/dialogs
+Built on DialogCache (dialogs) and CRMData (tags, status, pinned); both stamp every change
+with a version, so "what changed since X" doesn't need to compare full lists.
+"""
+import base64
+import json
+import uuid
+import zlib
+from typing import Optional
+
+from dialog_cache import dialog_sort_key
+
+
+def _order_key(dialog: dict) -> tuple:
+    """Newest first; account + id make the order total (stable cursors)"""
+    return dialog_sort_key(dialog), dialog["account"], dialog["id"]
+
+
+def encode_cursor(dialog: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(_order_key(dialog)).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    date, account, chat_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return date, account, int(chat_id)
+
+
+class DialogFilter:
+    def __init__(self, account: Optional[str] = None, type: Optional[str] = None,
+                 unread_gt: Optional[int] = None, tag: Optional[str] = None,
+                 status: Optional[str] = None, pinned: Optional[bool] = None):
+        self.account = account
+        self.type = type
+        self.unread_gt = unread_gt
+        self.tag = tag
+        self.status = status
+        self.pinned = pinned
+
+    def matches(self, dialog: dict) -> bool:
+        crm = dialog["crm"]
+        if self.account and dialog["account"] != self.account:
+            return False
+        if self.type and dialog.get("type") != self.type:
+            return False
+        if self.unread_gt is not None and dialog.get("unread_count", 0) <= self.unread_gt:
+            return False
+        if self.tag and self.tag not in crm.get("tags", []):
+            return False
+        if self.status and crm.get("status") != self.status:
+            return False
+        if self.pinned is not None and bool(crm.get("pinned")) != self.pinned:
+            return False
+        return True
+
+
+class DialogIndex:
+    """
+    Version token "<epoch>.<dialogs version>.<crm version>.<accounts>": the same token means
+    the same response for the same query. epoch changes on restart (versions start over).
+    """
+
+    def __init__(self, cache, crm):
+        self.cache = cache
+        self.crm = crm
+        self.epoch = uuid.uuid4().hex[:8]
+        # Sorted dialogs, rebuilt only when dialog cache changes
+        self._sorted: list[dict] = []
+        self._sorted_key: Optional[tuple] = None
+
+    def version(self, accounts: set[str]) -> str:
+        accounts_hash = format(zlib.crc32(",".join(sorted(accounts)).encode()), "x")
+        return f"{self.epoch}.{self.cache.version}.{self.crm.version}.{accounts_hash}"
+
+    def _with_crm(self, dialog: dict) -> dict:
+        dialog["crm"] = self.crm.get_chat_data(dialog["account"], dialog["id"])
+        return dialog
+
+    def _sorted_dialogs(self, accounts: set[str]) -> list[dict]:
+        key = (self.cache.version, frozenset(accounts))
+        if key != self._sorted_key:
+            version, dialogs = self.cache.all_dialogs(accounts)
+            dialogs.sort(key=_order_key, reverse=True)
+            self._sorted, self._sorted_key = dialogs, (version, key[1])
+        return self._sorted
+
+    def page(self, accounts: set[str], filters: DialogFilter,
+             cursor: Optional[str] = None, limit: Optional[int] = None) -> dict:
+        """Filtered dialogs newest first; next_cursor continues after the last returned one"""
+        after = decode_cursor(cursor) if cursor else None
+        matched = []
+        total = 0
+        has_more = False
+        for dialog in self._sorted_dialogs(accounts):
+            dialog = self._with_crm(dict(dialog))
+            if not filters.matches(dialog):
+                continue
+            total += 1
+            if after is not None and _order_key(dialog) >= after:
+                continue
+            if limit is not None and len(matched) >= limit:
+                has_more = True
+                continue
+            matched.append(dialog)
+
+        return {
+            "dialogs": matched,
+            "total": total,
+            "next_cursor": encode_cursor(matched[-1]) if has_more else None,
+            "version": self.version(accounts)
+        }
+
+    def delta(self, accounts: set[str], filters: DialogFilter, since: str) -> Optional[dict]:
+        """
+        Changes after version `since`: changed dialogs that match filters, and keys the client
+        should drop (removed or no longer matching). None - token unusable, send full list.
+        """
+        try:
+            epoch, dialogs_version, crm_version, accounts_hash = since.split(".")
+            dialogs_version, crm_version = int(dialogs_version), int(crm_version)
+        except ValueError:
+            return None
+        current = self.version(accounts)
+        if epoch != self.epoch or not current.endswith("." + accounts_hash):
+            return None
+        if dialogs_version > self.cache.version or crm_version > self.crm.version:
+            return None
+
+        changed_keys, removed_keys = self.cache.changed_since(dialogs_version)
+        keys = set(changed_keys) | set(self.crm.changed_since(crm_version))
+        removed = {key for key in removed_keys if key[0] in accounts}
+
+        changed = []
+        for account, chat_id in keys - removed:
+            if account not in accounts:
+                continue
+            dialog = self.cache.get_dialog(account, chat_id)
+            if dialog is None:
+                continue
+            dialog = self._with_crm(dialog)
+            if filters.matches(dialog):
+                changed.append(dialog)
+            else:
+                removed.add((account, chat_id))
+
+        changed.sort(key=_order_key, reverse=True)
+        return {
+            "delta": True,
+            "changed": changed,
+            "removed": [{"account": account, "id": chat_id} for account, chat_id in sorted(removed)],
+            "version": current
+        }
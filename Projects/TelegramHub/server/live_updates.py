@@ -0,0 +1,94 @@
+"""
+Live Updates - push of Telegram / CRM events to dashboard WebSocket clients (/ws)
+Producers (Telethon update handlers, drafts, broadcasts) call publish() from the event loop;
+every client has its own bounded queue, so a slow client never delays producers or other clients.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from config import LIVE_QUEUE_SIZE
+
+logger = logging.getLogger("TelegramHub")
+
+EVENT_TYPES = {"message", "edited", "deleted", "read", "dialog", "draft", "broadcast"}
+
+
+class Subscription:
+    """
+    Per-client filter; None = everything.
+    Events without account / chat_id (broadcast progress) pass account / chat filters.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.types: Optional[set[str]] = None
+        self.accounts: Optional[set[str]] = None
+        self.chats: Optional[set[tuple[str, int]]] = None
+        self.dropped = 0
+
+    def update(self, types=None, accounts=None, chats=None):
+        self.types = set(types) & EVENT_TYPES if types is not None else None
+        self.accounts = set(accounts) if accounts is not None else None
+        self.chats = {(c["account"], int(c["chat_id"])) for c in chats} if chats is not None else None
+
+    def matches(self, event: dict) -> bool:
+        if self.types is not None and event["type"] not in self.types:
+            return False
+        account = event.get("account")
+        if self.accounts is not None and account is not None and account not in self.accounts:
+            return False
+        chat_id = event.get("chat_id")
+        if self.chats is not None and chat_id is not None and (account, chat_id) not in self.chats:
+            return False
+        return True
+
+    def offer(self, event: dict):
+        """
+        Queue event without waiting. On overflow queued events are dropped and replaced by one
+        "resync" event - the client reloads state (/api/dialogs?since=...) instead of replaying.
+        """
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.dropped += 1
+            self.queue.put_nowait({"type": "resync", "dropped": self.dropped})
+
+
+class EventHub:
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscriptions: set[Subscription] = set()
+        self.stats = {"published": 0, "resyncs": 0}
+
+    @property
+    def clients(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def publish(self, event_type: str, **data):
+        """Must be called from the event loop thread (handlers, endpoints, tasks)"""
+        if not self._subscriptions:
+            return
+        event = {"type": event_type, **data}
+        self.stats["published"] += 1
+        for subscription in list(self._subscriptions):
+            if subscription.matches(event):
+                full = subscription.queue.full()
+                subscription.offer(event)
+                if full:
+                    self.stats["resyncs"] += 1
+
+
+# Global instance
+event_hub = EventHub(LIVE_QUEUE_SIZE)
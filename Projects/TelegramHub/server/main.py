@@ -3,23 +3,33 @@ TelegramHub CRM v2.0
 Full-featured Telegram multi-account management system
 """
 import asyncio
-import json
 import csv
+import time
 import io
 import base64
 from datetime import datetime
+from urllib.parse import quote
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, Request, UploadFile, File
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response, PlainTextResponse
 from pydantic import BaseModel
 import uvicorn
 
-from config import HOST, PORT, CONTEXT_DIR, DRAFTS_DIR, AI_ENABLED, REVIEW_MIN_UNREAD, REVIEW_MAX_CHATS, REVIEW_SKIP_GROUPS
+from config import HOST, PORT, CONTEXT_DIR, AI_ENABLED, REVIEW_MESSAGES_LIMIT
+from config import MEDIA_CACHE_EAGER_MB, MEDIA_CHUNK_SIZE, LIVE_SEND_TIMEOUT_SECONDS
 from telegram_manager import manager, logger
 from crm_data import crm
 from ai_assistant import ai_assistant, drafts_manager
+from media_cache import MediaCache, RangeNotSatisfiable, parse_range, iter_file
+from crm_store import crm_store
+from review_ai import ReviewAnalyzer
+from dialog_index import DialogIndex, DialogFilter
+from metrics import metrics, http_latency, cache_requests, hit_ratio
+
+review_analyzer = ReviewAnalyzer(manager, crm, ai_assistant, crm_store)
+dialog_index = DialogIndex(manager.dialog_cache, crm)
 
 
 # ============================================================
@@ -83,11 +93,16 @@ class ExportRequest(BaseModel):
 class MultiExportRequest(BaseModel):
     chats: list[dict]
     limit_per_chat: int = 100
+    format: str = "json"  # "json" or "ndjson"
+    incremental: bool = False  # Only messages newer than the previous incremental export
+    export_key: str = "multi"  # Separate incremental state per export
 
 
 class TagExportRequest(BaseModel):
     tag_id: str
     limit_per_chat: int = 50
+    format: str = "json"
+    incremental: bool = False
 
 
 # AI Request Models
@@ -141,41 +156,65 @@ class ReviewActionRequest(BaseModel):
     draft_id: str | None = None
 
 
-# Drafts storage
-drafts = {}
-
-
-def load_drafts():
-    global drafts
-    drafts_file = DRAFTS_DIR / "outbox.json"
-    if drafts_file.exists():
-        with open(drafts_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            drafts = {d["id"]: d for d in data}
-
-
-def save_drafts():
-    drafts_file = DRAFTS_DIR / "outbox.json"
-    with open(drafts_file, "w", encoding="utf-8") as f:
-        json.dump(list(drafts.values()), f, ensure_ascii=False, indent=2)
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting TelegramHub CRM v2.0...")
-    load_drafts()
+    crm_store.open()
+    crm.load()
+    drafts_manager.load()
+    manager.open()
     loaded = await manager.load_accounts()
     logger.info(f"Accounts loaded: {loaded}")
     if loaded > 0:
         await manager.sync_to_files()
+    review_analyzer.start()
     yield
     logger.info("Stopping TelegramHub CRM...")
+    await review_analyzer.stop()
     await manager.disconnect_all()
+    manager.close()
+    crm_store.close()
 
 
 app = FastAPI(title="TelegramHub CRM", version="2.0.0", lifespan=lifespan)
 
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    """Latency per route template (not raw path - chat ids would explode label count)"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Streaming responses: time until headers are ready
+        route = request.scope.get("route")
+        http_latency.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=f"{status // 100}xx"
+        )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/metrics")
+async def metrics_summary():
+    """Rolling window (p50/p95/max) for the dashboard"""
+    summary = metrics.summary()
+    summary["cache_hit_ratio"] = {
+        cache: hit_ratio(cache_requests, cache) for cache in ("dialogs", "media", "ai_review")
+    }
+    return summary
+
+
 # ============================================================
 # API Endpoints
 # ============================================================
@@ -191,13 +230,89 @@ async def get_statistics():
 
 
 @app.get("/api/dialogs")
-async def get_dialogs():
-    dialogs = await manager.get_all_dialogs()
-    # Enrich with CRM data
-    for d in dialogs:
-        crm_data = crm.get_chat_data(d["account"], d["id"])
-        d["crm"] = crm_data
-    return dialogs
+async def get_dialogs(
+    request: Request,
+    refresh: bool = False,
+    account: str | None = None,
+    type: str | None = None,
+    unread_gt: int | None = None,
+    tag: str | None = None,
+    status: str | None = None,
+    pinned: bool | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+    since: str | None = None
+):
+    """
+    Dialogs with CRM data, newest first, filtered on server.
+    limit + cursor (next_cursor of previous page) - pagination;
+    since (version of previous response) - only changed / removed dialogs.
+    ETag is the version: unchanged data -> 304.
+    """
+    accounts = await manager.ensure_all_dialogs(refresh)
+    filters = DialogFilter(account, type, unread_gt, tag, status, pinned)
+
+    version = dialog_index.version(accounts)
+    etag = f'W/"{version}"'
+    if not refresh and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    result = dialog_index.delta(accounts, filters, since) if since else None
+    if result is None:
+        try:
+            result = dialog_index.page(accounts, filters, cursor, limit)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+    return JSONResponse(result, headers={"ETag": etag})
+
+
+@app.websocket("/ws")
+async def live_updates(websocket: WebSocket, types: str | None = None, accounts: str | None = None):
+    """
+    Live events: message, edited, deleted, read, dialog, draft, broadcast (see live_updates.py).
+    Filters: ?types=message,read&accounts=acc1 or at any time
+    {"subscribe": {"types": [...], "accounts": [...], "chats": [{"account": ..., "chat_id": ...}]}}
+    ({"type": "resync"} = events were dropped for this client, reload state).
+    """
+    await websocket.accept()
+    subscription = manager.live.subscribe()
+    subscription.update(
+        types=types.split(",") if types else None,
+        accounts=accounts.split(",") if accounts else None
+    )
+
+    async def receive_filters():
+        while True:
+            try:
+                filters = (await websocket.receive_json()).get("subscribe")
+                if isinstance(filters, dict):
+                    subscription.update(filters.get("types"), filters.get("accounts"), filters.get("chats"))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                continue
+
+    receiver = asyncio.create_task(receive_filters())
+    try:
+        await websocket.send_json({"type": "hello"})
+        while True:
+            next_event = asyncio.ensure_future(subscription.queue.get())
+            await asyncio.wait({next_event, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver.done():
+                next_event.cancel()
+                break
+            # Slow client: disconnected, reconnects and catches up via /api/dialogs?since=
+            await asyncio.wait_for(websocket.send_json(next_event.result()), LIVE_SEND_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning(f"Live client too slow, disconnecting ({subscription.dropped} events dropped)")
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        manager.live.unsubscribe(subscription)
+        receiver.cancel()
+        await asyncio.gather(receiver, return_exceptions=True)
 
 
 @app.get("/api/messages/{account}/{chat_id}")
@@ -209,6 +324,35 @@ async def get_messages(account: str, chat_id: int, limit: int = 50):
     return messages
 
 
+@app.get("/api/search")
+async def search_messages(
+    q: str,
+    account: str | None = None,
+    chat_id: int | None = None,
+    tag: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    limit: int = 50,
+    offset: int = 0
+):
+    """Full-text search over messages already loaded or received (see search_index.py)"""
+    chats = crm.get_chats_by_tag(tag) if tag else None
+    try:
+        # FTS query + bm25 in a worker thread - a common word must not stall the event loop
+        found = await asyncio.to_thread(
+            manager.search_index.search,
+            q, account=account, chat_id=chat_id, chats=chats,
+            date_from=date_from, date_to=date_to, limit=min(limit, 200), offset=offset
+        )
+    except ValueError:
+        raise HTTPException(400, "Invalid date, use ISO format (2025-01-31 or 2025-01-31T12:00:00)")
+
+    for r in found["results"]:
+        dialog = manager.dialog_cache.get_dialog(r["account"], r["chat_id"]) or {}
+        r["chat_name"] = dialog.get("name")
+    return found
+
+
 @app.post("/api/send")
 async def send_message(req: SendMessageRequest):
     acc = manager.get_account(req.account)
@@ -234,47 +378,128 @@ async def send_file(
     return result
 
 
+def _media_response(body, size: int, mime_type: str, filename: str | None, byte_range) -> StreamingResponse:
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": "private, max-age=86400"}
+    if filename:
+        headers["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(filename)}"
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(body, status_code=206, media_type=mime_type, headers=headers)
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(body, media_type=mime_type, headers=headers)
+
+
+def _parse_range_or_416(request: Request, size: int):
+    try:
+        return parse_range(request.headers.get("range"), size)
+    except RangeNotSatisfiable:
+        raise HTTPException(416, "Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+
+
+def _cached_media_response(request: Request, cached) -> StreamingResponse:
+    byte_range = _parse_range_or_416(request, cached.size)
+    start, end = byte_range or (0, cached.size - 1)
+    body = iter_file(cached.path, start, end, MEDIA_CHUNK_SIZE)
+    return _media_response(body, cached.size, cached.mime_type, cached.filename, byte_range)
+
+
+async def _stream_and_cache(acc, msg, key: str, info: dict):
+    """
+    Full download: sent to client and written to disk cache at the same time.
+    Registered as the download of `key` - concurrent requests wait for it and are served from disk.
+    Registration happens when streaming starts, so a response that is never sent leaves nothing behind
+    """
+    download = manager.register_media_download(key)
+    cached = None
+    writer = None
+    try:
+        writer = await asyncio.to_thread(manager.media_cache.writer, key, info["mime_type"], info.get("filename"))
+        async for chunk in acc.iter_media(msg):
+            await asyncio.to_thread(writer.write, chunk)
+            yield chunk
+        cached = await asyncio.to_thread(writer.commit)
+    finally:
+        if cached is None and writer is not None:
+            await asyncio.to_thread(writer.abort)
+        if not download.done():
+            download.set_result(cached)
+
+
 @app.get("/api/media/{account}/{chat_id}/{message_id}")
-async def get_media(account: str, chat_id: int, message_id: int):
+async def get_media(account: str, chat_id: int, message_id: int, request: Request):
+    """Stream media (HTTP Range supported); repeated views are served from disk cache"""
     acc = manager.get_account(account)
     if not acc:
         raise HTTPException(404, "Account not found")
 
-    media = await acc.download_media(chat_id, message_id)
-    if not media:
+    cached = manager.media_cache.find(account, chat_id, message_id)
+    cache_requests.inc(cache="media", result="hit" if cached else "miss")
+    if cached:
+        return _cached_media_response(request, cached)
+
+    msg = await acc.get_media_message(chat_id, message_id)
+    if not msg:
         raise HTTPException(404, "Media not found")
 
-    return media
+    info = acc.get_file_info(msg)
+    key = MediaCache.key(account, chat_id, message_id, info["id"])
+    size = info["size"]
+
+    # Photos (size unknown) and small files: download once, then serve from disk
+    if size is None or size <= MEDIA_CACHE_EAGER_MB * 1024 * 1024:
+        cached = await manager.cache_media(acc, msg, key, info)
+        if not cached:
+            raise HTTPException(502, "Media download failed")
+        return _cached_media_response(request, cached)
+
+    byte_range = _parse_range_or_416(request, size)
+    if byte_range and byte_range != (0, size - 1):
+        # Seek in video: stream only the range, cache the whole file in background
+        manager.prefetch_media(acc, msg, key, info)
+        start, end = byte_range
+        body = acc.iter_media(msg, offset=start, length=end - start + 1)
+        return _media_response(body, size, info["mime_type"], info.get("filename"), byte_range)
+
+    if manager.is_media_downloading(key):
+        # Another request is downloading the file - wait for it instead of a second download
+        cached = await manager.cache_media(acc, msg, key, info)
+        if cached:
+            return _cached_media_response(request, cached)
+
+    body = _stream_and_cache(acc, msg, key, info)
+    return _media_response(body, size, info["mime_type"], info.get("filename"), byte_range)
 
 
 # CRM Endpoints
 @app.post("/api/crm/tag/add")
 async def add_tag(req: TagRequest):
-    crm.add_tag_to_chat(req.account, req.chat_id, req.tag_id)
+    crm.add_chat_tag(req.account, req.chat_id, req.tag_id)
     return {"status": "ok"}
 
 
 @app.post("/api/crm/tag/remove")
 async def remove_tag(req: TagRequest):
-    crm.remove_tag_from_chat(req.account, req.chat_id, req.tag_id)
+    crm.remove_chat_tag(req.account, req.chat_id, req.tag_id)
     return {"status": "ok"}
 
 
 @app.post("/api/crm/notes")
 async def set_notes(req: NotesRequest):
-    crm.set_notes(req.account, req.chat_id, req.notes)
+    crm.set_chat_notes(req.account, req.chat_id, req.notes)
     return {"status": "ok"}
 
 
 @app.post("/api/crm/status")
 async def set_status(req: StatusRequest):
-    crm.set_status(req.account, req.chat_id, req.status)
+    crm.set_chat_status(req.account, req.chat_id, req.status)
     return {"status": "ok"}
 
 
 @app.post("/api/crm/pin")
 async def toggle_pin(req: PinRequest):
-    pinned = crm.toggle_pin(req.account, req.chat_id)
+    pinned = crm.toggle_chat_pinned(req.account, req.chat_id)
     return {"pinned": pinned}
 
 
@@ -286,34 +511,20 @@ async def get_tags():
 
 @app.post("/api/tags")
 async def create_tag(req: NewTagRequest):
-    crm.tags.append({
-        "id": req.tag_id,
-        "name": req.name,
-        "color": req.color
-    })
-    crm.save()
+    crm.add_tag(req.tag_id, req.name, req.color)
     return {"status": "ok"}
 
 
 @app.put("/api/tags/{tag_id}")
 async def update_tag(tag_id: str, req: NewTagRequest):
-    for tag in crm.tags:
-        if tag["id"] == tag_id:
-            tag["name"] = req.name
-            tag["color"] = req.color
-            crm.save()
-            return {"status": "ok"}
+    if crm.update_tag(tag_id, req.name, req.color):
+        return {"status": "ok"}
     raise HTTPException(404, "Tag not found")
 
 
 @app.delete("/api/tags/{tag_id}")
 async def delete_tag(tag_id: str):
-    crm.tags = [t for t in crm.tags if t["id"] != tag_id]
-    # Remove tag from all chats
-    for chat_key, chat_data in crm.chats.items():
-        if tag_id in chat_data.get("tags", []):
-            chat_data["tags"].remove(tag_id)
-    crm.save()
+    crm.remove_tag(tag_id)
     return {"status": "ok"}
 
 
@@ -331,12 +542,8 @@ async def add_template(req: TemplateRequest):
 
 @app.put("/api/templates/{template_id}")
 async def update_template(template_id: str, req: TemplateRequest):
-    for t in crm.templates:
-        if t["id"] == template_id:
-            t["name"] = req.name
-            t["text"] = req.text
-            crm.save()
-            return {"status": "ok"}
+    if crm.update_template(template_id, req.name, req.text):
+        return {"status": "ok"}
     raise HTTPException(404, "Template not found")
 
 
@@ -354,11 +561,32 @@ async def broadcast_message(req: BroadcastRequest):
 
 
 @app.post("/api/broadcast/cancel")
-async def cancel_broadcast():
-    manager.cancel_broadcast()
+async def cancel_broadcast(broadcast_id: str | None = None):
+    manager.cancel_broadcast(broadcast_id)
     return {"status": "cancelled"}
 
 
+@app.get("/api/broadcasts")
+async def list_broadcasts(limit: int = 20):
+    return [manager.broadcasts.status(b["id"]) for b in manager.broadcasts.store.recent(limit)]
+
+
+@app.get("/api/broadcast/{broadcast_id}")
+async def get_broadcast(broadcast_id: str):
+    status = manager.broadcasts.status(broadcast_id)
+    if not status:
+        raise HTTPException(404, "Broadcast not found")
+    return status
+
+
+@app.post("/api/broadcast/{broadcast_id}/resume")
+async def resume_broadcast(broadcast_id: str):
+    """Continue interrupted broadcast: targets already attempted are not sent again"""
+    if not manager.broadcasts.resume(broadcast_id):
+        raise HTTPException(409, "Broadcast is not resumable")
+    return {"status": "resumed", "broadcast_id": broadcast_id}
+
+
 # Export Endpoints
 @app.post("/api/export/chat")
 async def export_chat(req: ExportRequest):
@@ -380,7 +608,9 @@ async def export_chat(req: ExportRequest):
 async def export_multiple_chats(req: MultiExportRequest):
     from cursor_integration import init_exporter
     exp = init_exporter(manager)
-    filepath = await exp.export_multiple_chats(req.chats, req.limit_per_chat)
+    filepath = await exp.export_multiple_chats(
+        req.chats, req.limit_per_chat, format=req.format, incremental=req.incremental, export_key=req.export_key
+    )
     if not filepath:
         raise HTTPException(500, "Export failed")
     return {"status": "exported", "filepath": filepath}
@@ -390,7 +620,7 @@ async def export_multiple_chats(req: MultiExportRequest):
 async def export_by_tag(req: TagExportRequest):
     from cursor_integration import init_exporter
     exp = init_exporter(manager)
-    filepath = await exp.export_by_tag(req.tag_id, req.limit_per_chat)
+    filepath = await exp.export_by_tag(req.tag_id, req.limit_per_chat, format=req.format, incremental=req.incremental)
     if not filepath:
         raise HTTPException(404, "No chats found with this tag")
     return {"status": "exported", "filepath": filepath}
@@ -403,6 +633,9 @@ async def list_exports():
 
     files = []
     for f in sorted(exports_dir.glob("*.*"), key=lambda x: x.stat().st_mtime, reverse=True):
+        # Export still being written
+        if f.suffix == ".part":
+            continue
         files.append({
             "name": f.name,
             "path": str(f),
@@ -445,9 +678,14 @@ async def export_csv():
 
 
 @app.post("/api/sync")
-async def sync_context():
-    await manager.sync_to_files()
-    return {"status": "synced", "timestamp": datetime.now().isoformat()}
+async def sync_context(refresh: bool = False):
+    report = await manager.sync_to_files(refresh)
+    return {
+        "status": "synced",
+        "timestamp": datetime.now().isoformat(),
+        "failed_accounts": report["failed"],
+        "slow_accounts": report["slow"]
+    }
 
 
 # ============================================================
@@ -461,7 +699,8 @@ async def ai_status():
         "available": ai_assistant.is_available,
         "enabled": AI_ENABLED,
         "provider": ai_assistant.provider if ai_assistant.is_available else None,
-        "model": ai_assistant.model if ai_assistant.is_available else None
+        "model": ai_assistant.model if ai_assistant.is_available else None,
+        "review_cache": review_analyzer.stats
     }
 
 
@@ -476,8 +715,7 @@ async def ai_analyze_chat(req: AIAnalyzeRequest):
         raise HTTPException(404, "Account not found")
 
     messages = await acc.get_messages(req.chat_id, req.limit)
-    dialogs = await acc.get_dialogs(limit=200)
-    chat_info = next((d for d in dialogs if d["id"] == req.chat_id), {})
+    chat_info = await manager.get_dialog(acc.name, req.chat_id)
 
     analysis = await ai_assistant.analyze_chat(messages, chat_info)
     return analysis
@@ -494,8 +732,7 @@ async def ai_suggest_replies(req: AISuggestRequest):
         raise HTTPException(404, "Account not found")
 
     messages = await acc.get_messages(req.chat_id, 30)  # Last 30 messages for context
-    dialogs = await acc.get_dialogs(limit=200)
-    chat_info = next((d for d in dialogs if d["id"] == req.chat_id), {})
+    chat_info = await manager.get_dialog(acc.name, req.chat_id)
 
     suggestions = await ai_assistant.suggest_replies(
         messages,
@@ -517,8 +754,7 @@ async def ai_summarize_chat(req: AISummarizeRequest):
         raise HTTPException(404, "Account not found")
 
     messages = await acc.get_messages(req.chat_id, req.limit)
-    dialogs = await acc.get_dialogs(limit=200)
-    chat_info = next((d for d in dialogs if d["id"] == req.chat_id), {})
+    chat_info = await manager.get_dialog(acc.name, req.chat_id)
 
     summary = await ai_assistant.summarize_conversation(messages, chat_info)
     return {"summary": summary}
@@ -548,8 +784,7 @@ async def ai_custom_request(req: AICustomRequest):
     messages = await acc.get_messages(req.chat_id, limit=50)
 
     # Get chat info
-    dialogs = await acc.get_dialogs(limit=200)
-    chat_info = next((d for d in dialogs if d["id"] == req.chat_id), {})
+    chat_info = await manager.get_dialog(acc.name, req.chat_id)
 
     # Generate suggestions with custom context
     suggestions = await ai_assistant.suggest_replies(
@@ -638,36 +873,14 @@ async def send_draft(draft_id: str):
 @app.get("/api/review/queue")
 async def get_review_queue():
     """Get list of chats that need review (have unread messages)"""
-    all_dialogs = await manager.get_all_dialogs()
-
-    # Filter chats that need review
-    review_queue = []
-    for dialog in all_dialogs:
-        unread = dialog.get("unread_count", 0)
-        chat_type = dialog.get("type", "")
-
-        # Skip based on settings
-        if unread < REVIEW_MIN_UNREAD:
-            continue
-        if REVIEW_SKIP_GROUPS and chat_type in ["supergroup", "channel", "chat"]:
-            continue
-
-        # Add CRM data
-        crm_data = crm.get_chat_data(dialog["account"], dialog["id"])
-        dialog["crm"] = crm_data
-
-        # Skip if marked as "later"
-        if crm_data.get("status") == "later":
-            continue
-
-        review_queue.append(dialog)
+    review_queue, total = await review_analyzer.get_queue()
 
-    # Sort by unread count (most unread first)
-    review_queue.sort(key=lambda x: x.get("unread_count", 0), reverse=True)
+    # Precompute AI analysis for the top of the queue in background
+    review_analyzer.kick()
 
     return {
-        "queue": review_queue[:REVIEW_MAX_CHATS],
-        "total": len(review_queue),
+        "queue": review_queue,
+        "total": total,
         "ai_available": ai_assistant.is_available
     }
 
@@ -680,11 +893,10 @@ async def get_review_chat_details(account: str, chat_id: int):
         raise HTTPException(404, "Account not found")
 
     # Get messages
-    messages = await acc.get_messages(chat_id, 30)
+    messages = await acc.get_messages(chat_id, REVIEW_MESSAGES_LIMIT)
 
     # Get chat info
-    dialogs = await acc.get_dialogs(limit=200)
-    chat_info = next((d for d in dialogs if d["id"] == chat_id), {})
+    chat_info = await manager.get_dialog(acc.name, chat_id)
 
     # Get CRM data
     crm_data = crm.get_chat_data(account, chat_id)
@@ -700,13 +912,13 @@ async def get_review_chat_details(account: str, chat_id: int):
         "ai_available": ai_assistant.is_available
     }
 
-    # Add AI analysis if available
+    # Add AI analysis if available (cached per last message, one AI call on miss)
     if ai_assistant.is_available:
         try:
-            analysis = await ai_assistant.analyze_chat(messages, chat_info)
-            suggestions = await ai_assistant.suggest_replies(messages, chat_info)
-            result["ai_analysis"] = analysis
-            result["ai_suggestions"] = suggestions
+            review = await review_analyzer.analyze(account, chat_id, messages, chat_info)
+            result["ai_analysis"] = review["analysis"]
+            result["ai_suggestions"] = review["suggestions"]
+            result["ai_cached"] = review["cached"]
         except Exception as e:
             logger.error(f"AI analysis failed: {e}")
             result["ai_error"] = str(e)
@@ -1811,6 +2023,10 @@ async def dashboard():
                     <div class="panel-section-title">Account Status</div>
                     <div id="accounts-status"></div>
                 </div>
+                <div class="panel-section">
+                    <div class="panel-section-title">Performance (last 5 min)</div>
+                    <div id="performance-stats"></div>
+                </div>
             </div>
         </aside>
     </div>
@@ -2004,6 +2220,10 @@ async def dashboard():
     <script>
         // State
         let dialogs = [];
+        let dialogsVersion = null;
+        let currentMessages = [];
+        let liveConnected = false;
+        let liveRefreshTimer = null;
         let reviewQueue = [];
         let reviewIndex = 0;
         let currentReviewChat = null;
@@ -2021,13 +2241,83 @@ async def dashboard():
         // Initialize
         document.addEventListener('DOMContentLoaded', () => {
             loadData();
-            setInterval(loadData, 30000); // Refresh every 30s
+            connectLive();
+            // Polling only as fallback while the live connection is down
+            setInterval(() => { if (!liveConnected) loadData(); }, 30000);
         });
 
+        function connectLive() {
+            const proto = location.protocol === 'https:' ? 'wss' : 'ws';
+            const ws = new WebSocket(`${proto}://${location.host}/ws`);
+            ws.onopen = () => {
+                // Catch up on changes missed while disconnected
+                if (dialogsVersion) loadData();
+                liveConnected = true;
+            };
+            ws.onclose = () => {
+                liveConnected = false;
+                setTimeout(connectLive, 5000);
+            };
+            ws.onmessage = (e) => handleLiveEvent(JSON.parse(e.data));
+        }
+
+        function scheduleDialogsRefresh() {
+            // Bursts of events -> one small delta request
+            if (liveRefreshTimer) return;
+            liveRefreshTimer = setTimeout(async () => {
+                liveRefreshTimer = null;
+                try {
+                    await loadDialogs();
+                    renderChatList();
+                    document.getElementById('stat-chats').textContent = dialogs.length;
+                    document.getElementById('stat-unread').textContent = dialogs.filter(d => d.unread_count > 0).length;
+                } catch (e) {
+                    console.error('Error refreshing dialogs:', e);
+                }
+            }, 300);
+        }
+
+        function handleLiveEvent(event) {
+            if (['message', 'read', 'dialog', 'resync'].includes(event.type)) {
+                scheduleDialogsRefresh();
+            }
+
+            const inCurrentChat = currentChat && event.account === currentChat.account && event.chat_id === currentChat.id;
+            if (inCurrentChat && ['message', 'edited', 'deleted'].includes(event.type)) {
+                if (event.type === 'deleted') {
+                    currentMessages = currentMessages.filter(m => !event.ids.includes(m.id));
+                } else {
+                    const index = currentMessages.findIndex(m => m.id === event.message.id);
+                    if (index >= 0) currentMessages[index] = event.message;
+                    else if (event.type === 'message') currentMessages.unshift(event.message);
+                }
+                renderMessages([...currentMessages]);
+            }
+
+            if (event.type === 'broadcast' && event.finished) {
+                showToast(`Broadcast finished: ${event.summary.sent}/${event.summary.total} sent`, 'success');
+            }
+        }
+
+        async function loadDialogs() {
+            // After the first load only changes since the last seen version are transferred
+            const url = dialogsVersion ? `/api/dialogs?since=${encodeURIComponent(dialogsVersion)}` : '/api/dialogs';
+            const data = await fetch(url).then(r => r.json());
+            if (data.delta) {
+                const gone = new Set(data.removed.map(d => d.account + ':' + d.id));
+                data.changed.forEach(d => gone.add(d.account + ':' + d.id));
+                dialogs = dialogs.filter(d => !gone.has(d.account + ':' + d.id)).concat(data.changed);
+            } else {
+                dialogs = data.dialogs;
+            }
+            dialogsVersion = data.version;
+            return dialogs;
+        }
+
         async function loadData() {
             try {
                 const [dialogsRes, tagsRes, templatesRes, statsRes] = await Promise.all([
-                    fetch('/api/dialogs').then(r => r.json()),
+                    loadDialogs(),
                     fetch('/api/tags').then(r => r.json()),
                     fetch('/api/templates').then(r => r.json()),
                     fetch('/api/statistics').then(r => r.json())
@@ -2165,7 +2455,8 @@ async def dashboard():
             // Load messages
             try {
                 const messages = await fetch(`/api/messages/${account}/${chatId}?limit=50`).then(r => r.json());
-                renderMessages(messages);
+                currentMessages = messages;
+                renderMessages([...messages]);
             } catch (e) {
                 console.error('Error loading messages:', e);
             }
@@ -2207,7 +2498,13 @@ async def dashboard():
                     </div>
                 `;
             } else if (type === 'video') {
-                return `<div class="media-placeholder"><span>Video: ${msg.media.filename || 'video'}</span></div>`;
+                return `
+                    <div class="message-media">
+                        <div class="media-placeholder" onclick="loadMedia(${msg.id}, 'video')">
+                            <span>Video: ${msg.media.filename || 'video'} - click to play</span>
+                        </div>
+                    </div>
+                `;
             } else if (type === 'document') {
                 return `<div class="media-placeholder"><span>File: ${msg.media.filename || 'document'}</span></div>`;
             } else if (type === 'voice') {
@@ -2217,26 +2514,24 @@ async def dashboard():
             return `<div class="media-placeholder"><span>${type}</span></div>`;
         }
 
-        async function loadMedia(messageId) {
+        function loadMedia(messageId, kind = 'image') {
             if (!currentChat) return;
 
-            try {
-                const media = await fetch(`/api/media/${currentChat.account}/${currentChat.id}/${messageId}`).then(r => r.json());
-                if (media.data) {
-                    const img = document.createElement('img');
-                    img.src = `data:image/jpeg;base64,${media.data}`;
-                    img.style.maxWidth = '100%';
-                    img.style.borderRadius = '8px';
-
-                    // Find and replace placeholder
-                    const placeholder = document.querySelector(`.message-media .media-placeholder[onclick="loadMedia(${messageId})"]`);
-                    if (placeholder) {
-                        placeholder.parentElement.innerHTML = '';
-                        placeholder.parentElement.appendChild(img);
-                    }
-                }
-            } catch (e) {
-                console.error('Error loading media:', e);
+            // Streamed by the server (Range requests for video seeking)
+            const url = `/api/media/${currentChat.account}/${currentChat.id}/${messageId}`;
+            const el = document.createElement(kind === 'video' ? 'video' : 'img');
+            el.src = url;
+            el.style.maxWidth = '100%';
+            el.style.borderRadius = '8px';
+            if (kind === 'video') el.controls = true;
+            el.onerror = () => console.error('Error loading media:', url);
+
+            // Find and replace placeholder
+            const selector = kind === 'video' ? `loadMedia(${messageId}, 'video')` : `loadMedia(${messageId})`;
+            const placeholder = document.querySelector(`.message-media .media-placeholder[onclick="${selector}"]`);
+            if (placeholder) {
+                placeholder.parentElement.innerHTML = '';
+                placeholder.parentElement.appendChild(el);
             }
         }
 
@@ -2296,7 +2591,31 @@ async def dashboard():
             `).join('');
         }
 
+        async function renderPerformance() {
+            const data = await fetch('/api/metrics').then(r => r.json());
+            const rows = (name, title, label) => (data.metrics[name]?.series || []).slice(0, 8).map(s => `
+                <div class="settings-item">
+                    <div class="settings-item-info">
+                        <div class="settings-item-name">${escapeHtml(label(s.labels))}</div>
+                        <div class="settings-item-desc">${title} | ${s.count} calls | p50 ${(s.p50 * 1000).toFixed(0)}ms</div>
+                    </div>
+                    <span>p95 ${(s.p95 * 1000).toFixed(0)}ms</span>
+                </div>
+            `).join('');
+            const ratios = Object.entries(data.cache_hit_ratio)
+                .filter(([, ratio]) => ratio !== null)
+                .map(([cache, ratio]) => `${cache}: ${(ratio * 100).toFixed(0)}%`).join(' | ');
+
+            document.getElementById('performance-stats').innerHTML =
+                (ratios ? `<div class="settings-item-desc" style="margin-bottom: 8px;">Cache hits - ${ratios}</div>` : '') +
+                rows('telegramhub_http_request_seconds', 'HTTP', l => `${l.method} ${l.route}`) +
+                rows('telegramhub_telegram_call_seconds', 'Telegram', l => `${l.account}: ${l.method}`) +
+                rows('telegramhub_ai_call_seconds', 'AI', l => `${l.provider} ${l.model}`);
+        }
+
         function renderAnalytics(stats) {
+            renderPerformance().catch(e => console.error('Error loading metrics:', e));
+
             const grid = document.getElementById('analytics-grid');
             grid.innerHTML = `
                 <div class="analytics-card">
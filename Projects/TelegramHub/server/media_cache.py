@@ -0,0 +1,216 @@
+"""
+Media Cache - size-bounded LRU disk cache for downloaded Telegram media
+Key: (account, chat_id, message_id, file_id); <key>.bin + <key>.json sidecar (mime type, filename)
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("TelegramHub")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    "bytes=start-end" -> (start, end) inclusive; None = whole file.
+    Only single ranges are supported (what browsers send for <video>/<audio>).
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].split(",")[0].strip()
+    start_s, _, end_s = spec.partition("-")
+    try:
+        if start_s:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        else:
+            # Suffix range: last N bytes
+            start = max(size - int(end_s), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+async def iter_file(path: Path, start: int, end: int, chunk_size: int):
+    """Read file[start..end] in chunks without blocking the event loop"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class CachedMedia:
+    def __init__(self, path: Path, size: int, mime_type: str, filename: Optional[str]):
+        self.path = path
+        self.size = size
+        self.mime_type = mime_type
+        self.filename = filename
+
+
+class MediaWriter:
+    """Writes a download into .part file; visible in cache only after commit()"""
+
+    def __init__(self, cache: "MediaCache", key: str, mime_type: str, filename: Optional[str]):
+        self.cache = cache
+        self.key = key
+        self.mime_type = mime_type
+        self.filename = filename
+        self.size = 0
+        # Unique name: the same media may be downloaded by two requests at once
+        self._part = cache.root / f"{key}.{uuid.uuid4().hex[:8]}.part"
+        self._file = open(self._part, "wb")
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> Optional[CachedMedia]:
+        self._file.close()
+        if self.size > self.cache.max_bytes:
+            self._part.unlink(missing_ok=True)
+            return None
+        return self.cache._add(self.key, self._part, self.size, self.mime_type, self.filename)
+
+    def abort(self):
+        self._file.close()
+        self._part.unlink(missing_ok=True)
+
+
+class MediaCache:
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, CachedMedia] = OrderedDict()   # oldest access first
+        self._by_message: dict[str, str] = {}                            # message_key -> key
+        self._lock = threading.Lock()
+        self._opened = False
+
+    def open(self):
+        """Create the directory and index files left by previous run (idempotent, app startup hook)"""
+        if self._opened:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load()
+        self._opened = True
+
+    @staticmethod
+    def message_key(account: str, chat_id: int, message_id: int) -> str:
+        return f"{account}_{chat_id}_{message_id}"
+
+    @classmethod
+    def key(cls, account: str, chat_id: int, message_id: int, file_id) -> str:
+        return f"{cls.message_key(account, chat_id, message_id)}_{file_id}"
+
+    def find(self, account: str, chat_id: int, message_id: int) -> Optional[CachedMedia]:
+        """Cached media of message without asking Telegram for file id"""
+        key = self._by_message.get(self.message_key(account, chat_id, message_id))
+        return self.get(key) if key else None
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.bin"
+
+    def _load(self):
+        """Index files left by previous run, least recently used first (by mtime)"""
+        for part in self.root.glob("*.part"):
+            part.unlink(missing_ok=True)
+
+        found = []
+        for meta_path in self.root.glob("*.json"):
+            path = meta_path.with_suffix(".bin")
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                stat = path.stat()
+            except (OSError, ValueError):
+                meta_path.unlink(missing_ok=True)
+                path.unlink(missing_ok=True)
+                continue
+            found.append((stat.st_mtime, meta_path.stem,
+                          CachedMedia(path, stat.st_size, meta.get("mime_type"), meta.get("filename"))))
+
+        for _, key, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[key] = entry
+            self._by_message[key.rsplit("_", 1)[0]] = key
+            self.total_bytes += entry.size
+        self._evict()
+
+    def get(self, key: str) -> Optional[CachedMedia]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        # mtime = last access, keeps LRU order across restarts
+        try:
+            os.utime(entry.path)
+        except OSError:
+            self._remove(key)
+            return None
+        return entry
+
+    def writer(self, key: str, mime_type: str, filename: Optional[str] = None) -> MediaWriter:
+        return MediaWriter(self, key, mime_type, filename)
+
+    def _add(self, key: str, part: Path, size: int, mime_type: str, filename: Optional[str]) -> CachedMedia:
+        path = self._path(key)
+        with open(path.with_suffix(".json"), "w", encoding="utf-8") as f:
+            json.dump({"mime_type": mime_type, "filename": filename}, f, ensure_ascii=False)
+        os.replace(part, path)
+
+        entry = CachedMedia(path, size, mime_type, filename)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self.total_bytes -= old.size
+            self._entries[key] = entry
+            self._by_message[key.rsplit("_", 1)[0]] = key
+            self.total_bytes += size
+        self._evict()
+        return entry
+
+    def _remove(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry:
+                self.total_bytes -= entry.size
+                message_key = key.rsplit("_", 1)[0]
+                if self._by_message.get(message_key) == key:
+                    del self._by_message[message_key]
+        if entry:
+            entry.path.unlink(missing_ok=True)
+            entry.path.with_suffix(".json").unlink(missing_ok=True)
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self.total_bytes <= self.max_bytes or not self._entries:
+                    return
+                key = next(iter(self._entries))
+            self._remove(key)
+            logger.debug(f"Media cache: evicted {key}")
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self._entries),
+            "size_mb": round(self.total_bytes / 1024 / 1024, 1),
+            "max_mb": round(self.max_bytes / 1024 / 1024, 1)
+        }
@@ -0,0 +1,228 @@
+"""
+Metrics - counters and latency histograms without external dependencies
+Exposed in Prometheus text format (/metrics) and as a rolling window summary
+(p50 / p95 / max over the last minutes) for the dashboard (/api/metrics).
+"""
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+# Seconds; covers fast cache hits up to slow AI calls / flood waits
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: tuple) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in key) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of unsorted values"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.kind = "counter"
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def summary(self, window: float) -> list[dict]:
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+
+class Histogram:
+    """Cumulative buckets for Prometheus + recent observations for the rolling view"""
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS,
+                 window: float = 300, max_recent: int = 2048):
+        self.name = name
+        self.help = help
+        self.kind = "histogram"
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.window = window
+        self.max_recent = max_recent
+        self._series: dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        now = time.monotonic()
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0,
+                          "recent": deque(maxlen=self.max_recent)}
+                self._series[key] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+            series["recent"].append((now, value))
+
+    def time(self, **labels) -> "_Timer":
+        return _Timer(self, labels)
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        result = []
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    result.append((f"{self.name}_bucket", key + (("le", _format_value(bound)),), cumulative))
+                result.append((f"{self.name}_sum", key, series["sum"]))
+                result.append((f"{self.name}_count", key, series["count"]))
+        return result
+
+    def summary(self, window: float) -> list[dict]:
+        """Per label set: observations in the last `window` seconds"""
+        since = time.monotonic() - window
+        result = []
+        with self._lock:
+            series_list = [(key, [v for t, v in s["recent"] if t >= since], s["count"])
+                           for key, s in self._series.items()]
+        for key, values, total in series_list:
+            if not values:
+                continue
+            result.append({
+                "labels": dict(key),
+                "count": len(values),
+                "total_count": total,
+                "avg": round(sum(values) / len(values), 4),
+                "p50": round(percentile(values, 0.5), 4),
+                "p95": round(percentile(values, 0.95), 4),
+                "max": round(max(values), 4)
+            })
+        result.sort(key=lambda s: s["p95"] * s["count"], reverse=True)
+        return result
+
+
+class _Timer:
+    """with histogram.time(label=...): ... - observes elapsed seconds, also on error"""
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = dict(self.labels)
+        if "result" not in labels:
+            labels["result"] = "error" if exc_type else "ok"
+        self.histogram.observe(time.perf_counter() - self.started, **labels)
+        return False
+
+
+class Gauge:
+    """Value read at scrape time from a callback: float or [(labels dict, value), ...]"""
+
+    def __init__(self, name: str, help: str, callback: Callable):
+        self.name = name
+        self.help = help
+        self.kind = "gauge"
+        self.callback = callback
+
+    def samples(self) -> list[tuple[str, tuple, float]]:
+        value = self.callback()
+        if isinstance(value, list):
+            return [(self.name, _label_key(labels), v) for labels, v in value]
+        return [(self.name, (), value)]
+
+    def summary(self, window: float) -> list[dict]:
+        return [{"labels": dict(key), "value": value} for _, key, value in self.samples()]
+
+
+class Registry:
+    def __init__(self, window: float = 300):
+        self.window = window
+        self._metrics: dict[str, object] = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, buckets, self.window))
+
+    def gauge(self, name: str, help: str, callback: Callable) -> Gauge:
+        # Re-registering replaces the callback (e.g. new manager instance)
+        gauge = Gauge(name, help, callback)
+        self._metrics[name] = gauge
+        return gauge
+
+    def render(self) -> str:
+        """Prometheus text exposition format 0.0.4"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """Rolling view for the dashboard"""
+        return {
+            "window_seconds": self.window,
+            "metrics": {
+                name: {"type": metric.kind, "help": metric.help, "series": metric.summary(self.window)}
+                for name, metric in self._metrics.items()
+            }
+        }
+
+
+def hit_ratio(counter: Counter, cache: str) -> Optional[float]:
+    hits = counter.value(cache=cache, result="hit")
+    total = hits + counter.value(cache=cache, result="miss")
+    return round(hits / total, 3) if total else None
+
+
+# Global registry and shared metrics
+metrics = Registry()
+
+http_latency = metrics.histogram("telegramhub_http_request_seconds", "HTTP request latency by route")
+telegram_latency = metrics.histogram("telegramhub_telegram_call_seconds", "Telethon call latency by account and method")
+flood_wait_seconds = metrics.counter("telegramhub_flood_wait_seconds_total", "Seconds spent in FloodWait by account")
+reconnect_latency = metrics.histogram("telegramhub_reconnect_seconds", "Reconnect duration by account",
+                                      buckets=(1, 5, 10, 15, 30, 45, 60, 120, 300))
+ai_latency = metrics.histogram("telegramhub_ai_call_seconds", "AI API call latency by provider and model")
+ai_tokens = metrics.counter("telegramhub_ai_tokens_total", "AI tokens by provider, model and direction")
+cache_requests = metrics.counter("telegramhub_cache_requests_total", "Cache lookups by cache and result (hit/miss)")
@@ -0,0 +1,165 @@
+"""
+Review AI - cached AI analysis for review mode
+Results are keyed by (account, chat, last message id, prompt version): reopening a chat
+without new messages costs no AI call. A background worker precomputes the top of the
+review queue so the first open is usually a cache hit too.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from config import (
+    REVIEW_MIN_UNREAD, REVIEW_MAX_CHATS, REVIEW_SKIP_GROUPS, REVIEW_MESSAGES_LIMIT,
+    REVIEW_PRECOMPUTE_TOP, REVIEW_PRECOMPUTE_CONCURRENCY, REVIEW_PRECOMPUTE_INTERVAL_SECONDS
+)
+from ai_assistant import AI_PROMPT_VERSION
+from metrics import cache_requests
+
+logger = logging.getLogger("TelegramHub")
+
+RESULT_KIND = "review"
+
+
+def last_message_id(messages: list[dict]) -> int:
+    return max((m["id"] for m in messages), default=0)
+
+
+class ReviewAnalyzer:
+    def __init__(self, manager, crm, ai, store):
+        self.manager = manager
+        self.crm = crm
+        self.ai = ai
+        self.store = store
+        self._inflight: dict[tuple[str, int], asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.stats = {"hits": 0, "misses": 0, "precomputed": 0}
+
+    # ===== Queue =====
+
+    def build_queue(self, dialogs: list[dict]) -> list[dict]:
+        """Chats that need review, most unread first (all of them, not capped)"""
+        queue = []
+        for dialog in dialogs:
+            if dialog.get("unread_count", 0) < REVIEW_MIN_UNREAD:
+                continue
+            if REVIEW_SKIP_GROUPS and dialog.get("type", "") in ["supergroup", "channel", "chat"]:
+                continue
+
+            crm_data = self.crm.get_chat_data(dialog["account"], dialog["id"])
+            # Skip if marked as "later"
+            if crm_data.get("status") == "later":
+                continue
+
+            queue.append({**dialog, "crm": crm_data})
+
+        queue.sort(key=lambda x: x.get("unread_count", 0), reverse=True)
+        return queue
+
+    async def get_queue(self) -> tuple[list[dict], int]:
+        queue = self.build_queue(await self.manager.get_all_dialogs())
+        for dialog in queue[:REVIEW_MAX_CHATS]:
+            dialog["ai_ready"] = self.cached(
+                dialog["account"], dialog["id"], dialog.get("last_message", {}).get("id", 0)
+            ) is not None
+        return queue[:REVIEW_MAX_CHATS], len(queue)
+
+    # ===== Cache =====
+
+    def cached(self, account: str, chat_id: int, message_id: int) -> Optional[dict]:
+        return self.store.get_ai_result(account, chat_id, RESULT_KIND, message_id, AI_PROMPT_VERSION)
+
+    async def analyze(self, account: str, chat_id: int, messages: list[dict], chat_info: dict) -> dict:
+        """{"analysis", "suggestions", "cached"}; concurrent requests for one chat share the AI call"""
+        message_id = last_message_id(messages)
+        result = self.cached(account, chat_id, message_id)
+        if result is not None:
+            self.stats["hits"] += 1
+            cache_requests.inc(cache="ai_review", result="hit")
+            return {**result, "cached": True}
+
+        key = (account, chat_id)
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            self.stats["misses"] += 1
+            cache_requests.inc(cache="ai_review", result="miss")
+            task = asyncio.create_task(self._compute(account, chat_id, message_id, messages, chat_info))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key, None) if self._inflight.get(key) is t else None)
+        result = await asyncio.shield(task)
+        return {**result, "cached": False}
+
+    async def _compute(self, account: str, chat_id: int, message_id: int,
+                       messages: list[dict], chat_info: dict) -> dict:
+        result = await self.ai.review_chat(messages, chat_info)
+        # Failed calls are not cached - next open retries
+        if "error" not in result:
+            self.store.save_ai_result(account, chat_id, RESULT_KIND, message_id, AI_PROMPT_VERSION, result)
+        return result
+
+    # ===== Background precompute =====
+
+    async def precompute(self) -> int:
+        """Analyze top review-queue chats that have no fresh result; returns number of AI calls"""
+        if not self.ai.is_available:
+            return 0
+
+        queue = self.build_queue(await self.manager.get_all_dialogs())[:REVIEW_PRECOMPUTE_TOP]
+        # Dialog cache knows the last message id - no need to fetch messages for fresh chats
+        stale = [
+            d for d in queue
+            if self.cached(d["account"], d["id"], d.get("last_message", {}).get("id", 0)) is None
+            and (d["account"], d["id"]) not in self._inflight
+        ]
+        if not stale:
+            return 0
+
+        semaphore = asyncio.Semaphore(REVIEW_PRECOMPUTE_CONCURRENCY)
+
+        async def run(dialog: dict) -> bool:
+            async with semaphore:
+                acc = self.manager.get_account(dialog["account"])
+                if not acc:
+                    return False
+                try:
+                    messages = await acc.get_messages(dialog["id"], REVIEW_MESSAGES_LIMIT)
+                    result = await self.analyze(dialog["account"], dialog["id"], messages, dialog)
+                    return not result["cached"] and "error" not in result
+                except Exception as e:
+                    logger.error(f"Review precompute {dialog['account']}/{dialog['id']}: {e}")
+                    return False
+
+        done = sum(await asyncio.gather(*(run(d) for d in stale)))
+        self.stats["precomputed"] += done
+        if done:
+            logger.info(f"Review precompute: {done}/{len(stale)} chats analyzed")
+        return done
+
+    def kick(self):
+        """Run the next precompute pass now (e.g. review queue was opened)"""
+        self._wakeup.set()
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.precompute()
+            except Exception as e:
+                logger.error(f"Review precompute failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), REVIEW_PRECOMPUTE_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self):
+        if self._task is None and self.ai.is_available and REVIEW_PRECOMPUTE_TOP > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
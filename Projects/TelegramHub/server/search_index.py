@@ -0,0 +1,317 @@
+"""
+Search Index - local full-text search over synced messages (sqlite FTS5)
+Fed by TelegramAccount.get_messages and live update events; messages are indexed as-is,
+queries are stemmed (simple Russian / English suffix stripping) and matched as prefixes,
+so "договоров" finds "договор", "договора", "договору"...
+"""
+import html
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("TelegramHub")
+
+# Marked ids: channels / supergroups are -100xxxxxxxxxx, basic groups small negatives, users positive
+CHANNEL_ID_FLOOR = -1000000000000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    rowid INTEGER PRIMARY KEY,
+    account TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    message_id INTEGER NOT NULL,
+    date INTEGER NOT NULL,
+    is_outgoing INTEGER NOT NULL DEFAULT 0,
+    text TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    UNIQUE (account, chat_id, message_id)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_date ON messages (date);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text,
+    scope,
+    content='messages',
+    content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3 4'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, text, scope) VALUES (new.rowid, new.text, new.scope);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text, scope) VALUES ('delete', old.rowid, old.text, old.scope);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE OF text ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text, scope) VALUES ('delete', old.rowid, old.text, old.scope);
+    INSERT INTO messages_fts (rowid, text, scope) VALUES (new.rowid, new.text, new.scope);
+END;
+"""
+
+# ===== Stemmer =====
+
+_RU_REFLEXIVE = ("ся", "сь")
+_RU_ENDINGS = sorted({
+    # adjectives / participles
+    "ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой",
+    "ем", "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+    "ейший", "ейшая", "ейшее", "ейшие",
+    # verbs
+    "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют",
+    "ить", "ыть", "ишь", "ешь", "ете", "йте", "ят", "ит", "ыт", "ены", "ет", "ют", "ть", "ла", "ли",
+    "ло", "ал", "ял", "ил", "ыл", "ал", "ув", "ав", "яв", "ив", "ыв", "вши", "вшись",
+    # nouns
+    "иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ье", "еи", "ии", "ям", "ам",
+    "ах", "ях", "ию", "ью", "ия", "ья", "ость", "ости", "остью", "остей",
+    "а", "е", "и", "й", "о", "у", "ы", "ь", "ю", "я",
+}, key=len, reverse=True)
+_EN_ENDINGS = ("ings", "ing", "edly", "ed", "es", "ly", "s")
+_CYRILLIC = re.compile(r"[а-я]")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+MIN_STEM = 3
+
+
+def stem(word: str) -> str:
+    """Very small suffix stripper; good enough for prefix search, not a real Snowball"""
+    word = word.lower().replace("ё", "е")
+    if len(word) <= MIN_STEM:
+        return word
+
+    if _CYRILLIC.search(word):
+        for ending in _RU_REFLEXIVE:
+            if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+                word = word[:-len(ending)]
+                break
+        for ending in _RU_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+                return word[:-len(ending)]
+        return word
+
+    for ending in _EN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """User query -> FTS5 expression: every word required, stemmed prefix match"""
+    terms = []
+    for word in _WORD.findall(query):
+        word = word.replace('"', "")
+        if not word:
+            continue
+        terms.append(f'"{stem(word)}"*')
+    return " AND ".join(terms) if terms else None
+
+
+# Account / chat filters are tokens of the indexed "scope" column: the filter becomes
+# a doclist intersection inside FTS instead of a post-filter over every match
+def _account_token(account: str) -> str:
+    return "a" + account.encode("utf-8").hex()
+
+
+def _chat_token(chat_id: int) -> str:
+    return "c" + str(chat_id).replace("-", "n")
+
+
+def _pair_token(account: str, chat_id: int) -> str:
+    return "p" + account.encode("utf-8").hex() + "x" + str(chat_id).replace("-", "n")
+
+
+def _scope(account: str, chat_id: int) -> str:
+    return f"{_account_token(account)} {_chat_token(chat_id)} {_pair_token(account, chat_id)}"
+
+
+def _to_timestamp(value) -> int:
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+class SearchIndex:
+    """One connection (WAL); writes from the event loop are small (a page of messages or one update)"""
+
+    def __init__(self, db_path: Path, rank_window: int = 5000):
+        self.db_path = Path(db_path)
+        # bm25 is computed for at most this many newest matches - keeps common words fast
+        self.rank_window = rank_window
+        self._lock = threading.RLock()
+        # Opened by open() in the app startup hook - importing the module creates no files
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def open(self):
+        """Open the database and create the schema (idempotent)"""
+        with self._lock:
+            if self._connection is not None:
+                return
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.commit()
+            self._connection = conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.open()
+        return self._connection
+
+    # ===== Writes =====
+
+    def add_messages(self, account: str, chat_id: int, messages: list[dict]):
+        """Upsert messages in get_messages() format; messages without text are skipped"""
+        scope = _scope(account, chat_id)
+        rows = [
+            # unicode61 doesn't fold ё -> е, so "счет" wouldn't find "счёт"
+            (account, chat_id, m["id"], _to_timestamp(m["date"]), int(bool(m.get("is_outgoing"))),
+             m["text"].replace("ё", "е").replace("Ё", "Е"), scope)
+            for m in messages if m.get("text")
+        ]
+        if not rows:
+            return
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT INTO messages (account, chat_id, message_id, date, is_outgoing, text, scope)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (account, chat_id, message_id) DO UPDATE SET text = excluded.text"
+                    " WHERE text != excluded.text",
+                    rows
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Search index: write failed - {e}")
+
+    def delete_messages(self, account: str, message_ids: list[int], chat_id: Optional[int] = None):
+        """
+        chat_id is unknown for deletions in private chats / small groups.
+        Those share one message id sequence per account; channels and supergroups have their own
+        and always come with chat_id - so the fallback never touches channel rows.
+        """
+        try:
+            with self._lock, self._conn:
+                if chat_id is None:
+                    self._conn.executemany(
+                        "DELETE FROM messages WHERE account = ? AND message_id = ? AND chat_id > ?",
+                        [(account, mid, CHANNEL_ID_FLOOR) for mid in message_ids]
+                    )
+                else:
+                    self._conn.executemany(
+                        "DELETE FROM messages WHERE account = ? AND chat_id = ? AND message_id = ?",
+                        [(account, chat_id, mid) for mid in message_ids]
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"Search index: delete failed - {e}")
+
+    # ===== Search =====
+
+    def search(
+        self,
+        query: str,
+        account: Optional[str] = None,
+        chat_id: Optional[int] = None,
+        chats: Optional[list[tuple[str, int]]] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> dict:
+        """
+        Ranked results (bm25, then newest) with highlighted snippets.
+        chats - restrict to (account, chat_id) pairs, e.g. chats with a CRM tag.
+        Only the rank_window most recently indexed matches are ranked and paged:
+        total - how many of them there are, truncated - older matches exist outside the window
+        (narrow the query or move date_to back to reach them).
+        """
+        started = time.perf_counter()
+        match = build_match_query(query)
+        if not match or chats == []:
+            return {"results": [], "total": 0, "truncated": False, "took_ms": 0}
+
+        match = f"text : ({match})"
+        if account:
+            match += f' AND scope : "{_account_token(account)}"'
+        if chat_id is not None:
+            match += f' AND scope : "{_chat_token(chat_id)}"'
+        if chats:
+            match += " AND scope : (" + " OR ".join(f'"{_pair_token(*pair)}"' for pair in chats) + ")"
+
+        where = ["messages_fts MATCH ?"]
+        params: list = [match]
+        if date_from:
+            where.append("m.date >= ?")
+            params.append(_to_timestamp(date_from))
+        if date_to:
+            where.append("m.date <= ?")
+            params.append(_to_timestamp(date_to))
+
+        base = f"FROM messages_fts CROSS JOIN messages m ON m.rowid = messages_fts.rowid WHERE {' AND '.join(where)}"
+        cutoff_sql = f"SELECT messages_fts.rowid {base} ORDER BY messages_fts.rowid DESC LIMIT 1 OFFSET ?"
+        older_sql = f"SELECT 1 {base} AND messages_fts.rowid < ? LIMIT 1"
+        total_sql = f"SELECT COUNT(*) {base} AND messages_fts.rowid >= ?"
+        sql = (
+            "SELECT m.account, m.chat_id, m.message_id, m.date, m.is_outgoing,"
+            " snippet(messages_fts, 0, char(2), char(3), '...', 16) AS snippet,"
+            " bm25(messages_fts, 1.0, 0.0) AS rank"
+            f" {base} AND messages_fts.rowid >= ?"
+            " ORDER BY rank, m.date DESC LIMIT ? OFFSET ?"
+        )
+
+        total, truncated = 0, False
+        try:
+            with self._lock:
+                # Walking the doclist by rowid is cheap, bm25 over every match is not
+                row = self._conn.execute(cutoff_sql, params + [self.rank_window - 1]).fetchone()
+                cutoff = row[0] if row else 0
+                if row:
+                    truncated = self._conn.execute(older_sql, params + [cutoff]).fetchone() is not None
+                total = self._conn.execute(total_sql, params + [cutoff]).fetchone()[0]
+                rows = self._conn.execute(sql, params + [cutoff, limit, offset]).fetchall() if offset < total else []
+        except sqlite3.Error as e:
+            logger.error(f"Search index: query {match!r} failed - {e}")
+            rows = []
+
+        results = [
+            {
+                "account": r["account"],
+                "chat_id": r["chat_id"],
+                "message_id": r["message_id"],
+                "date": datetime.fromtimestamp(r["date"], timezone.utc).isoformat(),
+                "is_outgoing": bool(r["is_outgoing"]),
+                # Message text is escaped, only the match markers become HTML
+                "snippet": html.escape(r["snippet"]).replace("\x02", "<b>").replace("\x03", "</b>"),
+                "rank": round(r["rank"], 3)
+            }
+            for r in rows
+        ]
+        return {
+            "results": results,
+            "total": total,
+            "truncated": truncated,
+            "took_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        return {"messages": count}
+
+    def optimize(self):
+        """Merge FTS segments (after large backfills)"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('optimize')")
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -3,23 +3,45 @@ TelegramHub Manager v2
 Multi-account management with auto-reconnect, media support, and rate limiting
 """
 import asyncio
-import json
+import heapq
+import time
 import logging
-import base64
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Optional
-from telethon import TelegramClient
+from telethon import TelegramClient, events
 from telethon.tl.types import User, Chat, Channel, Message, MessageMediaPhoto, MessageMediaDocument
 from telethon.errors import FloodWaitError, SessionPasswordNeededError
+from telethon.utils import get_display_name
 from config import (
     SESSIONS_DIR,
     CONTEXT_DIR,
     DRAFTS_DIR,
     API_ID,
     API_HASH,
-    MAX_MESSAGES_PER_CHAT
+    MAX_MESSAGES_PER_CHAT,
+    DIALOG_CACHE_PATH,
+    DIALOG_CACHE_LIMIT,
+    DIALOG_CACHE_FLUSH_SECONDS,
+    ACCOUNT_TIMEOUT_SECONDS,
+    ACCOUNT_SLOW_SECONDS,
+    BROADCAST_DB_PATH,
+    BROADCAST_BURST,
+    MEDIA_CACHE_DIR,
+    MEDIA_CACHE_MAX_MB,
+    MEDIA_CHUNK_SIZE,
+    SEARCH_INDEX_PATH,
+    SEARCH_RANK_WINDOW,
+    SYNC_INTERVAL_SECONDS,
+    CONTEXT_SYNC_DEBOUNCE_SECONDS
 )
+from dialog_cache import DialogCache, dialog_sort_key
+from broadcast import BroadcastStore, BroadcastScheduler
+from media_cache import MediaCache, CachedMedia
+from search_index import SearchIndex
+from live_updates import EventHub, event_hub
+from context_sync import ContextSync
+from metrics import metrics, telegram_latency, flood_wait_seconds, reconnect_latency, cache_requests
 
 
 # Setup logging
@@ -61,9 +83,13 @@ rate_limiter = RateLimiter(min_delay=2.0)
 class TelegramAccount:
     """Represents single Telegram account with auto-reconnect"""
 
-    def __init__(self, session_path: Path):
+    def __init__(self, session_path: Path, dialog_cache: Optional[DialogCache] = None,
+                 search_index: Optional[SearchIndex] = None, live: Optional[EventHub] = None):
         self.session_path = session_path
         self.name = session_path.stem
+        self.dialog_cache = dialog_cache
+        self.search_index = search_index
+        self.live = live
         self.client: Optional[TelegramClient] = None
         self.user_info: dict = {}
         self.connected = False
@@ -107,6 +133,11 @@ class TelegramAccount:
                 self.last_error = None
                 logger.info(f"{self.name}: Connected as {me.first_name}")
 
+                # Keep dialog cache current; updates missed while offline -> re-sync
+                self._register_update_handlers()
+                if self.dialog_cache:
+                    self.dialog_cache.mark_stale(self.name)
+
                 # Start health check
                 self._should_run = True
                 self._health_check_task = asyncio.create_task(self._health_check_loop())
@@ -155,6 +186,7 @@ class TelegramAccount:
         logger.info(f"{self.name}: Attempting reconnect...")
         self.connected = False
         self.stats["reconnects"] += 1
+        started = time.monotonic()
 
         for attempt in range(3):
             try:
@@ -163,16 +195,19 @@ class TelegramAccount:
                     await self.client.disconnect()
                 if await self.connect():
                     logger.info(f"{self.name}: Reconnected successfully")
+                    reconnect_latency.observe(time.monotonic() - started, account=self.name, result="ok")
                     return
             except Exception as e:
                 logger.error(f"{self.name}: Reconnect attempt {attempt + 1} failed - {e}")
 
         logger.error(f"{self.name}: All reconnect attempts failed")
+        reconnect_latency.observe(time.monotonic() - started, account=self.name, result="failed")
 
     async def _handle_flood_wait(self, e: FloodWaitError):
         """Handle Telegram flood wait error"""
         wait_time = e.seconds
         self.stats["flood_waits"] += 1
+        flood_wait_seconds.inc(wait_time, account=self.name)
         logger.warning(f"{self.name}: Flood wait for {wait_time} seconds")
         await asyncio.sleep(wait_time)
 
@@ -181,71 +216,195 @@ class TelegramAccount:
         if not self.connected:
             return []
 
-        dialogs = []
         try:
-            async for dialog in self.client.iter_dialogs(limit=limit):
-                entity = dialog.entity
-
-                dialog_info = {
-                    "id": dialog.id,
-                    "name": dialog.name or "Unknown",
-                    "unread_count": dialog.unread_count,
-                    "last_message_date": dialog.date.isoformat() if dialog.date else None,
-                    "type": self._get_entity_type(entity),
-                    "account": self.name
-                }
-
-                if dialog.message:
-                    has_media = dialog.message.media is not None
-                    dialog_info["last_message"] = {
-                        "text": dialog.message.text or ("[Media]" if has_media else ""),
-                        "from_id": self._extract_peer_id(dialog.message.from_id),
-                        "date": dialog.message.date.isoformat(),
-                        "has_media": has_media
-                    }
+            return await self.fetch_dialogs(limit)
+        except Exception as e:
+            logger.error(f"{self.name}: Error getting dialogs - {e}")
+            self.last_error = str(e)
 
-                dialogs.append(dialog_info)
+        return []
 
+    async def fetch_dialogs(self, limit: int = 100) -> list[dict]:
+        """Get dialogs list from Telegram (raises on errors, waits out flood wait)"""
+        try:
+            with telegram_latency.time(account=self.name, method="iter_dialogs"):
+                return [self._dialog_info(dialog) async for dialog in self.client.iter_dialogs(limit=limit)]
         except FloodWaitError as e:
             await self._handle_flood_wait(e)
-            return await self.get_dialogs(limit)
-        except Exception as e:
-            logger.error(f"{self.name}: Error getting dialogs - {e}")
-            self.last_error = str(e)
+            return await self.fetch_dialogs(limit)
+
+    def _dialog_info(self, dialog) -> dict:
+        """Dialog -> dict for API and dialog cache"""
+        dialog_info = {
+            "id": dialog.id,
+            "name": dialog.name or "Unknown",
+            "unread_count": dialog.unread_count,
+            "last_message_date": dialog.date.isoformat() if dialog.date else None,
+            "type": self._get_entity_type(dialog.entity),
+            "account": self.name
+        }
+        if dialog.message:
+            dialog_info["last_message"] = self._last_message_info(dialog.message)
+        return dialog_info
 
-        return dialogs
+    def _last_message_info(self, msg: Message) -> dict:
+        has_media = msg.media is not None
+        return {
+            "id": msg.id,
+            "text": msg.text or ("[Media]" if has_media else ""),
+            "from_id": self._extract_peer_id(msg.from_id),
+            "date": msg.date.isoformat(),
+            "has_media": has_media
+        }
+
+    # Update handlers (dialog cache, search index, live updates)
+    def _register_update_handlers(self):
+        """Subscribe dialog cache, search index and live clients to message updates"""
+        if self.dialog_cache or self.search_index or self.live:
+            self.client.add_event_handler(self._on_new_message, events.NewMessage())
+        if self.dialog_cache or self.live:
+            self.client.add_event_handler(self._on_message_read, events.MessageRead(inbox=True))
+            self.client.add_event_handler(self._on_chat_action, events.ChatAction())
+        if self.search_index or self.live:
+            self.client.add_event_handler(self._on_message_edited, events.MessageEdited())
+            self.client.add_event_handler(self._on_message_deleted, events.MessageDeleted())
+
+    def _unread_count(self, chat_id: int) -> Optional[int]:
+        dialog = self.dialog_cache.get_dialog(self.name, chat_id) if self.dialog_cache else None
+        return dialog.get("unread_count") if dialog else None
+
+    def _publish_message(self, event_type: str, chat_id: int, msg: Message):
+        if self.live:
+            self.live.publish(
+                event_type, account=self.name, chat_id=chat_id,
+                message=self._message_info(msg), unread_count=self._unread_count(chat_id)
+            )
+
+    async def _index_messages(self, chat_id: int, messages: list[Message]):
+        # sqlite commit in a worker thread - handlers must not block the event loop
+        if self.search_index:
+            await asyncio.to_thread(self.search_index.add_messages, self.name, chat_id, [
+                {"id": m.id, "date": m.date, "text": m.text, "is_outgoing": m.out} for m in messages
+            ])
+
+    async def _on_message_edited(self, event):
+        await self._index_messages(event.chat_id, [event.message])
+        self._publish_message("edited", event.chat_id, event.message)
+
+    async def _on_message_deleted(self, event):
+        # chat_id is only known for channels / supergroups
+        if self.search_index:
+            await asyncio.to_thread(self.search_index.delete_messages, self.name, event.deleted_ids, event.chat_id)
+        if self.live:
+            self.live.publish("deleted", account=self.name, chat_id=event.chat_id, ids=list(event.deleted_ids))
+
+    async def _on_new_message(self, event):
+        try:
+            msg = event.message
+            if not msg.out:
+                self.stats["messages_received"] += 1
+            await self._index_messages(event.chat_id, [msg])
+            if not self.dialog_cache:
+                self._publish_message("message", event.chat_id, msg)
+                return
+
+            dialog = None
+            if self.dialog_cache.get_dialog(self.name, event.chat_id) is None:
+                chat = await event.get_chat()
+                dialog = {
+                    "id": event.chat_id,
+                    "name": get_display_name(chat) or "Unknown",
+                    "type": self._get_entity_type(chat),
+                    "account": self.name
+                }
+            self.dialog_cache.apply_message(
+                self.name, event.chat_id, self._last_message_info(msg),
+                incoming=not msg.out, dialog=dialog
+            )
+            self._publish_message("message", event.chat_id, msg)
+        except Exception as e:
+            logger.error(f"{self.name}: New message update failed - {e}")
+
+    async def _on_message_read(self, event):
+        if self.dialog_cache and not self.dialog_cache.mark_read(self.name, event.chat_id, event.max_id):
+            # Partially read - exact unread count is only known to Telegram
+            self.dialog_cache.mark_stale(self.name)
+        if self.live:
+            self.live.publish(
+                "read", account=self.name, chat_id=event.chat_id,
+                max_id=event.max_id, unread_count=self._unread_count(event.chat_id)
+            )
 
-    async def get_messages(self, chat_id: int, limit: int = MAX_MESSAGES_PER_CHAT) -> list[dict]:
-        """Get messages from chat with media info"""
+    async def _on_chat_action(self, event):
+        action = None
+        if event.new_title:
+            action = "renamed"
+            if self.dialog_cache:
+                self.dialog_cache.rename(self.name, event.chat_id, event.new_title)
+        elif (event.user_kicked or event.user_left) and event.user_id == self.user_info.get("id"):
+            action = "removed"
+            if self.dialog_cache:
+                self.dialog_cache.remove(self.name, event.chat_id)
+        elif event.created or event.user_joined or event.user_added:
+            action = "changed"
+            if self.dialog_cache:
+                self.dialog_cache.mark_stale(self.name)
+        if action and self.live:
+            self.live.publish("dialog", account=self.name, chat_id=event.chat_id, action=action)
+
+    async def _cache_sent_message(self, chat_id: int, msg: Message):
+        """Own messages sent through the API don't come back as NewMessage"""
+        await self._index_messages(chat_id, [msg])
+        if self.dialog_cache:
+            self.dialog_cache.apply_message(self.name, chat_id, self._last_message_info(msg), incoming=False)
+        self._publish_message("message", chat_id, msg)
+
+    async def get_messages(self, chat_id: int, limit: int = MAX_MESSAGES_PER_CHAT, min_id: int = 0,
+                           reverse: bool = False, raise_errors: bool = False) -> list[dict]:
+        """
+        Get messages from chat with media info (newest first; min_id - only messages after it).
+        reverse=True - oldest first: with min_id the `limit` messages right after it.
+        raise_errors=True - errors are raised instead of returning [] (caller must tell "no messages" from failure)
+        """
         if not self.connected:
+            if raise_errors:
+                raise ConnectionError(f"{self.name}: not connected")
             return []
 
         messages = []
         try:
-            async for msg in self.client.iter_messages(chat_id, limit=limit):
-                media_info = self._get_media_info(msg)
-
-                messages.append({
-                    "id": msg.id,
-                    "text": msg.text,
-                    "date": msg.date.isoformat(),
-                    "from_id": self._extract_peer_id(msg.from_id),
-                    "reply_to": msg.reply_to_msg_id if msg.reply_to else None,
-                    "is_outgoing": msg.out,
-                    "has_media": media_info is not None,
-                    "media": media_info
-                })
+            with telegram_latency.time(account=self.name, method="iter_messages"):
+                async for msg in self.client.iter_messages(chat_id, limit=limit, min_id=min_id, reverse=reverse):
+                    messages.append(self._message_info(msg))
 
             self.stats["last_activity"] = datetime.now().isoformat()
+            if self.search_index:
+                await asyncio.to_thread(self.search_index.add_messages, self.name, chat_id, messages)
 
         except FloodWaitError as e:
             await self._handle_flood_wait(e)
-            return await self.get_messages(chat_id, limit)
+            return await self.get_messages(chat_id, limit, min_id, reverse, raise_errors)
         except Exception as e:
             logger.error(f"{self.name}: Error getting messages - {e}")
+            if raise_errors:
+                raise
 
         return messages
 
+    def _message_info(self, msg: Message) -> dict:
+        """Message -> dict for API (get_messages, live updates)"""
+        media_info = self._get_media_info(msg)
+        return {
+            "id": msg.id,
+            "text": msg.text,
+            "date": msg.date.isoformat(),
+            "from_id": self._extract_peer_id(msg.from_id),
+            "reply_to": msg.reply_to_msg_id if msg.reply_to else None,
+            "is_outgoing": msg.out,
+            "has_media": media_info is not None,
+            "media": media_info
+        }
+
     def _get_media_info(self, msg: Message) -> Optional[dict]:
         """Extract media information from message"""
         if not msg.media:
@@ -292,43 +451,71 @@ class TelegramAccount:
 
         return {"type": "other"}
 
-    async def download_media(self, chat_id: int, message_id: int) -> Optional[dict]:
-        """Download media from message and return as base64"""
+    async def get_media_message(self, chat_id: int, message_id: int) -> Optional[Message]:
+        """Message with media (for streaming), None if missing or without media"""
         if not self.connected:
             return None
 
         try:
-            msg = await self.client.get_messages(chat_id, ids=message_id)
-            if not msg or not msg.media:
-                return None
-
-            # Download to bytes
-            data = await self.client.download_media(msg, file=bytes)
-            if data:
-                return {
-                    "data": base64.b64encode(data).decode("utf-8"),
-                    "media_info": self._get_media_info(msg)
-                }
+            with telegram_latency.time(account=self.name, method="get_messages"):
+                msg = await self.client.get_messages(chat_id, ids=message_id)
+            if msg and msg.media:
+                return msg
+        except FloodWaitError as e:
+            await self._handle_flood_wait(e)
+            return await self.get_media_message(chat_id, message_id)
         except Exception as e:
-            logger.error(f"{self.name}: Error downloading media - {e}")
+            logger.error(f"{self.name}: Error getting media message - {e}")
 
         return None
 
-    async def send_message(self, chat_id: int, text: str, reply_to: int = None) -> dict:
-        """Send text message with rate limiting"""
+    def get_file_info(self, msg: Message) -> dict:
+        """file id, size (None for photos), mime type and filename for streaming"""
+        info = self._get_media_info(msg) or {}
+        if info.get("type") == "photo":
+            return {"id": info.get("id"), "size": None, "mime_type": "image/jpeg", "filename": None}
+        if msg.file:
+            return {
+                "id": info.get("id") or msg.file.id,
+                "size": msg.file.size,
+                "mime_type": msg.file.mime_type or "application/octet-stream",
+                "filename": msg.file.name
+            }
+        return {"id": info.get("id"), "size": None, "mime_type": "application/octet-stream", "filename": None}
+
+    async def iter_media(self, msg: Message, offset: int = 0, length: Optional[int] = None):
+        """Stream media bytes from Telegram starting at offset (photos: offset 0 only)"""
+        remaining = length
+        async for chunk in self.client.iter_download(msg.media, offset=offset, request_size=MEDIA_CHUNK_SIZE):
+            if remaining is not None:
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+            if chunk:
+                yield chunk
+            if remaining == 0:
+                break
+
+    async def send_message(self, chat_id: int, text: str, reply_to: int = None,
+                           retry_flood_wait: bool = True) -> dict:
+        """
+        Send text message with rate limiting.
+        retry_flood_wait=False - don't sleep on flood wait, return {"flood_wait": seconds} to caller
+        """
         if not self.connected:
             return {"success": False, "error": "Not connected"}
 
         await rate_limiter.wait(f"send_{self.name}")
 
         try:
-            msg = await self.client.send_message(
-                chat_id,
-                text,
-                reply_to=reply_to
-            )
+            with telegram_latency.time(account=self.name, method="send_message"):
+                msg = await self.client.send_message(
+                    chat_id,
+                    text,
+                    reply_to=reply_to
+                )
             self.stats["messages_sent"] += 1
             self.stats["last_activity"] = datetime.now().isoformat()
+            await self._cache_sent_message(chat_id, msg)
             logger.info(f"{self.name}: Message sent to {chat_id}")
 
             return {
@@ -337,6 +524,12 @@ class TelegramAccount:
                 "date": msg.date.isoformat()
             }
         except FloodWaitError as e:
+            if not retry_flood_wait:
+                self.stats["flood_waits"] += 1
+                # Waited out by the caller (broadcast token bucket)
+                flood_wait_seconds.inc(e.seconds, account=self.name)
+                logger.warning(f"{self.name}: Flood wait for {e.seconds} seconds")
+                return {"success": False, "error": f"Flood wait {e.seconds}s", "flood_wait": e.seconds}
             await self._handle_flood_wait(e)
             return await self.send_message(chat_id, text, reply_to)
         except Exception as e:
@@ -361,13 +554,15 @@ class TelegramAccount:
                 temp_path = f.name
 
             try:
-                msg = await self.client.send_file(
-                    chat_id,
-                    temp_path,
-                    caption=caption,
-                    force_document=not filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif'))
-                )
+                with telegram_latency.time(account=self.name, method="send_file"):
+                    msg = await self.client.send_file(
+                        chat_id,
+                        temp_path,
+                        caption=caption,
+                        force_document=not filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif'))
+                    )
                 self.stats["messages_sent"] += 1
+                await self._cache_sent_message(chat_id, msg)
                 logger.info(f"{self.name}: File sent to {chat_id}")
 
                 return {
@@ -412,27 +607,144 @@ class TelegramManager:
 
     def __init__(self):
         self.accounts: dict[str, TelegramAccount] = {}
-        self._broadcast_in_progress = False
-        self._broadcast_cancel = False
+
+        # Downloaded media on disk, streamed by /api/media
+        self.media_cache = MediaCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_MB * 1024 * 1024)
+        self._media_downloads: dict[str, asyncio.Task] = {}
+
+        # Full-text search over every message loaded or received
+        self.search_index = SearchIndex(SEARCH_INDEX_PATH, SEARCH_RANK_WINDOW)
+
+        # Broadcasts: per-account workers, progress in sqlite
+        self.live = event_hub
+        self.broadcasts = BroadcastScheduler(
+            self, BroadcastStore(BROADCAST_DB_PATH), burst=BROADCAST_BURST, live=self.live
+        )
+
+        # Dialogs in memory (warm from sqlite after restart, see open())
+        self.dialog_cache = DialogCache(DIALOG_CACHE_PATH)
+        self._dialog_sync_tasks: dict[str, asyncio.Task] = {}
+        self._cache_flush_task: Optional[asyncio.Task] = None
+
+        # Context files for Cursor, updated from dialog cache changes
+        self.context_sync = ContextSync(self.dialog_cache, CONTEXT_DIR)
+
+        # Last fan-out report (slow / failed accounts) for dashboard
+        self.last_fanout: dict = {}
+
+        metrics.gauge("telegramhub_accounts_connected", "Connected accounts",
+                      lambda: sum(1 for acc in self.accounts.values() if acc.connected))
+        metrics.gauge("telegramhub_media_cache_bytes", "Media cache size on disk",
+                      lambda: self.media_cache.total_bytes)
+        metrics.gauge("telegramhub_live_clients", "Connected WebSocket clients", lambda: self.live.clients)
+
+    def open(self):
+        """
+        Open the stores on disk and restore what the previous run left (app startup hook).
+        Nothing is opened at import - the module-level manager is created with no file I/O
+        """
+        self.media_cache.open()
+        self.search_index.open()
+        self.broadcasts.store.open()
+        interrupted = self.broadcasts.store.recover_interrupted()
+        if interrupted:
+            logger.warning(f"Interrupted broadcasts (resume via API): {', '.join(interrupted)}")
+        self.dialog_cache.open()
+        self.dialog_cache.load()
+
+    def close(self):
+        """Close the stores (after disconnect_all)"""
+        self.dialog_cache.close()
+        self.search_index.close()
+        self.broadcasts.store.close()
 
     async def load_accounts(self) -> int:
         """Load all accounts from sessions folder"""
         loaded = 0
 
         for session_file in SESSIONS_DIR.glob("*.session"):
-            account = TelegramAccount(session_file)
+            account = TelegramAccount(
+                session_file, dialog_cache=self.dialog_cache, search_index=self.search_index, live=self.live
+            )
             if await account.connect():
                 self.accounts[account.name] = account
                 loaded += 1
             else:
                 logger.warning(f"{account.name}: Failed to connect")
 
+        if self._cache_flush_task is None:
+            self._cache_flush_task = asyncio.create_task(self._cache_flush_loop())
+        self.context_sync.start(
+            self.live, lambda: set(self.accounts), SYNC_INTERVAL_SECONDS, CONTEXT_SYNC_DEBOUNCE_SECONDS
+        )
+
         return loaded
 
     async def disconnect_all(self):
         """Disconnect all accounts"""
+        for task in [self._cache_flush_task, *self._dialog_sync_tasks.values()]:
+            if task:
+                task.cancel()
+        self._cache_flush_task = None
+        self._dialog_sync_tasks.clear()
+        await self.context_sync.stop()
+        self.broadcasts.cancel()
+
         for account in self.accounts.values():
             await account.disconnect()
+        self.dialog_cache.flush()
+
+    async def _cache_flush_loop(self):
+        """Persist dialog cache changes in batches"""
+        while True:
+            await asyncio.sleep(DIALOG_CACHE_FLUSH_SECONDS)
+            try:
+                await asyncio.to_thread(self.dialog_cache.flush)
+            except Exception as e:
+                logger.error(f"Dialog cache flush error - {e}")
+
+    def is_media_downloading(self, key: str) -> bool:
+        return key in self._media_downloads
+
+    def register_media_download(self, key: str) -> asyncio.Future:
+        """
+        Whole-file download running outside cache_media (streamed to a client).
+        Set the future to the CachedMedia (None on failure) - concurrent cache_media calls wait for it
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._media_downloads[key] = future
+        future.add_done_callback(lambda _: self._media_downloads.pop(key, None))
+        return future
+
+    async def cache_media(self, account: TelegramAccount, msg: Message, key: str, info: dict) -> Optional[CachedMedia]:
+        """Download whole media into cache; concurrent requests share one download"""
+        task = self._media_downloads.get(key)
+        if task is None:
+            task = asyncio.create_task(self._download_media_to_cache(account, msg, key, info))
+            self._media_downloads[key] = task
+            task.add_done_callback(lambda _: self._media_downloads.pop(key, None))
+        return await asyncio.shield(task)
+
+    def prefetch_media(self, account: TelegramAccount, msg: Message, key: str, info: dict):
+        """Fill cache in background (e.g. while a range of the video is being streamed)"""
+        if key not in self._media_downloads:
+            asyncio.create_task(self.cache_media(account, msg, key, info))
+
+    async def _download_media_to_cache(self, account: TelegramAccount, msg: Message, key: str, info: dict):
+        # File I/O in a worker thread - disk latency doesn't stall the event loop
+        writer = await asyncio.to_thread(self.media_cache.writer, key, info["mime_type"], info.get("filename"))
+        cached = None
+        try:
+            async for chunk in account.iter_media(msg):
+                await asyncio.to_thread(writer.write, chunk)
+            cached = await asyncio.to_thread(writer.commit)
+        except Exception as e:
+            logger.error(f"{account.name}: Error downloading media {key} - {e}")
+        finally:
+            # Also on cancellation (shutdown, client gone) - no .part file is left behind
+            if cached is None:
+                await asyncio.to_thread(writer.abort)
+        return cached
 
     def get_account(self, name: str) -> Optional[TelegramAccount]:
         """Get account by name"""
@@ -451,22 +763,144 @@ class TelegramManager:
             for acc in self.accounts.values()
         ]
 
-    async def get_all_dialogs(self) -> list[dict]:
-        """Get dialogs from all accounts"""
-        all_dialogs = []
+    async def run_per_account(
+        self,
+        operation,
+        accounts: Optional[list[TelegramAccount]] = None,
+        timeout: float = ACCOUNT_TIMEOUT_SECONDS,
+        label: str = "fan-out"
+    ) -> tuple[dict, dict]:
+        """
+        Run operation(account) for all connected accounts concurrently.
+        Each account gets its own timeout; failed or timed out accounts are left out of results.
+        Returns (results by account name, report with slow / failed accounts and timings).
+        """
+        if accounts is None:
+            accounts = [acc for acc in self.accounts.values() if acc.connected]
+
+        async def run_one(account: TelegramAccount):
+            started = time.monotonic()
+            try:
+                return await asyncio.wait_for(operation(account), timeout)
+            finally:
+                timings[account.name] = round(time.monotonic() - started, 2)
+
+        timings: dict[str, float] = {}
+        outcomes = await asyncio.gather(*(run_one(acc) for acc in accounts), return_exceptions=True)
+
+        results = {}
+        failed = {}
+        for account, outcome in zip(accounts, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                failed[account.name] = f"timeout after {timeout}s"
+            elif isinstance(outcome, BaseException):
+                failed[account.name] = str(outcome) or type(outcome).__name__
+            else:
+                results[account.name] = outcome
 
-        for account in self.accounts.values():
-            if account.connected:
-                dialogs = await account.get_dialogs()
-                all_dialogs.extend(dialogs)
-
-        # Sort by last message date
-        all_dialogs.sort(
-            key=lambda x: x.get("last_message_date", "") or "",
-            reverse=True
+        slow = {
+            name: seconds for name, seconds in timings.items()
+            if seconds >= ACCOUNT_SLOW_SECONDS and name not in failed
+        }
+        for name, error in failed.items():
+            logger.warning(f"{name}: {label} failed - {error}")
+        if slow:
+            logger.warning(f"{label}: slow accounts {slow}")
+
+        report = {
+            "operation": label,
+            "finished_at": datetime.now().isoformat(),
+            "accounts": len(accounts),
+            "ok": len(results),
+            "failed": failed,
+            "slow": slow,
+            "timings": timings
+        }
+        self.last_fanout = report
+        return results, report
+
+    async def sync_account_dialogs(self, account: TelegramAccount) -> bool:
+        """Load full dialog list of account from Telegram into cache"""
+        try:
+            dialogs = await account.fetch_dialogs(DIALOG_CACHE_LIMIT)
+        except Exception as e:
+            logger.error(f"{account.name}: Error syncing dialogs - {e}")
+            account.last_error = str(e)
+            return False
+
+        self.dialog_cache.replace_account(account.name, dialogs)
+        logger.info(f"{account.name}: {len(dialogs)} dialogs synced to cache")
+        return True
+
+    def _schedule_dialog_sync(self, account: TelegramAccount):
+        """Re-sync account in background, cached dialogs are served meanwhile"""
+        task = self._dialog_sync_tasks.get(account.name)
+        if task is None or task.done():
+            self._dialog_sync_tasks[account.name] = asyncio.create_task(self.sync_account_dialogs(account))
+
+    def _cancel_dialog_sync(self, account: TelegramAccount):
+        task = self._dialog_sync_tasks.pop(account.name, None)
+        if task and not task.done():
+            task.cancel()
+
+    async def get_account_dialogs(self, account: TelegramAccount, refresh: bool = False) -> list[dict]:
+        """Dialogs of one account from cache"""
+        await self.ensure_account_dialogs(account, refresh)
+        return self.dialog_cache.get_dialogs(account.name)
+
+    async def ensure_account_dialogs(self, account: TelegramAccount, refresh: bool = False):
+        """
+        Make sure dialogs of account are in cache.
+        Never loaded -> loaded now; warm but stale (restart, reconnect) -> served and re-synced in background.
+        """
+        cached = not refresh and self.dialog_cache.has_account(account.name)
+        cache_requests.inc(cache="dialogs", result="hit" if cached else "miss")
+        if not cached:
+            if refresh:
+                self._cancel_dialog_sync(account)
+            self._schedule_dialog_sync(account)
+            # Shielded: on timeout the load keeps running and fills the cache for next request
+            synced = await asyncio.shield(self._dialog_sync_tasks[account.name])
+            if not synced and not self.dialog_cache.has_account(account.name):
+                raise RuntimeError(account.last_error or "dialogs not loaded")
+        elif not self.dialog_cache.is_fresh(account.name):
+            self._schedule_dialog_sync(account)
+
+    async def get_dialog(self, account_name: str, chat_id: int) -> dict:
+        """Info for one chat from cache (no iter_dialogs); {} if unknown"""
+        account = self.get_account(account_name)
+        if not account:
+            return {}
+        dialog = self.dialog_cache.get_dialog(account_name, chat_id)
+        if dialog is None and account.connected and not self.dialog_cache.has_account(account_name):
+            await self.sync_account_dialogs(account)
+            dialog = self.dialog_cache.get_dialog(account_name, chat_id)
+        return dialog or {}
+
+    async def ensure_all_dialogs(self, refresh: bool = False) -> set[str]:
+        """Dialogs of all connected accounts in cache (no copies); names of accounts that are served"""
+        results, _ = await self.run_per_account(
+            lambda acc: self.ensure_account_dialogs(acc, refresh), label="dialogs"
+        )
+        return set(results)
+
+    async def get_all_dialogs(self, refresh: bool = False) -> list[dict]:
+        """Get dialogs from all accounts (served from dialog cache)"""
+        dialogs, _ = await self.collect_all_dialogs(refresh)
+        return dialogs
+
+    async def collect_all_dialogs(self, refresh: bool = False) -> tuple[list[dict], dict]:
+        """
+        Dialogs of all accounts fetched concurrently, newest first.
+        Slow or failed accounts don't block the rest - see report.
+        """
+        per_account, report = await self.run_per_account(
+            lambda acc: self.get_account_dialogs(acc, refresh), label="dialogs"
         )
 
-        return all_dialogs
+        # Every account list is already sorted by last message date - k-way merge
+        all_dialogs = list(heapq.merge(*per_account.values(), key=dialog_sort_key, reverse=True))
+        return all_dialogs, report
 
     async def broadcast_message(
         self,
@@ -476,64 +910,20 @@ class TelegramManager:
         progress_callback=None
     ) -> dict:
         """
-        Send message to multiple chats with delay.
+        Send message to multiple chats and wait for the result.
         targets: [{"account": "acc1", "chat_id": 123}, ...]
+        Accounts send in parallel, each at most one message per `delay` seconds
+        (slower after flood waits). Progress is persisted - see broadcast.py.
         """
-        if self._broadcast_in_progress:
+        if self.broadcasts.in_progress:
             return {"success": False, "error": "Broadcast already in progress"}
 
-        self._broadcast_in_progress = True
-        self._broadcast_cancel = False
-
-        results = {
-            "total": len(targets),
-            "sent": 0,
-            "failed": 0,
-            "errors": []
-        }
-
-        try:
-            for i, target in enumerate(targets):
-                if self._broadcast_cancel:
-                    results["cancelled"] = True
-                    break
-
-                account = self.get_account(target["account"])
-                if not account or not account.connected:
-                    results["failed"] += 1
-                    results["errors"].append({
-                        "target": target,
-                        "error": "Account not connected"
-                    })
-                    continue
-
-                result = await account.send_message(target["chat_id"], text)
-
-                if result["success"]:
-                    results["sent"] += 1
-                else:
-                    results["failed"] += 1
-                    results["errors"].append({
-                        "target": target,
-                        "error": result.get("error")
-                    })
-
-                if progress_callback:
-                    await progress_callback(i + 1, len(targets), result)
-
-                # Delay between messages
-                if i < len(targets) - 1:
-                    await asyncio.sleep(delay)
+        broadcast_id = self.broadcasts.start(targets, text, delay, progress_callback)
+        return await self.broadcasts.wait(broadcast_id)
 
-        finally:
-            self._broadcast_in_progress = False
-
-        logger.info(f"Broadcast completed: {results['sent']}/{results['total']} sent")
-        return results
-
-    def cancel_broadcast(self):
+    def cancel_broadcast(self, broadcast_id: str = None):
         """Cancel ongoing broadcast"""
-        self._broadcast_cancel = True
+        self.broadcasts.cancel(broadcast_id)
 
     def get_statistics(self) -> dict:
         """Get aggregated statistics"""
@@ -547,81 +937,27 @@ class TelegramManager:
             "messages_sent_total": total_sent,
             "reconnects_total": total_reconnects,
             "flood_waits_total": total_flood_waits,
-            "accounts": self.get_accounts_status()
+            "accounts": self.get_accounts_status(),
+            "last_fanout": self.last_fanout,
+            "broadcast_limits": self.broadcasts.limits(),
+            "live": {"clients": self.live.clients, **self.live.stats}
         }
 
-    async def sync_to_files(self):
-        """Sync data to files for Cursor"""
+    async def sync_to_files(self, refresh: bool = False):
+        """Sync context files for Cursor (only changed chats / files are written, see context_sync.py)"""
         logger.info("Syncing context...")
 
-        all_dialogs = await self.get_all_dialogs()
-
-        # Save active chats
-        active_chats_path = CONTEXT_DIR / "active_chats" / "all_chats.json"
-        with open(active_chats_path, "w", encoding="utf-8") as f:
-            json.dump(all_dialogs, f, ensure_ascii=False, indent=2)
-
-        # Create markdown summary
-        summary_path = CONTEXT_DIR / "summaries" / "dialogs_summary.md"
-        await self._create_summary(all_dialogs, summary_path)
-
-        # Pending replies
-        pending = [d for d in all_dialogs if d.get("unread_count", 0) > 0]
-        pending_path = CONTEXT_DIR / "pending_replies" / "unread.json"
-        with open(pending_path, "w", encoding="utf-8") as f:
-            json.dump(pending, f, ensure_ascii=False, indent=2)
-
-        pending_md_path = CONTEXT_DIR / "pending_replies" / "unread.md"
-        await self._create_pending_md(pending, pending_md_path)
-
-        logger.info(f"Synced {len(all_dialogs)} dialogs, {len(pending)} pending")
-
-    async def _create_summary(self, dialogs: list[dict], path: Path):
-        """Create markdown summary"""
-        content = f"""# Telegram Dialogs Overview
-
-**Updated:** {datetime.now().strftime("%Y-%m-%d %H:%M")}
-**Accounts:** {len(self.accounts)}
-**Dialogs:** {len(dialogs)}
-
-## Recent Dialogs
-
-| # | Account | Chat | Type | Unread | Last Message |
-|---|---------|------|------|--------|--------------|
-"""
-        for i, d in enumerate(dialogs[:50], 1):
-            last_msg = d.get("last_message", {}).get("text", "-")[:40]
-            if len(d.get("last_message", {}).get("text", "")) > 40:
-                last_msg += "..."
-            last_msg = last_msg.replace("|", "/").replace("\n", " ")
-            name = (d.get("name") or "Unknown")[:25]
-
-            content += f"| {i} | {d['account']} | {name} | {d['type']} | {d.get('unread_count', 0)} | {last_msg} |\n"
-
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
-
-    async def _create_pending_md(self, pending: list[dict], path: Path):
-        """Create markdown for pending replies"""
-        content = f"""# Pending Replies
-
-**Updated:** {datetime.now().strftime("%Y-%m-%d %H:%M")}
-**Unread Chats:** {len(pending)}
-
-## List
-
-"""
-        for d in pending:
-            msg_text = d.get('last_message', {}).get('text', '-')[:100]
-            content += f"""### {d.get('name', 'Unknown')} ({d['account']})
-- **Type:** {d['type']}
-- **Unread:** {d['unread_count']} messages
-- **Last:** {msg_text}
-
-"""
+        _, report = await self.run_per_account(
+            lambda acc: self.ensure_account_dialogs(acc, refresh), label="sync"
+        )
+        accounts = set(self.accounts)
+        result = await asyncio.to_thread(self.context_sync.sync, accounts, report)
 
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
+        logger.info(
+            f"Synced {result['dialogs']} dialogs, {result['pending']} pending "
+            f"({result['written']} files written, {result['removed']} removed)"
+        )
+        return report
 
 
 # Global manager instance
@@ -632,6 +968,7 @@ async def main():
     """Test run"""
     logger.info("=== TelegramHub Manager Test ===")
 
+    manager.open()
     loaded = await manager.load_accounts()
     logger.info(f"Accounts loaded: {loaded}")
 
@@ -641,6 +978,7 @@ async def main():
         logger.info(f"Stats: {stats}")
 
     await manager.disconnect_all()
+    manager.close()
 
 
 if __name__ == "__main__":
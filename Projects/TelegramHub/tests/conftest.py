@@ -0,0 +1,8 @@
+"""
+TelegramHub tests - server modules import each other by plain name (run from server/),
+so server/ is put on sys.path here. Run from Projects/TelegramHub: python -m pytest -q tests
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "server"))
@@ -0,0 +1,262 @@
+"""Broadcasts: token bucket (AIMD under flood waits), store recovery, scheduler with fake accounts"""
+import asyncio
+
+import pytest
+
+import broadcast
+from broadcast import BroadcastScheduler, BroadcastStore, TokenBucket
+
+
+class FakeClock:
+    """time.monotonic + asyncio.sleep for broadcast.py: sleeping just moves the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+        await real_sleep(0)
+
+
+real_sleep = asyncio.sleep
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = FakeClock()
+    monkeypatch.setattr(broadcast.time, "monotonic", c.monotonic)
+    monkeypatch.setattr(broadcast.asyncio, "sleep", c.sleep)
+    return c
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = BroadcastStore(tmp_path / "broadcasts.db")
+    s.open()
+    yield s
+    s.close()
+
+
+# ===== Token bucket =====
+
+def test_burst_is_free_then_one_token_per_interval(clock):
+    async def run():
+        bucket = TokenBucket(interval=2.0, burst=3)
+        for _ in range(5):
+            await bucket.acquire()
+
+    asyncio.run(run())
+    assert clock.sleeps == [2.0, 2.0]
+
+
+def test_flood_wait_blocks_and_halves_rate(clock):
+    async def run():
+        bucket = TokenBucket(interval=1.0, burst=1)
+        await bucket.acquire()
+        bucket.on_flood_wait(30)
+        assert bucket.rate == pytest.approx(0.5)
+        assert bucket.to_dict() == {"rate_per_minute": 30.0, "blocked_for": 30.0}
+        started = clock.now
+        await bucket.acquire()
+        after_block = clock.now - started
+        await bucket.acquire()
+        return after_block, clock.now - started - after_block
+
+    after_block, spacing = asyncio.run(run())
+    # Nothing is sent during the flood wait; afterwards sends are spaced at the halved rate
+    assert after_block == pytest.approx(30.0)
+    assert spacing == pytest.approx(2.0)
+
+
+def test_rate_never_drops_below_floor(clock):
+    bucket = TokenBucket(interval=1.0, min_rate_factor=0.1)
+    for _ in range(10):
+        bucket.on_flood_wait(1)
+    assert bucket.rate == pytest.approx(0.1)
+
+
+def test_successes_restore_rate_additively(clock):
+    bucket = TokenBucket(interval=1.0, recover_after=3)
+    bucket.on_flood_wait(1)
+    bucket.on_flood_wait(1)
+    assert bucket.rate == pytest.approx(0.25)
+
+    for _ in range(2):
+        bucket.on_success()
+    assert bucket.rate == pytest.approx(0.25)
+    bucket.on_success()
+    assert bucket.rate == pytest.approx(0.35)
+
+    for _ in range(30):
+        bucket.on_success()
+    assert bucket.rate == pytest.approx(bucket.base_rate)
+
+
+def test_flood_wait_resets_success_streak(clock):
+    bucket = TokenBucket(interval=1.0, recover_after=3)
+    bucket.on_flood_wait(1)
+    bucket.on_success()
+    bucket.on_success()
+    bucket.on_flood_wait(1)
+    bucket.on_success()
+    assert bucket.rate == pytest.approx(0.25)
+
+
+# ===== Store =====
+
+def target_statuses(store: BroadcastStore, broadcast_id: str) -> list[str]:
+    with store._lock:
+        rows = store._conn.execute(
+            "SELECT status FROM broadcast_targets WHERE broadcast_id = ? ORDER BY position", (broadcast_id,)
+        ).fetchall()
+    return [r["status"] for r in rows]
+
+
+def targets(*pairs) -> list[dict]:
+    return [{"account": account, "chat_id": chat_id} for account, chat_id in pairs]
+
+
+def test_init_does_not_touch_disk(tmp_path):
+    BroadcastStore(tmp_path / "sub" / "broadcasts.db")
+    assert not (tmp_path / "sub").exists()
+
+
+def test_recover_interrupted(store):
+    running = store.create("hi", 1.0, targets(("a", 1), ("a", 2), ("a", 3), ("b", 4)))
+    store.set_target(running, 0, "sent", message_id=100)
+    store.set_target(running, 1, "sending")
+    store.set_target(running, 2, "failed", "PeerIdInvalid")
+    done = store.create("old", 1.0, targets(("a", 1)))
+    store.set_target(done, 0, "sent")
+    store.set_status(done, "completed")
+
+    assert store.recover_interrupted() == [running]
+
+    assert store.get(running)["status"] == "interrupted"
+    assert target_statuses(store, running) == ["sent", "unknown", "failed", "pending"]
+    assert store.get(done)["status"] == "completed"
+    assert [t["position"] for t in store.pending_targets(running)] == [3]
+
+    summary = store.summary(running)
+    assert (summary["sent"], summary["failed"], summary["unknown"], summary["pending"]) == (1, 1, 1, 1)
+    assert {e["error"] for e in summary["errors"]} == {"PeerIdInvalid", "interrupted while sending"}
+
+
+def test_recover_interrupted_survives_reopen(tmp_path):
+    first = BroadcastStore(tmp_path / "broadcasts.db")
+    broadcast_id = first.create("hi", 1.0, targets(("a", 1)))
+    first.set_target(broadcast_id, 0, "sending")
+    first.close()
+
+    second = BroadcastStore(tmp_path / "broadcasts.db")
+    try:
+        assert second.recover_interrupted() == [broadcast_id]
+        assert second.recover_interrupted() == []
+        assert target_statuses(second, broadcast_id) == ["unknown"]
+    finally:
+        second.close()
+
+
+# ===== Scheduler =====
+
+class FakeAccount:
+    def __init__(self, name: str, results: list[dict] = None, connected: bool = True):
+        self.name = name
+        self.connected = connected
+        self.results = list(results or [])
+        self.sent: list[int] = []
+
+    async def send_message(self, chat_id: int, text: str, retry_flood_wait: bool = True) -> dict:
+        assert retry_flood_wait is False
+        result = self.results.pop(0) if self.results else {"success": True, "message_id": chat_id * 10}
+        if result["success"]:
+            self.sent.append(chat_id)
+        return result
+
+
+class FakeManager:
+    def __init__(self, *accounts: FakeAccount):
+        self.accounts = {a.name: a for a in accounts}
+
+    def get_account(self, name: str):
+        return self.accounts.get(name)
+
+
+def test_broadcast_sends_to_all_accounts(clock, store):
+    alice, bob = FakeAccount("alice"), FakeAccount("bob")
+    scheduler = BroadcastScheduler(FakeManager(alice, bob), store)
+
+    async def run():
+        broadcast_id = scheduler.start(targets(("alice", 1), ("bob", 2), ("alice", 3)), "hi", delay=1.0)
+        return await scheduler.wait(broadcast_id)
+
+    result = asyncio.run(run())
+    assert result["status"] == "completed"
+    assert (result["sent"], result["total"]) == (3, 3)
+    assert alice.sent == [1, 3] and bob.sent == [2]
+
+
+def test_flood_wait_is_retried_and_slows_account_down(clock, store):
+    alice = FakeAccount("alice", results=[{"success": False, "error": "flood", "flood_wait": 20}])
+    scheduler = BroadcastScheduler(FakeManager(alice), store)
+
+    async def run():
+        broadcast_id = scheduler.start(targets(("alice", 1), ("alice", 2)), "hi", delay=1.0)
+        return await scheduler.wait(broadcast_id)
+
+    result = asyncio.run(run())
+    assert result["sent"] == 2 and alice.sent == [1, 2]
+    assert scheduler.buckets["alice"].rate == pytest.approx(0.5)
+    assert 20.0 in clock.sleeps
+
+
+def test_flood_wait_retries_are_bounded(clock, store):
+    flood = {"success": False, "error": "flood", "flood_wait": 5}
+    alice = FakeAccount("alice", results=[flood] * 10)
+    scheduler = BroadcastScheduler(FakeManager(alice), store, max_flood_retries=2)
+
+    async def run():
+        broadcast_id = scheduler.start(targets(("alice", 1)), "hi", delay=1.0)
+        return await scheduler.wait(broadcast_id)
+
+    result = asyncio.run(run())
+    assert result["failed"] == 1
+    assert result["errors"][0]["error"] == "Flood wait retries exceeded"
+    assert len(alice.results) == 7
+
+
+def test_disconnected_account_fails_its_targets_only(clock, store):
+    alice, bob = FakeAccount("alice"), FakeAccount("bob", connected=False)
+    scheduler = BroadcastScheduler(FakeManager(alice, bob), store)
+
+    async def run():
+        broadcast_id = scheduler.start(targets(("alice", 1), ("bob", 2)), "hi", delay=1.0)
+        return await scheduler.wait(broadcast_id)
+
+    result = asyncio.run(run())
+    assert result["status"] == "completed"
+    assert (result["sent"], result["failed"]) == (1, 1)
+
+
+def test_resume_sends_only_never_attempted_targets(clock, store):
+    broadcast_id = store.create("hi", 1.0, targets(("alice", 1), ("alice", 2), ("alice", 3)))
+    store.set_target(broadcast_id, 0, "sent")
+    store.set_target(broadcast_id, 1, "sending")
+    store.recover_interrupted()
+    alice = FakeAccount("alice")
+    scheduler = BroadcastScheduler(FakeManager(alice), store)
+
+    async def run():
+        assert scheduler.resume(broadcast_id)
+        return await scheduler.wait(broadcast_id)
+
+    result = asyncio.run(run())
+    assert alice.sent == [3]
+    assert result["status"] == "completed"
+    assert (result["sent"], result["unknown"]) == (2, 1)
+    assert not scheduler.resume(broadcast_id)
@@ -0,0 +1,166 @@
+"""ContextSync: incremental, atomic, change-only writes of the Cursor context directory"""
+import asyncio
+import json
+
+import pytest
+
+from context_sync import ContextSync
+from dialog_cache import DialogCache
+from live_updates import EventHub
+
+
+def dialog(account: str, chat_id: int, day: int, unread: int = 0, text: str = "hello") -> dict:
+    date = f"2025-01-{day:02d}T12:00:00"
+    return {
+        "id": chat_id,
+        "account": account,
+        "name": f"{account}-{chat_id}",
+        "type": "user",
+        "unread_count": unread,
+        "last_message": {"id": day, "text": text, "date": date},
+        "last_message_date": date
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = DialogCache(tmp_path / "dialogs.db")
+    c.replace_account("alice", [dialog("alice", 1, 1), dialog("alice", 2, 5, unread=2)])
+    c.replace_account("bob", [dialog("bob", 3, 3)])
+    yield c
+    c.close()
+
+
+@pytest.fixture
+def context_dir(tmp_path):
+    return tmp_path / "context"
+
+
+@pytest.fixture
+def sync(cache, context_dir):
+    return ContextSync(cache, context_dir)
+
+
+def files(context_dir) -> set[str]:
+    return {p.relative_to(context_dir).as_posix() for p in context_dir.rglob("*") if p.is_file()}
+
+
+def test_first_pass_writes_chats_and_aggregates(sync, context_dir):
+    result = sync.sync({"alice", "bob"})
+
+    assert files(context_dir) == {
+        "active_chats/chats/alice/1.json",
+        "active_chats/chats/alice/2.json",
+        "active_chats/chats/bob/3.json",
+        "active_chats/index.json",
+        "pending_replies/unread.json",
+        "pending_replies/unread.md",
+        "summaries/dialogs_summary.md",
+    }
+    assert result == {"dialogs": 3, "pending": 1, "written": 7, "removed": 0}
+
+    index = json.loads((context_dir / "active_chats" / "index.json").read_text(encoding="utf-8"))
+    assert [(c["account"], c["id"]) for c in index] == [("alice", 2), ("bob", 3), ("alice", 1)]
+    assert index[0]["file"] == "active_chats/chats/alice/2.json"
+    chat = json.loads((context_dir / "active_chats/chats/alice/2.json").read_text(encoding="utf-8"))
+    assert chat["unread_count"] == 2
+    assert "**Updated:** 20" in (context_dir / "summaries/dialogs_summary.md").read_text(encoding="utf-8")
+
+
+def test_pass_without_changes_writes_nothing(sync):
+    sync.sync({"alice", "bob"})
+    assert sync.sync({"alice", "bob"}) == {"dialogs": 3, "pending": 1, "written": 0, "removed": 0}
+
+
+def test_only_changed_chat_is_rewritten(sync, cache, context_dir):
+    sync.sync({"alice", "bob"})
+    untouched = (context_dir / "active_chats/chats/alice/2.json").stat().st_mtime_ns
+
+    cache.rename("alice", 1, "Renamed")
+    result = sync.sync({"alice", "bob"})
+
+    # The chat file, index.json and the summary table (name column)
+    assert result["written"] == 3
+    chat = json.loads((context_dir / "active_chats/chats/alice/1.json").read_text(encoding="utf-8"))
+    assert chat["name"] == "Renamed"
+    assert (context_dir / "active_chats/chats/alice/2.json").stat().st_mtime_ns == untouched
+
+
+def test_removed_dialog_file_is_deleted(sync, cache, context_dir):
+    sync.sync({"alice", "bob"})
+
+    cache.remove("alice", 1)
+    result = sync.sync({"alice", "bob"})
+
+    assert result["removed"] == 1
+    assert not (context_dir / "active_chats/chats/alice/1.json").exists()
+
+
+def test_account_set_change_drops_other_accounts(sync, context_dir):
+    legacy = context_dir / "active_chats" / "all_chats.json"
+    legacy.parent.mkdir(parents=True)
+    legacy.write_text("[]", encoding="utf-8")
+    sync.sync({"alice", "bob"})
+
+    result = sync.sync({"alice"})
+
+    assert result["dialogs"] == 2
+    assert not (context_dir / "active_chats/chats/bob").exists()
+    assert not legacy.exists()
+
+
+def test_restart_with_same_content_writes_nothing(cache, context_dir):
+    ContextSync(cache, context_dir).sync({"alice", "bob"})
+
+    # New process: hashes are rebuilt from disk, the Updated stamp is ignored
+    restarted = ContextSync(cache, context_dir)
+    assert restarted.sync({"alice", "bob"})["written"] == 0
+
+
+def test_no_temp_files_left(sync, cache, context_dir):
+    sync.sync({"alice", "bob"})
+    cache.apply_message("bob", 3, {"id": 9, "text": "new", "date": "2025-01-09T00:00:00"}, incoming=True)
+    sync.sync({"alice", "bob"})
+
+    assert not [p for p in context_dir.rglob("*.tmp")]
+
+
+def test_failed_accounts_in_summary(sync, context_dir):
+    sync.sync({"alice", "bob"}, report={"failed": {"bob": "timeout"}})
+    summary = (context_dir / "summaries/dialogs_summary.md").read_text(encoding="utf-8")
+    assert "**Not synced:** bob (timeout)" in summary
+
+    # Kept for background passes that have no report of their own
+    sync.sync({"alice", "bob"})
+    assert "**Not synced:** bob (timeout)" in (context_dir / "summaries/dialogs_summary.md").read_text(encoding="utf-8")
+
+
+def test_pending_replies(sync, cache, context_dir):
+    cache.apply_message("bob", 3, {"id": 9, "text": "ping | pong", "date": "2025-01-09T00:00:00"}, incoming=True)
+    sync.sync({"alice", "bob"})
+
+    pending = json.loads((context_dir / "pending_replies/unread.json").read_text(encoding="utf-8"))
+    assert [(d["account"], d["id"]) for d in pending] == [("bob", 3), ("alice", 2)]
+    unread_md = (context_dir / "pending_replies/unread.md").read_text(encoding="utf-8")
+    assert "**Unread Chats:** 2" in unread_md and "### bob-3 (bob)" in unread_md
+
+
+def test_background_pass_follows_dialog_events(sync, cache, context_dir):
+    hub = EventHub()
+
+    async def run():
+        sync.start(hub, lambda: {"alice", "bob"}, interval=60, debounce=0)
+        await asyncio.sleep(0)
+        cache.rename("alice", 1, "Live rename")
+        hub.publish("dialog", account="alice", chat_id=1, action="renamed")
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if sync.stats["passes"]:
+                break
+        await sync.stop()
+
+    asyncio.run(run())
+    assert sync.stats["passes"] == 1
+    assert hub.clients == 0
+    chat = json.loads((context_dir / "active_chats/chats/alice/1.json").read_text(encoding="utf-8"))
+    assert chat["name"] == "Live rename"
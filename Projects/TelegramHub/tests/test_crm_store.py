@@ -0,0 +1,170 @@
+"""CRMStore: one-time JSON migration, draft and AI result round-trips"""
+import json
+
+import pytest
+
+from crm_store import CRMStore, split_chat_key
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = CRMStore(tmp_path / "crm.db")
+    s.open()
+    yield s
+    s.close()
+
+
+def draft(draft_id: str, chat_id: int = 1, status: str = "pending", created_at: str = "2025-01-01T10:00:00") -> dict:
+    return {
+        "id": draft_id,
+        "account": "alice",
+        "chat_id": chat_id,
+        "text": f"Черновик {draft_id}",
+        "status": status,
+        "created_at": created_at
+    }
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def test_split_chat_key():
+    assert split_chat_key("alice:123") == ("alice", 123)
+    assert split_chat_key("my:account:-100500") == ("my:account", -100500)
+    assert split_chat_key("broken") is None
+
+
+def test_init_does_not_touch_disk(tmp_path):
+    CRMStore(tmp_path / "sub" / "crm.db")
+    assert not (tmp_path / "sub").exists()
+
+
+# ===== Drafts migration =====
+
+def test_migrate_drafts_from_dict(store, tmp_path):
+    outbox = tmp_path / "outbox.json"
+    write_json(outbox, {"d1": draft("d1"), "d2": draft("d2", status="sent", created_at="2025-01-02")})
+
+    store.migrate_drafts_json(outbox)
+
+    assert store.get_draft("d1") == draft("d1")
+    assert [d["id"] for d in store.get_drafts()] == ["d2", "d1"]
+    assert [d["id"] for d in store.get_drafts("pending")] == ["d1"]
+
+
+def test_migrate_drafts_from_list_skips_entries_without_id(store, tmp_path):
+    outbox = tmp_path / "outbox.json"
+    write_json(outbox, [draft("d1"), {"text": "no id"}])
+
+    store.migrate_drafts_json(outbox)
+
+    assert [d["id"] for d in store.get_drafts()] == ["d1"]
+
+
+def test_migrating_twice_is_a_no_op(store, tmp_path):
+    outbox = tmp_path / "outbox.json"
+    write_json(outbox, [draft("d1"), draft("d2")])
+    store.migrate_drafts_json(outbox)
+    store.delete_draft("d2")
+    store.save_draft(dict(draft("d1"), text="edited"))
+
+    # The JSON file stays as a backup; a second run must not bring old state back
+    write_json(outbox, [draft("d1"), draft("d2"), draft("d3")])
+    store.migrate_drafts_json(outbox)
+
+    assert [d["id"] for d in store.get_drafts()] == ["d1"]
+    assert store.get_draft("d1")["text"] == "edited"
+
+
+def test_migration_flag_survives_reopen(tmp_path):
+    outbox = tmp_path / "outbox.json"
+    write_json(outbox, [draft("d1")])
+    first = CRMStore(tmp_path / "crm.db")
+    first.migrate_drafts_json(outbox)
+    first.delete_draft("d1")
+    first.close()
+
+    second = CRMStore(tmp_path / "crm.db")
+    try:
+        second.migrate_drafts_json(outbox)
+        assert second.get_drafts() == []
+    finally:
+        second.close()
+
+
+def test_missing_or_broken_drafts_file(store, tmp_path):
+    broken = tmp_path / "outbox.json"
+    broken.write_text("{not json", encoding="utf-8")
+
+    store.migrate_drafts_json(broken)
+    assert store.get_drafts() == []
+
+    # Marked as migrated - a later fix of the file is not imported over live data
+    write_json(broken, [draft("d1")])
+    store.migrate_drafts_json(broken)
+    assert store.get_drafts() == []
+
+
+def test_migrate_crm_json(store, tmp_path):
+    crm_file = tmp_path / "crm_chats.json"
+    write_json(crm_file, {
+        "chats": {
+            "alice:1": {"tags": ["vip", "lead"], "notes": "звонить утром", "status": "active", "pinned": True},
+            "bad-key": {"tags": ["vip"]}
+        },
+        "tags": [{"id": "vip", "name": "VIP", "color": "#ff0000"}, {"id": "lead", "name": "Lead"}]
+    })
+    defaults = [{"id": "1", "name": "Hello", "text": "Hi!"}]
+
+    store.migrate_crm_json(crm_file, tmp_path / "missing_templates.json", [], defaults)
+
+    assert store.load_chats() == {
+        "alice:1": {"tags": ["vip", "lead"], "notes": "звонить утром", "status": "active", "pinned": True}
+    }
+    assert store.load_tags() == [
+        {"id": "vip", "name": "VIP", "color": "#ff0000"},
+        {"id": "lead", "name": "Lead", "color": "#888888"}
+    ]
+    assert store.load_templates() == defaults
+    assert store.chats_with_tag("lead") == [("alice", 1)]
+
+
+# ===== Round-trips =====
+
+def test_draft_round_trip(store):
+    original = dict(draft("d1", chat_id=-100123), attachments=[{"name": "файл.pdf"}], reply_to=55)
+    store.save_draft(original)
+
+    assert store.get_draft("d1") == original
+    assert store.get_chat_drafts("alice", -100123) == [original]
+
+    store.save_draft(dict(original, status="sent"))
+    assert store.get_draft("d1")["status"] == "sent"
+    assert store.get_drafts("pending") == []
+
+    assert store.delete_draft("d1") is True
+    assert store.delete_draft("d1") is False
+    assert store.get_draft("d1") is None
+
+
+def test_ai_result_round_trip(store):
+    data = {"summary": "Клиент ждёт счёт", "priority": "high", "suggested_replies": ["Отправлю сегодня"]}
+    store.save_ai_result("alice", 1, "review", last_message_id=42, prompt_version="v3", data=data)
+
+    cached = store.get_ai_result("alice", 1, "review", 42, "v3")
+    assert cached.pop("cached_at")
+    assert cached == data
+
+
+def test_ai_result_is_keyed_by_last_message_and_prompt_version(store):
+    store.save_ai_result("alice", 1, "review", 42, "v3", {"summary": "old"})
+
+    assert store.get_ai_result("alice", 1, "review", 43, "v3") is None
+    assert store.get_ai_result("alice", 1, "review", 42, "v4") is None
+    assert store.get_ai_result("alice", 1, "reply", 42, "v3") is None
+
+    # A newer message replaces the result of the chat
+    store.save_ai_result("alice", 1, "review", 43, "v3", {"summary": "new"})
+    assert store.get_ai_result("alice", 1, "review", 42, "v3") is None
+    assert store.get_ai_result("alice", 1, "review", 43, "v3")["summary"] == "new"
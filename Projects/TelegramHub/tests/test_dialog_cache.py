@@ -0,0 +1,165 @@
+"""DialogCache: change versions, tombstones, persistence to sqlite and reload"""
+import pytest
+
+from dialog_cache import DialogCache
+
+
+def dialog(chat_id: int, name: str = "Chat", date: str = "2025-01-01T10:00:00", unread: int = 0) -> dict:
+    return {
+        "id": chat_id,
+        "name": name,
+        "type": "user",
+        "unread_count": unread,
+        "last_message": {"id": 10, "text": "hi", "date": date},
+        "last_message_date": date
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = DialogCache(tmp_path / "dialogs.db")
+    c.open()
+    yield c
+    c.close()
+
+
+def reopened(cache: DialogCache) -> DialogCache:
+    cache.close()
+    fresh = DialogCache(cache.db_path)
+    fresh.load()
+    return fresh
+
+
+def test_init_does_not_touch_disk(tmp_path):
+    DialogCache(tmp_path / "sub" / "dialogs.db")
+    assert not (tmp_path / "sub").exists()
+
+
+def test_replace_account_stamps_every_dialog(cache):
+    cache.replace_account("alice", [dialog(1), dialog(2)])
+
+    changed, removed = cache.changed_since(0)
+    assert sorted(changed) == [("alice", 1), ("alice", 2)]
+    assert removed == []
+    assert cache.version == 2
+    assert cache.is_fresh("alice")
+
+
+def test_unchanged_dialogs_keep_their_version_on_resync(cache):
+    cache.replace_account("alice", [dialog(1), dialog(2)])
+    seen = cache.version
+
+    cache.replace_account("alice", [dialog(1), dialog(2, name="Renamed")])
+
+    assert cache.changed_since(seen) == ([("alice", 2)], [])
+
+
+def test_updates_bump_version(cache):
+    cache.replace_account("alice", [dialog(1, unread=0)])
+    seen = cache.version
+
+    cache.apply_message("alice", 1, {"id": 11, "text": "new", "date": "2025-01-02T00:00:00"}, incoming=True)
+    assert cache.changed_since(seen) == ([("alice", 1)], [])
+    assert cache.get_dialog("alice", 1)["unread_count"] == 1
+    assert cache.get_dialog("alice", 1)["last_message_date"] == "2025-01-02T00:00:00"
+
+    seen = cache.version
+    assert cache.mark_read("alice", 1, max_id=11)
+    assert cache.get_dialog("alice", 1)["unread_count"] == 0
+    assert cache.changed_since(seen) == ([("alice", 1)], [])
+
+    seen = cache.version
+    cache.rename("alice", 1, "New name")
+    assert cache.changed_since(seen) == ([("alice", 1)], [])
+
+
+def test_mark_read_before_last_message_is_unknown(cache):
+    cache.replace_account("alice", [dialog(1, unread=3)])
+    assert cache.mark_read("alice", 1, max_id=5) is False
+    assert cache.get_dialog("alice", 1)["unread_count"] == 3
+
+
+def test_message_for_unloaded_account_is_ignored(cache):
+    cache.apply_message("bob", 1, {"id": 1, "date": "2025-01-01"}, incoming=True)
+    assert not cache.has_account("bob")
+    assert cache.version == 0
+
+
+def test_removed_dialog_leaves_tombstone(cache):
+    cache.replace_account("alice", [dialog(1), dialog(2)])
+    seen = cache.version
+
+    cache.remove("alice", 2)
+
+    assert cache.changed_since(seen) == ([], [("alice", 2)])
+    assert cache.get_dialog("alice", 2) is None
+    # Readers older than the removal see it as removed, not changed
+    changed, removed = cache.changed_since(0)
+    assert changed == [("alice", 1)] and removed == [("alice", 2)]
+
+
+def test_dialog_dropped_by_resync_is_buried(cache):
+    cache.replace_account("alice", [dialog(1), dialog(2)])
+    seen = cache.version
+
+    cache.replace_account("alice", [dialog(1)])
+
+    assert cache.changed_since(seen) == ([], [("alice", 2)])
+
+
+def test_reappearing_dialog_clears_tombstone(cache):
+    cache.replace_account("alice", [dialog(1)])
+    cache.remove("alice", 1)
+    cache.apply_message("alice", 1, {"id": 1, "date": "2025-01-03"}, incoming=True, dialog=dialog(1))
+
+    changed, removed = cache.changed_since(0)
+    assert changed == [("alice", 1)] and removed == []
+
+
+def test_get_dialogs_newest_first_and_copies(cache):
+    cache.replace_account("alice", [dialog(1, date="2025-01-01"), dialog(2, date="2025-03-01")])
+
+    dialogs = cache.get_dialogs("alice")
+    assert [d["id"] for d in dialogs] == [2, 1]
+    dialogs[0]["name"] = "changed by caller"
+    assert cache.get_dialog("alice", 2)["name"] == "Chat"
+
+
+def test_reload_from_sqlite(cache):
+    cache.replace_account("alice", [dialog(1), dialog(2)])
+    cache.replace_account("bob", [dialog(5, name="Bob chat")])
+    cache.rename("alice", 1, "Renamed")
+    cache.remove("alice", 2)
+    cache.flush()
+
+    fresh = reopened(cache)
+    try:
+        assert fresh.get_dialog("alice", 1)["name"] == "Renamed"
+        assert fresh.get_dialog("alice", 2) is None
+        assert fresh.get_dialog("bob", 5)["name"] == "Bob chat"
+        # Served from disk, but not yet synced with Telegram in this run
+        assert not fresh.is_fresh("alice")
+    finally:
+        fresh.close()
+
+
+def test_resync_replaces_saved_rows(cache):
+    cache.replace_account("alice", [dialog(1), dialog(2)])
+    cache.flush()
+    cache.replace_account("alice", [dialog(3)])
+
+    fresh = reopened(cache)
+    try:
+        assert [d["id"] for d in fresh.get_dialogs("alice")] == [3]
+    finally:
+        fresh.close()
+
+
+def test_close_flushes_pending_changes(cache):
+    cache.replace_account("alice", [dialog(1)])
+
+    fresh = reopened(cache)
+    try:
+        assert fresh.get_dialog("alice", 1) is not None
+    finally:
+        fresh.close()
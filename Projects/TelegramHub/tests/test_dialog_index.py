@@ -0,0 +1,195 @@
+"""DialogIndex: version tokens (ETag), filtered cursor pages and `since` deltas"""
+import pytest
+
+from crm_data import CRMData
+from crm_store import CRMStore
+from dialog_cache import DialogCache
+from dialog_index import DialogFilter, DialogIndex, decode_cursor, encode_cursor
+
+ACCOUNTS = {"alice", "bob"}
+
+
+def dialog(account: str, chat_id: int, day: int, unread: int = 0, type: str = "user") -> dict:
+    date = f"2025-01-{day:02d}T12:00:00"
+    return {
+        "id": chat_id,
+        "account": account,
+        "name": f"{account}-{chat_id}",
+        "type": type,
+        "unread_count": unread,
+        "last_message": {"id": day, "date": date},
+        "last_message_date": date
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = DialogCache(tmp_path / "dialogs.db")
+    c.replace_account("alice", [dialog("alice", 1, 1), dialog("alice", 2, 5, unread=2), dialog("alice", 3, 9)])
+    c.replace_account("bob", [dialog("bob", 1, 3, unread=1), dialog("bob", 4, 7, type="supergroup")])
+    yield c
+    c.close()
+
+
+@pytest.fixture
+def crm():
+    store = CRMStore(":memory:")
+    yield CRMData(store)
+    store.close()
+
+
+@pytest.fixture
+def index(cache, crm):
+    return DialogIndex(cache, crm)
+
+
+def keys(dialogs: list[dict]) -> list[tuple[str, int]]:
+    return [(d["account"], d["id"]) for d in dialogs]
+
+
+def apply_delta(dialogs: list[dict], delta: dict) -> list[tuple[str, int]]:
+    """What a client does with a delta response"""
+    drop = {(r["account"], r["id"]) for r in delta["removed"]} | set(keys(delta["changed"]))
+    kept = [d for d in dialogs if (d["account"], d["id"]) not in drop] + delta["changed"]
+    kept.sort(key=lambda d: (d["last_message_date"], d["account"], d["id"]), reverse=True)
+    return keys(kept)
+
+
+# ===== Version token =====
+
+def test_version_is_stable_without_changes(index):
+    assert index.version(ACCOUNTS) == index.version(set(ACCOUNTS))
+
+
+def test_version_changes_with_dialogs_crm_and_accounts(index, cache, crm):
+    seen = {index.version(ACCOUNTS)}
+
+    cache.rename("alice", 1, "New name")
+    seen.add(index.version(ACCOUNTS))
+    crm.set_chat_status("alice", 1, "active")
+    seen.add(index.version(ACCOUNTS))
+    seen.add(index.version({"alice"}))
+
+    assert len(seen) == 4
+
+
+def test_new_index_has_new_epoch(cache, crm):
+    assert DialogIndex(cache, crm).version(ACCOUNTS) != DialogIndex(cache, crm).version(ACCOUNTS)
+
+
+# ===== Pages =====
+
+def test_page_newest_first_with_crm(index, crm):
+    crm.set_chat_tags("alice", 2, ["client"])
+
+    result = index.page(ACCOUNTS, DialogFilter())
+
+    assert keys(result["dialogs"]) == [("alice", 3), ("bob", 4), ("alice", 2), ("bob", 1), ("alice", 1)]
+    assert result["dialogs"][2]["crm"]["tags"] == ["client"]
+    assert result["total"] == 5 and result["next_cursor"] is None
+    assert result["version"] == index.version(ACCOUNTS)
+
+
+def test_filters(index, crm):
+    crm.set_chat_tags("alice", 1, ["client"])
+    crm.set_chat_status("bob", 1, "active")
+    crm.toggle_chat_pinned("alice", 3)
+
+    def found(**kwargs):
+        return keys(index.page(ACCOUNTS, DialogFilter(**kwargs))["dialogs"])
+
+    assert found(account="bob") == [("bob", 4), ("bob", 1)]
+    assert found(type="supergroup") == [("bob", 4)]
+    assert found(unread_gt=0) == [("alice", 2), ("bob", 1)]
+    assert found(tag="client") == [("alice", 1)]
+    assert found(status="active") == [("bob", 1)]
+    assert found(pinned=True) == [("alice", 3)]
+
+
+def test_cursor_pages_cover_everything_once(index):
+    pages, cursor = [], None
+    while True:
+        result = index.page(ACCOUNTS, DialogFilter(), cursor=cursor, limit=2)
+        pages.append(keys(result["dialogs"]))
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == [[("alice", 3), ("bob", 4)], [("alice", 2), ("bob", 1)], [("alice", 1)]]
+
+
+def test_cursor_round_trip():
+    d = dialog("my:account", -100500, 4)
+    assert decode_cursor(encode_cursor(d)) == (d["last_message_date"], "my:account", -100500)
+
+
+# ===== Deltas =====
+
+def test_delta_contains_only_changes(index, cache, crm):
+    since = index.version(ACCOUNTS)
+
+    cache.apply_message("alice", 1, {"id": 20, "date": "2025-01-20T00:00:00"}, incoming=True)
+    crm.set_chat_status("bob", 1, "active")
+    cache.remove("alice", 3)
+
+    delta = index.delta(ACCOUNTS, DialogFilter(), since)
+
+    assert delta["delta"] is True
+    assert keys(delta["changed"]) == [("alice", 1), ("bob", 1)]
+    assert delta["changed"][1]["crm"]["status"] == "active"
+    assert delta["removed"] == [{"account": "alice", "id": 3}]
+    assert delta["version"] == index.version(ACCOUNTS)
+
+
+def test_delta_without_changes_is_empty(index):
+    delta = index.delta(ACCOUNTS, DialogFilter(), index.version(ACCOUNTS))
+    assert delta["changed"] == [] and delta["removed"] == []
+
+
+def test_dialog_leaving_filter_is_removed(index, crm):
+    crm.set_chat_tags("alice", 2, ["client"])
+    since = index.version(ACCOUNTS)
+
+    crm.set_chat_tags("alice", 2, [])
+
+    delta = index.delta(ACCOUNTS, DialogFilter(tag="client"), since)
+    assert delta["changed"] == []
+    assert delta["removed"] == [{"account": "alice", "id": 2}]
+
+
+def test_delta_applied_to_old_page_equals_fresh_page(index, cache, crm):
+    old = index.page(ACCOUNTS, DialogFilter(unread_gt=0))
+
+    cache.apply_message("alice", 1, {"id": 20, "date": "2025-01-20T00:00:00"}, incoming=True)
+    cache.mark_read("bob", 1, max_id=3)
+    cache.replace_account("bob", [dialog("bob", 1, 3), dialog("bob", 6, 8, unread=4)])
+
+    delta = index.delta(ACCOUNTS, DialogFilter(unread_gt=0), old["version"])
+    fresh = index.page(ACCOUNTS, DialogFilter(unread_gt=0))
+    assert apply_delta(old["dialogs"], delta) == keys(fresh["dialogs"])
+
+
+def test_other_accounts_changes_are_not_sent(index, cache):
+    since = index.version({"alice"})
+    cache.rename("bob", 1, "Bob")
+    cache.remove("bob", 4)
+
+    delta = index.delta({"alice"}, DialogFilter(), since)
+    assert delta["changed"] == [] and delta["removed"] == []
+
+
+@pytest.mark.parametrize("since", ["garbage", "a.b.c.d", "x.1.2"])
+def test_unusable_token_means_full_list(index, since):
+    assert index.delta(ACCOUNTS, DialogFilter(), since) is None
+
+
+def test_token_of_other_epoch_or_accounts_means_full_list(index, cache, crm):
+    other = DialogIndex(cache, crm)
+    assert index.delta(ACCOUNTS, DialogFilter(), other.version(ACCOUNTS)) is None
+    assert index.delta(ACCOUNTS, DialogFilter(), index.version({"alice"})) is None
+
+
+def test_token_from_the_future_means_full_list(index, cache):
+    epoch, dialogs_version, crm_version, accounts = index.version(ACCOUNTS).split(".")
+    future = f"{epoch}.{int(dialogs_version) + 5}.{crm_version}.{accounts}"
+    assert index.delta(ACCOUNTS, DialogFilter(), future) is None
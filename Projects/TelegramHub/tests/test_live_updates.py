@@ -0,0 +1,125 @@
+"""EventHub: publishing to filtered subscriptions, queue overflow -> resync"""
+from live_updates import EventHub
+
+
+def drain(subscription) -> list[dict]:
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+def test_publish_without_clients_is_a_no_op():
+    hub = EventHub()
+    hub.publish("message", account="alice", chat_id=1)
+    assert hub.stats["published"] == 0
+
+
+def test_every_client_gets_the_event():
+    hub = EventHub()
+    first, second = hub.subscribe(), hub.subscribe()
+
+    hub.publish("message", account="alice", chat_id=1, text="hi")
+
+    expected = [{"type": "message", "account": "alice", "chat_id": 1, "text": "hi"}]
+    assert drain(first) == expected and drain(second) == expected
+    assert hub.clients == 2 and hub.stats["published"] == 1
+
+
+def test_unsubscribed_client_gets_nothing():
+    hub = EventHub()
+    subscription = hub.subscribe()
+    hub.unsubscribe(subscription)
+    hub.unsubscribe(subscription)
+
+    hub.publish("message", account="alice", chat_id=1)
+
+    assert drain(subscription) == [] and hub.clients == 0
+
+
+def test_type_filter_ignores_unknown_types():
+    hub = EventHub()
+    subscription = hub.subscribe()
+    subscription.update(types=["draft", "no-such-type"])
+
+    hub.publish("message", account="alice", chat_id=1)
+    hub.publish("draft", id="d1")
+
+    assert drain(subscription) == [{"type": "draft", "id": "d1"}]
+    assert subscription.types == {"draft"}
+
+
+def test_account_and_chat_filters():
+    hub = EventHub()
+    by_account, by_chat = hub.subscribe(), hub.subscribe()
+    by_account.update(accounts=["alice"])
+    by_chat.update(chats=[{"account": "bob", "chat_id": "5"}])
+
+    hub.publish("message", account="alice", chat_id=1)
+    hub.publish("message", account="bob", chat_id=5)
+    hub.publish("read", account="bob", chat_id=6)
+
+    assert [(e["account"], e["chat_id"]) for e in drain(by_account)] == [("alice", 1)]
+    assert [(e["account"], e["chat_id"]) for e in drain(by_chat)] == [("bob", 5)]
+
+
+def test_events_without_account_pass_account_filters():
+    hub = EventHub()
+    subscription = hub.subscribe()
+    subscription.update(accounts=["alice"], chats=[{"account": "alice", "chat_id": 1}])
+
+    hub.publish("broadcast", broadcast_id="b1", done=1, total=2)
+
+    assert drain(subscription) == [{"type": "broadcast", "broadcast_id": "b1", "done": 1, "total": 2}]
+
+
+def test_clearing_filters_restores_everything():
+    hub = EventHub()
+    subscription = hub.subscribe()
+    subscription.update(types=["draft"])
+    subscription.update()
+
+    hub.publish("message", account="alice", chat_id=1)
+
+    assert len(drain(subscription)) == 1
+
+
+def test_overflow_replaces_backlog_with_resync():
+    hub = EventHub(queue_size=3)
+    slow, fast = hub.subscribe(), hub.subscribe()
+
+    for i in range(4):
+        hub.publish("message", account="alice", chat_id=1, n=i)
+        if i < 3:
+            drain(fast)
+
+    assert drain(slow) == [{"type": "resync", "dropped": 4}]
+    assert [e["n"] for e in drain(fast)] == [3]
+    assert hub.stats == {"published": 4, "resyncs": 1}
+
+
+def test_events_after_resync_are_queued_and_drops_accumulate():
+    hub = EventHub(queue_size=2)
+    slow = hub.subscribe()
+
+    for i in range(3):
+        hub.publish("message", account="alice", chat_id=1, n=i)
+    hub.publish("message", account="alice", chat_id=1, n=3)
+
+    assert [e.get("n", e["type"]) for e in drain(slow)] == ["resync", 3]
+
+    for i in range(3):
+        hub.publish("message", account="alice", chat_id=1, n=10 + i)
+    assert drain(slow) == [{"type": "resync", "dropped": 6}]
+    assert slow.dropped == 6
+
+
+def test_filtered_out_events_do_not_fill_the_queue():
+    hub = EventHub(queue_size=1)
+    subscription = hub.subscribe()
+    subscription.update(types=["draft"])
+
+    for i in range(5):
+        hub.publish("message", account="alice", chat_id=1, n=i)
+
+    assert drain(subscription) == [] and hub.stats["resyncs"] == 0
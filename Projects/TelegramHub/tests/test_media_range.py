@@ -0,0 +1,68 @@
+"""HTTP Range parsing for /api/media and ranged reads from the media cache"""
+import asyncio
+
+import pytest
+
+from media_cache import MediaCache, RangeNotSatisfiable, iter_file, parse_range
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize("header", [None, "", "items=0-10", "bytes=abc-def", "bytes=-"])
+def test_no_or_unusable_header_means_whole_file(header):
+    assert parse_range(header, SIZE) is None
+
+
+def test_closed_range():
+    assert parse_range("bytes=100-199", SIZE) == (100, 199)
+
+
+def test_open_ended_range_runs_to_the_end():
+    assert parse_range("bytes=500-", SIZE) == (500, SIZE - 1)
+    assert parse_range("bytes=0-", SIZE) == (0, SIZE - 1)
+
+
+def test_end_past_size_is_clamped():
+    assert parse_range("bytes=900-5000", SIZE) == (900, SIZE - 1)
+
+
+def test_suffix_range_is_last_n_bytes():
+    assert parse_range("bytes=-100", SIZE) == (900, SIZE - 1)
+
+
+def test_suffix_longer_than_file_is_whole_file():
+    assert parse_range("bytes=-5000", SIZE) == (0, SIZE - 1)
+
+
+def test_only_first_of_multiple_ranges_is_used():
+    assert parse_range("bytes=0-9, 20-29", SIZE) == (0, 9)
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=2000-3000", "bytes=500-100", "bytes=-0"])
+def test_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, SIZE)
+
+
+def test_iter_file_reads_inclusive_range_in_chunks(tmp_path):
+    path = tmp_path / "media.bin"
+    data = bytes(range(256)) * 4
+    path.write_bytes(data)
+
+    async def read(start, end):
+        return [chunk async for chunk in iter_file(path, start, end, chunk_size=100)]
+
+    chunks = asyncio.run(read(10, 309))
+    assert b"".join(chunks) == data[10:310]
+    assert [len(c) for c in chunks] == [100, 100, 100]
+
+
+def test_aborted_writer_leaves_nothing_in_cache(tmp_path):
+    cache = MediaCache(tmp_path, max_bytes=10_000)
+    cache.open()
+    writer = cache.writer(MediaCache.key("alice", 1, 2, "f"), "video/mp4")
+    writer.write(b"partial")
+    writer.abort()
+
+    assert list(tmp_path.iterdir()) == []
+    assert cache.find("alice", 1, 2) is None
@@ -0,0 +1,139 @@
+"""Metrics: Prometheus text rendering of counters / histograms / gauges and the rolling summary"""
+import pytest
+
+import metrics as metrics_module
+from metrics import Registry, hit_ratio, percentile
+
+
+@pytest.fixture
+def registry():
+    return Registry(window=60)
+
+
+def lines(registry: Registry) -> list[str]:
+    text = registry.render()
+    assert text.endswith("\n")
+    return text.splitlines()
+
+
+def test_counter_rendering(registry):
+    requests = registry.counter("app_requests_total", "Requests by route")
+    requests.inc(route="/a", status="2xx")
+    requests.inc(2, status="2xx", route="/a")
+    requests.inc(0.5, route="/b", status="5xx")
+
+    assert lines(registry) == [
+        "# HELP app_requests_total Requests by route",
+        "# TYPE app_requests_total counter",
+        'app_requests_total{route="/a",status="2xx"} 3',
+        'app_requests_total{route="/b",status="5xx"} 0.5',
+    ]
+    assert requests.value(status="2xx", route="/a") == 3
+
+
+def test_label_values_are_escaped(registry):
+    registry.counter("app_errors_total", "Errors").inc(message='bad "quote" \\ and\nnewline')
+    assert lines(registry)[-1] == 'app_errors_total{message="bad \\"quote\\" \\\\ and\\nnewline"} 1'
+
+
+def test_histogram_rendering_is_cumulative(registry):
+    latency = registry.histogram("app_seconds", "Latency", buckets=(0.1, 1, 10))
+    for value in (0.05, 0.1, 0.5, 3, 100):
+        latency.observe(value, route="/a")
+
+    assert lines(registry) == [
+        "# HELP app_seconds Latency",
+        "# TYPE app_seconds histogram",
+        'app_seconds_bucket{route="/a",le="0.1"} 2',
+        'app_seconds_bucket{route="/a",le="1"} 3',
+        'app_seconds_bucket{route="/a",le="10"} 4',
+        'app_seconds_bucket{route="/a",le="+Inf"} 5',
+        'app_seconds_sum{route="/a"} 103.65',
+        'app_seconds_count{route="/a"} 5',
+    ]
+
+
+def test_histogram_without_labels(registry):
+    registry.histogram("app_seconds", "Latency", buckets=(1,)).observe(2)
+    assert lines(registry)[2:] == [
+        'app_seconds_bucket{le="1"} 0',
+        'app_seconds_bucket{le="+Inf"} 1',
+        "app_seconds_sum 2",
+        "app_seconds_count 1",
+    ]
+
+
+def test_timer_labels_result(registry):
+    latency = registry.histogram("app_seconds", "Latency", buckets=(60,))
+    with latency.time(method="get"):
+        pass
+    with pytest.raises(ValueError):
+        with latency.time(method="get"):
+            raise ValueError
+    with latency.time(method="get", result="flood"):
+        pass
+
+    counts = {line.split(" ")[0]: line.split(" ")[1] for line in lines(registry) if "_count" in line}
+    assert counts == {
+        'app_seconds_count{method="get",result="ok"}': "1",
+        'app_seconds_count{method="get",result="error"}': "1",
+        'app_seconds_count{method="get",result="flood"}': "1",
+    }
+
+
+def test_gauge_reads_callback_at_render(registry):
+    state = {"clients": 1}
+    registry.gauge("app_clients", "Clients", lambda: state["clients"])
+    registry.gauge("app_queue", "Queue by account", lambda: [({"account": "alice"}, 2), ({"account": "bob"}, 0)])
+
+    state["clients"] = 7
+    assert lines(registry) == [
+        "# HELP app_clients Clients",
+        "# TYPE app_clients gauge",
+        "app_clients 7",
+        "# HELP app_queue Queue by account",
+        "# TYPE app_queue gauge",
+        'app_queue{account="alice"} 2',
+        'app_queue{account="bob"} 0',
+    ]
+
+
+def test_registering_twice_returns_same_metric(registry):
+    first = registry.counter("app_total", "Help")
+    assert registry.counter("app_total", "Help") is first
+    registry.gauge("app_gauge", "Help", lambda: 1)
+    registry.gauge("app_gauge", "Help", lambda: 2)
+    assert lines(registry)[-1] == "app_gauge 2"
+
+
+def test_summary_uses_rolling_window(registry, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(metrics_module.time, "monotonic", lambda: now[0])
+    latency = registry.histogram("app_seconds", "Latency")
+    latency.observe(9.0, route="/a")
+    now[0] += 120
+    for value in (0.1, 0.2, 0.3, 0.4):
+        latency.observe(value, route="/a")
+
+    series = registry.summary()["metrics"]["app_seconds"]["series"]
+
+    assert series == [{
+        "labels": {"route": "/a"}, "count": 4, "total_count": 5,
+        "avg": 0.25, "p50": 0.2, "p95": 0.4, "max": 0.4
+    }]
+
+
+def test_percentile_nearest_rank():
+    values = [5, 1, 4, 2, 3]
+    assert percentile(values, 0.5) == 3
+    assert percentile(values, 0.95) == 5
+    assert percentile(values, 0) == 1
+
+
+def test_hit_ratio(registry):
+    cache = registry.counter("app_cache_total", "Cache lookups")
+    assert hit_ratio(cache, "media") is None
+    cache.inc(cache="media", result="hit")
+    cache.inc(cache="media", result="hit")
+    cache.inc(cache="media", result="miss")
+    assert hit_ratio(cache, "media") == 0.667
@@ -0,0 +1,196 @@
+"""ReviewAnalyzer: AI results cached by (last message id, prompt version), one AI call per chat in flight"""
+import asyncio
+
+import pytest
+
+import review_ai
+from crm_store import CRMStore
+from review_ai import ReviewAnalyzer, last_message_id
+
+
+class FakeAI:
+    """review_chat counts calls; `gate` holds them until the test releases it"""
+
+    is_available = True
+
+    def __init__(self, result: dict = None):
+        self.result = result or {"analysis": {"summary": "ok"}, "suggestions": ["Hi"]}
+        self.calls: list[int] = []
+        self.gate: asyncio.Event = None
+
+    async def review_chat(self, messages: list[dict], chat_info: dict) -> dict:
+        self.calls.append(last_message_id(messages))
+        if self.gate:
+            await self.gate.wait()
+        return dict(self.result)
+
+
+class FakeCRM:
+    def __init__(self, statuses: dict = None):
+        self.statuses = statuses or {}
+
+    def get_chat_data(self, account: str, chat_id: int) -> dict:
+        return {"status": self.statuses.get((account, chat_id), "new"), "tags": []}
+
+
+class FakeAccount:
+    def __init__(self, messages: dict):
+        self.messages = messages
+
+    async def get_messages(self, chat_id: int, limit: int) -> list[dict]:
+        return self.messages[chat_id]
+
+
+class FakeManager:
+    def __init__(self, dialogs: list[dict], messages: dict):
+        self.dialogs = dialogs
+        self.account = FakeAccount(messages)
+
+    async def get_all_dialogs(self) -> list[dict]:
+        return self.dialogs
+
+    def get_account(self, name: str):
+        return self.account
+
+
+@pytest.fixture
+def store():
+    s = CRMStore(":memory:")
+    s.open()
+    yield s
+    s.close()
+
+
+def messages(*ids) -> list[dict]:
+    return [{"id": i, "text": f"m{i}", "is_outgoing": False} for i in ids]
+
+
+def analyzer(store, ai=None, manager=None, crm=None) -> ReviewAnalyzer:
+    return ReviewAnalyzer(manager, crm or FakeCRM(), ai or FakeAI(), store)
+
+
+def test_second_open_without_new_messages_is_a_cache_hit(store):
+    ai = FakeAI()
+    review = analyzer(store, ai)
+
+    async def run():
+        first = await review.analyze("alice", 1, messages(1, 2, 3), {})
+        second = await review.analyze("alice", 1, messages(3, 2, 1), {})
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["cached"] is False and second["cached"] is True
+    assert second["analysis"] == first["analysis"]
+    assert ai.calls == [3]
+    assert review.stats["hits"] == 1 and review.stats["misses"] == 1
+
+
+def test_new_message_invalidates_result(store):
+    ai = FakeAI()
+    review = analyzer(store, ai)
+
+    async def run():
+        await review.analyze("alice", 1, messages(1, 2), {})
+        return await review.analyze("alice", 1, messages(1, 2, 3), {})
+
+    assert asyncio.run(run())["cached"] is False
+    assert ai.calls == [2, 3]
+
+
+def test_prompt_version_change_invalidates_result(store, monkeypatch):
+    ai = FakeAI()
+    review = analyzer(store, ai)
+
+    async def run():
+        await review.analyze("alice", 1, messages(1), {})
+        monkeypatch.setattr(review_ai, "AI_PROMPT_VERSION", "changed-prompt")
+        return await review.analyze("alice", 1, messages(1), {})
+
+    assert asyncio.run(run())["cached"] is False
+    assert ai.calls == [1, 1]
+
+
+def test_results_are_per_chat(store):
+    ai = FakeAI()
+    review = analyzer(store, ai)
+
+    async def run():
+        await review.analyze("alice", 1, messages(5), {})
+        await review.analyze("alice", 2, messages(5), {})
+        await review.analyze("bob", 1, messages(5), {})
+
+    asyncio.run(run())
+    assert len(ai.calls) == 3
+
+
+def test_concurrent_requests_share_one_ai_call(store):
+    ai = FakeAI()
+    review = analyzer(store, ai)
+
+    async def run():
+        ai.gate = asyncio.Event()
+        waiting = [asyncio.create_task(review.analyze("alice", 1, messages(1, 2), {})) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert ("alice", 1) in review._inflight
+        ai.gate.set()
+        results = await asyncio.gather(*waiting)
+        return results
+
+    results = asyncio.run(run())
+    assert ai.calls == [2]
+    assert all(r["cached"] is False for r in results)
+    assert review._inflight == {}
+
+
+def test_cancelled_request_does_not_cancel_shared_call(store):
+    ai = FakeAI()
+    review = analyzer(store, ai)
+
+    async def run():
+        ai.gate = asyncio.Event()
+        first = asyncio.create_task(review.analyze("alice", 1, messages(1), {}))
+        second = asyncio.create_task(review.analyze("alice", 1, messages(1), {}))
+        await asyncio.sleep(0)
+        first.cancel()
+        ai.gate.set()
+        return await second
+
+    assert asyncio.run(run())["cached"] is False
+    assert review.cached("alice", 1, 1) is not None
+
+
+def test_failed_call_is_not_cached(store):
+    ai = FakeAI(result={"error": "rate limited"})
+    review = analyzer(store, ai)
+
+    async def run():
+        await review.analyze("alice", 1, messages(1), {})
+        return await review.analyze("alice", 1, messages(1), {})
+
+    assert asyncio.run(run())["error"] == "rate limited"
+    assert ai.calls == [1, 1]
+
+
+def test_precompute_fills_cache_for_review_queue(store):
+    dialogs = [
+        {"account": "alice", "id": 1, "type": "user", "unread_count": 3, "last_message": {"id": 12}},
+        {"account": "alice", "id": 2, "type": "user", "unread_count": 1, "last_message": {"id": 20}},
+        {"account": "alice", "id": 3, "type": "supergroup", "unread_count": 9, "last_message": {"id": 30}},
+        {"account": "alice", "id": 4, "type": "user", "unread_count": 0, "last_message": {"id": 40}},
+        {"account": "alice", "id": 5, "type": "user", "unread_count": 2, "last_message": {"id": 50}},
+    ]
+    manager = FakeManager(dialogs, {1: messages(11, 12), 2: messages(20), 5: messages(50)})
+    ai = FakeAI()
+    review = analyzer(store, ai, manager, FakeCRM({("alice", 5): "later"}))
+
+    async def run():
+        first = await review.precompute()
+        second = await review.precompute()
+        queue, total = await review.get_queue()
+        return first, second, queue, total
+
+    first, second, queue, total = asyncio.run(run())
+    assert first == 2 and second == 0
+    assert sorted(ai.calls) == [12, 20]
+    assert [d["id"] for d in queue] == [1, 2] and total == 2
+    assert all(d["ai_ready"] for d in queue)
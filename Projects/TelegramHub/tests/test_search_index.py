@@ -0,0 +1,136 @@
+"""SearchIndex: indexing, scoped search, deletion, pagination over the rank window"""
+from datetime import datetime, timezone
+
+import pytest
+
+from search_index import SearchIndex
+
+CHANNEL = -1001234567890
+GROUP = -4567
+USER = 777
+
+
+def msg(message_id: int, text: str, day: int = 1, out: bool = False) -> dict:
+    return {
+        "id": message_id,
+        "date": datetime(2025, 1, day, 12, tzinfo=timezone.utc),
+        "text": text,
+        "is_outgoing": out
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = SearchIndex(tmp_path / "search.db")
+    idx.open()
+    yield idx
+    idx.close()
+
+
+def ids(found: dict) -> list[tuple[str, int, int]]:
+    return [(r["account"], r["chat_id"], r["message_id"]) for r in found["results"]]
+
+
+def test_indexed_message_is_found_by_stemmed_prefix(index):
+    index.add_messages("alice", USER, [msg(1, "Отправил договора на подпись"), msg(2, "Привет")])
+
+    found = index.search("договор")
+    assert ids(found) == [("alice", USER, 1)]
+    assert "<b>" in found["results"][0]["snippet"]
+    assert found["total"] == 1 and found["truncated"] is False
+
+
+def test_yo_is_folded(index):
+    index.add_messages("alice", USER, [msg(1, "Выставил счёт")])
+    assert ids(index.search("счет")) == [("alice", USER, 1)]
+
+
+def test_messages_without_text_are_skipped(index):
+    index.add_messages("alice", USER, [msg(1, ""), {"id": 2, "date": 0, "text": None}])
+    assert index.stats() == {"messages": 0}
+
+
+def test_edit_replaces_text(index):
+    index.add_messages("alice", USER, [msg(1, "старый текст")])
+    index.add_messages("alice", USER, [msg(1, "новый текст")])
+
+    assert ids(index.search("старый")) == []
+    assert ids(index.search("новый")) == [("alice", USER, 1)]
+    assert index.stats() == {"messages": 1}
+
+
+def test_scoped_search(index):
+    index.add_messages("alice", USER, [msg(1, "invoice paid")])
+    index.add_messages("alice", GROUP, [msg(2, "invoice sent")])
+    index.add_messages("bob", USER, [msg(3, "invoice lost")])
+
+    assert sorted(ids(index.search("invoice", account="bob"))) == [("bob", USER, 3)]
+    assert sorted(ids(index.search("invoice", chat_id=USER))) == [("alice", USER, 1), ("bob", USER, 3)]
+    assert ids(index.search("invoice", chats=[("alice", GROUP)])) == [("alice", GROUP, 2)]
+    assert ids(index.search("invoice", chats=[])) == []
+
+
+def test_date_filter(index):
+    index.add_messages("alice", USER, [msg(1, "report", day=1), msg(2, "report", day=10)])
+
+    found = index.search("report", date_from="2025-01-05")
+    assert ids(found) == [("alice", USER, 2)]
+
+
+def test_delete_with_chat_id_removes_only_that_chat(index):
+    index.add_messages("alice", CHANNEL, [msg(5, "release notes")])
+    index.add_messages("alice", USER, [msg(5, "release party")])
+
+    index.delete_messages("alice", [5], CHANNEL)
+
+    assert ids(index.search("release")) == [("alice", USER, 5)]
+
+
+def test_delete_without_chat_id_keeps_channel_message_with_same_id(index):
+    # Telethon reports private / basic group deletions without chat_id
+    index.add_messages("alice", CHANNEL, [msg(5, "release notes")])
+    index.add_messages("alice", USER, [msg(5, "release party")])
+    index.add_messages("alice", GROUP, [msg(6, "release date")])
+
+    index.delete_messages("alice", [5, 6])
+
+    assert ids(index.search("release")) == [("alice", CHANNEL, 5)]
+
+
+def test_delete_is_per_account(index):
+    index.add_messages("alice", USER, [msg(5, "release")])
+    index.add_messages("bob", USER, [msg(5, "release")])
+
+    index.delete_messages("alice", [5])
+
+    assert ids(index.search("release")) == [("bob", USER, 5)]
+
+
+def test_pagination_walks_all_ranked_matches_once(index):
+    index.add_messages("alice", USER, [msg(i, f"payment number {i}", day=1 + i % 28) for i in range(1, 26)])
+
+    pages = [index.search("payment", limit=10, offset=offset) for offset in (0, 10, 20, 30)]
+
+    assert [len(p["results"]) for p in pages] == [10, 10, 5, 0]
+    seen = [r["message_id"] for p in pages for r in p["results"]]
+    assert sorted(seen) == list(range(1, 26))
+    assert all(p["total"] == 25 and p["truncated"] is False for p in pages)
+
+
+def test_matches_outside_rank_window_are_reported(tmp_path):
+    index = SearchIndex(tmp_path / "search.db", rank_window=10)
+    index.open()
+    index.add_messages("alice", USER, [msg(i, f"payment {i}") for i in range(1, 26)])
+
+    first = index.search("payment", limit=10)
+    past_window = index.search("payment", limit=10, offset=10)
+    index.close()
+
+    # Only the 10 newest matches are ranked; the caller is told the rest exist
+    assert sorted(r["message_id"] for r in first["results"]) == list(range(16, 26))
+    assert first["total"] == 10 and first["truncated"] is True
+    assert past_window["results"] == [] and past_window["truncated"] is True
+
+
+def test_empty_query(index):
+    assert index.search("  ") == {"results": [], "total": 0, "truncated": False, "took_ms": 0}